@@ -2,27 +2,34 @@
 对话聊天 API 路由
 支持 SSE 流式响应
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+import asyncio
 import json
+from app.core.config import get_settings
 from app.core.database import get_db_session
+from app.core.metrics import RequestTrace
 from app.repositories.conversation_repository import ConversationRepository
-from app.services.chat_service import ChatService
+from app.services.chat_service import ChatService, ChatTurn, start_chat_turn, save_chat_answer
 from app.services.embedding_service import EmbeddingService
 from app.services.vector_service_adapter import create_vector_service
 from app.services.rerank_service import RerankService
 from app.services.rag_service import RAGService
-from app.schemas.chat import ChatQueryDTO, ChatResponseDTO, ConversationDTO
+from app.schemas.chat import ChatQueryDTO, ChatResponseDTO, ChatMessageDTO, ConversationDTO
 from app.schemas.common import SuccessResponse
 import structlog
 
 logger = structlog.get_logger()
+settings = get_settings()
 
 router = APIRouter()
 
+# 送入 RAG 的对话历史条数（含本轮用户消息）
+CHAT_HISTORY_WINDOW = 10
+
 
 def get_chat_service(session: AsyncSession = Depends(get_db_session)) -> ChatService:
     """获取 ChatService 实例"""
@@ -38,10 +45,29 @@ def get_rag_service() -> RAGService:
     return RAGService(embedding_svc, vector_svc, rerank_svc)
 
 
+async def _begin_turn(
+    request: ChatQueryDTO,
+    rag_svc: RAGService,
+    trace: RequestTrace
+) -> Tuple[ChatTurn, List[float]]:
+    """
+    开始一轮对话：保存用户消息并取回历史窗口（一条语句），与问题向量化并发执行
+    
+    Returns:
+        Tuple[ChatTurn, List[float]]: (对话 ID 与历史窗口, 问题向量)
+    """
+    async def persist_turn() -> ChatTurn:
+        with trace.span("history"):
+            return await start_chat_turn(request.conversation_id, request.query, history_limit=CHAT_HISTORY_WINDOW)
+    
+    turn, query_vector = await asyncio.gather(persist_turn(), rag_svc.embed_question(request.query, trace))
+    return turn, query_vector
+
+
 @router.post("/")
 async def chat(
     request: ChatQueryDTO,
-    chat_svc: ChatService = Depends(get_chat_service),
+    http_request: Request,
     rag_svc: RAGService = Depends(get_rag_service)
 ):
     """
@@ -51,26 +77,21 @@ async def chat(
     - **top_k**: 检索数量
     - **stream**: 是否流式输出
     - **conversation_id**: 对话 ID（可选）
+    
+    请求头 X-Request-ID 作为追踪 ID（没有时自动生成），流式响应的 done 事件中返回
+    
+    每轮对话两次数据库写入：开始时保存用户消息并取回历史（与问题向量化并发），
+    生成结束后保存回答
     """
+    trace = RequestTrace(http_request.headers.get("X-Request-ID"))
     try:
-        conversation_id = request.conversation_id
+        turn, query_vector = await _begin_turn(request, rag_svc, trace)
+        conversation_id = turn.conversation_id or request.conversation_id
         
-        # 如果没有对话 ID，创建新对话
-        if not conversation_id:
-            conversation_id = await chat_svc.create_conversation(
-                first_message=request.query
-            )
-        
-        # 保存用户消息
-        await chat_svc.add_message(
-            conv_id=conversation_id,
-            role="user",
-            content=request.query
-        )
-        
-        # 获取对话历史
-        conversation = await chat_svc.get_conversation(conversation_id)
-        history = conversation.messages if conversation else []
+        async def save_answer(answer: str):
+            # 指定的对话不存在时不保存
+            if turn.conversation_id is not None:
+                await save_chat_answer(turn.conversation_id, answer)
         
         # SSE 流式响应
         async def generate_stream():
@@ -79,8 +100,10 @@ async def chat(
                 
                 async for token in rag_svc.query(
                     question=request.query,
-                    conversation_history=history[-10:],  # 保留最近 10 轮
-                    top_k=request.top_k
+                    conversation_history=turn.history,
+                    top_k=request.top_k,
+                    trace=trace,
+                    query_vector=query_vector
                 ):
                     full_answer += token
                     
@@ -88,17 +111,16 @@ async def chat(
                     yield f"data: {json.dumps({'token': token}, ensure_ascii=False)}\n\n"
                 
                 # 保存助手回答
-                await chat_svc.add_message(
-                    conv_id=conversation_id,
-                    role="assistant",
-                    content=full_answer
-                )
+                await save_answer(full_answer)
                 
                 # 发送完成信号
-                yield f"data: {json.dumps({'done': True, 'conversation_id': str(conversation_id)}, ensure_ascii=False)}\n\n"
+                done = {'done': True, 'conversation_id': str(conversation_id)}
+                if settings.TRACE_ID_IN_RESPONSE:
+                    done['trace_id'] = trace.trace_id
+                yield f"data: {json.dumps(done, ensure_ascii=False)}\n\n"
                 
             except Exception as e:
-                logger.error("stream_generation_failed", error=str(e))
+                logger.error("stream_generation_failed", error=str(e), trace_id=trace.trace_id)
                 yield f"data: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
         
         if request.stream:
@@ -111,17 +133,15 @@ async def chat(
             full_answer = ""
             async for token in rag_svc.query(
                 question=request.query,
-                conversation_history=history[-10:],
-                top_k=request.top_k
+                conversation_history=turn.history,
+                top_k=request.top_k,
+                trace=trace,
+                query_vector=query_vector
             ):
                 full_answer += token
             
             # 保存回答
-            await chat_svc.add_message(
-                conv_id=conversation_id,
-                role="assistant",
-                content=full_answer
-            )
+            await save_answer(full_answer)
             
             return SuccessResponse(
                 data=ChatResponseDTO(
@@ -152,8 +172,8 @@ async def get_conversations(
             ConversationDTO(
                 id=conv.id,
                 title=conv.title or "新对话",
-                last_message=(conv.messages[-1]['content'] if conv.messages else None),
-                turns=len(conv.messages) // 2 if conv.messages else 0,
+                last_message=conv.last_message,
+                turns=conv.message_count // 2,
                 updated_at=conv.updated_at
             )
             for conv in conversations
@@ -166,6 +186,28 @@ async def get_conversations(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/conversations/{conv_id}/messages", response_model=SuccessResponse[list[ChatMessageDTO]])
+async def get_conversation_messages(
+    conv_id: UUID,
+    limit: int = Query(50, ge=1, le=200),
+    before_id: Optional[int] = Query(None, description="分页游标：只返回该消息 ID 之前的消息"),
+    chat_svc: ChatService = Depends(get_chat_service)
+):
+    """
+    分页获取对话消息（时间正序，向前翻页时传入当前页第一条消息的 ID）
+    
+    - **limit**: 返回数量
+    - **before_id**: 分页游标
+    """
+    try:
+        messages = await chat_svc.get_history(conv_id, limit=limit, before_id=before_id)
+        return SuccessResponse(data=[ChatMessageDTO(**message) for message in messages])
+        
+    except Exception as e:
+        logger.error("get_conversation_messages_failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete("/conversations/{conv_id}", status_code=204)
 async def delete_conversation(
     conv_id: UUID,
@@ -1,20 +1,24 @@
 """
 文档管理 API 路由
 """
-import asyncio
-from fastapi import APIRouter, Depends, Query, HTTPException, File
+from fastapi import APIRouter, Depends, Query, HTTPException, File, Request, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import AsyncIterator, Optional
 from uuid import UUID
+from app.core.config import get_settings
 from app.core.database import get_db_session
+from app.exceptions import FileTooLargeError
 from app.repositories.document_repository import DocumentRepository
 from app.services.document_service import DocumentService
 from app.services.embedding_service import EmbeddingService
+from app.services.ingestion_queue import get_ingestion_worker_pool
 from app.schemas.document import DocumentDTO, DocumentListDTO
 from app.schemas.common import PageDTO, SuccessResponse
+from app.utils.upload_spool import spool_stream, iter_upload_file
 import structlog
 
 logger = structlog.get_logger()
+settings = get_settings()
 
 router = APIRouter()
 
@@ -27,63 +31,64 @@ def get_document_service(session: AsyncSession = Depends(get_db_session)) -> Doc
     return DocumentService(repo, embedding_svc)
 
 
-@router.post("/upload")
-async def upload_document(
-    file: bytes = File(..., description="上传的文件"),
-    mime_type: str = Query(..., description="文件 MIME 类型"),
-    filename: str = Query(..., description="文件名"),
-    service: DocumentService = Depends(get_document_service),
-    session: AsyncSession = Depends(get_db_session)  # 获取 session 用于提交事务
-):
+async def _ingest_upload(
+    chunks: AsyncIterator[bytes],
+    filename: str,
+    mime_type: str,
+    service: DocumentService,
+    session: AsyncSession
+) -> SuccessResponse:
     """
-    上传文档
+    暂存上传内容并创建文档记录
 
-    - **file**: 文件二进制内容
-    - **mime_type**: 文件 MIME 类型
-    - **filename**: 文件名
+    内容边读边写入磁盘并计算 SHA-256，单次上传的内存占用与文件大小无关
 
-    返回:
-    - 文档 ID 和处理状态
+    Args:
+        chunks: 上传内容的字节块
+        filename: 文件名
+        mime_type: 文件 MIME 类型
+        service: 文档服务
+        session: 数据库会话
+
+    Returns:
+        SuccessResponse: 文档 ID 和处理状态
     """
+    spooled = None
     try:
-        file_size = len(file)
+        # 1. 流式暂存到磁盘（超过大小限制时立即中止）
+        spooled = await spool_stream(chunks)
 
-        # 1. 上传文档（创建文档记录）
-        doc_id = await service.upload_document(
-            file_content=file,
+        # 2. 创建文档记录、逐块写入内容并入队处理任务
+        doc_id = await service.upload_spooled_document(
+            spooled,
             filename=filename,
-            mime_type=mime_type,
-            file_size=file_size
+            mime_type=mime_type
         )
 
         logger.info(
             "document_uploaded_api",
             doc_id=str(doc_id),
             filename=filename,
+            file_size=spooled.size,
             status="processing"
         )
 
-        # 2. 显式提交事务，确保文档记录已写入数据库
+        # 3. 显式提交事务，文档记录与处理任务一起写入数据库
         await session.commit()
-        
+
         logger.info(
             "transaction_committed",
             doc_id=str(doc_id)
         )
 
-        # 3. 事务提交后再启动异步处理任务
-        logger.info(
-            "starting_async_processing",
-            doc_id=str(doc_id),
-            after_commit=True
-        )
-        asyncio.create_task(service._process_document_async(doc_id))
+        # 4. 事务提交后唤醒工作池（并发度由 INGESTION_WORKERS 限制）
+        get_ingestion_worker_pool().notify()
 
         return SuccessResponse(
             data=DocumentDTO(
                 id=doc_id,
                 filename=filename,
-                file_size=file_size,
+                file_size=spooled.size,
                 mime_type=mime_type,
                 status="processing",
                 created_at=None,
@@ -94,6 +99,61 @@ async def upload_document(
     except Exception as e:
         logger.error("upload_failed", error=str(e))
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if spooled is not None:
+            spooled.cleanup()
+
+
+@router.post("/upload")
+async def upload_document(
+    file: UploadFile = File(..., description="上传的文件"),
+    mime_type: str = Query(..., description="文件 MIME 类型"),
+    filename: str = Query(..., description="文件名"),
+    service: DocumentService = Depends(get_document_service),
+    session: AsyncSession = Depends(get_db_session)  # 获取 session 用于提交事务
+):
+    """
+    上传文档（multipart/form-data）
+
+    - **file**: 文件
+    - **mime_type**: 文件 MIME 类型
+    - **filename**: 文件名
+
+    返回:
+    - 文档 ID 和处理状态
+    """
+    try:
+        return await _ingest_upload(iter_upload_file(file), filename, mime_type, service, session)
+    finally:
+        await file.close()
+
+
+@router.post("/upload/stream")
+async def upload_document_stream(
+    request: Request,
+    mime_type: str = Query(..., description="文件 MIME 类型"),
+    filename: str = Query(..., description="文件名"),
+    service: DocumentService = Depends(get_document_service),
+    session: AsyncSession = Depends(get_db_session)
+):
+    """
+    流式上传文档（请求体即文件内容，如 Content-Type: application/octet-stream）
+
+    不经过 multipart 解析，边接收边写入暂存文件
+
+    - **mime_type**: 文件 MIME 类型
+    - **filename**: 文件名
+
+    返回:
+    - 文档 ID 和处理状态
+    """
+    # 声明了 Content-Length 时提前拒绝超限请求，不读取请求体
+    max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise HTTPException(status_code=413, detail=FileTooLargeError(int(content_length), max_size).message)
+
+    return await _ingest_upload(request.stream(), filename, mime_type, service, session)
 
 
 @router.get("/", response_model=SuccessResponse[PageDTO[DocumentListDTO]])
@@ -185,22 +245,25 @@ async def delete_document(
 @router.post("/{doc_id}/reprocess")
 async def reprocess_document(
     doc_id: UUID,
+    full: bool = Query(False, description="全量重新处理（清空旧块后全部重新向量化）"),
     service: DocumentService = Depends(get_document_service)
 ):
     """
     重新处理文档
 
     仅允许状态为 "failed" 或 "ready" 的文档重新处理。
-    重新处理会清空旧的 chunk 数据和向量，然后重新启动异步处理流程。
+    默认增量处理：内容未变的块保留原向量，只向量化新增/变化的块；
+    full=true 时清空旧的 chunk 数据和向量后全部重新处理。
 
     - **doc_id**: 文档 ID
+    - **full**: 是否全量重新处理
 
     返回:
     - 成功消息
     """
     try:
         # 尝试重新处理文档
-        success = await service.reprocess_document(doc_id)
+        success = await service.reprocess_document(doc_id, incremental=False if full else None)
 
         if not success:
             raise HTTPException(status_code=500, detail="重新处理失败")
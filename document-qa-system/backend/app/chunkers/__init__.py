@@ -1,6 +1,6 @@
 """
 文本分块器模块
 """
-from .semantic_chunker import TextChunker, TextChunk
+from .semantic_chunker import TextChunker, TextChunk, split_sentences
 
-__all__ = ["TextChunker", "TextChunk"]
+__all__ = ["TextChunker", "TextChunk", "split_sentences"]
@@ -2,204 +2,317 @@
 语义分块算法
 基于段落和语义边界的智能分块
 """
-from typing import List
+import re
+from typing import Iterator, List, Optional, Tuple
 from dataclasses import dataclass
+from app.utils.tokenizer import HeuristicTokenizer, Tokenizer
+
+# 段落边界：两个换行之间只有空白
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n")
+# 句子边界：中英文句末标点（英文句点需后跟空白），连同紧随的右引号/右括号
+_SENTENCE_END = re.compile(r"(?:[。！？!?]+|\.(?=\s))[”’\"'）)」』]*")
+_WHITESPACE = re.compile(r"\s+")
+# 按字符分块时的 token 估算（不加载全局 tokenizer）
+_ESTIMATOR = HeuristicTokenizer()
 
 
 @dataclass
 class TextChunk:
     """
     文本块数据类
-    
+
     Attributes:
         content: 文本内容
-        token_count: Token 数量（估算）
+        token_count: Token 数量（未提供时按字符类别估算；按 token 分块时由分块器精确计算）
         start_index: 在原文中的起始位置
-        end_index: 在原文中的结束位置
+        end_index: 在原文中的结束位置（不含），content == text[start_index:end_index]
     """
     content: str
     token_count: int = 0
     start_index: int = 0
     end_index: int = 0
-    
+
     def __post_init__(self):
-        # 估算 token 数量（中文约 4 字符/token，英文约 4 字符/token）
-        self.token_count = len(self.content) // 4
+        if not self.token_count:
+            self.token_count = _ESTIMATOR.count(self.content)
+
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """去掉区间首尾空白，返回新的 (start, end)"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    按句末标点和段落切分句子（与分块使用相同的边界规则）
+
+    Args:
+        text: 文本
+
+    Returns:
+        List[str]: 去掉首尾空白的非空句子
+    """
+    sentences = []
+    position = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentences.extend(_split_lines(text, position, match.end()))
+        position = match.end()
+    sentences.extend(_split_lines(text, position, len(text)))
+    return sentences
+
+
+def _split_lines(text: str, start: int, end: int) -> List[str]:
+    """把区间按换行切开（没有句末标点的标题、列表项各自成句）"""
+    return [line.strip() for line in text[start:end].split("\n") if line.strip()]
 
 
 class TextChunker:
     """
     文本分块器
-    
+
     策略:
-    1. 先按段落分割（保留语义完整性）
-    2. 过大的段落按句子二次分割
-    3. 合并小段落至目标大小范围
-    
+    1. 先按段落切分；过大的段落按句子切分，过长的句子按固定长度切分
+    2. 依次合并切分单元，块大小不超过 chunk_size
+    3. 相邻块重叠约 overlap，重叠起点优先对齐到单元/句子/空白边界
+
+    单遍扫描原文，边界用预编译正则查找，块内容直接切片原文，
+    整体为线性时间，start_index/end_index 与原文精确对应。
+    提供 tokenizer 时 chunk_size/overlap 以 token 计，否则以字符计
+
     Attributes:
-        chunk_size: 目标块大小（字符数）
-        overlap: 块间重叠（字符数）
+        chunk_size: 目标块大小
+        overlap: 块间重叠
+        tokenizer: token 计数器（None 表示按字符数）
     """
-    
-    def __init__(self, chunk_size: int = 800, overlap: int = 150):
+
+    def __init__(self, chunk_size: int = 800, overlap: int = 150, tokenizer: Optional[Tokenizer] = None):
         """
         初始化分块器
-        
+
         Args:
             chunk_size: 目标块大小
-            overlap: 重叠大小
+            overlap: 重叠大小（需小于 chunk_size）
+            tokenizer: token 计数器（提供时按 token 预算分块）
+
+        Raises:
+            ValueError: 参数不合法
         """
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size 必须大于 0：{chunk_size}")
+        if overlap < 0 or overlap >= chunk_size:
+            raise ValueError(f"overlap 必须在 [0, chunk_size) 范围内：{overlap}")
         self.chunk_size = chunk_size
         self.overlap = overlap
-    
+        self.tokenizer = tokenizer
+
     def chunk_by_semantic(self, text: str) -> List[TextChunk]:
         """
         基于语义边界的分块算法
-        
+
         Args:
             text: 原始文本
-            
+
         Returns:
             List[TextChunk]: 文本块列表
         """
-        # Step 1: 按段落分割
-        paragraphs = self._split_by_paragraph(text)
-        
-        # Step 2: 过滤空段落
-        paragraphs = [p for p in paragraphs if p.strip()]
-        
-        # Step 3: 合并段落至目标大小
-        chunks = []
-        current_chunk = ""
-        current_start = 0
-        
-        char_index = 0
-        for paragraph in paragraphs:
-            para_start = char_index
-            para_end = char_index + len(paragraph)
-            
-            if not current_chunk:
-                # 当前块为空，直接添加
-                current_chunk = paragraph
-                current_start = para_start
-            elif len(current_chunk) + len(paragraph) <= self.chunk_size:
-                # 可以合并到当前块
-                current_chunk += "\n\n" + paragraph
-            else:
-                # 当前块已满，保存并开始新块
-                if current_chunk:
-                    chunk = TextChunk(
-                        content=current_chunk,
-                        start_index=current_start,
-                        end_index=para_start
-                    )
-                    chunks.append(chunk)
-                
-                # 如果段落本身就超过 chunk_size，需要拆分
-                if len(paragraph) > self.chunk_size:
-                    sub_chunks = self._split_large_paragraph(paragraph)
-                    chunks.extend(sub_chunks)
-                    current_chunk = ""
-                else:
-                    current_chunk = paragraph
-                    current_start = para_start
-            
-            char_index = para_end
-        
-        # 添加最后一个块
-        if current_chunk:
-            # 如果最后一个块超过 chunk_size，需要拆分
-            if len(current_chunk) > self.chunk_size:
-                sub_chunks = self._split_large_paragraph(current_chunk)
-                chunks.extend(sub_chunks)
-            else:
-                chunk = TextChunk(
-                    content=current_chunk,
-                    start_index=current_start,
-                    end_index=len(text)
-                )
-                chunks.append(chunk)
-        
-        return chunks
-    
-    def _split_by_paragraph(self, text: str) -> List[str]:
+        return list(self.iter_chunks(text))
+
+    def iter_chunks(self, text: str) -> Iterator[TextChunk]:
         """
-        按段落分割文本
-        
+        逐个生成文本块（惰性，不在内存中保留整份块列表）
+
         Args:
             text: 原始文本
-            
-        Returns:
-            List[str]: 段落列表（过滤空段落）
+
+        Yields:
+            TextChunk: 文本块
         """
-        # 按双换行符分割（Markdown 段落）
-        paragraphs = text.split('\n\n')
-        
-        # 清理每段的首尾空白并过滤空段落
-        paragraphs = [p.strip() for p in paragraphs if p.strip()]
-        
-        return paragraphs
-    
-    def _split_large_paragraph(self, paragraph: str, max_size: int = None) -> List[TextChunk]:
+        chunk_start = chunk_end = -1
+        # 当前块大小：逐段累加（字符模式下即原文跨度；token 模式下每段只计数一次）
+        used = 0
+        # 当前块内各单元的起点，用于把重叠起点对齐到单元边界
+        unit_starts: List[int] = []
+
+        for start, end in self._iter_units(text):
+            if chunk_start < 0:
+                chunk_start, chunk_end = start, end
+                used = self._size(text, start, end)
+                unit_starts = [start]
+                continue
+
+            extra = self._size(text, chunk_end, end)
+            if used + extra <= self.chunk_size:
+                chunk_end = end
+                used += extra
+                unit_starts.append(start)
+                continue
+
+            yield self._make_chunk(text, chunk_start, chunk_end)
+
+            next_start = self._overlap_start(text, unit_starts, chunk_start, chunk_end, start, end)
+            unit_starts = [s for s in unit_starts if s >= next_start]
+            if not unit_starts or unit_starts[0] != next_start:
+                unit_starts.insert(0, next_start)
+            unit_starts.append(start)
+            chunk_start, chunk_end = next_start, end
+            used = self._size(text, next_start, end)
+
+        if chunk_start >= 0:
+            yield self._make_chunk(text, chunk_start, chunk_end)
+
+    def _make_chunk(self, text: str, start: int, end: int) -> TextChunk:
+        """按原文区间构造文本块"""
+        content = text[start:end]
+        token_count = self.tokenizer.count(content) if self.tokenizer is not None else 0
+        return TextChunk(content=content, token_count=token_count, start_index=start, end_index=end)
+
+    def _size(self, text: str, start: int, end: int) -> int:
+        """区间大小（字符数或 token 数）"""
+        if self.tokenizer is None:
+            return end - start
+        return self.tokenizer.count(text[start:end])
+
+    def _head_end(self, text: str, start: int, end: int, budget: int) -> int:
+        """区间内不超过 budget 的最长前缀的结束位置"""
+        if self.tokenizer is None:
+            return min(end, start + budget)
+        return self.tokenizer.prefix_end(text, start, end, budget)
+
+    def _tail_start(self, text: str, start: int, end: int, budget: int) -> int:
+        """区间内不超过 budget 的最长后缀的起始位置"""
+        if self.tokenizer is None:
+            return max(start, end - budget)
+        return self.tokenizer.suffix_start(text, start, end, budget)
+
+    def _overlap_start(
+        self,
+        text: str,
+        unit_starts: List[int],
+        chunk_start: int,
+        chunk_end: int,
+        next_unit_start: int,
+        next_unit_end: int
+    ) -> int:
         """
-        拆分大段落（按句子 + 固定长度）
-            
+        计算下一块的起点（包含上一块末尾约 overlap 大小的内容）
+
+        优先级：上一块内的单元起点 > 句子边界 > 空白 > 任意字符位置；
+        同时保证下一块加入新单元后不超过 chunk_size
+
         Args:
-            paragraph: 大段落
-            max_size: 最大块大小
-                
+            text: 原始文本
+            unit_starts: 上一块内各单元的起点（升序）
+            chunk_start: 上一块的起始位置
+            chunk_end: 上一块的结束位置
+            next_unit_start: 新单元的起点
+            next_unit_end: 新单元的结束位置
+
         Returns:
-            List[TextChunk]: 文本块列表
+            int: 下一块的起点
+        """
+        if self.overlap == 0:
+            return next_unit_start
+
+        lower = max(
+            self._tail_start(text, chunk_start, chunk_end, self.overlap),
+            self._tail_start(text, chunk_start, next_unit_end, self.chunk_size),
+            chunk_start + 1
+        )
+        if lower >= chunk_end:
+            return next_unit_start
+
+        for unit_start in unit_starts:
+            if unit_start >= lower:
+                if unit_start < chunk_end:
+                    return unit_start
+                break
+
+        for pattern in (_SENTENCE_END, _WHITESPACE):
+            match = pattern.search(text, lower, chunk_end)
+            if match:
+                start, _ = _strip_span(text, match.end(), chunk_end)
+                if start < chunk_end:
+                    return start
+
+        return lower
+
+    def _iter_units(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        生成切分单元的原文区间：段落；过大的段落拆成句子；过长的句子按固定长度拆分
+
+        Args:
+            text: 原始文本
+
+        Yields:
+            Tuple[int, int]: (起点, 终点)，均已去掉首尾空白
+        """
+        for para_start, para_end in self._iter_paragraphs(text):
+            if self._size(text, para_start, para_end) <= self.chunk_size:
+                yield para_start, para_end
+                continue
+
+            for sent_start, sent_end in self._iter_sentences(text, para_start, para_end):
+                if self._size(text, sent_start, sent_end) <= self.chunk_size:
+                    yield sent_start, sent_end
+                    continue
+
+                # 强制按固定大小拆分（留出重叠空间，保证相邻块仍能重叠 overlap）
+                piece_start = sent_start
+                while piece_start < sent_end:
+                    piece_end = self._head_end(
+                        text, piece_start, sent_end, self.chunk_size - self.overlap
+                    )
+                    # 单个字符就超出预算时也至少前进一个字符
+                    piece_end = max(piece_end, piece_start + 1)
+                    start, end = _strip_span(text, piece_start, piece_end)
+                    if start < end:
+                        yield start, end
+                    piece_start = piece_end
+
+    def _iter_paragraphs(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        按段落（空行）切分
+
+        Args:
+            text: 原始文本
+
+        Yields:
+            Tuple[int, int]: 非空段落的 (起点, 终点)
         """
-        if max_size is None:
-            max_size = self.chunk_size
-            
-        # 按句子分割（中文句号、问号、感叹号）
-        sentences = []
-        current_sentence = ""
-            
-        for char in paragraph:
-            current_sentence += char
-            if char in '。！？!?':
-                sentences.append(current_sentence.strip())
-                current_sentence = ""
-            
-        # 处理剩余部分
-        if current_sentence.strip():
-            sentences.append(current_sentence.strip())
-            
-        # 合并句子至目标大小（确保不超过 max_size）
-        chunks = []
-        current_chunk = ""
-            
-        for sentence in sentences:
-            # 如果当前块 + 新句子超过限制，保存当前块
-            if len(current_chunk) + len(sentence) > max_size:
-                if current_chunk:
-                    chunks.append(TextChunk(content=current_chunk))
-                current_chunk = sentence
-            else:
-                # 可以添加到当前块
-                current_chunk += sentence
-            
-        # 添加最后一个块
-        if current_chunk:
-            chunks.append(TextChunk(content=current_chunk))
-            
-        # 如果还有超过 max_size 的块，强制按固定长度拆分
-        final_chunks = []
-        for chunk in chunks:
-            if len(chunk.content) > max_size:
-                # 强制按 max_size 拆分
-                content = chunk.content
-                for i in range(0, len(content), max_size):
-                    sub_content = content[i:i+max_size]
-                    final_chunks.append(TextChunk(
-                        content=sub_content,
-                        start_index=chunk.start_index + i,
-                        end_index=chunk.start_index + i + len(sub_content)
-                    ))
-            else:
-                final_chunks.append(chunk)
-            
-        return final_chunks
+        position = 0
+        for match in _PARAGRAPH_BREAK.finditer(text):
+            start, end = _strip_span(text, position, match.start())
+            if start < end:
+                yield start, end
+            position = match.end()
+
+        start, end = _strip_span(text, position, len(text))
+        if start < end:
+            yield start, end
+
+    def _iter_sentences(self, text: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """
+        在段落区间内按句末标点切分
+
+        Args:
+            text: 原始文本
+            start: 段落起点
+            end: 段落终点
+
+        Yields:
+            Tuple[int, int]: 非空句子的 (起点, 终点)
+        """
+        position = start
+        for match in _SENTENCE_END.finditer(text, start, end):
+            sent_start, sent_end = _strip_span(text, position, match.end())
+            if sent_start < sent_end:
+                yield sent_start, sent_end
+            position = match.end()
+
+        sent_start, sent_end = _strip_span(text, position, end)
+        if sent_start < sent_end:
+            yield sent_start, sent_end
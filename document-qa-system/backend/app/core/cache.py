@@ -0,0 +1,253 @@
+"""
+进程内缓存
+提供容量受限的 LRU + TTL 缓存，可选挂载共享后端（Redis），
+多实例部署时本地未命中再查共享后端
+"""
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+# 已创建的缓存（名称 -> 实例，需实现 stats()），用于统一输出命中率
+_registry: Dict[str, Any] = {}
+
+
+def register_cache(name: str, cache: Any):
+    """
+    登记缓存，统一输出命中统计
+
+    Args:
+        name: 缓存名称
+        cache: 缓存实例（需实现 stats()）
+    """
+    _registry[name] = cache
+
+
+class RedisCacheBackend:
+    """
+    Redis 共享缓存后端（需要安装 redis 包）
+
+    值以 JSON 存储，过期由 Redis 负责
+    """
+
+    def __init__(self, url: str, prefix: str, ttl_seconds: float):
+        """
+        初始化 Redis 后端
+
+        Args:
+            url: Redis 连接地址，如 redis://localhost:6379/0
+            prefix: 键前缀
+            ttl_seconds: 过期时间（秒）
+        """
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+    async def get(self, key: str) -> Optional[Any]:
+        """读取值，不存在返回 None"""
+        raw = await self.client.get(f"{self.prefix}:{key}")
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any):
+        """写入值"""
+        await self.client.set(
+            f"{self.prefix}:{key}",
+            json.dumps(value),
+            ex=max(1, int(self.ttl_seconds))
+        )
+
+    async def delete(self, key: str):
+        """删除值"""
+        await self.client.delete(f"{self.prefix}:{key}")
+
+
+def create_shared_backend(url: str, prefix: str, ttl_seconds: float) -> Optional[RedisCacheBackend]:
+    """
+    按配置创建共享后端
+
+    Args:
+        url: Redis 连接地址（为空表示不启用）
+        prefix: 键前缀
+        ttl_seconds: 过期时间（秒）
+
+    Returns:
+        Optional[RedisCacheBackend]: 未配置或 redis 包不可用时返回 None
+    """
+    if not url:
+        return None
+    try:
+        return RedisCacheBackend(url, prefix, ttl_seconds)
+    except ImportError:
+        logger.warning("shared_cache_backend_unavailable", prefix=prefix, reason="redis package not installed")
+        return None
+
+
+class TTLCache:
+    """
+    LRU + TTL 缓存
+
+    - 本地层：OrderedDict 实现 LRU，超过 max_size 淘汰最久未使用的项
+    - 过期：读取时惰性判断，过期项视为未命中并删除
+    - 共享层（可选）：本地未命中时查询，命中后回填本地；共享层异常视为未命中
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        ttl_seconds: float,
+        backend: Optional[Any] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化缓存
+
+        Args:
+            name: 缓存名称（用于日志和统计）
+            max_size: 本地最大条目数
+            ttl_seconds: 过期时间（秒）
+            backend: 共享后端（需实现 async get/set/delete）
+            clock: 时钟函数（测试可注入）
+        """
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._clock = clock
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        register_cache(name, self)
+
+    def get_local(self, key: str) -> Optional[Any]:
+        """
+        只查询本地层（不计入统计）
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[Any]: 缓存值，未命中或过期返回 None
+        """
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set_local(self, key: str, value: Any):
+        """
+        只写入本地层
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+        """
+        self._data[key] = (self._clock() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存（本地 -> 共享）
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[Any]: 缓存值，未命中返回 None
+        """
+        value = self.get_local(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.backend is not None:
+            try:
+                value = await self.backend.get(key)
+            except Exception as e:
+                logger.warning("shared_cache_get_failed", cache=self.name, error=str(e))
+                value = None
+            if value is not None:
+                self.shared_hits += 1
+                self.set_local(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        """
+        写入缓存（本地 + 共享）
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+        """
+        self.set_local(key, value)
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, value)
+            except Exception as e:
+                logger.warning("shared_cache_set_failed", cache=self.name, error=str(e))
+
+    async def delete(self, key: str):
+        """
+        删除缓存项
+
+        Args:
+            key: 缓存键
+        """
+        self._data.pop(key, None)
+        if self.backend is not None:
+            try:
+                await self.backend.delete(key)
+            except Exception as e:
+                logger.warning("shared_cache_delete_failed", cache=self.name, error=str(e))
+
+    def clear(self):
+        """清空本地层"""
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取命中统计
+
+        Returns:
+            Dict[str, Any]: 命中/未命中次数、命中率、当前大小等
+        """
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "shared_backend": self.backend is not None
+        }
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    获取所有缓存的统计
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 缓存名称 -> 统计
+    """
+    return {name: cache.stats() for name, cache in _registry.items()}
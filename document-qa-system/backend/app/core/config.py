@@ -29,6 +29,29 @@ class Settings(BaseSettings):
     # HNSW 索引参数
     HNSW_M: int = 16
     HNSW_EF_CONSTRUCTION: int = 64
+    # IVFFlat 索引参数（聚类中心数量，建议约为 行数/1000）
+    IVFFLAT_LISTS: int = 100
+    # 查询时的默认检索宽度（召回率/延迟权衡，越大召回越高、越慢）
+    HNSW_EF_SEARCH: int = 40
+    IVFFLAT_PROBES: int = 10
+    # 启动时自动创建缺失的向量索引
+    VECTOR_INDEX_AUTO_CREATE: bool = True
+    
+    # 混合检索配置（全文检索 + 向量检索，RRF 融合）
+    HYBRID_SEARCH_ENABLED: bool = True
+    FTS_CONFIG: str = "simple"  # 全文检索配置（分词在 Python 侧完成，数据库只做切词和小写）
+    LEXICAL_TOP_K: int = 15  # 全文检索召回数量
+    LEXICAL_MAX_QUERY_TERMS: int = 16  # 查询词项上限（已去掉停用词和虚词二元组）
+    LEXICAL_CANDIDATE_LIMIT: int = 1000  # GIN 预筛选的候选上限，只对候选计算 ts_rank_cd
+    RRF_K: int = 60  # RRF 平滑常数，越大越弱化排名靠前结果的优势
+    
+    # 多查询检索（LLM 生成查询变体，批量向量化后一次检索，RRF 融合）
+    MULTI_QUERY_ENABLED: bool = False
+    MULTI_QUERY_MAX_VARIANTS: int = 4  # 含原问题在内的最大查询数
+    MULTI_QUERY_EXPANSION_BUDGET_SECONDS: float = 0.8  # 扩展超时则本次只用原问题，结果在后台写入缓存
+    QUERY_EXPANSION_MODEL: str = ""  # 查询扩展模型（为空时使用 LLM_MODEL）
+    QUERY_EXPANSION_CACHE_SIZE: int = 1024
+    QUERY_EXPANSION_CACHE_TTL_SECONDS: float = 86400.0
     
     # 阿里云百炼配置
     DASHSCOPE_API_KEY: str = ""
@@ -43,20 +66,93 @@ class Settings(BaseSettings):
     EMBEDDING_MODEL: str = "text-embedding-v4"
     RERANK_MODEL: str = "qwen3-rerank"
     
+    # Embedding 批处理配置（文档入库）
+    EMBEDDING_BATCH_SIZE: int = 10  # 单次 API 请求的文本数（text-embedding-v4 上限 10）
+    EMBEDDING_BATCH_MAX_CHARS: int = 24000  # 单次 API 请求的总字符数上限
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # 同时在途的批次数
+    EMBEDDING_MAX_RETRIES: int = 2  # 单条文本的最大重试次数
+    
+    # 持久化向量缓存（按模型 + 文本 SHA-256 复用文档块向量）
+    EMBEDDING_STORE_ENABLED: bool = True
+    
+    # 查询向量缓存（用户问题 -> 向量，LRU + TTL）
+    QUERY_EMBEDDING_CACHE_ENABLED: bool = True
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048  # 本地最大条目数
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: float = 3600.0
+    
+    # 语义回答缓存（相同/同义问题复用回答，按查询向量相似度匹配并绑定语料版本）
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIZE: int = 1024  # 最大回答数
+    ANSWER_CACHE_TTL_SECONDS: float = 3600.0
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95  # 命中所需的最低余弦相似度
+    ANSWER_CACHE_REPLAY_CHUNK_CHARS: int = 8  # 命中时按此长度切片流式回放
+    
+    # 重排序分数缓存（规范化问题 + 块 ID + 内容哈希 -> 分数，部分命中时只重排未缓存的候选）
+    RERANK_CACHE_ENABLED: bool = True
+    RERANK_CACHE_SIZE: int = 20000  # 本地最大条目数（每个问题-候选对一条）
+    RERANK_CACHE_TTL_SECONDS: float = 3600.0
+    
+    # 自适应重排序（向量相似度已有明显第一名时跳过重排序，否则只重排接近第一名的候选）
+    # 阈值与 Embedding 模型的分数分布相关，调整后用 app/evaluation/scripts/tune_rerank_policy.py 验证
+    ADAPTIVE_RERANK_ENABLED: bool = False
+    ADAPTIVE_RERANK_SKIP_MIN_SCORE: float = 0.75  # 跳过所需的第一名最低相似度
+    ADAPTIVE_RERANK_SKIP_MIN_GAP: float = 0.12  # 跳过所需的第一名领先第二名的幅度
+    ADAPTIVE_RERANK_SHRINK_WINDOW: float = 0.2  # 只重排与第一名相差不超过该值的候选（0 表示不收缩）
+    CACHE_REDIS_URL: str = ""  # 多实例共享缓存（为空表示仅进程内缓存，需安装 redis）
+    
     # LLM 超时配置
     LLM_TIMEOUT_SECONDS: int = 4  # 生成超时4秒
     
+    # HTTP 客户端连接池配置（DashScope 调用共享）
+    HTTP2_ENABLED: bool = True  # 需要安装 h2，未安装时自动降级为 HTTP/1.1
+    HTTP_MAX_CONNECTIONS: int = 50  # 每个端点的最大连接数
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20  # 每个端点保持的空闲长连接数
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    EMBEDDING_TIMEOUT_SECONDS: float = 30.0
+    RERANK_TIMEOUT_SECONDS: float = 30.0
+    
     # RAG 配置
     CHUNK_SIZE: int = 600
     CHUNK_OVERLAP: int = 200
-    RAG_TOP_K: int = 15  # 平衡检索数量
+    CHUNK_MAX_TOKENS: int = 0  # >0 时按 token 预算分块（取代 CHUNK_SIZE/CHUNK_OVERLAP 的字符数）
+    CHUNK_OVERLAP_TOKENS: int = 64
+    
+    # Token 计数（分块预算、Prompt 预算）
+    TOKENIZER_BACKEND: str = "auto"  # auto / tiktoken / heuristic；auto 时只有配置了词表文件才用 tiktoken，否则估算
+    TOKENIZER_BPE_FILE: str = ""  # Qwen 词表 qwen.tiktoken 路径（本地文件，不会自动下载）
+    TOKENIZER_ENCODING: str = "cl100k_base"  # 仅 TOKENIZER_BACKEND=tiktoken 且未配置词表文件时使用
+    TOKEN_COUNT_CACHE_SIZE: int = 8192
+    RAG_TOP_K: int = 10  # 混合检索召回更准，缩小送入 rerank 的候选集
     RERANK_TOP_K: int = 6  # 平衡rerank数量
     RELEVANCE_THRESHOLD: float = 0.08  # 降低阈值
     MAX_RETRIEVAL_DOCS: int = 15
     
+    # Prompt 输入预算（文档块按相关性装入，放不下时裁剪为最相关的句子）
+    PROMPT_INPUT_TOKEN_BUDGET: int = 2400  # 模板+问题+历史+文档的 token 上限
+    PROMPT_HISTORY_TOKEN_BUDGET: int = 400
+    PROMPT_HISTORY_MAX_TURNS: int = 5
+    CONTEXT_MIN_CHUNK_TOKENS: int = 40  # 裁剪后不足该 token 数的块直接丢弃
+    
     # LLM 超时配置
     LLM_TIMEOUT_SECONDS: int = 8  # 生成超时8秒
     
+    # 文档解析/分块执行器（CPU 密集任务移出事件循环）
+    PARSE_EXECUTOR_MODE: str = "process"  # process / thread
+    PARSE_MAX_WORKERS: int = 2
+    PARSE_TIMEOUT_SECONDS: float = 120.0  # 单个文档解析+分块超时
+    PARSE_MEMORY_LIMIT_MB: int = 2048  # 子进程内存上限，0 表示不限制（仅 Linux/macOS 生效）
+    
+    # 文档入库任务队列（ingestion_jobs 表 + 工作池）
+    INGESTION_WORKERS: int = 4  # 每个实例的并发入库任务数，0 表示本实例不消费任务
+    INGESTION_POLL_INTERVAL_SECONDS: float = 2.0  # 空闲轮询间隔
+    INGESTION_JOB_MAX_ATTEMPTS: int = 3
+    INGESTION_RETRY_BACKOFF_SECONDS: float = 30.0  # 首次重试延迟，之后每次翻倍
+    INGESTION_RETRY_BACKOFF_MAX_SECONDS: float = 600.0
+    INGESTION_HEARTBEAT_SECONDS: float = 30.0
+    INGESTION_STALE_JOB_SECONDS: float = 300.0  # 心跳超时后视为执行者失联，任务重新排队
+    INCREMENTAL_REPROCESS_ENABLED: bool = True  # 重新处理时按内容哈希比对，只向量化变化的块
+    
     # 文件上传配置
     MAX_FILE_SIZE_MB: int = 50
     MAX_FILE_SIZE: int = 52428800  # 字节
@@ -67,6 +163,14 @@ class Settings(BaseSettings):
         "text/plain"
     }
     UPLOAD_DIR: str = "./uploads"
+    UPLOAD_SPOOL_DIR: str = ""  # 流式上传暂存目录，为空时使用 UPLOAD_DIR/spool
+    UPLOAD_STREAM_CHUNK_BYTES: int = 1024 * 1024  # 流式上传每次读取的字节数
+    UPLOAD_PIECE_BYTES: int = 5 * 1024 * 1024  # 流式上传写入 document_chunks 的分块大小
+    
+    # 文档二进制 blob 存储（按内容 SHA-256 寻址，替代数据库大字段）
+    BLOB_STORE_ENABLED: bool = True
+    BLOB_STORE_BACKEND: str = "local"
+    BLOB_STORE_PATH: str = "./storage/blobs"
     
     # 存储配置
     STORAGE_PATH: str = "./backend/app/storage"
@@ -82,6 +186,12 @@ class Settings(BaseSettings):
     # 日志配置
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "json"
+    LOG_PROFILE: str = "default"  # production：级别至少 INFO，热路径事件采样，丢弃调试负载字段
+    LOG_SAMPLE_RATES: str = ""  # 按事件名采样，如 "step*_started=0.01,embedding_success=0.1"（覆盖 production 默认值）
+    
+    # 指标与请求追踪（RAG 各阶段耗时直方图，Prometheus 文本格式）
+    METRICS_ENABLED: bool = True  # 是否开放 GET /metrics
+    TRACE_ID_IN_RESPONSE: bool = True  # SSE done 事件中返回 trace_id（与 X-Request-ID 请求头对应）
     
     class Config:
         env_file = ".env.local"
@@ -2,6 +2,7 @@
 数据库连接管理
 使用 SQLAlchemy Async 进行异步数据库操作
 """
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.core.config import get_settings
@@ -53,10 +54,30 @@ async def get_db_session() -> AsyncSession:
 
 
 async def init_db():
-    """初始化数据库（创建所有表）"""
+    """初始化数据库（创建所有表及向量索引）"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+        # 已有库补齐 blob 存储引用列（create_all 不会修改已存在的表）
+        if engine.dialect.name == "postgresql":
+            await conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS blob_hash VARCHAR(64)"))
+            # 对话列表元数据列（消息已迁移到 conversation_messages 表）
+            await conn.execute(text(
+                "ALTER TABLE conversations "
+                "ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0, "
+                "ADD COLUMN IF NOT EXISTS last_message TEXT"
+            ))
+
+        # 创建 chunks.embedding 的 ANN 索引，避免相似度检索退化为全表扫描
+        if settings.VECTOR_INDEX_AUTO_CREATE and engine.dialect.name == "postgresql":
+            from app.services.vector_index_manager import VectorIndexManager
+            await VectorIndexManager().ensure_index(conn)
+
+        # 全文检索列及 GIN 索引（已有库通过 ALTER TABLE 补齐）
+        if settings.HYBRID_SEARCH_ENABLED and engine.dialect.name == "postgresql":
+            from app.services.lexical_search_service import LexicalSearchService
+            await LexicalSearchService().ensure_schema(conn)
+
 
 async def close_db():
     """关闭数据库连接"""
@@ -0,0 +1,173 @@
+"""
+HTTP 客户端连接池管理
+为 DashScope 各端点提供进程级共享的 httpx.AsyncClient（长连接复用、HTTP/2、独立限额与超时）
+"""
+from typing import Dict, Any, Optional
+import httpx
+import structlog
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# 端点名称
+EMBEDDING = "embedding"
+RERANK = "rerank"
+LLM = "llm"
+
+
+def _http2_available() -> bool:
+    """判断是否可以启用 HTTP/2（依赖 h2 包）"""
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _endpoint_specs() -> Dict[str, Dict[str, Any]]:
+    """
+    各端点的连接池与超时配置
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 端点名称 -> {max_connections, read_timeout}
+    """
+    return {
+        EMBEDDING: {
+            "max_connections": settings.HTTP_MAX_CONNECTIONS,
+            "read_timeout": settings.EMBEDDING_TIMEOUT_SECONDS
+        },
+        RERANK: {
+            "max_connections": settings.HTTP_MAX_CONNECTIONS,
+            "read_timeout": settings.RERANK_TIMEOUT_SECONDS
+        },
+        LLM: {
+            "max_connections": settings.HTTP_MAX_CONNECTIONS,
+            "read_timeout": float(settings.LLM_TIMEOUT_SECONDS)
+        },
+    }
+
+
+class HTTPClientRegistry:
+    """
+    HTTP 客户端注册表
+
+    每个端点一个 AsyncClient，避免每次请求重新建立 TCP/TLS 连接。
+    在 main.py 的 lifespan 中 start()，关闭时 close()；
+    脚本等未经过 lifespan 的场景在首次 get() 时懒加载创建
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _create_client(self, name: str) -> httpx.AsyncClient:
+        """
+        按端点配置创建客户端
+
+        Args:
+            name: 端点名称
+
+        Returns:
+            httpx.AsyncClient: 客户端实例
+        """
+        spec = _endpoint_specs().get(name, {
+            "max_connections": settings.HTTP_MAX_CONNECTIONS,
+            "read_timeout": 30.0
+        })
+        http2 = _http2_available()
+
+        client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=spec["max_connections"],
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=httpx.Timeout(
+                spec["read_timeout"],
+                connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS
+            )
+        )
+
+        logger.info(
+            "http_client_created",
+            endpoint=name,
+            http2=http2,
+            max_connections=spec["max_connections"],
+            read_timeout=spec["read_timeout"]
+        )
+        return client
+
+    def start(self):
+        """预先创建所有端点的客户端"""
+        for name in _endpoint_specs():
+            self.get(name)
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """
+        获取端点客户端（不存在或已关闭时创建）
+
+        Args:
+            name: 端点名称
+
+        Returns:
+            httpx.AsyncClient: 共享客户端
+        """
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._create_client(name)
+            self._clients[name] = client
+        return client
+
+    async def close(self):
+        """关闭所有客户端并释放连接"""
+        for name, client in list(self._clients.items()):
+            await client.aclose()
+            logger.info("http_client_closed", endpoint=name)
+        self._clients.clear()
+
+    def get_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取连接池统计（用于监控）
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 端点名称 -> 连接数统计
+        """
+        stats = {}
+        for name, client in self._clients.items():
+            pool = getattr(client._transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []) or [])
+            stats[name] = {
+                "connections": len(connections),
+                "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+                "is_closed": client.is_closed
+            }
+        return stats
+
+
+http_clients = HTTPClientRegistry()
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """
+    获取共享 HTTP 客户端（依赖注入用）
+
+    Args:
+        name: 端点名称（embedding / rerank / llm）
+
+    Returns:
+        httpx.AsyncClient: 共享客户端
+    """
+    return http_clients.get(name)
+
+
+async def init_http_clients():
+    """初始化 HTTP 客户端连接池"""
+    http_clients.start()
+
+
+async def close_http_clients():
+    """关闭 HTTP 客户端连接池"""
+    await http_clients.close()
@@ -0,0 +1,362 @@
+"""
+指标与请求追踪
+进程内直方图/计数器，按 Prometheus 文本格式（0.0.4）输出到 /metrics；
+RequestTrace 记录一次 RAG 请求各阶段耗时，同时写入直方图
+"""
+import math
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+# 延迟直方图的默认桶（秒）：覆盖毫秒级缓存命中到数十秒的生成
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """转义标签值（反斜杠、双引号、换行）"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """格式化标签，如 {stage="embed",le="0.1"}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """格式化数值（Prometheus 使用 +Inf / -Inf / NaN）"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """单调递增计数器（指标名统一带 _total 后缀，HELP/TYPE 与样本行使用同一名称）"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name if name.endswith("_total") else f"{name}_total"
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        """
+        增加计数
+
+        Args:
+            amount: 增量（不能为负）
+            **labels: 标签值
+        """
+        if amount < 0:
+            raise ValueError("计数器只能递增")
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """读取当前值"""
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.label_names), 0.0)
+
+    def render(self) -> Iterator[str]:
+        """输出样本行"""
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """累积桶直方图（与 Prometheus histogram 语义一致）"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> (各桶计数（非累积）, 总和, 总数)
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels: str):
+        """
+        记录一次观测
+
+        Args:
+            value: 观测值（秒）
+            **labels: 标签值
+        """
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        series = self._series.get(key)
+        if series is None:
+            series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            self._series[key] = series
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, **labels: str) -> int:
+        """读取观测次数"""
+        series = self._series.get(tuple(str(labels.get(name, "")) for name in self.label_names))
+        return series[2] if series else 0
+
+    def render(self) -> Iterator[str]:
+        """输出样本行（_bucket 累积计数、_sum、_count）"""
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+@dataclass
+class GaugeFamily:
+    """
+    采集时生成的仪表值（连接池、缓存等当前状态）
+
+    Attributes:
+        name: 指标名
+        documentation: 说明
+        samples: (标签, 值) 列表
+    """
+    name: str
+    documentation: str
+    samples: List[Tuple[Dict[str, str], float]] = field(default_factory=list)
+
+    def add(self, value: float, **labels: str):
+        """添加样本"""
+        self.samples.append((labels, value))
+
+
+class MetricsRegistry:
+    """指标注册表：常驻指标 + 采集时调用的仪表采集函数"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], Iterable[GaugeFamily]]] = []
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        """获取或创建计数器"""
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, documentation, label_names)
+        return self._metrics[name]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        """获取或创建直方图"""
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, documentation, label_names, buckets)
+        return self._metrics[name]
+
+    def register_collector(self, collector: Callable[[], Iterable[GaugeFamily]]):
+        """
+        注册仪表采集函数（每次输出时调用，异常只记录告警）
+
+        Args:
+            collector: 返回 GaugeFamily 列表的函数
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        输出 Prometheus 文本格式
+
+        Returns:
+            str: 指标文本
+        """
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.warning("metrics_collector_failed", collector=getattr(collector, "__name__", "?"), error=str(e))
+                continue
+            for family in families:
+                lines.append(f"# HELP {family.name} {family.documentation}")
+                lines.append(f"# TYPE {family.name} gauge")
+                for labels, value in family.samples:
+                    label_text = _format_labels(list(labels), list(labels.values()))
+                    lines.append(f"{family.name}{label_text} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+RAG_STAGE_SECONDS = metrics_registry.histogram(
+    "rag_stage_duration_seconds",
+    "Duration of each RAG pipeline stage",
+    label_names=("stage",)
+)
+RAG_QUERIES = metrics_registry.counter(
+    "rag_queries_total",
+    "RAG queries by outcome",
+    label_names=("outcome",)
+)
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    获取全局指标注册表
+
+    Returns:
+        MetricsRegistry: 注册表
+    """
+    return metrics_registry
+
+
+class RequestTrace:
+    """
+    一次 RAG 请求的追踪
+
+    各阶段耗时写入 rag_stage_duration_seconds{stage=...}；
+    finish() 记录 total 阶段和请求结果，并输出一条汇总日志
+    """
+
+    def __init__(self, trace_id: Optional[str] = None, clock: Callable[[], float] = time.perf_counter):
+        """
+        初始化追踪
+
+        Args:
+            trace_id: 追踪 ID（为空时生成）
+            clock: 时钟函数（测试可注入）
+        """
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self._clock = clock
+        self._start = clock()
+        self.durations: Dict[str, float] = {}
+        self.outcome: Optional[str] = None
+
+    @contextmanager
+    def span(self, stage: str):
+        """
+        记录一个阶段的耗时（异常时同样记录）
+
+        Args:
+            stage: 阶段名称
+        """
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.record(stage, self._clock() - start)
+
+    def record(self, stage: str, seconds: float):
+        """
+        记录阶段耗时
+
+        Args:
+            stage: 阶段名称
+            seconds: 耗时（秒）
+        """
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+        RAG_STAGE_SECONDS.observe(seconds, stage=stage)
+
+    def elapsed(self) -> float:
+        """从请求开始到现在的耗时（秒）"""
+        return self._clock() - self._start
+
+    def finish(self, outcome: str):
+        """
+        结束追踪（重复调用只生效一次）
+
+        Args:
+            outcome: 请求结果（answered / cache_hit / no_documents / filtered_out / error / cancelled）
+        """
+        if self.outcome is not None:
+            return
+        self.outcome = outcome
+        self.record("total", self.elapsed())
+        RAG_QUERIES.inc(outcome=outcome)
+        logger.info(
+            "rag_trace",
+            trace_id=self.trace_id,
+            outcome=outcome,
+            stages_ms={stage: round(seconds * 1000, 1) for stage, seconds in self.durations.items()}
+        )
+
+
+def _numeric_gauges(prefix: str, documentation: str, label: str, stats: Dict[str, Dict[str, object]]) -> List[GaugeFamily]:
+    """把 {标签值: {字段: 数值}} 统计展开为每个字段一个仪表（跳过布尔和非数值字段）"""
+    families: Dict[str, GaugeFamily] = {}
+    for label_value, fields in stats.items():
+        for key, value in fields.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            family = families.get(key)
+            if family is None:
+                family = families[key] = GaugeFamily(f"{prefix}_{key}", f"{documentation} ({key})")
+            family.add(value, **{label: label_value})
+    return list(families.values())
+
+
+def collect_db_pool() -> List[GaugeFamily]:
+    """数据库连接池状态"""
+    from app.core.database import engine
+
+    pool = engine.sync_engine.pool
+    families = []
+    for key in ("size", "checkedin", "checkedout", "overflow"):
+        reader = getattr(pool, key, None)
+        if reader is None:
+            continue
+        family = GaugeFamily(f"db_pool_{key}", f"Database connection pool {key}")
+        family.add(reader())
+        families.append(family)
+    return families
+
+
+def collect_http_pools() -> List[GaugeFamily]:
+    """外部 API HTTP 连接池状态（按端点）"""
+    from app.core.http_client import http_clients
+
+    return _numeric_gauges("http_client_pool", "HTTP client pool", "endpoint", http_clients.get_pool_stats())
+
+
+def collect_caches() -> List[GaugeFamily]:
+    """进程内缓存统计（按缓存名称）"""
+    from app.core.cache import get_cache_stats
+
+    return _numeric_gauges("app_cache", "In-process cache", "cache", get_cache_stats())
+
+
+def collect_ingestion_workers() -> List[GaugeFamily]:
+    """入库工作池状态"""
+    from app.services.ingestion_queue import get_ingestion_worker_pool
+
+    return _numeric_gauges("ingestion_workers", "Ingestion worker pool", "pool", {"default": get_ingestion_worker_pool().stats()})
+
+
+for _collector in (collect_db_pool, collect_http_pools, collect_caches, collect_ingestion_workers):
+    metrics_registry.register_collector(_collector)
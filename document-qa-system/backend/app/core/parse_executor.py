@@ -0,0 +1,343 @@
+"""
+文档解析/分块执行器
+PDF/DOCX 解析和语义分块是纯 CPU 计算，放到独立进程池执行，
+避免大文件阻塞事件循环（SSE 流式回答、WebSocket 心跳）
+"""
+import asyncio
+import concurrent.futures
+import multiprocessing
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+import structlog
+from app.core.config import get_settings
+from app.exceptions import BaseAppException, DocumentParseError, DocumentParseInterruptedError
+
+try:
+    import resource
+except ImportError:  # Windows 不支持 resource 模块，内存限制不生效
+    resource = None
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# 任务因其他任务超时重建进程池而中断时，在新进程池中重新提交的次数
+_MAX_RESUBMITS = 1
+
+
+def _init_worker(memory_limit_mb: int):
+    """
+    子进程初始化：设置地址空间上限，超限时解析代码收到 MemoryError 而不是拖垮主机
+
+    Args:
+        memory_limit_mb: 内存上限（MB），0 表示不限制
+    """
+    if memory_limit_mb and resource is not None:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def parse_and_chunk_job(
+    mime_type: str,
+    file_content: bytes,
+    chunk_size: int,
+    overlap: int,
+    by_tokens: bool = False
+):
+    """
+    解析并分块（在子进程中执行）
+
+    Args:
+        mime_type: 文档 MIME 类型
+        file_content: 文件二进制内容
+        chunk_size: 分块大小
+        overlap: 分块重叠
+        by_tokens: chunk_size/overlap 是否以 token 计
+
+    Returns:
+        Tuple[str, List[TextChunk]]: (解析后的文本, 文本块列表)
+    """
+    return _parse_and_chunk(
+        mime_type, lambda parser: parser.parse(file_content), chunk_size, overlap, by_tokens
+    )
+
+
+def parse_and_chunk_file_job(
+    mime_type: str,
+    path: str,
+    chunk_size: int,
+    overlap: int,
+    by_tokens: bool = False
+):
+    """
+    按路径解析并分块（在子进程中执行，文件内容不经过进程间管道）
+
+    Args:
+        mime_type: 文档 MIME 类型
+        path: 文件路径（如 blob 存储中的文件）
+        chunk_size: 分块大小
+        overlap: 分块重叠
+        by_tokens: chunk_size/overlap 是否以 token 计
+
+    Returns:
+        Tuple[str, List[TextChunk]]: (解析后的文本, 文本块列表)
+    """
+    return _parse_and_chunk(
+        mime_type, lambda parser: parser.parse_file(path), chunk_size, overlap, by_tokens
+    )
+
+
+def _parse_and_chunk(
+    mime_type: str,
+    parse: Callable[[Any], Any],
+    chunk_size: int,
+    overlap: int,
+    by_tokens: bool = False
+):
+    """
+    解析并分块的公共流程
+
+    Args:
+        mime_type: 文档 MIME 类型
+        parse: 接收解析器、返回解析协程的函数
+        chunk_size: 分块大小
+        overlap: 分块重叠
+        by_tokens: chunk_size/overlap 是否以 token 计（子进程内加载 tokenizer）
+
+    Returns:
+        Tuple[str, List[TextChunk]]: (解析后的文本, 文本块列表)
+    """
+    from app.parsers import ParserRegistry
+    from app.chunkers.semantic_chunker import TextChunker
+    from app.utils.tokenizer import get_tokenizer
+
+    try:
+        parser = ParserRegistry.get_parser(mime_type)
+        # 解析器声明为 async 但不包含 IO，在子进程内直接驱动完成
+        text_content = asyncio.run(parse(parser))
+        chunker = TextChunker(
+            chunk_size=chunk_size,
+            overlap=overlap,
+            tokenizer=get_tokenizer() if by_tokens else None
+        )
+        chunks = chunker.chunk_by_semantic(text_content)
+        return text_content, chunks
+    except BaseAppException:
+        raise
+    except MemoryError:
+        raise DocumentParseError("解析进程内存超过限制")
+    except Exception as e:
+        raise DocumentParseError(str(e))
+
+
+class ParseExecutor:
+    """
+    解析/分块执行器
+
+    - process 模式：进程池（spawn 启动，设置内存上限），超时后终止并重建进程池
+    - thread 模式：线程池，仅释放事件循环，无法强制中断超时任务
+
+    提交前先获取并发槽位（不超过 max_workers），任务不会在执行池队列中排队，
+    超时只计算实际执行时间；只有超时的任务本身以 DocumentParseError 失败，
+    进程池重建时一起被终止的任务重新提交，子进程崩溃（无法确定由哪个文档导致）时抛出可重试的错误
+    """
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        memory_limit_mb: Optional[int] = None
+    ):
+        """
+        初始化执行器
+
+        Args:
+            mode: process / thread
+            max_workers: 最大并发任务数
+            timeout_seconds: 单个任务超时（秒）
+            memory_limit_mb: 子进程内存上限（MB），0 表示不限制
+        """
+        self.mode = mode or settings.PARSE_EXECUTOR_MODE
+        if self.mode not in ("process", "thread"):
+            raise ValueError(f"不支持的执行器模式：{self.mode}")
+        self.max_workers = max_workers or settings.PARSE_MAX_WORKERS
+        self.timeout_seconds = timeout_seconds or settings.PARSE_TIMEOUT_SECONDS
+        self.memory_limit_mb = settings.PARSE_MEMORY_LIMIT_MB if memory_limit_mb is None else memory_limit_mb
+        self._pool: Optional[concurrent.futures.Executor] = None
+        # 并发槽位（按事件循环创建）
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_pool(self) -> concurrent.futures.Executor:
+        """创建底层执行池"""
+        if self.mode == "thread":
+            return concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="parse"
+            )
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            # spawn：避免 fork 继承事件循环和数据库连接
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.memory_limit_mb,)
+        )
+
+    def start(self):
+        """创建执行池（懒加载，调用可选）"""
+        if self._pool is None:
+            self._pool = self._create_pool()
+            logger.info(
+                "parse_executor_started",
+                mode=self.mode,
+                max_workers=self.max_workers,
+                timeout_seconds=self.timeout_seconds,
+                memory_limit_mb=self.memory_limit_mb
+            )
+
+    def shutdown(self):
+        """关闭执行池（不等待运行中的任务）"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            logger.info("parse_executor_stopped", mode=self.mode)
+
+    def _restart_pool(self, pool: concurrent.futures.Executor, reason: str):
+        """
+        终止并重建进程池（超时任务无法单独取消，只能结束其所在进程）
+
+        Args:
+            pool: 出问题的执行池（已被其他任务重建时忽略）
+            reason: 重建原因
+        """
+        if self._pool is not pool:
+            return
+
+        if isinstance(pool, concurrent.futures.ProcessPoolExecutor):
+            for process in list((pool._processes or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+        logger.warning("parse_executor_restarted", mode=self.mode, reason=reason)
+
+    def _slots_for(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        """获取当前事件循环的并发槽位"""
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._slots_loop = loop
+        return self._slots
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        在执行池中运行任务（带超时，只计算执行时间）
+
+        Args:
+            fn: 模块级函数（process 模式下需可 pickle）
+            *args: 参数
+
+        Returns:
+            Any: 任务返回值
+
+        Raises:
+            DocumentParseError: 本任务超时（不可重试）
+            DocumentParseInterruptedError: 子进程崩溃或多次被其他任务的超时中断（可重试）
+        """
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(_MAX_RESUBMITS + 1):
+            async with self._slots_for(loop):
+                self.start()
+                pool = self._pool
+                try:
+                    return await asyncio.wait_for(
+                        loop.run_in_executor(pool, fn, *args),
+                        timeout=self.timeout_seconds
+                    )
+                except asyncio.TimeoutError:
+                    self._restart_pool(pool, "timeout")
+                    raise DocumentParseError(f"解析超时（超过 {self.timeout_seconds:.0f} 秒）")
+                except (BrokenProcessPool, asyncio.CancelledError) as e:
+                    if isinstance(e, asyncio.CancelledError) and asyncio.current_task().cancelling():
+                        # 调用方取消，不是执行池关闭导致的
+                        raise
+                    if self._pool is pool:
+                        # 本任务最先发现进程池损坏：子进程崩溃，无法确定由哪个文档导致，交给任务队列重试
+                        self._restart_pool(pool, "broken_process_pool")
+                        raise DocumentParseInterruptedError("解析进程异常退出（可能超过内存限制）")
+                    logger.info("parse_job_resubmitted", reason="pool_restarted", attempt=attempt + 1)
+
+        raise DocumentParseInterruptedError("解析进程池多次因其他任务超时重建")
+
+    async def parse_and_chunk(
+        self,
+        mime_type: str,
+        file_content: bytes,
+        chunk_size: int,
+        overlap: int,
+        by_tokens: bool = False
+    ):
+        """
+        解析文档并分块
+
+        Args:
+            mime_type: 文档 MIME 类型
+            file_content: 文件二进制内容
+            chunk_size: 分块大小
+            overlap: 分块重叠
+            by_tokens: chunk_size/overlap 是否以 token 计
+
+        Returns:
+            Tuple[str, List[TextChunk]]: (解析后的文本, 文本块列表)
+        """
+        return await self.run(
+            parse_and_chunk_job, mime_type, file_content, chunk_size, overlap, by_tokens
+        )
+
+    async def parse_and_chunk_file(
+        self,
+        mime_type: str,
+        path: str,
+        chunk_size: int,
+        overlap: int,
+        by_tokens: bool = False
+    ):
+        """
+        按文件路径解析文档并分块
+
+        Args:
+            mime_type: 文档 MIME 类型
+            path: 文件路径
+            chunk_size: 分块大小
+            overlap: 分块重叠
+            by_tokens: chunk_size/overlap 是否以 token 计
+
+        Returns:
+            Tuple[str, List[TextChunk]]: (解析后的文本, 文本块列表)
+        """
+        return await self.run(
+            parse_and_chunk_file_job, mime_type, path, chunk_size, overlap, by_tokens
+        )
+
+
+parse_executor = ParseExecutor()
+
+
+def get_parse_executor() -> ParseExecutor:
+    """
+    获取全局解析执行器
+
+    Returns:
+        ParseExecutor: 执行器实例
+    """
+    return parse_executor
+
+
+async def init_parse_executor():
+    """初始化解析执行器"""
+    parse_executor.start()
+
+
+async def close_parse_executor():
+    """关闭解析执行器"""
+    parse_executor.shutdown()
@@ -27,6 +27,8 @@ class EvaluationResult:
     # 性能指标
     retrieval_latency_ms: float = 0.0
     generation_latency_ms: float = 0.0
+    rerank_latency_ms: float = 0.0
+    rerank_action: str = ""
     
     # 检索结果
     retrieved_chunks: List[Dict] = field(default_factory=list)
@@ -59,21 +61,24 @@ class RAGEvaluator:
             start_time = asyncio.get_event_loop().time()
             
             # 获取检索到的chunks
-            query_vector = await self.rag_service._embed_question(question)
-            similar_chunks = await self.rag_service._retrieve_similar_chunks(query_vector, top_k=10)
+            similar_chunks = await self.rag_service._retrieve(question, top_k=10)
             
             retrieval_time = (asyncio.get_event_loop().time() - start_time) * 1000
             
             # 尝试重排序
+            rerank_start = asyncio.get_event_loop().time()
             try:
-                reranked_chunks = await self.rag_service._rerank_results(
+                reranked_chunks, rerank_decision = await self.rag_service._rerank_adaptive(
                     similar_chunks,
                     question,
                     keep_top_k=5
                 )
+                result.rerank_action = rerank_decision.action
             except Exception as e:
                 logger.warning(f"rerank failed: {e}")
                 reranked_chunks = similar_chunks[:5]
+                result.rerank_action = "failed"
+            result.rerank_latency_ms = (asyncio.get_event_loop().time() - rerank_start) * 1000
             
             result.retrieved_chunks = reranked_chunks
             result.retrieval_latency_ms = retrieval_time
@@ -236,6 +241,8 @@ class RAGEvaluator:
                 "context_recall": r.context_recall,
                 "retrieval_latency_ms": r.retrieval_latency_ms,
                 "generation_latency_ms": r.generation_latency_ms,
+                "rerank_latency_ms": r.rerank_latency_ms,
+                "rerank_action": r.rerank_action,
             })
         
         with open(output_path, "w", encoding="utf-8") as f:
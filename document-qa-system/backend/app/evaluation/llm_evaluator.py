@@ -8,6 +8,7 @@ from dataclasses import dataclass, field
 import structlog
 import json
 import httpx
+from app.core.http_client import get_http_client, LLM
 
 logger = structlog.get_logger()
 
@@ -120,6 +121,8 @@ class EvaluationResult:
     
     retrieval_latency_ms: float = 0.0
     generation_latency_ms: float = 0.0
+    rerank_latency_ms: float = 0.0
+    rerank_action: str = ""
     
     retrieved_chunks: List[Dict] = field(default_factory=list)
 
@@ -132,12 +135,19 @@ class LLMEvaluator:
         rag_service=None,
         llm_base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1",
         llm_api_key: str = None,
-        judge_model: str = "qwen-max"
+        judge_model: str = "qwen-max",
+        http_client: Optional[httpx.AsyncClient] = None
     ):
         self.rag_service = rag_service
         self.llm_base_url = llm_base_url
         self.llm_api_key = llm_api_key
         self.judge_model = judge_model
+        self._http_client = http_client
+    
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """获取 HTTP 客户端（未注入时使用共享连接池）"""
+        return self._http_client or get_http_client(LLM)
     
     async def _call_judge_llm(self, prompt: str, system_prompt: str = None) -> Dict:
         """调用Judge LLM进行评估"""
@@ -145,38 +155,39 @@ class LLMEvaluator:
             system_prompt = LLM_JUDGE_SYSTEM_PROMPT
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.llm_base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.llm_api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.judge_model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.0
-                    }
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                
-                content = result["choices"][0]["message"]["content"]
-                
-                # 尝试解析JSON
-                import re
-                json_match = re.search(r'\{[^}]+\}', content, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group())
-                
-                # 如果无法解析，返回默认
-                logger.warning(f"无法解析LLM响应: {content}")
-                return {"score": 0.5, "reason": "评估失败，使用默认分数"}
-                
+            client = self.http_client
+            response = await client.post(
+                f"{self.llm_base_url}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {self.llm_api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.judge_model,
+                    "messages": [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "temperature": 0.0
+                },
+                timeout=30.0
+            )
+            
+            response.raise_for_status()
+            result = response.json()
+            
+            content = result["choices"][0]["message"]["content"]
+            
+            # 尝试解析JSON
+            import re
+            json_match = re.search(r'\{[^}]+\}', content, re.DOTALL)
+            if json_match:
+                return json.loads(json_match.group())
+            
+            # 如果无法解析，返回默认
+            logger.warning(f"无法解析LLM响应: {content}")
+            return {"score": 0.5, "reason": "评估失败，使用默认分数"}
+            
         except Exception as e:
             logger.error(f"Judge LLM调用失败: {e}")
             return {"score": 0.5, "reason": f"调用失败: {str(e)}"}
@@ -201,21 +212,24 @@ class LLMEvaluator:
             start_time = asyncio.get_event_loop().time()
             
             # 获取检索到的chunks
-            query_vector = await self.rag_service._embed_question(question)
-            similar_chunks = await self.rag_service._retrieve_similar_chunks(query_vector, top_k=10)
+            similar_chunks = await self.rag_service._retrieve(question, top_k=10)
             
             retrieval_time = (asyncio.get_event_loop().time() - start_time) * 1000
             
             # 重排序
+            rerank_start = asyncio.get_event_loop().time()
             try:
-                reranked_chunks = await self.rag_service._rerank_results(
+                reranked_chunks, rerank_decision = await self.rag_service._rerank_adaptive(
                     similar_chunks,
                     question,
                     keep_top_k=5
                 )
+                result.rerank_action = rerank_decision.action
             except Exception as e:
                 logger.warning(f"rerank failed: {e}")
                 reranked_chunks = similar_chunks[:5]
+                result.rerank_action = "failed"
+            result.rerank_latency_ms = (asyncio.get_event_loop().time() - rerank_start) * 1000
             
             result.retrieved_chunks = reranked_chunks
             result.retrieval_latency_ms = retrieval_time
@@ -361,6 +375,8 @@ class LLMEvaluator:
                 "context_recall": r.context_recall,
                 "retrieval_latency_ms": r.retrieval_latency_ms,
                 "generation_latency_ms": r.generation_latency_ms,
+                "rerank_latency_ms": r.rerank_latency_ms,
+                "rerank_action": r.rerank_action,
             })
         
         with open(output_path, "w", encoding="utf-8") as f:
@@ -0,0 +1,138 @@
+"""
+自适应重排序策略调优
+对每个问题只做一次检索和一次完整重排序（作为参考结果），
+离线回放不同策略参数，比较延迟与结果一致性，挑选延迟最低且不损失精度的参数
+"""
+import itertools
+import statistics
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.services.rerank_policy import RerankPolicy, SKIP, SHRINK
+
+
+@dataclass
+class RerankSample:
+    """
+    一个问题的调优样本
+
+    Attributes:
+        question: 问题
+        candidates: 检索结果（按检索排序）
+        full_scores: 完整重排序的分数（候选位置 -> 分数）
+        full_latency_ms: 完整重排序耗时
+        subset_latency_ms: 部分重排序耗时（候选位置元组 -> 耗时），未测量的按候选数比例估算
+    """
+    question: str
+    candidates: List[Dict[str, Any]]
+    full_scores: Dict[int, float]
+    full_latency_ms: float
+    subset_latency_ms: Dict[Tuple[int, ...], float] = field(default_factory=dict)
+
+    def top_k(self, positions: Iterable[int], keep_top_k: int) -> List[int]:
+        """按完整重排序分数取前 keep_top_k（重排序分数与候选集合无关，部分重排序结果可直接推出）"""
+        scored = [i for i in positions if i in self.full_scores]
+        scored.sort(key=lambda i: self.full_scores[i], reverse=True)
+        return scored[:keep_top_k]
+
+    def latency_ms(self, positions: List[int]) -> float:
+        """部分重排序耗时"""
+        measured = self.subset_latency_ms.get(tuple(positions))
+        if measured is not None:
+            return measured
+        return self.full_latency_ms * len(positions) / max(len(self.candidates), 1)
+
+
+def evaluate_policy(
+    samples: List[RerankSample],
+    policy: RerankPolicy,
+    keep_top_k: int
+) -> Dict[str, Any]:
+    """
+    回放策略，统计延迟与一致性
+
+    一致性（agreement）= 策略选出的前 keep_top_k 与完整重排序前 keep_top_k 的重合比例，
+    完整重排序视为参考结果，一致性不下降即不损失精度
+
+    Args:
+        samples: 调优样本
+        policy: 待评估的策略
+        keep_top_k: 重排序后保留数量
+
+    Returns:
+        Dict[str, Any]: 跳过率、收缩率、重排序延迟中位数/P95、平均一致性、第一名一致率
+    """
+    latencies = []
+    agreements = []
+    top1_matches = 0
+    actions = {SKIP: 0, SHRINK: 0}
+
+    for sample in samples:
+        reference = sample.top_k(range(len(sample.candidates)), keep_top_k)
+        decision = policy.decide(sample.candidates, keep_top_k)
+
+        if decision.action == SKIP:
+            chosen = list(range(min(keep_top_k, len(sample.candidates))))
+            latency = 0.0
+        else:
+            chosen = sample.top_k(decision.candidates, keep_top_k)
+            latency = sample.latency_ms(decision.candidates)
+        actions[decision.action] = actions.get(decision.action, 0) + 1
+
+        latencies.append(latency)
+        agreements.append(len(set(chosen) & set(reference)) / len(reference) if reference else 1.0)
+        top1_matches += int(bool(chosen) and bool(reference) and chosen[0] == reference[0])
+
+    count = len(samples) or 1
+    ordered = sorted(latencies)
+    return {
+        "skip_min_score": policy.skip_min_score,
+        "skip_min_gap": policy.skip_min_gap,
+        "shrink_window": policy.shrink_window,
+        "skip_rate": actions[SKIP] / count,
+        "shrink_rate": actions[SHRINK] / count,
+        "median_latency_ms": statistics.median(latencies) if latencies else 0.0,
+        "p95_latency_ms": ordered[int(0.95 * (len(ordered) - 1))] if ordered else 0.0,
+        "agreement": sum(agreements) / count,
+        "top1_agreement": top1_matches / count
+    }
+
+
+def grid_search(
+    samples: List[RerankSample],
+    keep_top_k: int,
+    skip_min_scores: Iterable[float],
+    skip_min_gaps: Iterable[float],
+    shrink_windows: Iterable[float],
+    min_agreement: float = 0.95
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    网格搜索策略参数
+
+    Args:
+        samples: 调优样本
+        keep_top_k: 重排序后保留数量
+        skip_min_scores: 候选的 skip_min_score
+        skip_min_gaps: 候选的 skip_min_gap
+        shrink_windows: 候选的 shrink_window
+        min_agreement: 可接受的最低平均一致性
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+            (全部参数组合的结果，按延迟中位数升序；满足一致性要求且延迟最低的组合，没有则为 None)
+    """
+    baseline = evaluate_policy(samples, RerankPolicy(enabled=False), keep_top_k)
+    results = [
+        evaluate_policy(
+            samples,
+            RerankPolicy(enabled=True, skip_min_score=score, skip_min_gap=gap, shrink_window=window),
+            keep_top_k
+        )
+        for score, gap, window in itertools.product(skip_min_scores, skip_min_gaps, shrink_windows)
+    ]
+    results.sort(key=lambda item: (item["median_latency_ms"], -item["agreement"]))
+
+    acceptable = [
+        item for item in results
+        if item["agreement"] >= min_agreement and item["median_latency_ms"] <= baseline["median_latency_ms"]
+    ]
+    return results, (acceptable[0] if acceptable else None)
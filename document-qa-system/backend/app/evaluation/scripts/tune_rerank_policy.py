@@ -0,0 +1,128 @@
+"""
+自适应重排序策略调优脚本
+
+对数据集中每个问题检索一次、完整重排序一次（不走分数缓存），
+并实测各收缩窗口下部分重排序的耗时，然后离线网格搜索 ADAPTIVE_RERANK_* 参数：
+输出每组参数的跳过率、重排序延迟中位数/P95 和与完整重排序结果的一致性
+
+使用方法:
+    python -m app.evaluation.scripts.tune_rerank_policy
+    python -m app.evaluation.scripts.tune_rerank_policy --dataset data/evaluation/golden_dataset.json --min-agreement 0.95
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.evaluation.rerank_tuning import RerankSample, grid_search
+from app.services.embedding_service import EmbeddingService
+from app.services.postgresql_vector_service import PostgreSQLVectorService
+from app.services.vector_service_adapter import VectorServiceAdapter
+from app.services.rerank_service import RerankService
+from app.services.rerank_policy import RerankPolicy, SHRINK
+from app.core.config import get_settings
+
+
+def _floats(value: str):
+    return [float(item) for item in value.split(",") if item]
+
+
+async def collect_samples(rag_svc, rerank_svc, questions, top_k, keep_top_k, shrink_windows):
+    """检索并完整重排序每个问题，实测各收缩窗口的部分重排序耗时"""
+    samples = []
+    for question in questions:
+        candidates = await rag_svc._retrieve(question, top_k=top_k)
+        documents = [(chunk.get("metadata") or {}).get("content", "") for chunk in candidates]
+        if not documents:
+            continue
+
+        start = time.perf_counter()
+        reranked = await rerank_svc.rerank(query=question, documents=documents, top_k=len(documents))
+        full_latency = (time.perf_counter() - start) * 1000
+
+        sample = RerankSample(
+            question=question,
+            candidates=candidates,
+            full_scores={item["index"]: item["relevance_score"] for item in reranked},
+            full_latency_ms=full_latency
+        )
+        for window in shrink_windows:
+            decision = RerankPolicy(enabled=True, skip_min_score=2.0, shrink_window=window).decide(candidates, keep_top_k)
+            key = tuple(decision.candidates)
+            if decision.action == SHRINK and key not in sample.subset_latency_ms:
+                start = time.perf_counter()
+                await rerank_svc.rerank(query=question, documents=[documents[i] for i in key], top_k=keep_top_k)
+                sample.subset_latency_ms[key] = (time.perf_counter() - start) * 1000
+
+        samples.append(sample)
+        print(f"  [{len(samples)}/{len(questions)}] {question[:30]} 完整重排序 {full_latency:.0f}ms")
+    return samples
+
+
+async def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="自适应重排序策略调优")
+    parser.add_argument("--dataset", default="data/evaluation/test_dataset.json", help="数据集路径（含 question 字段）")
+    parser.add_argument("--top-k", type=int, default=settings.RAG_TOP_K, help="检索数量")
+    parser.add_argument("--keep-top-k", type=int, default=settings.RERANK_TOP_K, help="重排序后保留数量")
+    # 相似度不超过 1，skip_min_score=2.0 表示从不跳过（只比较收缩的效果）
+    parser.add_argument("--skip-min-scores", type=_floats, default=[0.6, 0.7, 0.75, 0.8, 0.85, 2.0])
+    parser.add_argument("--skip-min-gaps", type=_floats, default=[0.05, 0.08, 0.12, 0.16, 0.2])
+    parser.add_argument("--shrink-windows", type=_floats, default=[0.0, 0.1, 0.15, 0.2, 0.3])
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="与完整重排序结果的最低平均一致性")
+    args = parser.parse_args()
+
+    if not settings.DASHSCOPE_API_KEY:
+        print("错误: DASHSCOPE_API_KEY 未设置")
+        return
+    if not os.path.exists(args.dataset):
+        print(f"错误: 数据集不存在: {args.dataset}")
+        return
+
+    from app.services.rag_service import RAGService
+    rerank_svc = RerankService()
+    rag_svc = RAGService(EmbeddingService(), VectorServiceAdapter(PostgreSQLVectorService()), rerank_svc)
+
+    questions = [item["question"] for item in json.load(open(args.dataset, "r", encoding="utf-8"))]
+    print(f"采集样本: {len(questions)} 个问题")
+    samples = await collect_samples(
+        rag_svc, rerank_svc, questions, args.top_k, args.keep_top_k, args.shrink_windows
+    )
+
+    results, best = grid_search(
+        samples,
+        keep_top_k=args.keep_top_k,
+        skip_min_scores=args.skip_min_scores,
+        skip_min_gaps=args.skip_min_gaps,
+        shrink_windows=args.shrink_windows,
+        min_agreement=args.min_agreement
+    )
+    full = sorted(sample.full_latency_ms for sample in samples)
+
+    print("\n" + "=" * 88)
+    print(f"完整重排序: 延迟中位数 {full[len(full) // 2]:.0f}ms（{len(samples)} 个样本）")
+    print(f"{'min_score':>9} {'min_gap':>8} {'window':>7} {'skip':>6} {'shrink':>7} {'p50(ms)':>8} {'p95(ms)':>8} {'agree':>6} {'top1':>6}")
+    for item in results[:20]:
+        print(
+            f"{item['skip_min_score']:>9.2f} {item['skip_min_gap']:>8.2f} {item['shrink_window']:>7.2f} "
+            f"{item['skip_rate']:>6.0%} {item['shrink_rate']:>7.0%} {item['median_latency_ms']:>8.0f} "
+            f"{item['p95_latency_ms']:>8.0f} {item['agreement']:>6.2f} {item['top1_agreement']:>6.0%}"
+        )
+    print("=" * 88)
+
+    if best is None:
+        print(f"没有参数组合达到一致性 ≥ {args.min_agreement}，保持 ADAPTIVE_RERANK_ENABLED=False")
+        return
+    print("推荐配置:")
+    print("ADAPTIVE_RERANK_ENABLED=True")
+    print(f"ADAPTIVE_RERANK_SKIP_MIN_SCORE={best['skip_min_score']}")
+    print(f"ADAPTIVE_RERANK_SKIP_MIN_GAP={best['skip_min_gap']}")
+    print(f"ADAPTIVE_RERANK_SHRINK_WINDOW={best['shrink_window']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
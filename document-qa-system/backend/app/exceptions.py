@@ -27,6 +27,20 @@ class BaseAppException(Exception):
         self.details = details or {}
         self.status_code = status_code
         super().__init__(self.message)
+    
+    def __reduce__(self):
+        """支持 pickle（进程池中抛出的异常需要原样传回主进程）"""
+        return (
+            _rebuild_app_exception,
+            (type(self), self.message, self.code, self.details, self.status_code)
+        )
+
+
+def _rebuild_app_exception(cls, message, code, details, status_code):
+    """按原始字段重建异常，绕过子类各自的 __init__ 签名"""
+    exc = cls.__new__(cls)
+    BaseAppException.__init__(exc, message, code, details, status_code)
+    return exc
 
 
 class DocumentException(BaseAppException):
@@ -64,6 +78,16 @@ class DocumentParseError(DocumentException):
         )
 
 
+class DocumentParseInterruptedError(DocumentException):
+    """解析进程被中断（进程池因其他任务重建或子进程崩溃），可重试"""
+    def __init__(self, reason: str):
+        super().__init__(
+            message=f"文档解析中断：{reason}",
+            code="DOCUMENT_PARSE_INTERRUPTED",
+            status_code=503
+        )
+
+
 class DocumentNotFoundException(DocumentException):
     """文档未找到"""
     def __init__(self, doc_id: str):
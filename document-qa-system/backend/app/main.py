@@ -1,11 +1,17 @@
 """
 FastAPI 应用主入口
 """
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, WebSocket, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from starlette.websockets import WebSocketDisconnect
 from app.core.database import init_db, close_db
+from app.core.http_client import init_http_clients, close_http_clients
+from app.core.parse_executor import init_parse_executor, close_parse_executor
+from app.core.cache import get_cache_stats
+from app.core.metrics import get_metrics_registry
+from app.services.ingestion_queue import init_ingestion_workers, close_ingestion_workers, get_ingestion_worker_pool
 from app.core.config import get_settings
 from app.utils.logger import setup_logging
 from app.websocket_manager import manager
@@ -27,11 +33,23 @@ async def lifespan(app: FastAPI):
     logger.info("Application starting up...")
     await init_db()
     logger.info("Database initialized")
+    await init_http_clients()
+    logger.info("HTTP client pools initialized")
+    await init_parse_executor()
+    logger.info("Parse executor initialized")
+    await init_ingestion_workers()
+    logger.info("Ingestion workers started")
     
     yield
     
     # 关闭时清理
     logger.info("Application shutting down...")
+    await close_ingestion_workers()
+    logger.info("Ingestion workers stopped")
+    await close_parse_executor()
+    logger.info("Parse executor closed")
+    await close_http_clients()
+    logger.info("HTTP client pools closed")
     await close_db()
     logger.info("Database connections closed")
 
@@ -56,8 +74,24 @@ app.add_middleware(
 
 @app.get("/health")
 async def health_check():
-    """健康检查接口"""
-    return {"status": "healthy", "version": settings.VERSION}
+    """健康检查接口（附带缓存命中统计和入库工作池状态）"""
+    return {
+        "status": "healthy",
+        "version": settings.VERSION,
+        "caches": get_cache_stats(),
+        "ingestion": get_ingestion_worker_pool().stats()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 指标（RAG 各阶段耗时、连接池、缓存统计）"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return PlainTextResponse(
+        get_metrics_registry().render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 @app.get("/")
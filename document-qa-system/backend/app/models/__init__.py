@@ -4,5 +4,8 @@
 from .document import Document
 from .chunk import Chunk
 from .conversation import Conversation
+from .conversation_message import ConversationMessage
+from .embedding_cache import EmbeddingCacheEntry
+from .ingestion_job import IngestionJob
 
-__all__ = ["Document", "Chunk", "Conversation"]
+__all__ = ["Document", "Chunk", "Conversation", "ConversationMessage", "EmbeddingCacheEntry", "IngestionJob"]
@@ -3,7 +3,7 @@
 对应数据库的 chunks 表
 """
 from sqlalchemy import Column, String, Integer, ForeignKey, Text
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 from app.core.database import Base
@@ -24,6 +24,7 @@ class Chunk(Base):
         content: 原始文本内容
         token_count: Token 数量
         chunk_metadata: 位置信息（章节、页码）
+        content_tsv: 分词后的全文检索向量（GIN 索引）
     """
     __tablename__ = "chunks"
     
@@ -36,6 +37,8 @@ class Chunk(Base):
     embedding = Column(Vector(settings.VECTOR_DIMENSION), nullable=True)
     # 使用 'chunk_metadata' 避免 SQLAlchemy 保留字冲突，数据库列名仍为 'metadata'
     chunk_metadata = Column(JSONB, nullable=True, name="metadata")
+    # 全文检索字段（Python 侧中文分词后 to_tsvector）
+    content_tsv = Column(TSVECTOR, nullable=True)
     
     # 关联关系
     document = relationship("Document", back_populates="chunks")
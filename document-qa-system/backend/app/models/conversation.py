@@ -2,9 +2,9 @@
 对话实体模型
 对应数据库的 conversations 表
 """
-from sqlalchemy import Column, String, DateTime, func
+from sqlalchemy import Column, String, DateTime, Integer, Text, func
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from uuid import uuid4
 from datetime import datetime
 from app.core.database import Base
@@ -18,7 +18,9 @@ class Conversation(Base):
         id: 对话唯一标识 (UUID)
         user_id: 用户 ID (MVP 阶段可选)
         title: 对话标题 (自动生成)
-        messages: 完整消息列表 (JSONB)
+        messages: 旧版完整消息列表 (JSONB，已由 conversation_messages 表取代，延迟加载，仅供迁移脚本读取)
+        message_count: 消息条数（追加消息时原子递增）
+        last_message: 最后一条消息（截断，用于对话列表）
         created_at: 创建时间
         updated_at: 最后更新时间
     """
@@ -27,7 +29,9 @@ class Conversation(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     user_id = Column(UUID(as_uuid=True), nullable=True)  # MVP 阶段为空
     title = Column(String(200), nullable=True)
-    messages = Column(JSONB, nullable=True)  # 存储完整对话历史
+    messages = deferred(Column(JSONB, nullable=True))  # 旧版历史，见 scripts/migrate_conversation_messages.py
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_message = Column(Text, nullable=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
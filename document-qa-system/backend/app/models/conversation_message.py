@@ -0,0 +1,50 @@
+"""
+对话消息模型
+每条消息一行，追加消息为单条 INSERT，历史按 ID 分页读取
+"""
+from sqlalchemy import Column, String, DateTime, Text, BigInteger, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from datetime import datetime
+from app.core.database import Base
+
+
+class ConversationMessage(Base):
+    """
+    对话消息表
+
+    Attributes:
+        id: 自增 ID（同一对话内按 ID 排序即消息顺序，也用作分页游标）
+        conversation_id: 所属对话 ID
+        role: 角色（user / assistant）
+        content: 消息内容
+        sources: 引用来源（仅 assistant）
+        created_at: 创建时间
+    """
+    __tablename__ = "conversation_messages"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False)
+    role = Column(String(20), nullable=False)
+    content = Column(Text, nullable=False)
+    sources = Column(JSONB, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # 按对话倒序分页读取历史
+        Index('ix_conversation_messages_conversation_id_id', 'conversation_id', 'id'),
+    )
+
+    def to_dict(self) -> dict:
+        """转换为对话历史格式（与原 JSONB 消息结构一致，附带 id）"""
+        message = {
+            "id": self.id,
+            "role": self.role,
+            "content": self.content,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+        if self.sources:
+            message["sources"] = self.sources
+        return message
+
+    def __repr__(self):
+        return f"<ConversationMessage(id={self.id}, conversation_id={self.conversation_id}, role='{self.role}')>"
@@ -20,6 +20,7 @@ class Document(Base):
         file_path: 本地存储路径
         file_size: 文件大小 (字节)
         mime_type: MIME 类型
+        blob_hash: blob 存储中的内容哈希（为空表示原始文件仍存放在数据库中）
         status: 处理状态 (processing/ready/failed)
         chunks_count: 分块数量
         doc_metadata: 额外元数据（页数、字数等）
@@ -32,6 +33,7 @@ class Document(Base):
     filename = Column(String(255), nullable=False)
     file_content = Column(LargeBinary, nullable=True)  # 存储文件二进制内容
     content_hash = Column(String(64), nullable=True, unique=True)  # 内容SHA256哈希，用于去重
+    blob_hash = Column(String(64), nullable=True)  # 原始文件在 blob 存储中的键（内容 SHA-256）
     file_size = Column(Integer, nullable=False)
     mime_type = Column(String(50), nullable=False)
     status = Column(String(20), nullable=False, default='processing')
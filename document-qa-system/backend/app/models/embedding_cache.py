@@ -0,0 +1,32 @@
+"""
+向量缓存模型
+按 (模型, 文本 SHA-256) 持久化已计算的嵌入向量，内容未变化的文档块无需重新调用 Embedding API
+"""
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+from app.core.database import Base
+from app.models.types import Vector
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class EmbeddingCacheEntry(Base):
+    """
+    向量缓存表
+    
+    Attributes:
+        model: Embedding 模型名称
+        content_hash: 文本内容的 SHA-256（十六进制）
+        embedding: 嵌入向量
+        created_at: 创建时间
+    """
+    __tablename__ = "embedding_cache"
+    
+    model = Column(String(100), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    embedding = Column(Vector(settings.VECTOR_DIMENSION), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<EmbeddingCacheEntry(model={self.model}, content_hash={self.content_hash[:12]})>"
@@ -0,0 +1,62 @@
+"""
+文档入库任务模型
+持久化的解析→分块→向量化任务队列，由工作池通过 FOR UPDATE SKIP LOCKED 领取
+"""
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from uuid import uuid4
+from datetime import datetime
+from app.core.database import Base
+
+
+class IngestionJob(Base):
+    """
+    文档入库任务表
+
+    Attributes:
+        id: 任务唯一标识
+        document_id: 关联文档 ID
+        job_type: 任务类型（process/reprocess）
+        priority: 优先级（数值越小越先执行）
+        status: 任务状态 (queued/running/succeeded/failed)
+        attempts: 已领取次数
+        max_attempts: 最大尝试次数
+        run_after: 最早可执行时间（重试退避）
+        locked_at: 领取/最近心跳时间，超过阈值视为执行者已失联
+        locked_by: 领取任务的工作者标识
+        last_error: 最近一次失败原因
+        created_at: 创建时间
+        updated_at: 更新时间
+    """
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    document_id = Column(UUID(as_uuid=True), ForeignKey('documents.id', ondelete='CASCADE'), nullable=False)
+    job_type = Column(String(32), nullable=False, default='process')
+    priority = Column(Integer, nullable=False, default=100)
+    status = Column(String(20), nullable=False, default='queued')
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime, nullable=True)
+    locked_by = Column(String(100), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # 领取任务：只扫描排队中的任务，按优先级 + 入队时间排序
+        Index(
+            'ix_ingestion_jobs_claim', 'priority', 'created_at',
+            postgresql_where=text("status = 'queued'")
+        ),
+        # 同一文档最多一个活跃任务（重复入队时忽略）
+        Index(
+            'ux_ingestion_jobs_active_document', 'document_id',
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')")
+        ),
+    )
+
+    def __repr__(self):
+        return f"<IngestionJob(id={self.id}, document_id={self.document_id}, status='{self.status}')>"
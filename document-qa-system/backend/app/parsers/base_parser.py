@@ -29,6 +29,23 @@ class DocumentParser(ABC):
         """
         pass
     
+    async def parse_file(self, path: str) -> str:
+        """
+        解析本地文件为纯文本
+        
+        默认一次性读取文件后交给 parse（parse 需要完整的 bytes，映射后再切片只会多一次整文件复制）；
+        能直接按路径打开的解析器（PDF、Word）可覆盖此方法按需读取
+        
+        Args:
+            path: 文件路径
+            
+        Returns:
+            str: 解析后的文本内容
+        """
+        with open(path, "rb") as f:
+            file_content = f.read()
+        return await self.parse(file_content)
+    
     @classmethod
     def get_supported_mime_types(cls) -> list[str]:
         """
@@ -41,34 +41,60 @@ class DocxParser(DocumentParser):
         try:
             # 读取文件
             file_io = BytesIO(file_content)
-            doc = Document(file_io)
+            return self._extract_text(Document(file_io))
             
-            # 提取段落文本
-            text_parts = []
-            
-            # 提取所有段落
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    text_parts.append(para.text.strip())
-            
-            # 提取表格内容
-            for table in doc.tables:
-                table_text = []
-                for row_idx, row in enumerate(table.rows):
-                    row_cells = []
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            row_cells.append(cell.text.strip())
-                    if row_cells:
-                        table_text.append(" | ".join(row_cells))
-                
-                if table_text:
-                    text_parts.append("\n".join(table_text))
-            
-            # 合并所有文本
-            full_text = "\n\n".join(text_parts)
+        except Exception as e:
+            raise DocumentParseError(f"Word 解析失败：{str(e)}")
+    
+    async def parse_file(self, path: str) -> str:
+        """
+        按路径解析 Word 文件（zip 成员按需读取）
+        
+        Args:
+            path: Word 文件路径
             
-            return full_text.strip()
+        Returns:
+            str: 提取的文本内容
+        """
+        try:
+            return self._extract_text(Document(path))
             
         except Exception as e:
             raise DocumentParseError(f"Word 解析失败：{str(e)}")
+    
+    def _extract_text(self, doc) -> str:
+        """
+        提取段落和表格文本
+        
+        Args:
+            doc: python-docx Document
+            
+        Returns:
+            str: 提取的文本内容
+        """
+        # 提取段落文本
+        text_parts = []
+        
+        # 提取所有段落
+        for para in doc.paragraphs:
+            if para.text.strip():
+                text_parts.append(para.text.strip())
+        
+        # 提取表格内容
+        for table in doc.tables:
+            table_text = []
+            for row_idx, row in enumerate(table.rows):
+                row_cells = []
+                for cell in row.cells:
+                    if cell.text.strip():
+                        row_cells.append(cell.text.strip())
+                if row_cells:
+                    table_text.append(" | ".join(row_cells))
+            
+            if table_text:
+                text_parts.append("\n".join(table_text))
+        
+        # 合并所有文本
+        full_text = "\n\n".join(text_parts)
+        
+        return full_text.strip()
@@ -38,7 +38,39 @@ class PDFParser(DocumentParser):
         try:
             # 打开 PDF
             doc = fitz.open(stream=file_content, filetype="pdf")
+            return self._extract_text(doc)
             
+        except Exception as e:
+            raise DocumentParseError(f"PDF 解析失败：{str(e)}")
+    
+    async def parse_file(self, path: str) -> str:
+        """
+        按路径解析 PDF 文件（MuPDF 按页读取，无需把整个文件载入内存）
+        
+        Args:
+            path: PDF 文件路径
+            
+        Returns:
+            str: 提取的文本内容
+        """
+        try:
+            doc = fitz.open(path, filetype="pdf")
+            return self._extract_text(doc)
+            
+        except Exception as e:
+            raise DocumentParseError(f"PDF 解析失败：{str(e)}")
+    
+    def _extract_text(self, doc) -> str:
+        """
+        提取已打开 PDF 的全部页面文本（完成后关闭文档）
+        
+        Args:
+            doc: fitz.Document
+            
+        Returns:
+            str: 提取的文本内容
+        """
+        try:
             # 提取所有页面的文本
             text_parts = []
             for page_num in range(len(doc)):
@@ -48,14 +80,11 @@ class PDFParser(DocumentParser):
                 # 添加页码标记（可选）
                 if page_text.strip():
                     text_parts.append(f"[第{page_num + 1}页]\n{page_text}")
-            
+        finally:
             # 关闭文档
             doc.close()
-            
-            # 合并所有页面文本
-            full_text = "\n\n".join(text_parts)
-            
-            return full_text.strip()
-            
-        except Exception as e:
-            raise DocumentParseError(f"PDF 解析失败：{str(e)}")
+        
+        # 合并所有页面文本
+        full_text = "\n\n".join(text_parts)
+        
+        return full_text.strip()
@@ -1,13 +1,21 @@
 """
 对话数据访问层
 负责对话的 CRUD 操作
+
+消息存储在 conversation_messages 表中（每条消息一行）：
+追加消息是一条语句（更新对话元数据 + 插入消息），不读取也不重写已有历史
 """
 from typing import Optional, List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
-from uuid import UUID
+from sqlalchemy import select, desc, update, insert, delete, literal, case, true
+from sqlalchemy.dialects.postgresql import JSONB
+from uuid import UUID, uuid4
 from datetime import datetime
 from app.models.conversation import Conversation
+from app.models.conversation_message import ConversationMessage
+
+# 对话列表中展示的最后一条消息长度
+LAST_MESSAGE_PREVIEW_CHARS = 200
 
 
 class ConversationRepository:
@@ -17,8 +25,9 @@ class ConversationRepository:
     Methods:
         save: 保存对话
         find_by_id: 根据 ID 查询
-        find_all: 查询对话列表
-        update_messages: 更新消息列表
+        find_all: 查询对话列表（只含元数据）
+        append_message: 追加消息（单条语句）
+        find_messages: 分页查询消息
         delete: 删除对话
     """
     
@@ -67,6 +76,8 @@ class ConversationRepository:
         """
         查询对话列表（按最近活动时间排序）
         
+        只返回元数据（标题、消息数、最后一条消息），不加载消息历史
+        
         Args:
             limit: 返回数量
             
@@ -80,36 +91,182 @@ class ConversationRepository:
         )
         return result.scalars().all()
     
-    async def update_messages(
-        self, 
-        conv_id: UUID, 
-        messages: List[Dict[str, Any]]
-    ) -> bool:
+    @staticmethod
+    def _insert_message_from(conv, role: str, content: str, sources: Optional[List[Dict[str, Any]]], now: datetime):
+        """构建 INSERT INTO conversation_messages SELECT ... FROM conv 的 CTE（conv 无行时不插入）"""
+        return (
+            insert(ConversationMessage)
+            .from_select(
+                ["conversation_id", "role", "content", "sources", "created_at"],
+                select(
+                    conv.c.id,
+                    literal(role),
+                    literal(content),
+                    literal(sources, type_=JSONB),
+                    literal(now)
+                )
+            )
+            .returning(ConversationMessage.id)
+            .cte("msg")
+        )
+    
+    def build_append_statement(
+        self,
+        conv_id: UUID,
+        role: str,
+        content: str,
+        sources: Optional[List[Dict[str, Any]]] = None,
+        history_limit: int = 0
+    ):
         """
-        更新对话消息列表
+        构建追加消息语句
+        
+        WITH conv AS (UPDATE conversations ... RETURNING ...),
+             msg AS (INSERT INTO conversation_messages SELECT ... FROM conv RETURNING id)
+        SELECT msg.id, conv.message_count FROM msg, conv
+        
+        对话不存在时不插入；消息数、最后一条消息、标题在同一语句中更新（行锁串行化），并发追加不会互相覆盖。
+        history_limit > 0 时同一语句还左连接追加前最近的 history_limit 条消息
+        （同一语句内的查询看不到本次插入的行），每条历史消息一行
         
         Args:
             conv_id: 对话 ID
-            messages: 消息列表（JSONB）
+            role: 角色
+            content: 消息内容
+            sources: 引用来源
+            history_limit: 同时返回的历史消息条数
             
         Returns:
-            bool: 是否更新成功
+            Select: 返回 (新消息 ID, 追加后的消息数[, 历史消息列...]) 的语句
         """
-        conv = await self.find_by_id(conv_id)
-        if not conv:
-            return False
+        now = datetime.utcnow()
+        values = {
+            "message_count": Conversation.message_count + 1,
+            "last_message": content[:LAST_MESSAGE_PREVIEW_CHARS],
+            "updated_at": now
+        }
+        if role == "user":
+            # 自动生成标题（第一条用户消息）
+            values["title"] = case((Conversation.title.is_(None), content[:50]), else_=Conversation.title)
+        conv = (
+            update(Conversation)
+            .where(Conversation.id == conv_id)
+            .values(**values)
+            .returning(Conversation.id, Conversation.message_count)
+            .cte("conv")
+        )
+        msg = self._insert_message_from(conv, role, content, sources, now)
+        statement = select(msg.c.id, conv.c.message_count).select_from(msg).join(conv, true())
+        if history_limit <= 0:
+            return statement
         
-        conv.messages = messages
-        conv.updated_at = datetime.utcnow()
+        prior = (
+            select(
+                ConversationMessage.id,
+                ConversationMessage.role,
+                ConversationMessage.content,
+                ConversationMessage.sources,
+                ConversationMessage.created_at
+            )
+            .where(ConversationMessage.conversation_id == conv_id)
+            .order_by(desc(ConversationMessage.id))
+            .limit(history_limit)
+            .subquery("prior")
+        )
+        return (
+            statement
+            .add_columns(prior.c.id, prior.c.role, prior.c.content, prior.c.sources, prior.c.created_at)
+            .outerjoin(prior, true())
+            .order_by(prior.c.id)
+        )
+    
+    async def append_message(
+        self,
+        conv_id: UUID,
+        role: str,
+        content: str,
+        sources: Optional[List[Dict[str, Any]]] = None
+    ) -> Optional[int]:
+        """
+        追加消息（O(1)，不读取已有历史）
+        
+        Args:
+            conv_id: 对话 ID
+            role: 角色（"user" 或 "assistant"）
+            content: 消息内容
+            sources: 引用来源
+            
+        Returns:
+            Optional[int]: 追加后的消息数，对话不存在时返回 None
+        """
+        result = await self.session.execute(self.build_append_statement(conv_id, role, content, sources))
+        row = result.first()
+        return row[1] if row else None
+    
+    async def append_message_with_history(
+        self,
+        conv_id: UUID,
+        role: str,
+        content: str,
+        history_limit: int
+    ) -> Optional[List[ConversationMessage]]:
+        """
+        追加消息并在同一语句中读取追加前最近的 history_limit 条消息（一次往返）
+        
+        Args:
+            conv_id: 对话 ID
+            role: 角色
+            content: 消息内容
+            history_limit: 读取的历史消息条数
+            
+        Returns:
+            Optional[List[ConversationMessage]]: 追加前的历史（时间正序，不含本条），对话不存在时返回 None
+        """
+        result = await self.session.execute(
+            self.build_append_statement(conv_id, role, content, history_limit=history_limit)
+        )
+        rows = result.fetchall()
+        if not rows:
+            return None
+        # 历史列来自外连接，没有历史时只有一行且全为 NULL
+        return [
+            ConversationMessage(
+                id=row[2], conversation_id=conv_id, role=row[3], content=row[4], sources=row[5], created_at=row[6]
+            )
+            for row in rows
+            if row[2] is not None
+        ]
+    
+    async def find_messages(
+        self,
+        conv_id: UUID,
+        limit: Optional[int] = None,
+        before_id: Optional[int] = None,
+        role: Optional[str] = None
+    ) -> List[ConversationMessage]:
+        """
+        分页查询消息（取 before_id 之前最近的 limit 条，按时间正序返回）
         
-        # 自动生成标题（从第一条用户消息）
-        if not conv.title and messages:
-            for msg in messages:
-                if msg.get('role') == 'user':
-                    conv.title = msg.get('content', '')[:50]
-                    break
+        Args:
+            conv_id: 对话 ID
+            limit: 返回数量（为空时返回全部）
+            before_id: 游标，只返回 ID 小于该值的消息
+            role: 只返回该角色的消息
+            
+        Returns:
+            List[ConversationMessage]: 消息列表（时间正序）
+        """
+        query = select(ConversationMessage).where(ConversationMessage.conversation_id == conv_id)
+        if before_id is not None:
+            query = query.where(ConversationMessage.id < before_id)
+        if role is not None:
+            query = query.where(ConversationMessage.role == role)
+        query = query.order_by(desc(ConversationMessage.id))
+        if limit is not None:
+            query = query.limit(limit)
         
-        return True
+        result = await self.session.execute(query)
+        return list(reversed(result.scalars().all()))
     
     async def create_with_message(
         self,
@@ -117,7 +274,7 @@ class ConversationRepository:
         first_message: Optional[str] = None
     ) -> UUID:
         """
-        创建新对话并添加第一条消息
+        创建新对话并添加第一条消息（一条语句：INSERT 对话 + INSERT 消息）
         
         Args:
             user_id: 用户 ID（可选）
@@ -126,24 +283,43 @@ class ConversationRepository:
         Returns:
             UUID: 对话 ID
         """
-        messages = []
-        title = None
-        
-        if first_message:
-            messages = [{
-                "role": "user",
-                "content": first_message,
-                "created_at": datetime.utcnow().isoformat()
-            }]
-            title = first_message[:50]
+        conv_id = uuid4()
+        await self.session.execute(self.build_create_statement(conv_id, user_id, first_message))
+        return conv_id
+    
+    def build_create_statement(
+        self,
+        conv_id: UUID,
+        user_id: Optional[UUID] = None,
+        first_message: Optional[str] = None
+    ):
+        """
+        构建创建对话语句（有第一条消息时通过 CTE 在同一语句中插入消息）
         
-        conversation = Conversation(
+        Args:
+            conv_id: 对话 ID（由调用方生成，无需 RETURNING 往返）
+            user_id: 用户 ID
+            first_message: 第一条消息
+            
+        Returns:
+            Executable: 创建语句
+        """
+        now = datetime.utcnow()
+        conv = insert(Conversation).values(
+            id=conv_id,
             user_id=user_id,
-            title=title,
-            messages=messages if messages else None
+            title=first_message[:50] if first_message else None,
+            message_count=1 if first_message else 0,
+            last_message=first_message[:LAST_MESSAGE_PREVIEW_CHARS] if first_message else None,
+            created_at=now,
+            updated_at=now
         )
+        if not first_message:
+            return conv
         
-        return await self.save(conversation)
+        conv = conv.returning(Conversation.id).cte("conv")
+        msg = self._insert_message_from(conv, "user", first_message, None, now)
+        return select(msg.c.id).select_from(msg)
     
     async def delete(self, conv_id: UUID) -> bool:
         """
@@ -155,9 +331,8 @@ class ConversationRepository:
         Returns:
             bool: 是否删除成功
         """
-        conv = await self.find_by_id(conv_id)
-        if not conv:
-            return False
-        
-        await self.session.delete(conv)
-        return True
+        # 消息通过外键 ON DELETE CASCADE 删除
+        result = await self.session.execute(
+            delete(Conversation).where(Conversation.id == conv_id)
+        )
+        return bool(result.rowcount)
@@ -2,11 +2,11 @@
 文档数据访问层
 负责文档的 CRUD 操作
 """
-from typing import Optional, List
+from typing import Optional, List, AsyncIterator
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc, text
+from sqlalchemy import select, func, desc, text, insert
 from sqlalchemy.orm import selectinload
-from uuid import UUID
+from uuid import UUID, uuid4
 from datetime import datetime
 from app.models.document import Document
 from app.models.chunk import Chunk
@@ -171,6 +171,63 @@ class DocumentRepository:
         await self.session.flush()
         return chunk.id
     
+    async def save_chunks_bulk(
+        self,
+        doc_id: UUID,
+        contents: List[str],
+        token_counts: List[int],
+        search_documents: Optional[List[str]] = None,
+        ts_config: str = "simple",
+        chunk_indexes: Optional[List[int]] = None
+    ) -> List[UUID]:
+        """
+        批量保存文档块（单条 INSERT ... SELECT FROM unnest，一次往返）
+        
+        Args:
+            doc_id: 文档 ID
+            contents: 块内容列表
+            token_counts: 块 Token 数列表
+            search_documents: 分词后的全文检索文本（None 表示不写入 content_tsv）
+            ts_config: 全文检索配置名
+            chunk_indexes: 块序号列表（默认为 contents 的下标）
+            
+        Returns:
+            List[UUID]: 与 contents 对齐的块 ID
+        """
+        if not contents:
+            return []
+        
+        chunk_ids = [uuid4() for _ in contents]
+        with_tsv = search_documents is not None
+        
+        await self.session.execute(
+            text("""
+                INSERT INTO chunks (id, document_id, chunk_index, content, token_count, content_tsv)
+                SELECT v.id, CAST(:document_id AS UUID), v.chunk_index, v.content, v.token_count,
+                       CASE WHEN :with_tsv
+                            THEN to_tsvector(CAST(:ts_config AS REGCONFIG), v.search_document)
+                       END
+                FROM unnest(
+                    CAST(:ids AS UUID[]),
+                    CAST(:chunk_indexes AS INTEGER[]),
+                    CAST(:contents AS TEXT[]),
+                    CAST(:token_counts AS INTEGER[]),
+                    CAST(:search_documents AS TEXT[])
+                ) AS v(id, chunk_index, content, token_count, search_document)
+            """),
+            {
+                "document_id": doc_id,
+                "ids": chunk_ids,
+                "chunk_indexes": chunk_indexes if chunk_indexes is not None else list(range(len(contents))),
+                "contents": contents,
+                "token_counts": token_counts,
+                "search_documents": search_documents if with_tsv else [""] * len(contents),
+                "with_tsv": with_tsv,
+                "ts_config": ts_config
+            }
+        )
+        return chunk_ids
+    
     async def find_chunks_by_document(self, doc_id: UUID) -> List[Chunk]:
         """
         查询文档的所有块
@@ -188,6 +245,82 @@ class DocumentRepository:
         )
         return result.scalars().all()
     
+    async def find_chunk_hashes(self, doc_id: UUID) -> List:
+        """
+        查询文档现有块的内容哈希（增量重新处理时比对）
+
+        哈希在数据库侧计算，不把块正文传回应用
+
+        Args:
+            doc_id: 文档 ID
+
+        Returns:
+            List: 行列表，包含 id、chunk_index、content_hash（SHA-256 十六进制）、has_embedding
+        """
+        result = await self.session.execute(
+            text("""
+                SELECT id, chunk_index,
+                       encode(sha256(convert_to(content, 'UTF8')), 'hex') AS content_hash,
+                       embedding IS NOT NULL AS has_embedding
+                FROM chunks
+                WHERE document_id = :doc_id
+                ORDER BY chunk_index
+            """),
+            {"doc_id": doc_id}
+        )
+        return result.fetchall()
+
+    async def reindex_chunks(self, chunk_ids: List[UUID], chunk_indexes: List[int]) -> int:
+        """
+        批量更新块序号（同步更新 metadata 中的 chunk_index）
+
+        Args:
+            chunk_ids: 块 ID 列表
+            chunk_indexes: 与 chunk_ids 对齐的新序号
+
+        Returns:
+            int: 更新的行数
+        """
+        if not chunk_ids:
+            return 0
+
+        result = await self.session.execute(
+            text("""
+                UPDATE chunks AS c
+                SET chunk_index = v.chunk_index,
+                    metadata = CASE
+                        WHEN c.metadata IS NULL THEN NULL
+                        ELSE jsonb_set(c.metadata, '{chunk_index}', to_jsonb(v.chunk_index))
+                    END
+                FROM unnest(
+                    CAST(:ids AS UUID[]),
+                    CAST(:chunk_indexes AS INTEGER[])
+                ) AS v(id, chunk_index)
+                WHERE c.id = v.id
+            """),
+            {"ids": chunk_ids, "chunk_indexes": chunk_indexes}
+        )
+        return result.rowcount
+
+    async def delete_chunks_by_ids(self, chunk_ids: List[UUID]) -> int:
+        """
+        按 ID 批量删除块（向量存放在同一行，一并删除）
+
+        Args:
+            chunk_ids: 块 ID 列表
+
+        Returns:
+            int: 删除的行数
+        """
+        if not chunk_ids:
+            return 0
+
+        result = await self.session.execute(
+            text("DELETE FROM chunks WHERE id = ANY(CAST(:ids AS UUID[]))"),
+            {"ids": chunk_ids}
+        )
+        return result.rowcount
+
     async def find_by_content_hash(self, content_hash: str) -> Optional[Document]:
         """
         根据内容哈希查找文档（用于去重）
@@ -255,6 +388,39 @@ class DocumentRepository:
             print(f"保存大文档分块失败: {e}")
             return False
     
+    async def save_document_pieces(self, doc_id: UUID, pieces: AsyncIterator[bytes]) -> int:
+        """
+        逐块写入文档二进制内容到 document_chunks 表（流式上传）
+
+        使用 Core INSERT 而不是 ORM 对象，已写入的块不会留在会话中占用内存
+
+        Args:
+            doc_id: 文档ID
+            pieces: 按顺序产生的内容块
+
+        Returns:
+            int: 写入的块数
+        """
+        count = 0
+        async for piece in pieces:
+            await self.session.execute(
+                insert(DocumentChunk).values(
+                    id=uuid4(),
+                    document_id=doc_id,
+                    chunk_index=count,
+                    chunk_data=piece,
+                    chunk_size=len(piece),
+                    created_at=datetime.utcnow()
+                )
+            )
+            count += 1
+
+        await self.session.execute(
+            text("UPDATE documents SET chunk_count = :chunk_count WHERE id = :doc_id"),
+            {"chunk_count": count, "doc_id": doc_id}
+        )
+        return count
+
     async def get_document_content(self, doc_id: UUID) -> Optional[bytes]:
         """
         获取文档的完整内容（处理分块合并）
@@ -334,7 +500,9 @@ class DocumentRepository:
         
     async def delete_chunks_by_document(self, doc_id: UUID) -> bool:
         """
-        删除文档的所有块记录（包括 chunks 表和 document_chunks 表）
+        删除文档的所有文本块记录（chunks 表）
+
+        document_chunks 中存放的是原始文件内容，重新处理时仍需读取，不在此删除
             
         Args:
             doc_id: 文档 ID
@@ -343,14 +511,6 @@ class DocumentRepository:
             bool: 是否删除成功
         """
         try:
-            from sqlalchemy import text
-                
-            # 删除 document_chunks 表的记录
-            await self.session.execute(
-                text("DELETE FROM document_chunks WHERE document_id = :doc_id"),
-                {"doc_id": doc_id}
-            )
-                
             # 删除 chunks 表的记录
             await self.session.execute(
                 text("DELETE FROM chunks WHERE document_id = :doc_id"),
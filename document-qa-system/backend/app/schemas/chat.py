@@ -27,6 +27,7 @@ class ChatQueryDTO(BaseModel):
 
 class ChatMessageDTO(BaseModel):
     """对话消息 DTO"""
+    id: Optional[int] = None  # 消息 ID（分页游标）
     role: str  # "user" or "assistant"
     content: str
     sources: Optional[List[Dict[str, Any]]] = None  # 引用来源
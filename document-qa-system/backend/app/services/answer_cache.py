@@ -0,0 +1,295 @@
+"""
+语义回答缓存
+相同或同义的问题直接复用已生成的回答，省去检索、重排序和 LLM 生成：
+按查询向量余弦相似度（不低于阈值）匹配，并绑定语料版本；
+新文档入库完成时语料版本递增，旧回答全部失效；
+文档删除或重新处理时，引用了该文档的回答立即失效
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+import numpy as np
+import structlog
+from app.core.cache import register_cache
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+@dataclass
+class CachedAnswer:
+    """
+    缓存的回答
+
+    Attributes:
+        question: 生成回答时的问题
+        answer: 完整回答
+        document_ids: 回答引用的文档 ID（用于定向失效）
+        chunk_ids: 回答引用的文档块 ID
+        corpus_version: 生成回答时的语料版本
+        similarity: 命中时与当前问题的相似度
+    """
+    question: str
+    answer: str
+    document_ids: Set[str] = field(default_factory=set)
+    chunk_ids: List[str] = field(default_factory=list)
+    corpus_version: int = 0
+    similarity: float = 1.0
+
+
+class SemanticAnswerCache:
+    """
+    语义回答缓存（进程内）
+
+    - 向量存放在预分配的矩阵中，查找为一次矩阵-向量乘法
+    - 容量满时淘汰最久未使用的回答；过期回答在查找时忽略
+    - 语料版本不一致的回答视为失效（版本递增即整体失效，无需逐条删除）
+    - 多实例部署时各实例独立缓存，其他实例的文档变更由 TTL 兜底
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        similarity_threshold: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化缓存
+
+        Args:
+            max_size: 最大回答数
+            ttl_seconds: 过期时间（秒）
+            similarity_threshold: 命中所需的最低余弦相似度
+            clock: 时钟函数（测试可注入）
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._clock = clock
+        self.corpus_version = 0
+        # 槽位矩阵（首次写入时按向量维度分配）
+        self._vectors: Optional[np.ndarray] = None
+        self._active = np.zeros(max_size, dtype=bool)
+        self._versions = np.zeros(max_size, dtype=np.int64)
+        self._expires = np.zeros(max_size, dtype=np.float64)
+        self._answers: List[Optional[CachedAnswer]] = [None] * max_size
+        # 槽位 LRU 顺序、空闲槽位、文档 -> 引用它的槽位
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        self._free: List[int] = list(range(max_size - 1, -1, -1))
+        self._by_document: Dict[str, Set[int]] = {}
+        # 当前语料版本内失效过的文档（删除/重新处理）：生成期间失效的文档被引用时不写入，版本递增时清空
+        self._invalidated_documents: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector: Iterable[float]) -> Optional[np.ndarray]:
+        """单位化向量，零向量返回 None"""
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        return array / norm if norm > 0 else None
+
+    def lookup(self, query_vector: List[float]) -> Optional[CachedAnswer]:
+        """
+        查找与查询向量足够相似的回答
+
+        Args:
+            query_vector: 查询向量
+
+        Returns:
+            Optional[CachedAnswer]: 命中的回答（similarity 为相似度），未命中返回 None
+        """
+        query = self._normalize(query_vector)
+        valid = self._active & (self._versions == self.corpus_version) & (self._expires > self._clock())
+        if query is None or self._vectors is None or query.shape[0] != self._vectors.shape[1] or not valid.any():
+            self.misses += 1
+            return None
+
+        similarities = np.where(valid, self._vectors @ query, -np.inf)
+        slot = int(np.argmax(similarities))
+        similarity = float(similarities[slot])
+        if similarity < self.similarity_threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._lru.move_to_end(slot)
+        cached = self._answers[slot]
+        return CachedAnswer(
+            question=cached.question,
+            answer=cached.answer,
+            document_ids=set(cached.document_ids),
+            chunk_ids=list(cached.chunk_ids),
+            corpus_version=cached.corpus_version,
+            similarity=similarity
+        )
+
+    def store(
+        self,
+        query_vector: List[float],
+        question: str,
+        answer: str,
+        chunks: List[Dict[str, Any]],
+        corpus_version: int
+    ):
+        """
+        写入回答
+
+        Args:
+            query_vector: 查询向量
+            question: 问题
+            answer: 完整回答
+            chunks: 生成回答时使用的文档块（记录引用的文档和块）
+            corpus_version: 开始生成时的语料版本（生成期间语料变化则不写入）
+        """
+        vector = self._normalize(query_vector)
+        if vector is None or not answer or corpus_version != self.corpus_version:
+            return
+        document_ids = {
+            str(chunk["metadata"]["document_id"])
+            for chunk in chunks
+            if (chunk.get("metadata") or {}).get("document_id") is not None
+        }
+        if document_ids & self._invalidated_documents:
+            # 引用的文档在生成期间被删除或重新处理（invalidate_document 时回答尚未写入）
+            logger.info("answer_cache_store_skipped", reason="document_invalidated")
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+        elif vector.shape[0] != self._vectors.shape[1]:
+            return
+
+        if not self._free:
+            self._release(next(iter(self._lru)))
+            self.evictions += 1
+        slot = self._free.pop()
+
+        self._vectors[slot] = vector
+        self._active[slot] = True
+        self._versions[slot] = corpus_version
+        self._expires[slot] = self._clock() + self.ttl_seconds
+        self._answers[slot] = CachedAnswer(
+            question=question,
+            answer=answer,
+            document_ids=document_ids,
+            chunk_ids=[str(chunk.get("id")) for chunk in chunks],
+            corpus_version=corpus_version
+        )
+        self._lru[slot] = None
+        for document_id in document_ids:
+            self._by_document.setdefault(document_id, set()).add(slot)
+
+    def _release(self, slot: int):
+        """释放槽位"""
+        cached = self._answers[slot]
+        if cached is not None:
+            for document_id in cached.document_ids:
+                slots = self._by_document.get(document_id)
+                if slots is not None:
+                    slots.discard(slot)
+                    if not slots:
+                        del self._by_document[document_id]
+        self._answers[slot] = None
+        self._active[slot] = False
+        self._lru.pop(slot, None)
+        self._free.append(slot)
+
+    def invalidate_document(self, document_id) -> int:
+        """
+        使引用了指定文档的回答失效（文档删除或重新处理时调用）
+
+        Args:
+            document_id: 文档 ID
+
+        Returns:
+            int: 失效的回答数
+        """
+        self._invalidated_documents.add(str(document_id))
+        slots = list(self._by_document.get(str(document_id), ()))
+        for slot in slots:
+            self._release(slot)
+        self.invalidations += len(slots)
+        if slots:
+            logger.info("answer_cache_invalidated", document_id=str(document_id), answers=len(slots))
+        return len(slots)
+
+    def bump_corpus_version(self) -> int:
+        """
+        语料版本递增（新内容入库完成时调用，之前的回答全部失效）
+
+        Returns:
+            int: 新版本号
+        """
+        self.corpus_version += 1
+        # 新版本开始前的生成都不会再写入，失效记录不再需要
+        self._invalidated_documents.clear()
+        return self.corpus_version
+
+    def clear(self):
+        """清空缓存"""
+        for slot in list(self._lru):
+            self._release(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取命中统计
+
+        Returns:
+            Dict[str, Any]: 命中/未命中次数、命中率、当前大小等
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._lru),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "similarity_threshold": self.similarity_threshold,
+            "corpus_version": self.corpus_version
+        }
+
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """
+    获取进程级回答缓存（未启用时返回 None）
+
+    Returns:
+        Optional[SemanticAnswerCache]: 缓存实例
+    """
+    global _answer_cache
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(
+            max_size=settings.ANSWER_CACHE_SIZE,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+        )
+        register_cache("answer", _answer_cache)
+    return _answer_cache
+
+
+def replay_answer(answer: str, piece_chars: Optional[int] = None) -> List[str]:
+    """
+    把缓存的回答切成小段，按流式输出回放（客户端收到的 SSE 事件格式与实时生成一致）
+
+    Args:
+        answer: 完整回答
+        piece_chars: 每段字符数（默认 ANSWER_CACHE_REPLAY_CHUNK_CHARS）
+
+    Returns:
+        List[str]: 回答片段
+    """
+    piece_chars = max(piece_chars or settings.ANSWER_CACHE_REPLAY_CHUNK_CHARS, 1)
+    return [answer[i:i + piece_chars] for i in range(0, len(answer), piece_chars)]
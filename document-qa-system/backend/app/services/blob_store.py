@@ -0,0 +1,286 @@
+"""
+文档二进制存储
+按内容 SHA-256 寻址的 blob 存储，替代 documents.file_content / document_chunks 中的原始文件，
+避免大字段膨胀数据表和 WAL；本地文件系统实现支持 mmap 读取并直接把路径交给解析进程
+"""
+import asyncio
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import structlog
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _check_hash(content_hash: str) -> str:
+    """
+    校验内容哈希格式（同时防止路径穿越）
+
+    Args:
+        content_hash: SHA-256 十六进制摘要
+
+    Returns:
+        str: 原样返回
+
+    Raises:
+        ValueError: 格式不合法
+    """
+    if not isinstance(content_hash, str) or not _HASH_PATTERN.match(content_hash):
+        raise ValueError(f"非法的内容哈希：{content_hash!r}")
+    return content_hash
+
+
+class BlobStore(ABC):
+    """
+    blob 存储抽象基类
+
+    内容以 SHA-256 为键，写入幂等；相同内容只存一份
+    """
+
+    @abstractmethod
+    async def put_file(self, path: str, content_hash: str, move: bool = False):
+        """
+        保存本地文件
+
+        Args:
+            path: 源文件路径
+            content_hash: 内容 SHA-256（调用方已计算）
+            move: 是否移动源文件（同一文件系统时避免复制）
+        """
+        pass
+
+    @abstractmethod
+    async def put_bytes(self, data: bytes, content_hash: str):
+        """
+        保存二进制内容
+
+        Args:
+            data: 内容
+            content_hash: 内容 SHA-256
+        """
+        pass
+
+    @abstractmethod
+    async def exists(self, content_hash: str) -> bool:
+        """判断 blob 是否存在"""
+        pass
+
+    @abstractmethod
+    async def read(self, content_hash: str) -> bytes:
+        """
+        读取完整内容
+
+        Raises:
+            FileNotFoundError: blob 不存在
+        """
+        pass
+
+    @abstractmethod
+    async def delete(self, content_hash: str) -> bool:
+        """
+        删除 blob
+
+        Returns:
+            bool: 是否删除了已存在的 blob
+        """
+        pass
+
+    @abstractmethod
+    def iter_hashes(self) -> Iterator[str]:
+        """遍历所有 blob 的内容哈希（用于清理未引用的 blob）"""
+        pass
+
+    def local_path(self, content_hash: str) -> Optional[str]:
+        """
+        获取 blob 的本地文件路径
+
+        Returns:
+            Optional[str]: 支持本地访问的后端返回路径，解析进程可直接打开；否则返回 None
+        """
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    """
+    本地文件系统 blob 存储
+
+    目录按哈希前两级分片：root/ab/cd/abcd...，避免单目录文件过多。
+    写入先落到同目录临时文件再 os.replace，读者不会看到半个文件
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        """
+        初始化本地存储
+
+        Args:
+            root: 存储根目录（默认 BLOB_STORE_PATH）
+        """
+        self.root = os.path.abspath(root or settings.BLOB_STORE_PATH)
+
+    def path_for(self, content_hash: str) -> str:
+        """
+        计算 blob 的存储路径
+
+        Args:
+            content_hash: 内容 SHA-256
+
+        Returns:
+            str: 文件路径
+        """
+        _check_hash(content_hash)
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash)
+
+    def local_path(self, content_hash: str) -> Optional[str]:
+        """获取 blob 的本地文件路径（不检查是否存在）"""
+        return self.path_for(content_hash)
+
+    def _put_file_sync(self, path: str, content_hash: str, move: bool):
+        """同步写入（在线程中执行）"""
+        target = self.path_for(content_hash)
+        if os.path.exists(target):
+            if move:
+                os.unlink(path)
+            return
+
+        target_dir = os.path.dirname(target)
+        os.makedirs(target_dir, exist_ok=True)
+
+        if move:
+            try:
+                os.replace(path, target)
+                return
+            except OSError:
+                # 跨文件系统无法 rename，退化为复制
+                pass
+
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=target_dir)
+        try:
+            with os.fdopen(fd, "wb") as dst, open(path, "rb") as src:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        if move:
+            os.unlink(path)
+
+    def _put_bytes_sync(self, data: bytes, content_hash: str):
+        """同步写入（在线程中执行）"""
+        target = self.path_for(content_hash)
+        if os.path.exists(target):
+            return
+
+        target_dir = os.path.dirname(target)
+        os.makedirs(target_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=target_dir)
+        try:
+            with os.fdopen(fd, "wb") as dst:
+                dst.write(data)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    async def put_file(self, path: str, content_hash: str, move: bool = False):
+        """保存本地文件（已存在相同内容时跳过）"""
+        await asyncio.to_thread(self._put_file_sync, path, content_hash, move)
+        logger.debug("blob_stored", content_hash=content_hash, moved=move)
+
+    async def put_bytes(self, data: bytes, content_hash: str):
+        """保存二进制内容（已存在相同内容时跳过）"""
+        await asyncio.to_thread(self._put_bytes_sync, data, content_hash)
+        logger.debug("blob_stored", content_hash=content_hash, size=len(data))
+
+    async def exists(self, content_hash: str) -> bool:
+        """判断 blob 是否存在"""
+        return os.path.exists(self.path_for(content_hash))
+
+    @contextmanager
+    def open_mmap(self, content_hash: str) -> Iterator[mmap.mmap]:
+        """
+        以只读 mmap 打开 blob（由操作系统页缓存按需载入，不经过数据库驱动）
+
+        Args:
+            content_hash: 内容 SHA-256
+
+        Yields:
+            mmap.mmap: 只读映射（空文件无法映射，调用方需先判断大小）
+        """
+        with open(self.path_for(content_hash), "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def _read_sync(self, content_hash: str) -> bytes:
+        """同步读取（在线程中执行，直接读入 bytes，不经过 mmap 切片复制）"""
+        with open(self.path_for(content_hash), "rb") as f:
+            return f.read()
+
+    async def read(self, content_hash: str) -> bytes:
+        """读取完整内容"""
+        return await asyncio.to_thread(self._read_sync, content_hash)
+
+    async def delete(self, content_hash: str) -> bool:
+        """删除 blob"""
+        try:
+            os.unlink(self.path_for(content_hash))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_hashes(self) -> Iterator[str]:
+        """遍历所有 blob 的内容哈希"""
+        if not os.path.isdir(self.root):
+            return
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if _HASH_PATTERN.match(filename):
+                    yield filename
+
+
+_blob_store: Optional[BlobStore] = None
+
+
+def create_blob_store(backend: Optional[str] = None) -> BlobStore:
+    """
+    按配置创建 blob 存储
+
+    Args:
+        backend: 后端类型（默认 BLOB_STORE_BACKEND）
+
+    Returns:
+        BlobStore: 存储实例
+
+    Raises:
+        ValueError: 不支持的后端类型
+    """
+    backend = backend or settings.BLOB_STORE_BACKEND
+    if backend == "local":
+        return LocalBlobStore()
+    raise ValueError(f"不支持的 blob 存储后端：{backend}")
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """
+    获取全局 blob 存储
+
+    Returns:
+        Optional[BlobStore]: 未启用时返回 None（原始文件继续存放在数据库中）
+    """
+    global _blob_store
+    if not settings.BLOB_STORE_ENABLED:
+        return None
+    if _blob_store is None:
+        _blob_store = create_blob_store()
+    return _blob_store
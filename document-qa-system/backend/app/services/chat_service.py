@@ -2,6 +2,7 @@
 对话管理服务
 负责对话历史的管理和持久化
 """
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from uuid import UUID
 from datetime import datetime
@@ -12,6 +13,21 @@ import structlog
 logger = structlog.get_logger()
 
 
+@dataclass
+class ChatTurn:
+    """
+    一轮对话的开始状态
+
+    Attributes:
+        conversation_id: 对话 ID（指定的对话不存在时为 None）
+        history: 最近的对话历史（时间正序，末尾为本轮用户消息）
+        created: 是否新建了对话
+    """
+    conversation_id: Optional[UUID]
+    history: List[Dict[str, Any]] = field(default_factory=list)
+    created: bool = False
+
+
 class ChatService:
     """
     对话管理服务
@@ -20,6 +36,7 @@ class ChatService:
     - 创建新对话
     - 获取对话历史
     - 添加消息到对话
+    - 开始一轮对话（创建/追加用户消息并读取历史窗口，一次数据库往返）
     - 删除对话
     - 管理对话上下文窗口
     """
@@ -124,43 +141,90 @@ class ChatService:
         Returns:
             bool: 是否添加成功
         """
-        # 获取现有消息
-        conversation = await self.repo.find_by_id(conv_id)
-        if not conversation:
+        # 引用来源只对助手回答有意义
+        message_count = await self.repo.append_message(
+            conv_id,
+            role=role,
+            content=content,
+            sources=sources if role == "assistant" and sources else None
+        )
+        
+        if message_count is None:
             logger.warning(
                 "conversation_not_found_for_message",
                 conversation_id=str(conv_id)
             )
             return False
         
-        messages = conversation.messages or []
-        
-        # 创建新消息
-        new_message = {
-            "role": role,
-            "content": content,
-            "created_at": datetime.utcnow().isoformat()
-        }
+        logger.info(
+            "message_added",
+            conversation_id=str(conv_id),
+            role=role,
+            message_count=message_count
+        )
         
-        # 如果是助手回答，添加引用来源
-        if role == "assistant" and sources:
-            new_message["sources"] = sources
+        return True
+    
+    async def start_turn(
+        self,
+        conv_id: Optional[UUID],
+        question: str,
+        history_limit: int = 10
+    ) -> ChatTurn:
+        """
+        开始一轮对话：新建对话或追加用户消息，同时取回历史窗口（一条语句）
         
-        # 添加到消息列表
-        messages.append(new_message)
+        Args:
+            conv_id: 对话 ID（为空时新建对话）
+            question: 用户问题
+            history_limit: 历史窗口大小（含本轮用户消息）
+            
+        Returns:
+            ChatTurn: 对话 ID 与历史窗口
+        """
+        current = {"role": "user", "content": question, "created_at": datetime.utcnow().isoformat()}
         
-        # 更新对话
-        success = await self.repo.update_messages(conv_id, messages)
+        if conv_id is None:
+            conv_id = await self.create_conversation(first_message=question)
+            return ChatTurn(conversation_id=conv_id, history=[current], created=True)
         
-        if success:
-            logger.info(
-                "message_added",
-                conversation_id=str(conv_id),
-                role=role,
-                message_count=len(messages)
+        prior = await self.repo.append_message_with_history(
+            conv_id, "user", question, history_limit=max(history_limit - 1, 0)
+        )
+        if prior is None:
+            logger.warning(
+                "conversation_not_found_for_message",
+                conversation_id=str(conv_id)
             )
+            return ChatTurn(conversation_id=None)
         
-        return success
+        logger.info(
+            "message_added",
+            conversation_id=str(conv_id),
+            role="user",
+            history_count=len(prior)
+        )
+        return ChatTurn(conversation_id=conv_id, history=[message.to_dict() for message in prior] + [current])
+    
+    async def get_history(
+        self,
+        conv_id: UUID,
+        limit: Optional[int] = None,
+        before_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        获取对话历史（分页）
+        
+        Args:
+            conv_id: 对话 ID
+            limit: 返回最近的消息条数（为空时返回全部）
+            before_id: 游标，只返回该消息之前的消息（用于向前翻页）
+            
+        Returns:
+            List[Dict[str, Any]]: 消息列表（时间正序），每条含 id/role/content/created_at/sources
+        """
+        messages = await self.repo.find_messages(conv_id, limit=limit, before_id=before_id)
+        return [message.to_dict() for message in messages]
     
     async def delete_conversation(self, conv_id: UUID) -> bool:
         """
@@ -230,13 +294,58 @@ class ChatService:
         Returns:
             Optional[str]: 用户消息内容
         """
-        conversation = await self.repo.find_by_id(conv_id)
-        if not conversation or not conversation.messages:
-            return None
-        
-        # 从后往前找第一条用户消息
-        for msg in reversed(conversation.messages):
-            if msg.get('role') == 'user':
-                return msg.get('content')
-        
-        return None
+        messages = await self.repo.find_messages(conv_id, limit=1, role="user")
+        return messages[-1].content if messages else None
+
+
+async def start_chat_turn(
+    conv_id: Optional[UUID],
+    question: str,
+    history_limit: int = 10
+) -> ChatTurn:
+    """
+    在独立会话中开始一轮对话并立即提交
+
+    流式响应开始后请求级会话已结束，对话读写使用独立的短会话；
+    也使其可与问题向量化并发执行
+
+    Args:
+        conv_id: 对话 ID（为空时新建对话）
+        question: 用户问题
+        history_limit: 历史窗口大小（含本轮用户消息）
+
+    Returns:
+        ChatTurn: 对话 ID 与历史窗口
+    """
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        turn = await ChatService(ConversationRepository(session)).start_turn(conv_id, question, history_limit)
+        await session.commit()
+    return turn
+
+
+async def save_chat_answer(
+    conv_id: UUID,
+    answer: str,
+    sources: Optional[List[Dict[str, Any]]] = None
+) -> bool:
+    """
+    在独立会话中保存助手回答（一条语句）并提交
+
+    Args:
+        conv_id: 对话 ID
+        answer: 回答内容
+        sources: 引用来源
+
+    Returns:
+        bool: 是否保存成功
+    """
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        saved = await ChatService(ConversationRepository(session)).add_message(
+            conv_id, role="assistant", content=answer, sources=sources
+        )
+        await session.commit()
+    return saved
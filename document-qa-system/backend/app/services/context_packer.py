@@ -0,0 +1,402 @@
+"""
+上下文打包服务
+在输入 token 预算内为 Prompt 挑选文档块和对话历史：
+按相关性排序、合并同一文档的重叠/相邻块、超出预算时只保留与问题最相关的句子
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import structlog
+from app.chunkers.semantic_chunker import split_sentences
+from app.core.config import get_settings
+from app.utils.text_segmenter import segment_text
+from app.utils.tokenizer import count_tokens, get_tokenizer
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# 每条历史消息的格式开销（角色前缀、换行）
+_HISTORY_MESSAGE_OVERHEAD = 2
+# 每个来源的格式开销（"[来源 N]" 标记、分隔空行）
+_SOURCE_OVERHEAD = 6
+# 裁剪后句子之间的省略标记
+_GAP_MARKER = " … "
+# 拼接相邻块时查找重叠的最大长度（字符）
+_MAX_STITCH_OVERLAP = 2000
+
+
+@dataclass
+class ContextSource:
+    """
+    打包后的一个上下文来源（可能由同一文档的多个相邻块合并而成）
+
+    Attributes:
+        content: 文本内容
+        tokens: token 数
+        relevance_score: 相关性分数（合并时取最高）
+        chunk_ids: 包含的块 ID
+        document_id: 所属文档 ID
+        trimmed: 是否只保留了部分句子
+    """
+    content: str
+    tokens: int
+    relevance_score: float
+    chunk_ids: List[str]
+    document_id: Optional[str] = None
+    trimmed: bool = False
+    # 块序号 -> 块内容（合并相邻块时按序号拼接）
+    pieces: Dict[int, str] = field(default_factory=dict, repr=False)
+
+
+@dataclass
+class PackedContext:
+    """
+    打包结果
+
+    Attributes:
+        sources: 选中的上下文来源（按相关性降序）
+        history: 选中的对话历史（时间正序）
+        dropped: 未使用的块/消息及原因（duplicate / budget / empty / history_budget）
+        context_tokens: 上下文 token 数
+        history_tokens: 历史 token 数
+        budget_tokens: 可用于上下文和历史的 token 预算
+    """
+    sources: List[ContextSource]
+    history: List[Dict[str, str]]
+    dropped: List[Dict[str, Any]]
+    context_tokens: int
+    history_tokens: int
+    budget_tokens: int
+
+    @property
+    def trimmed_count(self) -> int:
+        """被裁剪的来源数"""
+        return sum(1 for source in self.sources if source.trimmed)
+
+
+def _stitch(left: str, right: str) -> str:
+    """
+    拼接相邻块，去掉 left 末尾与 right 开头的重叠部分
+
+    Args:
+        left: 前一块
+        right: 后一块
+
+    Returns:
+        str: 拼接结果
+    """
+    size = _overlap_length(left, right)
+    if size:
+        return left + right[size:]
+    return left + "\n" + right
+
+
+def _overlap_length(left: str, right: str) -> int:
+    """
+    left 的后缀与 right 的前缀的最长重合长度（不超过 _MAX_STITCH_OVERLAP）
+
+    对 right 前缀 + 分隔符 + left 后缀计算 KMP 前缀函数，线性时间，
+    避免逐个长度比较 endswith 的平方级开销
+
+    Args:
+        left: 前一块
+        right: 后一块
+
+    Returns:
+        int: 重合的字符数
+    """
+    size = min(len(left), len(right), _MAX_STITCH_OVERLAP)
+    if size == 0:
+        return 0
+    # None 作分隔符，保证匹配不会跨过两段的边界
+    text = list(right[:size]) + [None] + list(left[-size:])
+    prefix = [0] * len(text)
+    for i in range(1, len(text)):
+        k = prefix[i - 1]
+        while k and text[i] != text[k]:
+            k = prefix[k - 1]
+        if text[i] == text[k]:
+            k += 1
+        prefix[i] = k
+    return prefix[-1]
+
+
+def _is_cjk_boundary(sentence: str) -> bool:
+    """句子以中文字符或全角标点结尾时，与下一句直接相连不加空格"""
+    return bool(sentence) and ord(sentence[-1]) >= 0x2E80
+
+
+class ContextPacker:
+    """
+    上下文打包器
+
+    流程:
+    1. 历史消息从最近一条往前取，不超过 history_token_budget 和 history_max_turns
+    2. 文档块按 relevance_score 降序；内容重复或被已选内容包含的丢弃，
+       同一文档中序号相邻的块合并为一个来源（去掉重叠文本）
+    3. 按顺序装入剩余预算；放不下时裁剪为与问题最相关的句子，
+       剩余预算不足 min_chunk_tokens 时丢弃
+    """
+
+    def __init__(
+        self,
+        input_token_budget: Optional[int] = None,
+        history_token_budget: Optional[int] = None,
+        history_max_turns: Optional[int] = None,
+        min_chunk_tokens: Optional[int] = None,
+        count: Callable[[str], int] = count_tokens
+    ):
+        """
+        初始化打包器
+
+        Args:
+            input_token_budget: Prompt 输入 token 总预算（默认 PROMPT_INPUT_TOKEN_BUDGET）
+            history_token_budget: 对话历史 token 上限（默认 PROMPT_HISTORY_TOKEN_BUDGET）
+            history_max_turns: 对话历史最多条数（默认 PROMPT_HISTORY_MAX_TURNS）
+            min_chunk_tokens: 裁剪后来源的最小 token 数（默认 CONTEXT_MIN_CHUNK_TOKENS）
+            count: token 计数函数（默认带缓存的 count_tokens）
+        """
+        self.input_token_budget = input_token_budget or settings.PROMPT_INPUT_TOKEN_BUDGET
+        self.history_token_budget = (
+            history_token_budget if history_token_budget is not None
+            else settings.PROMPT_HISTORY_TOKEN_BUDGET
+        )
+        self.history_max_turns = (
+            history_max_turns if history_max_turns is not None
+            else settings.PROMPT_HISTORY_MAX_TURNS
+        )
+        self.min_chunk_tokens = min_chunk_tokens or settings.CONTEXT_MIN_CHUNK_TOKENS
+        self.count = count
+
+    def pack(
+        self,
+        question: str,
+        chunks: List[Dict[str, Any]],
+        history: Optional[List[Dict[str, str]]] = None,
+        reserved_tokens: int = 0
+    ) -> PackedContext:
+        """
+        在预算内挑选上下文和历史
+
+        Args:
+            question: 用户问题（用于挑选相关句子）
+            chunks: 检索/重排序后的文档块
+            history: 对话历史（时间正序）
+            reserved_tokens: 模板和问题已占用的 token 数
+
+        Returns:
+            PackedContext: 打包结果
+        """
+        budget = max(self.input_token_budget - reserved_tokens, 0)
+        dropped: List[Dict[str, Any]] = []
+
+        selected_history, history_tokens = self._pack_history(
+            history or [], min(self.history_token_budget, budget), dropped
+        )
+        sources = self._merge_chunks(chunks, dropped)
+
+        remaining = budget - history_tokens
+        packed: List[ContextSource] = []
+        question_terms = set(segment_text(question))
+
+        for source in sources:
+            cost = source.tokens + _SOURCE_OVERHEAD
+            if cost <= remaining:
+                packed.append(source)
+                remaining -= cost
+                continue
+
+            available = remaining - _SOURCE_OVERHEAD
+            if available >= self.min_chunk_tokens:
+                trimmed = self._trim(source, question_terms, available)
+                if trimmed is not None:
+                    packed.append(trimmed)
+                    remaining -= trimmed.tokens + _SOURCE_OVERHEAD
+                    continue
+
+            dropped.extend({"id": chunk_id, "reason": "budget"} for chunk_id in source.chunk_ids)
+
+        context_tokens = sum(source.tokens for source in packed)
+        result = PackedContext(
+            sources=packed,
+            history=selected_history,
+            dropped=dropped,
+            context_tokens=context_tokens,
+            history_tokens=history_tokens,
+            budget_tokens=budget
+        )
+
+        logger.info(
+            "context_packed",
+            budget_tokens=budget,
+            reserved_tokens=reserved_tokens,
+            context_tokens=context_tokens,
+            history_tokens=history_tokens,
+            chunks_in=len(chunks),
+            sources_used=len(packed),
+            trimmed=result.trimmed_count,
+            history_used=len(selected_history),
+            dropped=dropped[:20]
+        )
+        return result
+
+    def _pack_history(
+        self,
+        history: List[Dict[str, str]],
+        budget: int,
+        dropped: List[Dict[str, Any]]
+    ):
+        """
+        从最近一条往前挑选历史消息
+
+        Args:
+            history: 对话历史（时间正序）
+            budget: token 上限
+            dropped: 丢弃记录（原地追加）
+
+        Returns:
+            Tuple[List[Dict[str, str]], int]: (选中的消息，时间正序；token 数)
+        """
+        recent = history[-self.history_max_turns:] if self.history_max_turns > 0 else []
+        selected = []
+        used = 0
+        for offset, message in enumerate(reversed(recent)):
+            cost = self.count(message.get("content", "")) + _HISTORY_MESSAGE_OVERHEAD
+            if used + cost > budget:
+                # 更早的消息也不再使用，保证历史连续
+                dropped.append({"messages": len(recent) - offset, "reason": "history_budget"})
+                break
+            selected.append(message)
+            used += cost
+        selected.reverse()
+        return selected, used
+
+    def _merge_chunks(
+        self,
+        chunks: List[Dict[str, Any]],
+        dropped: List[Dict[str, Any]]
+    ) -> List[ContextSource]:
+        """
+        排序、去重并合并相邻块
+
+        Args:
+            chunks: 文档块
+            dropped: 丢弃记录（原地追加）
+
+        Returns:
+            List[ContextSource]: 按相关性降序的来源
+        """
+        ranked = sorted(
+            chunks,
+            key=lambda chunk: chunk.get("relevance_score", chunk.get("score", 0)) or 0,
+            reverse=True
+        )
+
+        sources: List[ContextSource] = []
+        for chunk in ranked:
+            metadata = chunk.get("metadata") or {}
+            chunk_id = str(chunk.get("id", ""))
+            content = (metadata.get("content") or "").strip()
+            if not content:
+                dropped.append({"id": chunk_id, "reason": "empty"})
+                continue
+
+            if any(content in source.content for source in sources):
+                dropped.append({"id": chunk_id, "reason": "duplicate"})
+                continue
+
+            document_id = metadata.get("document_id")
+            chunk_index = metadata.get("chunk_index")
+            score = chunk.get("relevance_score", chunk.get("score", 0)) or 0
+
+            neighbour = None
+            if document_id is not None and chunk_index is not None:
+                neighbour = next(
+                    (
+                        source for source in sources
+                        if source.document_id == document_id
+                        and any(abs(index - chunk_index) <= 1 for index in source.pieces)
+                    ),
+                    None
+                )
+
+            if neighbour is not None:
+                # 排序保证先到的来源分数更高，合并后沿用该来源的分数
+                neighbour.pieces[chunk_index] = content
+                neighbour.chunk_ids.append(chunk_id)
+                stitched = ""
+                for index in sorted(neighbour.pieces):
+                    stitched = _stitch(stitched, neighbour.pieces[index]) if stitched else neighbour.pieces[index]
+                neighbour.content = stitched
+                neighbour.tokens = self.count(stitched)
+                continue
+
+            source = ContextSource(
+                content=content,
+                tokens=self.count(content),
+                relevance_score=score,
+                chunk_ids=[chunk_id],
+                document_id=document_id
+            )
+            if chunk_index is not None:
+                source.pieces[chunk_index] = content
+            sources.append(source)
+
+        return sources
+
+    def _trim(self, source: ContextSource, question_terms: set, budget: int) -> Optional[ContextSource]:
+        """
+        裁剪来源：保留与问题词项重合最多的句子（按原文顺序输出）
+
+        Args:
+            source: 来源
+            question_terms: 问题词项
+            budget: token 上限
+
+        Returns:
+            Optional[ContextSource]: 裁剪结果，不足 min_chunk_tokens 时返回 None
+        """
+        sentences = split_sentences(source.content)
+        scored = []
+        for position, sentence in enumerate(sentences):
+            terms = set(segment_text(sentence))
+            overlap = len(terms & question_terms)
+            # 长句的词项天然更多，按词项数的平方根归一
+            scored.append((overlap / math.sqrt(len(terms) + 1), -position, position))
+        scored.sort(reverse=True)
+
+        chosen = []
+        used = 0
+        for _, _, position in scored:
+            cost = self.count(sentences[position]) + 1
+            if used + cost <= budget:
+                chosen.append(position)
+                used += cost
+
+        if chosen:
+            chosen.sort()
+            parts = [sentences[chosen[0]]]
+            for prev, cur in zip(chosen, chosen[1:]):
+                if cur != prev + 1:
+                    parts.append(_GAP_MARKER)
+                elif not _is_cjk_boundary(sentences[prev]):
+                    parts.append(" ")
+                parts.append(sentences[cur])
+            content = "".join(parts)
+        else:
+            # 单句就超出预算：截取最相关句子的开头
+            best = sentences[scored[0][2]] if scored else source.content
+            content = best[:get_tokenizer().prefix_end(best, 0, len(best), budget)]
+
+        tokens = self.count(content)
+        if tokens < self.min_chunk_tokens or tokens > budget:
+            return None
+
+        return ContextSource(
+            content=content,
+            tokens=tokens,
+            relevance_score=source.relevance_score,
+            chunk_ids=source.chunk_ids,
+            document_id=source.document_id,
+            trimmed=True
+        )
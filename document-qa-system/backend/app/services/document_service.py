@@ -2,30 +2,56 @@
 文档服务层
 负责文档上传、解析、分块、向量化的编排
 """
-import asyncio
 import hashlib
 from uuid import UUID
-from typing import Optional, List
+from typing import Any, Callable, Dict, Optional, List
+from sqlalchemy import select
 from app.repositories.document_repository import DocumentRepository
 from app.parsers.base_parser import ParserRegistry
 from app.chunkers.semantic_chunker import TextChunker
 from app.services.embedding_service import EmbeddingService
+from app.services.embedding_pipeline import EmbeddingPipeline
+from app.services.embedding_store import EmbeddingStore, content_hash
 from app.services.vector_service_adapter import create_vector_service
+from app.services.blob_store import BlobStore, get_blob_store
+from app.services.answer_cache import get_answer_cache
+from app.utils.text_segmenter import to_search_document
+from app.utils.upload_spool import SpooledUpload
+from app.utils.tokenizer import get_tokenizer
 from app.models.document import Document
 from app.models.chunk import Chunk
 from app.models.document_chunk import DocumentChunk
 from app.core.config import get_settings
+from app.core.parse_executor import get_parse_executor
+from app.services.ingestion_queue import (
+    ClaimedJob,
+    IngestionJobQueue,
+    IngestionWorkerPool,
+    get_ingestion_worker_pool,
+    PRIORITY_UPLOAD,
+    PRIORITY_LARGE_UPLOAD,
+    PRIORITY_REPROCESS
+)
 from app.exceptions import (
     FileTooLargeError,
     UnsupportedFileTypeError,
     DocumentParseError,
-    DocumentNotFoundException
+    DocumentNotFoundException,
+    RetrievalException,
+    VectorizationException
 )
 import structlog
 
 logger = structlog.get_logger()
 settings = get_settings()
 
+# 重试无意义的入库错误（文档已删除、格式不支持、文件损坏/超限）
+PERMANENT_INGESTION_ERRORS = (
+    DocumentNotFoundException,
+    UnsupportedFileTypeError,
+    DocumentParseError
+)
+
 
 class DocumentService:
     """
@@ -42,7 +68,10 @@ class DocumentService:
     def __init__(
         self,
         repo: DocumentRepository,
-        embedding_svc: EmbeddingService
+        embedding_svc: EmbeddingService,
+        job_queue: Optional[IngestionJobQueue] = None,
+        blob_store: Optional[BlobStore] = None,
+        session_factory: Optional[Callable[[], Any]] = None
     ):
         """
         初始化文档服务
@@ -50,16 +79,38 @@ class DocumentService:
         Args:
             repo: 文档数据访问仓库
             embedding_svc: 嵌入向量化服务
+            job_queue: 入库任务队列
+            blob_store: 原始文件存储（默认按 BLOB_STORE_ENABLED 创建，未启用时存放在数据库中）
+            session_factory: 独立事务使用的会话工厂（默认 AsyncSessionLocal）
         """
         self.repo = repo
         self.embedding_svc = embedding_svc
-        self.chunker = TextChunker(
-            chunk_size=settings.CHUNK_SIZE,
-            overlap=settings.CHUNK_OVERLAP
-        )
+        self.job_queue = job_queue or IngestionJobQueue()
+        self.blob_store = blob_store or get_blob_store()
+        self._session_factory = session_factory
+        if settings.CHUNK_MAX_TOKENS > 0:
+            # 按 token 预算分块（块大小与 Embedding/Prompt 的 token 限制直接对应）
+            self.chunker = TextChunker(
+                chunk_size=settings.CHUNK_MAX_TOKENS,
+                overlap=settings.CHUNK_OVERLAP_TOKENS,
+                tokenizer=get_tokenizer()
+            )
+        else:
+            self.chunker = TextChunker(
+                chunk_size=settings.CHUNK_SIZE,
+                overlap=settings.CHUNK_OVERLAP
+            )
         # 设置大文件阈值（10MB）
         self.large_file_threshold = 10 * 1024 * 1024  # 10MB
 
+    @property
+    def session_factory(self) -> Callable[[], Any]:
+        """会话工厂（延迟导入数据库模块）"""
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
     async def upload_document(
         self,
         file_content: bytes,
@@ -79,6 +130,86 @@ class DocumentService:
         Returns:
             UUID: 文档 ID
 
+        Raises:
+            FileTooLargeError: 文件过大
+            UnsupportedFileTypeError: 文件格式不支持
+        """
+        # 1-3. 验证文件大小和类型
+        self.validate_upload(file_size, mime_type)
+
+        # 4. 计算文件内容哈希用于去重检测
+        content_hash = hashlib.sha256(file_content).hexdigest()
+
+        # 4. 检查是否已存在相同内容的文档
+        existing_doc = await self.repo.find_by_content_hash(content_hash)
+        if existing_doc:
+            logger.info(
+                "duplicate_document_detected",
+                doc_id=str(existing_doc.id),
+                filename=filename,
+                content_hash=content_hash
+            )
+            return existing_doc.id
+
+        is_large_file = file_size > self.large_file_threshold
+
+        # 5. 原始文件写入 blob 存储（先于文档记录提交，任务执行时一定能读到）
+        if self.blob_store is not None:
+            await self.blob_store.put_bytes(file_content, content_hash)
+
+        # 6. 创建文档记录
+        doc = Document(
+            filename=filename,
+            file_content=file_content if self.blob_store is None and not is_large_file else None,
+            content_hash=content_hash,
+            blob_hash=content_hash if self.blob_store is not None else None,
+            file_size=file_size,
+            mime_type=mime_type,
+            status='processing'
+        )
+
+        doc_id = await self.repo.save(doc)
+
+        # 未启用 blob 存储的大文件，在同一事务内写入分块存储
+        if self.blob_store is None and is_large_file:
+            logger.info(
+                "large_file_detected",
+                doc_id=str(doc_id),
+                filename=filename,
+                size_mb=file_size / 1024 / 1024
+            )
+            if not await self._handle_large_file(doc_id, file_content):
+                raise DocumentParseError("大文件分块存储失败")
+
+        # 7. 入队处理任务：与文档记录同一事务提交，提交失败时不会留下孤儿任务
+        await self.job_queue.enqueue(
+            self.repo.session,
+            doc_id,
+            job_type="process",
+            priority=PRIORITY_LARGE_UPLOAD if is_large_file else PRIORITY_UPLOAD
+        )
+
+        logger.info(
+            "document_uploaded",
+            doc_id=str(doc_id),
+            filename=filename,
+            size_mb=file_size / 1024 / 1024,
+            is_large_file=is_large_file,
+            blob_stored=self.blob_store is not None
+        )
+
+        # 📝 调用者提交事务后，工作池领取任务执行 _process_document_async
+        # 参考：app/api/v1/documents.py 中的 upload_document 端点
+        return doc_id
+
+    def validate_upload(self, file_size: int, mime_type: str):
+        """
+        验证上传文件的大小和类型
+
+        Args:
+            file_size: 文件大小
+            mime_type: MIME 类型
+
         Raises:
             FileTooLargeError: 文件过大
             UnsupportedFileTypeError: 文件格式不支持
@@ -106,64 +237,81 @@ class DocumentService:
             )
             raise UnsupportedFileTypeError(mime_type)
 
-        # 4. 计算文件内容哈希用于去重检测
-        content_hash = hashlib.sha256(file_content).hexdigest()
+    async def upload_spooled_document(
+        self,
+        spooled: SpooledUpload,
+        filename: str,
+        mime_type: str
+    ) -> UUID:
+        """
+        上传已暂存到磁盘的文档（流式上传）
 
-        # 4. 检查是否已存在相同内容的文档
-        existing_doc = await self.repo.find_by_content_hash(content_hash)
+        启用 blob 存储时暂存文件直接移入存储；否则内容按 UPLOAD_PIECE_BYTES 逐块写入
+        document_chunks。两种方式都不在内存中保留完整文件。暂存文件由调用者清理
+
+        Args:
+            spooled: 暂存结果（大小和 SHA-256 已在写入时计算）
+            filename: 文件名
+            mime_type: MIME 类型
+
+        Returns:
+            UUID: 文档 ID
+
+        Raises:
+            FileTooLargeError: 文件过大
+            UnsupportedFileTypeError: 文件格式不支持
+        """
+        self.validate_upload(spooled.size, mime_type)
+
+        existing_doc = await self.repo.find_by_content_hash(spooled.content_hash)
         if existing_doc:
             logger.info(
                 "duplicate_document_detected",
                 doc_id=str(existing_doc.id),
                 filename=filename,
-                content_hash=content_hash
+                content_hash=spooled.content_hash
             )
             return existing_doc.id
 
-        # 5. 创建文档记录
+        if self.blob_store is not None:
+            await self.blob_store.put_file(spooled.path, spooled.content_hash, move=True)
+
         doc = Document(
             filename=filename,
-            file_content=file_content if file_size <= self.large_file_threshold else None,
-            content_hash=content_hash,
-            file_size=file_size,
+            file_content=None,
+            content_hash=spooled.content_hash,
+            blob_hash=spooled.content_hash if self.blob_store is not None else None,
+            file_size=spooled.size,
             mime_type=mime_type,
             status='processing'
         )
-
         doc_id = await self.repo.save(doc)
 
-        # 如果是大文件，先处理分块存储
-        if file_size > self.large_file_threshold:
-            logger.info(
-                "large_file_detected",
-                doc_id=str(doc_id),
-                filename=filename,
-                size_mb=file_size / 1024 / 1024
+        piece_count = 0
+        if self.blob_store is None:
+            piece_count = await self.repo.save_document_pieces(
+                doc_id,
+                spooled.iter_pieces(settings.UPLOAD_PIECE_BYTES)
             )
-            # 异步处理大文件分块
-            asyncio.create_task(
-                self._handle_large_file_async(doc_id, file_content))
 
-        logger.info(
-            "document_uploaded",
-            doc_id=str(doc_id),
-            filename=filename,
-            size_mb=file_size / 1024 / 1024,
-            is_large_file=(file_size > self.large_file_threshold)
+        is_large_file = spooled.size > self.large_file_threshold
+        await self.job_queue.enqueue(
+            self.repo.session,
+            doc_id,
+            job_type="process",
+            priority=PRIORITY_LARGE_UPLOAD if is_large_file else PRIORITY_UPLOAD
         )
 
-        # 📝 重要说明：
-        # 这里不再自动启动异步处理任务，因为当前事务还未提交
-        # 异步任务需要由调用者在事务提交后手动启动
-        # 参考：app/api/v1/documents.py 中的 upload_document 端点
-
-        # 5. 返回文档 ID，由调用者负责在事务提交后启动异步任务
         logger.info(
-            "document_ready_for_processing",
+            "document_uploaded",
             doc_id=str(doc_id),
-            note="Call _process_document_async(doc_id) after transaction commit"
+            filename=filename,
+            size_mb=spooled.size / 1024 / 1024,
+            is_large_file=is_large_file,
+            streamed=True,
+            blob_stored=self.blob_store is not None,
+            piece_count=piece_count
         )
-
         return doc_id
 
     async def _handle_large_file(self, doc_id: UUID, file_content: bytes) -> bool:
@@ -209,18 +357,33 @@ class DocumentService:
             )
             return False
 
-    async def _process_document_async(self, doc_id: UUID):
+    async def _process_document_async(
+        self,
+        doc_id: UUID,
+        final_attempt: bool = True,
+        incremental: bool = False
+    ) -> Optional[str]:
         """
         异步处理文档（解析→分块→向量化）
 
         Args:
             doc_id: 文档 ID
+            final_attempt: 是否为最后一次尝试；否则可重试的错误不标记 failed，由任务队列稍后重试
+            incremental: 是否与现有块比对，只向量化新增/变化的块（重新处理时使用）
+
+        Returns:
+            Optional[str]: 处理完成时返回 'ready'；未获得数据库会话时返回 None
+
+        Raises:
+            Exception: 处理失败时（标记 failed 之后）原样抛出，由任务队列记录失败
         """
         # ✅ 创建新的数据库会话用于异步任务
         from app.core.database import get_db_session
         from app.repositories.document_repository import DocumentRepository
 
+        status = None
         async for session in get_db_session():
+            doc = None
             try:
                 repo = DocumentRepository(session)
 
@@ -243,76 +406,17 @@ class DocumentService:
                     filename=doc.filename
                 )
 
-                # 2. 获取文件内容
-                # 📝 关键日志：记录获取文件内容的过程
-                logger.debug(
-                    "fetching_document_content",
-                    doc_id=str(doc_id),
-                    doc_file_content_is_null=doc.file_content is None,
-                    doc_file_size=doc.file_size,
-                    using_repo_method="get_document_content"
-                )
-                                
-                # 注意：这里使用新创建的 repo（异步任务中创建的）
-                # 因为 self.repo 绑定的是上传时的 session，可能已关闭
-                file_content = await repo.get_document_content(doc_id)
-                                
-                logger.info(
-                    "document_content_fetched",
-                    doc_id=str(doc_id),
-                    content_size=len(file_content) if file_content else 0,
-                    content_is_null=file_content is None
-                )
-                                
-                if file_content is None:
-                    # 如果是大文件分块存储，需要合并内容
-                    logger.warning(
-                        "document_content_not_found",
-                        doc_id=str(doc_id),
-                        suggestion="可能是大文件分块存储，需要检查 document_chunks 表",
-                        doc_file_content_field=doc.file_content,
-                        doc_chunk_count=doc.chunk_count
-                    )
-                                    
-                    # 尝试从 DocumentChunk 表合并内容（针对大文件）
-                    if doc.chunk_count and doc.chunk_count > 0:
-                        logger.info(
-                            "attempting_to_merge_large_file_chunks",
-                            doc_id=str(doc_id),
-                            chunk_count=doc.chunk_count
-                        )
-                                        
-                        # 查询 document_chunks 表
-                        chunks_result = await session.execute(
-                            select(DocumentChunk.chunk_data)
-                            .where(DocumentChunk.document_id == doc_id)
-                            .order_by(DocumentChunk.chunk_index)
-                        )
-                        chunks = chunks_result.scalars().all()
-                                        
-                        if chunks:
-                            file_content = b''.join(chunks)
-                            logger.info(
-                                "large_file_chunks_merged",
-                                doc_id=str(doc_id),
-                                merged_size=len(file_content),
-                                chunk_count=len(chunks)
-                            )
-                        else:
-                            logger.error(
-                                "no_chunks_found_for_large_file",
-                                doc_id=str(doc_id),
-                                chunk_count=doc.chunk_count
-                            )
-                                    
-                    # 如果仍然没有内容，抛出异常
-                    if file_content is None:
-                        logger.error(
-                            "document_content_really_not_found",
-                            doc_id=str(doc_id),
-                            fatal=True
-                        )
+                # 2. 获取文件内容：blob 存储中的文件由解析进程按路径读取，不经过数据库和进程间管道
+                blob_path = None
+                file_content = None
+                if doc.blob_hash and self.blob_store is not None:
+                    if not await self.blob_store.exists(doc.blob_hash):
                         raise DocumentNotFoundException(f"文档内容未找到：{doc_id}")
+                    blob_path = self.blob_store.local_path(doc.blob_hash)
+                    if blob_path is None:
+                        file_content = await self.blob_store.read(doc.blob_hash)
+                else:
+                    file_content = await self._fetch_document_content(repo, session, doc)
 
                 # 3. 解析文档
                 logger.debug(
@@ -322,19 +426,34 @@ class DocumentService:
                     content_size=len(file_content) if file_content else 0
                 )
                 
-                parser = ParserRegistry.get_parser(doc.mime_type)
-                text_content = await parser.parse(file_content)
+                # 3-4. 解析 + 文本分块（在解析执行器中运行，不阻塞事件循环）
+                if not ParserRegistry.is_supported(doc.mime_type):
+                    raise UnsupportedFileTypeError(doc.mime_type)
+                
+                if blob_path is not None:
+                    text_content, chunks = await get_parse_executor().parse_and_chunk_file(
+                        doc.mime_type,
+                        blob_path,
+                        self.chunker.chunk_size,
+                        self.chunker.overlap,
+                        self.chunker.tokenizer is not None
+                    )
+                else:
+                    text_content, chunks = await get_parse_executor().parse_and_chunk(
+                        doc.mime_type,
+                        file_content,
+                        self.chunker.chunk_size,
+                        self.chunker.overlap,
+                        self.chunker.tokenizer is not None
+                    )
 
                 logger.info(
                     "document_parsed",
                     doc_id=str(doc_id),
                     text_length=len(text_content),
-                    parser_type=type(parser).__name__
+                    mime_type=doc.mime_type
                 )
 
-                # 4. 文本分块
-                chunks = self.chunker.chunk_by_semantic(text_content)
-
                 logger.info(
                     "text_chunked",
                     doc_id=str(doc_id),
@@ -347,7 +466,10 @@ class DocumentService:
                     doc_id=str(doc_id),
                     chunks_count=len(chunks)
                 )
-                await self._vectorize_chunks(repo, chunks, doc_id, doc.filename, session)
+                if incremental:
+                    await self._sync_chunks_incremental(repo, chunks, doc_id, doc.filename, session)
+                else:
+                    await self._vectorize_chunks(repo, chunks, doc_id, doc.filename, session)
 
                 # 6. 更新状态为 ready
                 logger.info(
@@ -356,14 +478,22 @@ class DocumentService:
                 )
                 await repo.update_status(doc_id, 'ready', len(chunks))
 
-                # 7. 更新文档内容和哈希（如果是小文件且内容为空）
-                if doc.file_content is None and file_content and len(file_content) <= self.large_file_threshold:
+                # 7. 更新文档内容和哈希（如果是小文件且内容为空；分块/blob 存储的文档不回写）
+                if (
+                    doc.file_content is None and not doc.chunk_count and not doc.blob_hash
+                    and file_content and len(file_content) <= self.large_file_threshold
+                ):
                     content_hash = hashlib.sha256(file_content).hexdigest()
                     await repo.update_document_content(doc_id, file_content, content_hash)
 
                 # ✅ 提交事务到数据库
                 await session.commit()
 
+                # 新内容可检索后，之前缓存的回答可能不再是最佳回答
+                answer_cache = get_answer_cache()
+                if answer_cache is not None:
+                    answer_cache.bump_corpus_version()
+
                 # 📢 发送 WebSocket 通知
                 from app.websocket_manager import manager
                 await manager.send_document_update(
@@ -378,14 +508,21 @@ class DocumentService:
                     doc_id=str(doc_id),
                     chunks_count=len(chunks)
                 )
+                status = 'ready'
 
             except Exception as e:
                 logger.error(
                     "document_processing_failed",
                     doc_id=str(doc_id),
                     error=str(e),
+                    final_attempt=final_attempt,
                     exc_info=True
                 )
+                if not final_attempt and not isinstance(e, PERMANENT_INGESTION_ERRORS):
+                    # 保持 processing 状态，等待任务队列重试
+                    await session.rollback()
+                    raise
+
                 # 失败时也要提交状态更新
                 try:
                     await repo.update_status(doc_id, 'failed')
@@ -396,7 +533,7 @@ class DocumentService:
                     await manager.send_document_update(
                         doc_id=str(doc_id),
                         status='failed',
-                        filename=doc.filename if 'doc' in locals() else None
+                        filename=doc.filename if doc else None
                     )
                 except Exception as commit_error:
                     logger.error(
@@ -408,40 +545,95 @@ class DocumentService:
             finally:
                 await session.close()
 
-    async def _handle_large_file_async(self, doc_id: UUID, file_content: bytes):
+        return status
+
+    async def _fetch_document_content(self, repo: DocumentRepository, session, doc: Document) -> bytes:
         """
-        异步处理大文件分块存储
+        从数据库读取文档原始内容（file_content 或 document_chunks 分块合并）
 
         Args:
-            doc_id: 文档ID
-            file_content: 文件二进制内容
+            repo: 文档数据访问仓库
+            session: 数据库会话
+            doc: 文档记录
+
+        Returns:
+            bytes: 文件内容
+
+        Raises:
+            DocumentNotFoundException: 内容不存在
         """
-        from app.core.database import get_db_session
-        from app.repositories.document_repository import DocumentRepository
+        doc_id = doc.id
+        # 📝 关键日志：记录获取文件内容的过程
+        logger.debug(
+            "fetching_document_content",
+            doc_id=str(doc_id),
+            doc_file_content_is_null=doc.file_content is None,
+            doc_file_size=doc.file_size,
+            using_repo_method="get_document_content"
+        )
 
-        async for session in get_db_session():
-            try:
-                repo = DocumentRepository(session)
+        # 注意：这里使用新创建的 repo（异步任务中创建的）
+        # 因为 self.repo 绑定的是上传时的 session，可能已关闭
+        file_content = await repo.get_document_content(doc_id)
 
-                success = await self._handle_large_file(doc_id, file_content)
-                if success:
-                    # 更新文档状态为已分块
-                    await repo.update_status(doc_id, 'chunked')
-                    await session.commit()
+        logger.info(
+            "document_content_fetched",
+            doc_id=str(doc_id),
+            content_size=len(file_content) if file_content else 0,
+            content_is_null=file_content is None
+        )
 
+        if file_content is None:
+            # 如果是大文件分块存储，需要合并内容
+            logger.warning(
+                "document_content_not_found",
+                doc_id=str(doc_id),
+                suggestion="可能是大文件分块存储，需要检查 document_chunks 表",
+                doc_file_content_field=doc.file_content,
+                doc_chunk_count=doc.chunk_count
+            )
+
+            # 尝试从 DocumentChunk 表合并内容（针对大文件）
+            if doc.chunk_count and doc.chunk_count > 0:
+                logger.info(
+                    "attempting_to_merge_large_file_chunks",
+                    doc_id=str(doc_id),
+                    chunk_count=doc.chunk_count
+                )
+
+                # 查询 document_chunks 表
+                chunks_result = await session.execute(
+                    select(DocumentChunk.chunk_data)
+                    .where(DocumentChunk.document_id == doc_id)
+                    .order_by(DocumentChunk.chunk_index)
+                )
+                chunks = chunks_result.scalars().all()
+
+                if chunks:
+                    file_content = b''.join(chunks)
                     logger.info(
-                        "large_file_processed",
-                        doc_id=str(doc_id)
+                        "large_file_chunks_merged",
+                        doc_id=str(doc_id),
+                        merged_size=len(file_content),
+                        chunk_count=len(chunks)
+                    )
+                else:
+                    logger.error(
+                        "no_chunks_found_for_large_file",
+                        doc_id=str(doc_id),
+                        chunk_count=doc.chunk_count
                     )
 
-            except Exception as e:
+            # 如果仍然没有内容，抛出异常
+            if file_content is None:
                 logger.error(
-                    "large_file_async_processing_failed",
+                    "document_content_really_not_found",
                     doc_id=str(doc_id),
-                    error=str(e)
+                    fatal=True
                 )
-            finally:
-                await session.close()
+                raise DocumentNotFoundException(f"文档内容未找到：{doc_id}")
+
+        return file_content
 
     async def _vectorize_chunks(self, repo: DocumentRepository, chunks, doc_id: UUID, filename: str = "", session=None):
         """
@@ -469,55 +661,29 @@ class DocumentService:
         )
             
         # 📝 关键：创建 chunk_index 到 db_chunk_id 的映射
-        chunk_id_map = {}
+        # 所有块通过一条 INSERT 写入，避免逐行 flush
+        try:
+            chunk_ids = await repo.save_chunks_bulk(
+                doc_id=doc_id,
+                contents=[chunk.content for chunk in chunks],
+                token_counts=[chunk.token_count for chunk in chunks],
+                search_documents=[
+                    to_search_document(chunk.content) for chunk in chunks
+                ] if settings.HYBRID_SEARCH_ENABLED else None,
+                ts_config=settings.FTS_CONFIG
+            )
+        except Exception as chunk_error:
+            logger.error(
+                "chunk_save_failed",
+                doc_id=str(doc_id),
+                chunks_count=len(chunks),
+                error=str(chunk_error),
+                error_type=type(chunk_error).__name__,
+                exc_info=True
+            )
+            raise
         
-        for idx, chunk in enumerate(chunks):
-            try:
-                db_chunk = Chunk(
-                    document_id=doc_id,
-                    chunk_index=idx,
-                    content=chunk.content,
-                    token_count=chunk.token_count
-                )
-                    
-                # 📝 关键日志：记录每个 chunk 的初始状态
-                logger.debug(
-                    "chunk_object_created",
-                    doc_id=str(doc_id),
-                    chunk_index=idx,
-                    has_content=bool(db_chunk.content),
-                    content_length=len(db_chunk.content) if db_chunk.content else 0,
-                    has_metadata=db_chunk.metadata is not None,
-                    has_embedding=db_chunk.embedding is not None,
-                    metadata_value=db_chunk.metadata,
-                    embedding_value=db_chunk.embedding
-                )
-                    
-                await repo.save_chunk(db_chunk)
-                
-                # 📝 关键：保存 chunk_id 映射
-                chunk_id_map[idx] = str(db_chunk.id)
-                    
-                # 📝 关键日志：确认保存后的状态
-                logger.debug(
-                    "chunk_saved_to_database",
-                    doc_id=str(doc_id),
-                    chunk_index=idx,
-                    chunk_id=str(db_chunk.id),
-                    has_metadata=db_chunk.metadata is not None,
-                    has_embedding=db_chunk.embedding is not None
-                )
-                    
-            except Exception as chunk_error:
-                logger.error(
-                    "chunk_save_failed",
-                    doc_id=str(doc_id),
-                    chunk_index=idx,
-                    error=str(chunk_error),
-                    error_type=type(chunk_error).__name__,
-                    exc_info=True
-                )
-                raise
+        chunk_id_map = {idx: str(chunk_id) for idx, chunk_id in enumerate(chunk_ids)}
     
         logger.info(
             "chunks_saved_to_database_completed",
@@ -526,145 +692,195 @@ class DocumentService:
         )
 
         # 2. 向量化并存储到向量数据库
+        await self._embed_and_upsert(
+            chunks, chunk_id_map, list(range(len(chunks))), doc_id, filename, session
+        )
+
+    async def _sync_chunks_incremental(
+        self,
+        repo: DocumentRepository,
+        chunks,
+        doc_id: UUID,
+        filename: str = "",
+        session=None
+    ):
+        """
+        增量同步文档块：按内容哈希与现有块比对
+
+        - 内容未变的块保留（序号变化时只更新 chunk_index），不重新向量化
+        - 不再出现的块删除
+        - 新增/变化的块插入并向量化；保留块中缺少向量的也一并补齐
+
+        Args:
+            repo: 文档仓库
+            chunks: 新的文本块列表
+            doc_id: 文档 ID
+            filename: 文件名（用于 metadata）
+            session: 数据库会话
+        """
+        existing = await repo.find_chunk_hashes(doc_id)
+
+        # 相同内容可能出现多次，按哈希保存候选队列，优先匹配原序号相同的块
+        candidates: Dict[str, List] = {}
+        for row in existing:
+            candidates.setdefault(row.content_hash, []).append(row)
+
+        chunk_id_map: Dict[int, str] = {}
+        new_positions: List[int] = []
+        embed_positions: List[int] = []
+        moved_ids: List[UUID] = []
+        moved_indexes: List[int] = []
+        kept_ids = set()
+
+        for position, chunk in enumerate(chunks):
+            rows = candidates.get(content_hash(chunk.content))
+            if not rows:
+                new_positions.append(position)
+                continue
+
+            row = next((r for r in rows if r.chunk_index == position), rows[0])
+            rows.remove(row)
+            kept_ids.add(row.id)
+            chunk_id_map[position] = str(row.id)
+            if row.chunk_index != position:
+                moved_ids.append(row.id)
+                moved_indexes.append(position)
+            if not row.has_embedding:
+                embed_positions.append(position)
+
+        stale_ids = [row.id for row in existing if row.id not in kept_ids]
+        await repo.delete_chunks_by_ids(stale_ids)
+        await repo.reindex_chunks(moved_ids, moved_indexes)
+
+        if new_positions:
+            new_chunks = [chunks[position] for position in new_positions]
+            chunk_ids = await repo.save_chunks_bulk(
+                doc_id=doc_id,
+                contents=[chunk.content for chunk in new_chunks],
+                token_counts=[chunk.token_count for chunk in new_chunks],
+                search_documents=[
+                    to_search_document(chunk.content) for chunk in new_chunks
+                ] if settings.HYBRID_SEARCH_ENABLED else None,
+                ts_config=settings.FTS_CONFIG,
+                chunk_indexes=new_positions
+            )
+            for position, chunk_id in zip(new_positions, chunk_ids):
+                chunk_id_map[position] = str(chunk_id)
+            embed_positions.extend(new_positions)
+
+        logger.info(
+            "incremental_chunks_synced",
+            doc_id=str(doc_id),
+            total=len(chunks),
+            kept=len(kept_ids),
+            moved=len(moved_ids),
+            added=len(new_positions),
+            deleted=len(stale_ids),
+            to_embed=len(embed_positions)
+        )
+
+        if embed_positions:
+            await self._embed_and_upsert(
+                chunks, chunk_id_map, sorted(embed_positions), doc_id, filename, session
+            )
+
+    async def _embed_and_upsert(
+        self,
+        chunks,
+        chunk_id_map: Dict[int, str],
+        positions: List[int],
+        doc_id: UUID,
+        filename: str = "",
+        session=None
+    ):
+        """
+        向量化指定位置的文档块并写入向量
+
+        先查持久化向量缓存（内容未变的块不再调用 API），
+        其余批量并发调用 Embedding API，每完成一个批次立即 upsert
+
+        Args:
+            chunks: 文本块列表
+            chunk_id_map: 块位置 -> 数据库块 ID
+            positions: 需要向量化的块位置
+            doc_id: 文档 ID
+            filename: 文件名（用于 metadata）
+            session: 数据库会话
+        """
         logger.info(
             "starting_vectorization_process",
             doc_id=str(doc_id),
-            chunks_count=len(chunks)
+            chunks_count=len(positions)
         )
                 
         try:
             vector_svc = create_vector_service(
                 {'vector_store_type': 'postgresql'})
-            embedding_svc = EmbeddingService()
+            pipeline = EmbeddingPipeline(self.embedding_svc)
+            texts = [chunks[position].content for position in positions]
+            if settings.EMBEDDING_STORE_ENABLED and session is not None:
+                embedding_stream = EmbeddingStore(self.embedding_svc.model).stream_with_cache(
+                    session, texts, pipeline
+                )
+            else:
+                embedding_stream = pipeline.stream(texts)
         
-            # 准备向量数据
-            vectors = []
             successful_embeddings = 0
-            failed_embeddings = 0
+            failed_indices = []
+            
+            async for batch_result in embedding_stream:
+                failed_indices.extend(positions[i] for i in batch_result.failed_indices)
+                
+                vectors = []
+                for local_idx, vector_values in batch_result.embeddings:
+                    idx = positions[local_idx]
+                    # 📝 关键：使用已保存的 Chunk UUID
+                    vector_id = chunk_id_map.get(idx)
+                    if not vector_id:
+                        logger.error(
+                            "chunk_id_not_found_in_map",
+                            doc_id=str(doc_id),
+                            chunk_index=idx
+                        )
+                        continue
                     
-            for idx, chunk in enumerate(chunks):
-                logger.debug(
-                    "processing_chunk_for_embedding",
-                    doc_id=str(doc_id),
-                    chunk_index=idx,
-                    content_preview=chunk.content[:50] if chunk.content else "NO_CONTENT"
-                )
-                        
-                # 📝 关键：使用已保存的 Chunk UUID
-                vector_id = chunk_id_map.get(idx)
-                if not vector_id:
-                    logger.error(
-                        "chunk_id_not_found_in_map",
-                        doc_id=str(doc_id),
-                        chunk_index=idx
-                    )
-                    continue
-        
-                # 获取文本向量
-                try:
-                    logger.debug(
-                        "calling_embedding_api",
-                        doc_id=str(doc_id),
-                        chunk_index=idx,
-                        text_length=len(chunk.content) if chunk.content else 0
-                    )
-                            
-                    vector_values = await embedding_svc.embed_text(chunk.content)
-        
-                    logger.debug(
-                        "embedding_received",
-                        doc_id=str(doc_id),
-                        chunk_index=idx,
-                        vector_dimension=len(vector_values),
-                        vector_sample=vector_values[:3]
-                    )
-        
-                    # 准备 metadata
-                    metadata = {
-                        "document_id": str(doc_id),
-                        "chunk_index": idx,
-                        "content": chunk.content[:500],  # 只存储前 500 字符
-                        "filename": filename,
-                        "token_count": chunk.token_count
-                    }
-                            
-                    logger.debug(
-                        "metadata_prepared",
-                        doc_id=str(doc_id),
-                        chunk_index=idx,
-                        metadata_keys=list(metadata.keys()),
-                        content_preview=metadata["content"][:50]
-                    )
-        
+                    chunk = chunks[idx]
                     vectors.append({
                         "id": vector_id,
                         "values": vector_values,
-                        "metadata": metadata
+                        "metadata": {
+                            "document_id": str(doc_id),
+                            "chunk_index": idx,
+                            "content": chunk.content[:500],  # 只存储前 500 字符
+                            "filename": filename,
+                            "token_count": chunk.token_count
+                        }
                     })
-                            
-                    successful_embeddings += 1
-                    logger.debug(
-                        "vector_data_prepared",
-                        doc_id=str(doc_id),
-                        chunk_index=idx,
-                        total_vectors_so_far=len(vectors)
-                    )
-        
-                except Exception as embed_error:
-                    failed_embeddings += 1
-                    logger.error(
-                        "embedding_failed_for_chunk",
-                        doc_id=str(doc_id),
-                        chunk_index=idx,
-                        error=str(embed_error),
-                        error_type=type(embed_error).__name__,
-                        exc_info=True
+                
+                if vectors:
+                    await vector_svc.upsert_vectors(
+                        session=session,  # ✅ 使用外部传入的 session
+                        vectors=vectors
                     )
-                    # 继续处理其他 chunks，不中断整个流程
-                    continue
-                    
+                    successful_embeddings += len(vectors)
+                
+                logger.debug(
+                    "embedding_batch_upserted",
+                    doc_id=str(doc_id),
+                    batch_vectors=len(vectors),
+                    total_vectors_so_far=successful_embeddings
+                )
+            
             logger.info(
                 "embedding_phase_completed",
                 doc_id=str(doc_id),
-                total_chunks=len(chunks),
+                total_chunks=len(positions),
                 successful=successful_embeddings,
-                failed=failed_embeddings,
-                vectors_to_upsert=len(vectors)
+                failed=len(failed_indices),
+                failed_chunk_indices=sorted(failed_indices)[:20]
             )
         
-            if vectors:
-                # 📝 关键日志：批量 upsert 前的最终检查
-                logger.info(
-                    "upsert_vectors_validation",
-                    doc_id=str(doc_id),
-                    vectors_count=len(vectors),
-                    sample_vector={
-                        "id": vectors[0]["id"],
-                        "has_values": "values" in vectors[0],
-                        "values_dimension": len(vectors[0].get("values", [])),
-                        "has_metadata": "metadata" in vectors[0],
-                        "metadata_sample": vectors[0].get("metadata", {})
-                    } if vectors else None
-                )
-                        
-                # 批量 upsert 到向量数据库
-                logger.info(
-                    "calling_upsert_vectors",
-                    doc_id=str(doc_id),
-                    vectors_count=len(vectors)
-                )
-                        
-                await vector_svc.upsert_vectors(
-                    session=session,  # ✅ 使用外部传入的 session
-                    vectors=vectors
-                )
-        
-                logger.info(
-                    "vectors_upserted_to_vector_db",
-                    doc_id=str(doc_id),
-                    vectors_count=len(vectors)
-                )
-            elif not vectors and len(chunks) > 0:
+            if successful_embeddings == 0 and positions:
                 logger.warning(
                     "no_vectors_to_upsert",
                     doc_id=str(doc_id),
@@ -787,6 +1003,18 @@ class DocumentService:
             # 提交事务（包含向量删除和文档删除）
             if success:
                 await self.repo.session.commit()
+                
+                # 4. 提交后删除原始文件（content_hash 唯一，blob 只被这一个文档引用）
+                if doc.blob_hash and self.blob_store is not None:
+                    try:
+                        await self.blob_store.delete(doc.blob_hash)
+                    except Exception as blob_error:
+                        logger.warning(
+                            "blob_deletion_failed",
+                            doc_id=str(doc_id),
+                            blob_hash=doc.blob_hash,
+                            error=str(blob_error)
+                        )
             
             if success:
                 logger.info(
@@ -795,6 +1023,11 @@ class DocumentService:
                     filename=doc.filename
                 )
                 
+                # 引用了该文档的缓存回答失效
+                answer_cache = get_answer_cache()
+                if answer_cache is not None:
+                    answer_cache.invalidate_document(doc_id)
+                
                 # 📢 发送 WebSocket 通知（如果需要）
                 try:
                     from app.websocket_manager import manager
@@ -828,18 +1061,20 @@ class DocumentService:
             )
             return False
     
-    async def reprocess_document(self, doc_id: UUID) -> bool:
+    async def reprocess_document(self, doc_id: UUID, incremental: Optional[bool] = None) -> bool:
         """
         重新处理文档
         
         处理流程:
         1. 查询文档并验证状态
-        2. 清空旧的 chunk 数据和向量
+        2. 全量模式清空旧的 chunk 数据和向量（增量模式保留）
         3. 重置状态为 processing
-        4. 重新启动异步处理流程
+        4. 入队处理任务
         
         Args:
             doc_id: 文档 ID
+            incremental: 是否增量处理（默认 INCREMENTAL_REPROCESS_ENABLED）：
+                只写入、删除和向量化内容有变化的块，未变化的块保留 ID 和向量
             
         Returns:
             bool: 是否成功启动重新处理流程
@@ -848,6 +1083,9 @@ class DocumentService:
             DocumentNotFoundException: 文档不存在
             ValueError: 文档状态不允许重新处理
         """
+        if incremental is None:
+            incremental = settings.INCREMENTAL_REPROCESS_ENABLED
+        
         try:
             # 1. 查询文档
             doc = await self.repo.find_by_id(doc_id)
@@ -877,53 +1115,64 @@ class DocumentService:
                     f"当前状态 ({doc.status}) 不允许重新处理，仅支持 failed 或 ready 状态"
                 )
             
-            # 3. 清空旧的 chunk 数据
-            logger.debug(
-                "clearing_old_chunks",
-                doc_id=str(doc_id)
-            )
+            # 引用了该文档的缓存回答失效（处理完成前不再回放旧内容）
+            answer_cache = get_answer_cache()
+            if answer_cache is not None:
+                answer_cache.invalidate_document(doc_id)
             
-            chunks_cleared = await self._clear_old_chunks(doc_id)
-            if not chunks_cleared:
-                logger.warning(
-                    "clear_chunks_failed_but_continuing",
+            # 3-4. 全量模式：清空旧的 chunk 数据和向量；增量模式保留，由处理任务按内容哈希比对
+            if incremental:
+                logger.info(
+                    "incremental_reprocess_requested",
                     doc_id=str(doc_id)
                 )
-            
-            # 4. 删除向量数据库中的向量
-            try:
+            else:
+                # 3. 清空旧的 chunk 数据
                 logger.debug(
-                    "deleting_vectors_for_reprocessing",
+                    "clearing_old_chunks",
                     doc_id=str(doc_id)
                 )
+            
+                chunks_cleared = await self._clear_old_chunks(doc_id)
+                if not chunks_cleared:
+                    logger.warning(
+                        "clear_chunks_failed_but_continuing",
+                        doc_id=str(doc_id)
+                    )
+            
+                # 4. 删除向量数据库中的向量
+                try:
+                    logger.debug(
+                        "deleting_vectors_for_reprocessing",
+                        doc_id=str(doc_id)
+                    )
                 
-                from app.services.vector_service_adapter import create_vector_service
-                from app.core.database import AsyncSessionLocal
-                vector_svc = create_vector_service({'vector_store_type': 'postgresql'})
+                    from app.services.vector_service_adapter import create_vector_service
+                    vector_svc = create_vector_service({'vector_store_type': 'postgresql'})
                 
-                async with AsyncSessionLocal() as session:
-                    await vector_svc.delete_vectors(
-                        session=session,
-                        ids=None,
-                        delete_all=False,
-                        namespace=str(doc_id)
-                    )
-                    await session.commit()
+                    async with self.session_factory() as session:
+                        await vector_svc.delete_vectors(
+                            session=session,
+                            ids=None,
+                            delete_all=False,
+                            namespace=str(doc_id)
+                        )
+                        await session.commit()
                 
-                logger.info(
-                    "vectors_deleted_for_reprocessing",
-                    doc_id=str(doc_id)
-                )
+                    logger.info(
+                        "vectors_deleted_for_reprocessing",
+                        doc_id=str(doc_id)
+                    )
                 
-            except Exception as vector_error:
-                logger.error(
-                    "vector_deletion_failed_for_reprocessing",
-                    doc_id=str(doc_id),
-                    error=str(vector_error),
-                    error_type=type(vector_error).__name__,
-                    exc_info=True
-                )
-                # 向量删除失败不阻断整个流程
+                except Exception as vector_error:
+                    logger.error(
+                        "vector_deletion_failed_for_reprocessing",
+                        doc_id=str(doc_id),
+                        error=str(vector_error),
+                        error_type=type(vector_error).__name__,
+                        exc_info=True
+                    )
+                    # 向量删除失败不阻断整个流程
             
             # 5. 重置状态为 processing 并提交
             logger.debug(
@@ -934,8 +1183,7 @@ class DocumentService:
             await self.repo.update_status(doc_id, 'processing', chunks_count=None)
             
             # 提交状态更新到数据库
-            from app.core.database import AsyncSessionLocal
-            async with AsyncSessionLocal() as commit_session:
+            async with self.session_factory() as commit_session:
                 try:
                     # 使用新的 session 重新获取文档并更新
                     from app.repositories.document_repository import DocumentRepository
@@ -944,21 +1192,22 @@ class DocumentService:
                     if doc_to_update:
                         doc_to_update.status = 'processing'
                         doc_to_update.chunks_count = None
+                        
+                        # 6. 入队处理任务（与状态重置同一事务提交）
+                        await self.job_queue.enqueue(
+                            commit_session,
+                            doc_id,
+                            job_type="reprocess" if incremental else "process",
+                            priority=PRIORITY_REPROCESS
+                        )
                         await commit_session.commit()
+                        get_ingestion_worker_pool().notify()
                         
                         logger.info(
                             "status_reset_committed",
                             doc_id=str(doc_id)
                         )
                         
-                        # 6. 启动异步处理任务
-                        logger.info(
-                            "starting_async_reprocessing",
-                            doc_id=str(doc_id),
-                            after_commit=True
-                        )
-                        asyncio.create_task(self._process_document_async(doc_id))
-                        
                         # 发送 WebSocket 通知
                         try:
                             from app.websocket_manager import manager
@@ -1049,3 +1298,40 @@ class DocumentService:
                 exc_info=True
             )
             return False
+
+
+async def process_document_job(job: ClaimedJob):
+    """
+    入库任务处理函数：解析→分块→向量化
+
+    Args:
+        job: 已领取的任务
+
+    Raises:
+        Exception: 处理失败；工作池据此记录任务失败或重试，处理函数正常返回才记为成功
+    """
+    from app.core.database import AsyncSessionLocal
+
+    # _process_document_async 使用独立会话，这里的会话只用于构造服务（未使用时不占用连接）
+    async with AsyncSessionLocal() as session:
+        service = DocumentService(DocumentRepository(session), EmbeddingService())
+        status = await service._process_document_async(
+            job.document_id,
+            final_attempt=job.final_attempt,
+            incremental=job.job_type == "reprocess"
+        )
+
+    if status != 'ready':
+        # 没有抛出异常但文档未入库，不能让任务记为成功
+        raise VectorizationException(f"文档未完成处理（状态：{status}）")
+
+
+def register_ingestion_handlers(pool: IngestionWorkerPool):
+    """
+    向工作池注册文档入库任务
+
+    Args:
+        pool: 入库工作池
+    """
+    for job_type in ("process", "reprocess"):
+        pool.register(job_type, process_document_job, permanent_errors=PERMANENT_INGESTION_ERRORS)
@@ -0,0 +1,191 @@
+"""
+文档入库向量化流水线
+将文本块打包成 API 批次，限制在途批次数并发请求，失败批次二分重试，
+按完成顺序流式输出结果供上游边嵌入边写库
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import List, Tuple, AsyncGenerator, Optional
+import structlog
+from app.services.embedding_service import EmbeddingService
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+@dataclass
+class EmbeddingBatchResult:
+    """
+    单个批次的向量化结果
+
+    Attributes:
+        embeddings: (文本下标, 向量) 列表
+        failed_indices: 重试耗尽仍失败的文本下标
+    """
+    embeddings: List[Tuple[int, List[float]]] = field(default_factory=list)
+    failed_indices: List[int] = field(default_factory=list)
+
+
+class EmbeddingPipeline:
+    """
+    批量并发向量化流水线
+
+    策略:
+    1. 按条数和总字符数打包批次
+    2. 使用信号量限制同时在途的批次数
+    3. 批次失败时二分拆分重试，单条失败按退避重试，定位并隔离坏文本
+    4. 批次完成即输出，调用方可立即写库
+    """
+
+    def __init__(
+        self,
+        embedding_svc: EmbeddingService,
+        batch_size: Optional[int] = None,
+        max_batch_chars: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None
+    ):
+        """
+        初始化流水线
+
+        Args:
+            embedding_svc: 嵌入向量化服务
+            batch_size: 单批最大文本数
+            max_batch_chars: 单批最大总字符数
+            max_concurrency: 最大在途批次数
+            max_retries: 单条文本最大重试次数
+        """
+        self.embedding_svc = embedding_svc
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.max_batch_chars = max_batch_chars or settings.EMBEDDING_BATCH_MAX_CHARS
+        self.max_concurrency = max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY
+        self.max_retries = settings.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+
+    def pack_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        将文本下标打包成批次
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            List[List[int]]: 每个批次包含的文本下标
+        """
+        batches = []
+        current = []
+        current_chars = 0
+
+        for idx, text in enumerate(texts):
+            text_chars = len(text)
+            if current and (
+                len(current) >= self.batch_size
+                or current_chars + text_chars > self.max_batch_chars
+            ):
+                batches.append(current)
+                current = []
+                current_chars = 0
+            current.append(idx)
+            current_chars += text_chars
+
+        if current:
+            batches.append(current)
+
+        return batches
+
+    async def _embed_with_bisect(self, indices: List[int], texts: List[str]) -> EmbeddingBatchResult:
+        """
+        向量化一个批次，失败时二分重试
+
+        Args:
+            indices: 批次内文本下标
+            texts: 全部文本
+
+        Returns:
+            EmbeddingBatchResult: 批次结果
+        """
+        result = EmbeddingBatchResult()
+        attempts = 1 if len(indices) > 1 else self.max_retries + 1
+
+        for attempt in range(attempts):
+            try:
+                vectors = await self.embedding_svc.embed_batch_request(
+                    [texts[i] for i in indices]
+                )
+                result.embeddings.extend(zip(indices, vectors))
+                return result
+            except Exception as e:
+                logger.warning(
+                    "embedding_batch_failed",
+                    batch_size=len(indices),
+                    attempt=attempt + 1,
+                    error=str(e)
+                )
+                if len(indices) == 1 and attempt + 1 < attempts:
+                    await asyncio.sleep(0.5 * (2 ** attempt))
+
+        if len(indices) == 1:
+            result.failed_indices.extend(indices)
+            return result
+
+        # 二分：只让坏文本所在的一半继续失败
+        mid = len(indices) // 2
+        for half in (indices[:mid], indices[mid:]):
+            half_result = await self._embed_with_bisect(half, texts)
+            result.embeddings.extend(half_result.embeddings)
+            result.failed_indices.extend(half_result.failed_indices)
+
+        return result
+
+    async def stream(self, texts: List[str]) -> AsyncGenerator[EmbeddingBatchResult, None]:
+        """
+        并发向量化并按完成顺序输出批次结果
+
+        Args:
+            texts: 文本列表
+
+        Yields:
+            EmbeddingBatchResult: 每个已完成批次的结果
+        """
+        batches = self.pack_batches(texts)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        logger.info(
+            "embedding_pipeline_started",
+            texts_count=len(texts),
+            batches_count=len(batches),
+            max_concurrency=self.max_concurrency
+        )
+
+        async def run_batch(indices: List[int]) -> EmbeddingBatchResult:
+            async with semaphore:
+                return await self._embed_with_bisect(indices, texts)
+
+        tasks = [asyncio.create_task(run_batch(indices)) for indices in batches]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 调用方提前退出（如写库失败）时取消剩余批次
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def embed_all(self, texts: List[str]) -> EmbeddingBatchResult:
+        """
+        向量化全部文本并汇总结果（按文本下标排序）
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            EmbeddingBatchResult: 汇总结果
+        """
+        total = EmbeddingBatchResult()
+        async for batch_result in self.stream(texts):
+            total.embeddings.extend(batch_result.embeddings)
+            total.failed_indices.extend(batch_result.failed_indices)
+
+        total.embeddings.sort(key=lambda item: item[0])
+        total.failed_indices.sort()
+        return total
@@ -2,15 +2,60 @@
 嵌入向量化服务
 调用阿里云百炼 text-embedding-v4 API
 """
+import hashlib
+import re
+import unicodedata
 import httpx
-from typing import List
+from typing import List, Optional
 import structlog
 from app.core.config import get_settings
+from app.core.cache import TTLCache, create_shared_backend
+from app.core.http_client import get_http_client, EMBEDDING
 from app.exceptions import RetrievalException
+from app.utils.logger import lazy, verbose
 
 logger = structlog.get_logger()
 settings = get_settings()
 
+_query_embedding_cache: Optional[TTLCache] = None
+
+
+def get_query_embedding_cache() -> Optional[TTLCache]:
+    """
+    获取进程级查询向量缓存（未启用时返回 None）
+    
+    Returns:
+        Optional[TTLCache]: 缓存实例
+    """
+    global _query_embedding_cache
+    if not settings.QUERY_EMBEDDING_CACHE_ENABLED:
+        return None
+    if _query_embedding_cache is None:
+        _query_embedding_cache = TTLCache(
+            name="query_embedding",
+            max_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+            ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+            backend=create_shared_backend(
+                settings.CACHE_REDIS_URL,
+                prefix="qemb",
+                ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS
+            )
+        )
+    return _query_embedding_cache
+
+
+def normalize_query(text: str) -> str:
+    """
+    规范化查询文本（全半角统一、去首尾空白、合并连续空白）
+    
+    Args:
+        text: 原始查询
+        
+    Returns:
+        str: 规范化后的文本
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
 
 class EmbeddingService:
     """
@@ -20,10 +65,114 @@ class EmbeddingService:
     输出维度：1536
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        query_cache: Optional[TTLCache] = None
+    ):
+        """
+        初始化嵌入服务
+        
+        Args:
+            http_client: HTTP 客户端（可选，默认使用进程级共享连接池）
+            query_cache: 查询向量缓存（可选，默认使用进程级共享缓存）
+        """
         self.api_key = settings.DASHSCOPE_API_KEY
         self.base_url = settings.DASHSCOPE_BASE_URL
         self.model = settings.EMBEDDING_MODEL
+        self._http_client = http_client
+        self.query_cache = query_cache or get_query_embedding_cache()
+    
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """获取 HTTP 客户端（未注入时使用共享连接池）"""
+        return self._http_client or get_http_client(EMBEDDING)
+    
+    def query_cache_key(self, text: str) -> str:
+        """
+        查询向量缓存键：模型名 + 规范化文本的 SHA-256
+        
+        Args:
+            text: 查询文本
+            
+        Returns:
+            str: 缓存键
+        """
+        digest = hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+        return f"{self.model}:{digest}"
+    
+    async def embed_query(self, text: str) -> List[float]:
+        """
+        向量化用户查询（优先读取缓存）
+        
+        高频/重复问题直接命中缓存，省去一次远程 Embedding 调用
+        
+        Args:
+            text: 用户查询
+            
+        Returns:
+            List[float]: 查询向量
+        """
+        if self.query_cache is None:
+            return await self.embed_text(text)
+        
+        key = self.query_cache_key(text)
+        embedding = await self.query_cache.get(key)
+        if embedding is not None:
+            logger.debug("query_embedding_cache_hit", model=self.model)
+            return embedding
+        
+        embedding = await self.embed_text(normalize_query(text))
+        await self.query_cache.set(key, embedding)
+        return embedding
+    
+    async def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量向量化多个查询（多查询检索用）
+        
+        逐条读取缓存，未命中的查询合并为一次批量请求（超过 EMBEDDING_BATCH_SIZE 时分批），
+        结果写回缓存
+        
+        Args:
+            texts: 查询列表
+            
+        Returns:
+            List[List[float]]: 与输入顺序一致的查询向量
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        keys = [self.query_cache_key(text) for text in texts]
+        
+        if self.query_cache is not None:
+            for i, key in enumerate(keys):
+                embeddings[i] = await self.query_cache.get(key)
+        
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        batch_size = settings.EMBEDDING_BATCH_SIZE
+        for offset in range(0, len(misses), batch_size):
+            batch = misses[offset:offset + batch_size]
+            vectors = await self.embed_batch_request([normalize_query(texts[i]) for i in batch])
+            for i, vector in zip(batch, vectors):
+                embeddings[i] = vector
+                if self.query_cache is not None:
+                    await self.query_cache.set(keys[i], vector)
+        
+        logger.debug(
+            "query_embeddings_batched",
+            queries_count=len(texts),
+            cache_hits=len(texts) - len(misses)
+        )
+        return embeddings
+    
+    def cache_stats(self) -> dict:
+        """
+        获取查询向量缓存的命中统计
+        
+        Returns:
+            dict: 命中统计，未启用缓存时为 {"enabled": False}
+        """
+        if self.query_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.query_cache.stats()}
     
     async def embed_text(self, text: str) -> List[float]:
         """
@@ -41,73 +190,72 @@ class EmbeddingService:
         logger.debug(
             "embedding_request_started",
             text_length=len(text),
-            text_preview=text[:100] if text else "EMPTY_TEXT",
+            text_preview=verbose(lambda: text[:100] if text else "EMPTY_TEXT"),
             model=self.model,
             api_url=self.base_url
         )
         
         try:
-            async with httpx.AsyncClient() as client:
-                request_payload = {
-                    "model": self.model,
-                    "input": text
-                }
-                
-                logger.debug(
-                    "sending_embedding_request",
-                    payload_size=len(str(request_payload)),
-                    timeout=30.0
-                )
-                
-                response = await client.post(
-                    f"{self.base_url}/embeddings",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json=request_payload,
-                    timeout=30.0
-                )
-                
-                logger.debug(
-                    "embedding_api_response_received",
+            client = self.http_client
+            request_payload = {
+                "model": self.model,
+                "input": text
+            }
+            
+            logger.debug(
+                "sending_embedding_request",
+                payload_size=lazy(lambda: len(str(request_payload))),
+                timeout=settings.EMBEDDING_TIMEOUT_SECONDS
+            )
+            
+            response = await client.post(
+                f"{self.base_url}/embeddings",
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json=request_payload
+            )
+            
+            logger.debug(
+                "embedding_api_response_received",
+                status_code=response.status_code,
+                response_time_ms=response.elapsed.total_seconds() * 1000,
+                response_size_bytes=len(response.content),
+                headers=verbose(dict, response.headers)
+            )
+            
+            if response.status_code != 200:
+                logger.error(
+                    "embedding_api_error",
                     status_code=response.status_code,
-                    response_time_ms=response.elapsed.total_seconds() * 1000,
-                    response_size_bytes=len(response.content),
-                    headers=dict(response.headers)
-                )
-                
-                if response.status_code != 200:
-                    logger.error(
-                        "embedding_api_error",
-                        status_code=response.status_code,
-                        response_body=response.text[:500],
-                        request_payload=request_payload
-                    )
-                    raise RetrievalException(f"Embedding API 返回错误：{response.status_code}")
-                
-                data = response.json()
-                
-                logger.debug(
-                    "embedding_response_parsed",
-                    data_keys=list(data.keys()),
-                    usage=data.get('usage', {})
+                    response_body=response.text[:500],
+                    request_payload=request_payload
                 )
-                
-                embedding = data['data'][0]['embedding']
-                
-                logger.info(
-                    "embedding_success",
-                    vector_dimension=len(embedding),
-                    vector_sample_first_5=embedding[:5],
-                    vector_sample_last_5=embedding[-5:],
-                    vector_min=min(embedding),
-                    vector_max=max(embedding),
-                    usage=data.get('usage', {})
-                )
-                
-                return embedding
-                
+                raise RetrievalException(f"Embedding API 返回错误：{response.status_code}")
+            
+            data = response.json()
+            
+            logger.debug(
+                "embedding_response_parsed",
+                data_keys=list(data.keys()),
+                usage=data.get('usage', {})
+            )
+            
+            embedding = data['data'][0]['embedding']
+            
+            logger.info(
+                "embedding_success",
+                vector_dimension=len(embedding),
+                vector_sample_first_5=verbose(lambda: embedding[:5]),
+                vector_sample_last_5=verbose(lambda: embedding[-5:]),
+                vector_min=verbose(min, embedding),
+                vector_max=verbose(max, embedding),
+                usage=data.get('usage', {})
+            )
+            
+            return embedding
+            
         except httpx.RequestError as e:
             logger.error(
                 "embedding_request_failed",
@@ -135,6 +283,55 @@ class EmbeddingService:
             )
             raise RetrievalException(f"Embedding 处理失败：{str(e)}")
     
+    async def embed_batch_request(self, texts: List[str], timeout: float = 60.0) -> List[List[float]]:
+        """
+        单次 API 请求向量化一批文本
+        
+        Args:
+            texts: 文本列表（数量不超过 API 批次上限）
+            timeout: 请求超时（秒）
+            
+        Returns:
+            List[List[float]]: 与输入顺序一致的向量列表
+            
+        Raises:
+            RetrievalException: API 调用失败或返回数量不一致时抛出
+        """
+        try:
+            client = self.http_client
+            response = await client.post(
+                f"{self.base_url}/embeddings",
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.model,
+                    "input": texts
+                },
+                timeout=timeout
+            )
+            
+            if response.status_code != 200:
+                raise RetrievalException(f"Embedding API 返回错误：{response.status_code}")
+            
+            data = response.json()
+            # 按 index 排序，保证与输入顺序一致
+            items = sorted(data['data'], key=lambda item: item.get('index', 0))
+            embeddings = [item['embedding'] for item in items]
+            
+            if len(embeddings) != len(texts):
+                raise RetrievalException(
+                    f"Embedding 返回数量不一致：期望 {len(texts)}，得到 {len(embeddings)}"
+                )
+            
+            return embeddings
+            
+        except RetrievalException:
+            raise
+        except Exception as e:
+            raise RetrievalException(f"批量 Embedding 失败：{str(e)}")
+    
     async def embed_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
         """
         批量向量化（减少 API 调用次数）
@@ -155,30 +352,8 @@ class EmbeddingService:
         ]
         
         for batch in batches:
-            try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        f"{self.base_url}/embeddings",
-                        headers={
-                            "Authorization": f"Bearer {self.api_key}",
-                            "Content-Type": "application/json"
-                        },
-                        json={
-                            "model": self.model,
-                            "input": batch
-                        },
-                        timeout=60.0
-                    )
-                    
-                    if response.status_code != 200:
-                        raise RetrievalException(f"Embedding API 返回错误：{response.status_code}")
-                    
-                    data = response.json()
-                    embeddings = [item['embedding'] for item in data['data']]
-                    all_embeddings.extend(embeddings)
-                    
-            except Exception as e:
-                raise RetrievalException(f"批量 Embedding 失败：{str(e)}")
+            embeddings = await self.embed_batch_request(batch)
+            all_embeddings.extend(embeddings)
         
         return all_embeddings
     
@@ -0,0 +1,196 @@
+"""
+持久化向量缓存
+按 (模型, 文本 SHA-256) 复用已计算的嵌入向量：
+重新处理文档、重新分块或批量重新向量化时，只有内容变化的块才调用 Embedding API
+"""
+import hashlib
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+from app.core.config import get_settings
+from app.models.embedding_cache import EmbeddingCacheEntry
+from app.services.embedding_pipeline import EmbeddingPipeline, EmbeddingBatchResult
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# 单条 SQL 的最大键数量，避免 IN 列表 / VALUES 过长
+_SQL_BATCH_SIZE = 500
+
+
+def content_hash(text: str) -> str:
+    """
+    计算文本内容的 SHA-256
+
+    Args:
+        text: 文本内容
+
+    Returns:
+        str: 十六进制摘要
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    持久化向量缓存
+
+    读写都在 SAVEPOINT 中执行：缓存表异常只记录告警，
+    不会中断调用方（文档入库）所在的事务
+    """
+
+    def __init__(self, model: Optional[str] = None):
+        """
+        初始化向量缓存
+
+        Args:
+            model: Embedding 模型名称（默认读取 EMBEDDING_MODEL）
+        """
+        self.model = model or settings.EMBEDDING_MODEL
+
+    async def get_many(self, session: AsyncSession, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        批量读取缓存向量
+
+        Args:
+            session: 数据库会话
+            hashes: 内容哈希列表
+
+        Returns:
+            Dict[str, List[float]]: 内容哈希 -> 向量（只包含命中的项）
+        """
+        hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+        if not hashes:
+            return found
+
+        try:
+            async with session.begin_nested():
+                for i in range(0, len(hashes), _SQL_BATCH_SIZE):
+                    result = await session.execute(
+                        select(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding).where(
+                            EmbeddingCacheEntry.model == self.model,
+                            EmbeddingCacheEntry.content_hash.in_(hashes[i:i + _SQL_BATCH_SIZE])
+                        )
+                    )
+                    for row in result.all():
+                        found[row.content_hash] = np.asarray(row.embedding, dtype=np.float32).tolist()
+        except Exception as e:
+            logger.warning("embedding_store_get_failed", model=self.model, error=str(e))
+            return {}
+
+        return found
+
+    async def put_many(self, session: AsyncSession, embeddings: Dict[str, List[float]]):
+        """
+        批量写入缓存向量（已存在则忽略）
+
+        Args:
+            session: 数据库会话
+            embeddings: 内容哈希 -> 向量
+        """
+        if not embeddings:
+            return
+
+        rows = [
+            {"model": self.model, "content_hash": digest, "embedding": vector}
+            for digest, vector in embeddings.items()
+        ]
+        try:
+            async with session.begin_nested():
+                for i in range(0, len(rows), _SQL_BATCH_SIZE):
+                    stmt = pg_insert(EmbeddingCacheEntry).values(
+                        rows[i:i + _SQL_BATCH_SIZE]
+                    ).on_conflict_do_nothing(index_elements=["model", "content_hash"])
+                    await session.execute(stmt)
+        except Exception as e:
+            logger.warning("embedding_store_put_failed", model=self.model, error=str(e), count=len(rows))
+
+    async def stream_with_cache(
+        self,
+        session: AsyncSession,
+        texts: List[str],
+        pipeline: EmbeddingPipeline
+    ) -> AsyncGenerator[EmbeddingBatchResult, None]:
+        """
+        先读缓存，再对未命中的文本调用流水线，并把新向量写回缓存
+
+        相同内容的文本只向量化一次。结果中的下标对应 texts
+
+        Args:
+            session: 数据库会话
+            texts: 文本列表
+            pipeline: 向量化流水线
+
+        Yields:
+            EmbeddingBatchResult: 第一批为缓存命中结果，其后为流水线各批次结果
+        """
+        hashes = [content_hash(text) for text in texts]
+        cached = await self.get_many(session, hashes)
+
+        hit_result = EmbeddingBatchResult()
+        # 未命中的内容哈希 -> 对应的文本下标（去重）
+        missing: Dict[str, List[int]] = {}
+        for idx, digest in enumerate(hashes):
+            if digest in cached:
+                hit_result.embeddings.append((idx, cached[digest]))
+            else:
+                missing.setdefault(digest, []).append(idx)
+
+        logger.info(
+            "embedding_store_lookup",
+            model=self.model,
+            texts_count=len(texts),
+            cache_hits=len(hit_result.embeddings),
+            unique_misses=len(missing)
+        )
+
+        if hit_result.embeddings:
+            yield hit_result
+
+        if not missing:
+            return
+
+        missing_hashes = list(missing)
+        missing_texts = [texts[missing[digest][0]] for digest in missing_hashes]
+
+        async for batch_result in pipeline.stream(missing_texts):
+            result = EmbeddingBatchResult()
+            new_embeddings: Dict[str, Any] = {}
+
+            for unique_idx, vector in batch_result.embeddings:
+                digest = missing_hashes[unique_idx]
+                new_embeddings[digest] = vector
+                result.embeddings.extend((idx, vector) for idx in missing[digest])
+
+            for unique_idx in batch_result.failed_indices:
+                result.failed_indices.extend(missing[missing_hashes[unique_idx]])
+
+            await self.put_many(session, new_embeddings)
+            yield result
+
+    async def embed_texts(
+        self,
+        session: AsyncSession,
+        texts: List[str],
+        pipeline: EmbeddingPipeline
+    ) -> List[Optional[List[float]]]:
+        """
+        向量化全部文本（经过缓存），按输入顺序返回
+
+        Args:
+            session: 数据库会话
+            texts: 文本列表
+            pipeline: 向量化流水线
+
+        Returns:
+            List[Optional[List[float]]]: 与 texts 对齐的向量，失败项为 None
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        async for batch_result in self.stream_with_cache(session, texts, pipeline):
+            for idx, vector in batch_result.embeddings:
+                embeddings[idx] = vector
+        return embeddings
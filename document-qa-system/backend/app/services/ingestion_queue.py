@@ -0,0 +1,662 @@
+"""
+文档入库任务队列
+任务持久化在 ingestion_jobs 表中，与文档记录在同一事务内入队；
+固定数量的工作者通过 SELECT ... FOR UPDATE SKIP LOCKED 领取任务，
+并发度受 INGESTION_WORKERS 限制，失败按指数退避重试，启动时回收失联任务
+"""
+import asyncio
+import os
+import socket
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+from uuid import UUID, uuid4
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# 优先级：数值越小越先执行。大文件和重新处理排在新上传的小文件之后，避免突发上传时被长任务饿死
+PRIORITY_UPLOAD = 100
+PRIORITY_LARGE_UPLOAD = 200
+PRIORITY_REPROCESS = 300
+
+# 时间列为不带时区的 UTC 时间（与模型的 datetime.utcnow 默认值一致）
+_NOW = "(now() AT TIME ZONE 'utc')"
+_ACTIVE_STATUSES = "('queued', 'running')"
+_MAX_ERROR_LENGTH = 2000
+
+
+@dataclass
+class ClaimedJob:
+    """已领取的任务"""
+    id: UUID
+    document_id: UUID
+    job_type: str
+    priority: int
+    attempts: int
+    max_attempts: int
+
+    @property
+    def final_attempt(self) -> bool:
+        """是否为最后一次尝试（失败后不再重试）"""
+        return self.attempts >= self.max_attempts
+
+
+class IngestionJobQueue:
+    """
+    入库任务队列（数据访问）
+
+    所有方法只执行 SQL，不提交事务：
+    enqueue 由调用方与文档记录一起提交，其余由工作池在独立会话中提交
+    """
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        retry_backoff_seconds: Optional[float] = None,
+        retry_backoff_max_seconds: Optional[float] = None,
+        stale_seconds: Optional[float] = None
+    ):
+        """
+        初始化任务队列
+
+        Args:
+            max_attempts: 最大尝试次数
+            retry_backoff_seconds: 首次重试延迟（秒），之后每次翻倍
+            retry_backoff_max_seconds: 重试延迟上限（秒）
+            stale_seconds: 心跳超过该时间的运行中任务视为失联
+        """
+        self.max_attempts = max_attempts or settings.INGESTION_JOB_MAX_ATTEMPTS
+        self.retry_backoff_seconds = (
+            settings.INGESTION_RETRY_BACKOFF_SECONDS if retry_backoff_seconds is None else retry_backoff_seconds
+        )
+        self.retry_backoff_max_seconds = retry_backoff_max_seconds or settings.INGESTION_RETRY_BACKOFF_MAX_SECONDS
+        self.stale_seconds = stale_seconds or settings.INGESTION_STALE_JOB_SECONDS
+
+    def retry_delay(self, attempts: int) -> float:
+        """
+        计算第 attempts 次失败后的重试延迟
+
+        Args:
+            attempts: 已尝试次数（从 1 开始）
+
+        Returns:
+            float: 延迟秒数
+        """
+        delay = self.retry_backoff_seconds * (2 ** max(0, attempts - 1))
+        return min(delay, self.retry_backoff_max_seconds)
+
+    async def enqueue(
+        self,
+        session: AsyncSession,
+        document_id: UUID,
+        job_type: str = "process",
+        priority: int = PRIORITY_UPLOAD
+    ) -> bool:
+        """
+        入队（同一文档已有排队/运行中的任务时忽略）
+
+        Args:
+            session: 数据库会话（与文档记录同一事务）
+            document_id: 文档 ID
+            job_type: 任务类型
+            priority: 优先级
+
+        Returns:
+            bool: 是否新建了任务
+        """
+        result = await session.execute(
+            text(f"""
+                INSERT INTO ingestion_jobs
+                    (id, document_id, job_type, priority, status, attempts, max_attempts,
+                     run_after, created_at, updated_at)
+                VALUES
+                    (:id, :document_id, :job_type, :priority, 'queued', 0, :max_attempts,
+                     {_NOW}, {_NOW}, {_NOW})
+                ON CONFLICT (document_id) WHERE status IN {_ACTIVE_STATUSES} DO NOTHING
+                RETURNING id
+            """),
+            {
+                "id": uuid4(),
+                "document_id": document_id,
+                "job_type": job_type,
+                "priority": priority,
+                "max_attempts": self.max_attempts
+            }
+        )
+        created = result.first() is not None
+
+        logger.info(
+            "ingestion_job_enqueued" if created else "ingestion_job_already_active",
+            doc_id=str(document_id),
+            job_type=job_type,
+            priority=priority
+        )
+        return created
+
+    async def claim(self, session: AsyncSession, worker_id: str) -> Optional[ClaimedJob]:
+        """
+        领取一个可执行的任务（跳过其他工作者已锁定的行）
+
+        Args:
+            session: 数据库会话
+            worker_id: 工作者标识
+
+        Returns:
+            Optional[ClaimedJob]: 没有可执行任务时返回 None
+        """
+        result = await session.execute(
+            text(f"""
+                UPDATE ingestion_jobs AS j
+                SET status = 'running',
+                    attempts = j.attempts + 1,
+                    locked_at = {_NOW},
+                    locked_by = :worker_id,
+                    updated_at = {_NOW}
+                FROM (
+                    SELECT id FROM ingestion_jobs
+                    WHERE status = 'queued' AND run_after <= {_NOW}
+                    ORDER BY priority, created_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                ) AS next_job
+                WHERE j.id = next_job.id
+                RETURNING j.id, j.document_id, j.job_type, j.priority, j.attempts, j.max_attempts
+            """),
+            {"worker_id": worker_id}
+        )
+        row = result.first()
+        if row is None:
+            return None
+
+        return ClaimedJob(
+            id=row.id,
+            document_id=row.document_id,
+            job_type=row.job_type,
+            priority=row.priority,
+            attempts=row.attempts,
+            max_attempts=row.max_attempts
+        )
+
+    async def heartbeat(self, session: AsyncSession, job_id: UUID):
+        """
+        刷新运行中任务的锁定时间
+
+        Args:
+            session: 数据库会话
+            job_id: 任务 ID
+        """
+        await session.execute(
+            text(f"UPDATE ingestion_jobs SET locked_at = {_NOW} WHERE id = :id AND status = 'running'"),
+            {"id": job_id}
+        )
+
+    async def complete(self, session: AsyncSession, job_id: UUID):
+        """
+        标记任务成功
+
+        Args:
+            session: 数据库会话
+            job_id: 任务 ID
+        """
+        await session.execute(
+            text(f"""
+                UPDATE ingestion_jobs
+                SET status = 'succeeded', locked_at = NULL, locked_by = NULL, updated_at = {_NOW}
+                WHERE id = :id
+            """),
+            {"id": job_id}
+        )
+
+    async def fail(self, session: AsyncSession, job: ClaimedJob, error: str, retryable: bool = True) -> bool:
+        """
+        记录任务失败：还有重试机会时按退避时间重新排队，否则标记为 failed
+
+        Args:
+            session: 数据库会话
+            job: 已领取的任务
+            error: 失败原因
+            retryable: 错误是否可重试
+
+        Returns:
+            bool: 是否已重新排队
+        """
+        will_retry = retryable and not job.final_attempt
+        delay = self.retry_delay(job.attempts) if will_retry else 0.0
+
+        await session.execute(
+            text(f"""
+                UPDATE ingestion_jobs
+                SET status = :status,
+                    run_after = {_NOW} + make_interval(secs => :delay),
+                    locked_at = NULL,
+                    locked_by = NULL,
+                    last_error = :error,
+                    updated_at = {_NOW}
+                WHERE id = :id
+            """),
+            {
+                "id": job.id,
+                "status": "queued" if will_retry else "failed",
+                "delay": delay,
+                "error": error[:_MAX_ERROR_LENGTH]
+            }
+        )
+        return will_retry
+
+    async def release(self, session: AsyncSession, job_id: UUID):
+        """
+        归还任务（停机时中断的任务重新排队，不计入尝试次数）
+
+        Args:
+            session: 数据库会话
+            job_id: 任务 ID
+        """
+        await session.execute(
+            text(f"""
+                UPDATE ingestion_jobs
+                SET status = 'queued',
+                    attempts = GREATEST(attempts - 1, 0),
+                    locked_at = NULL,
+                    locked_by = NULL,
+                    updated_at = {_NOW}
+                WHERE id = :id AND status = 'running'
+            """),
+            {"id": job_id}
+        )
+
+    async def recover_stale(self, session: AsyncSession) -> Dict[str, int]:
+        """
+        回收失联任务（执行者崩溃或重启导致心跳中断）
+
+        - 仍有重试机会的任务重新排队
+        - 已用完尝试次数的任务标记为 failed，对应文档同步标记为 failed
+          （避免反复拖垮进程的任务无限循环）
+
+        Args:
+            session: 数据库会话
+
+        Returns:
+            Dict[str, int]: requeued / failed 数量
+        """
+        stale_condition = f"status = 'running' AND locked_at < {_NOW} - make_interval(secs => :stale_seconds)"
+        params = {"stale_seconds": self.stale_seconds}
+
+        requeued = await session.execute(
+            text(f"""
+                UPDATE ingestion_jobs
+                SET status = 'queued', run_after = {_NOW}, locked_at = NULL, locked_by = NULL,
+                    last_error = 'worker lost', updated_at = {_NOW}
+                WHERE {stale_condition} AND attempts < max_attempts
+                RETURNING id
+            """),
+            params
+        )
+        requeued_count = len(requeued.fetchall())
+
+        exhausted = await session.execute(
+            text(f"""
+                UPDATE ingestion_jobs
+                SET status = 'failed', locked_at = NULL, locked_by = NULL,
+                    last_error = 'worker lost', updated_at = {_NOW}
+                WHERE {stale_condition} AND attempts >= max_attempts
+                RETURNING document_id
+            """),
+            params
+        )
+        failed_documents = [row.document_id for row in exhausted.fetchall()]
+        if failed_documents:
+            await session.execute(
+                text(f"""
+                    UPDATE documents SET status = 'failed', updated_at = {_NOW}
+                    WHERE id = ANY(CAST(:ids AS UUID[]))
+                """),
+                {"ids": failed_documents}
+            )
+
+        return {"requeued": requeued_count, "failed": len(failed_documents)}
+
+    async def enqueue_orphaned_documents(self, session: AsyncSession) -> int:
+        """
+        为处于处理中但没有活跃任务的文档补建任务（队列上线前遗留的文档）
+
+        Args:
+            session: 数据库会话
+
+        Returns:
+            int: 补建的任务数
+        """
+        result = await session.execute(
+            text(f"""
+                INSERT INTO ingestion_jobs
+                    (id, document_id, job_type, priority, status, attempts, max_attempts,
+                     run_after, created_at, updated_at)
+                SELECT gen_random_uuid(), d.id, 'process', :priority, 'queued', 0, :max_attempts,
+                       {_NOW}, {_NOW}, {_NOW}
+                FROM documents AS d
+                WHERE d.status IN ('processing', 'chunked')
+                  AND NOT EXISTS (
+                      SELECT 1 FROM ingestion_jobs AS j
+                      WHERE j.document_id = d.id AND j.status IN {_ACTIVE_STATUSES}
+                  )
+                ON CONFLICT (document_id) WHERE status IN {_ACTIVE_STATUSES} DO NOTHING
+                RETURNING id
+            """),
+            {"priority": PRIORITY_UPLOAD, "max_attempts": self.max_attempts}
+        )
+        return len(result.fetchall())
+
+
+JobHandler = Callable[[ClaimedJob], Awaitable[None]]
+
+
+class IngestionWorkerPool:
+    """
+    入库工作池
+
+    - 固定数量的工作协程循环领取任务，空闲时等待唤醒或轮询间隔
+    - 执行期间定期刷新心跳，其他实例据此判断任务是否失联
+    - 停机时取消运行中的任务并归还到队列
+    """
+
+    def __init__(
+        self,
+        queue: Optional[IngestionJobQueue] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        heartbeat_seconds: Optional[float] = None,
+        session_factory: Optional[Callable[[], Any]] = None
+    ):
+        """
+        初始化工作池
+
+        Args:
+            queue: 任务队列
+            concurrency: 工作协程数量（0 表示本实例不消费任务）
+            poll_interval: 空闲轮询间隔（秒）
+            heartbeat_seconds: 心跳间隔（秒）
+            session_factory: 会话工厂（默认 AsyncSessionLocal）
+        """
+        self.queue = queue or IngestionJobQueue()
+        self.concurrency = settings.INGESTION_WORKERS if concurrency is None else concurrency
+        self.poll_interval = poll_interval or settings.INGESTION_POLL_INTERVAL_SECONDS
+        self.heartbeat_seconds = heartbeat_seconds or settings.INGESTION_HEARTBEAT_SECONDS
+        self._session_factory = session_factory
+        self._handlers: Dict[str, Tuple[JobHandler, Tuple[Type[BaseException], ...]]] = {}
+        self._tasks: list = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.running = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+
+    @property
+    def session_factory(self) -> Callable[[], Any]:
+        """会话工厂（延迟导入数据库模块）"""
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    def register(
+        self,
+        job_type: str,
+        handler: JobHandler,
+        permanent_errors: Tuple[Type[BaseException], ...] = ()
+    ):
+        """
+        注册任务处理函数
+
+        Args:
+            job_type: 任务类型
+            handler: 处理函数，接收 ClaimedJob
+            permanent_errors: 不重试的异常类型
+        """
+        self._handlers[job_type] = (handler, permanent_errors)
+
+    def notify(self):
+        """唤醒空闲的工作协程（本实例入队后调用，减少轮询延迟）"""
+        self._wakeup.set()
+
+    async def _execute(self, operation: Callable[..., Awaitable[Any]], *args) -> Any:
+        """
+        在独立会话中执行队列操作并提交
+
+        Args:
+            operation: 队列方法（第一个参数为会话）
+            *args: 其余参数
+
+        Returns:
+            Any: 队列方法返回值
+        """
+        async with self.session_factory() as session:
+            result = await operation(session, *args)
+            await session.commit()
+            return result
+
+    async def recover(self):
+        """回收失联任务并为遗留文档补建任务"""
+        try:
+            recovered = await self._execute(self.queue.recover_stale)
+            orphaned = await self._execute(self.queue.enqueue_orphaned_documents)
+            logger.info(
+                "ingestion_jobs_recovered",
+                requeued=recovered["requeued"],
+                failed=recovered["failed"],
+                orphaned_documents=orphaned
+            )
+        except Exception as e:
+            logger.error("ingestion_job_recovery_failed", error=str(e), exc_info=True)
+
+    async def start(self):
+        """启动工作协程（先回收失联任务）"""
+        if self._tasks or self.concurrency <= 0:
+            return
+
+        self._stopping = False
+        await self.recover()
+        self._tasks = [
+            asyncio.create_task(self._worker_loop(f"{self.instance_id}:{index}"))
+            for index in range(self.concurrency)
+        ]
+        self._tasks.append(asyncio.create_task(self._reaper_loop()))
+
+        logger.info(
+            "ingestion_workers_started",
+            concurrency=self.concurrency,
+            poll_interval=self.poll_interval,
+            job_types=sorted(self._handlers)
+        )
+
+    async def stop(self):
+        """停止工作协程（运行中的任务归还到队列）"""
+        if not self._tasks:
+            return
+
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        logger.info("ingestion_workers_stopped")
+
+    async def _worker_loop(self, worker_id: str):
+        """
+        工作协程主循环
+
+        Args:
+            worker_id: 工作者标识
+        """
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                job = await self._execute(self.queue.claim, worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("ingestion_job_claim_failed", worker_id=worker_id, error=str(e))
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run_job(job, worker_id)
+
+    async def _reaper_loop(self):
+        """定期回收其他实例失联的任务"""
+        while not self._stopping:
+            await asyncio.sleep(self.queue.stale_seconds)
+            try:
+                recovered = await self._execute(self.queue.recover_stale)
+                if recovered["requeued"] or recovered["failed"]:
+                    logger.warning("ingestion_stale_jobs_recovered", **recovered)
+                    self.notify()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("ingestion_stale_job_recovery_failed", error=str(e))
+
+    async def _heartbeat_loop(self, job_id: UUID):
+        """
+        定期刷新任务心跳
+
+        Args:
+            job_id: 任务 ID
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await self._execute(self.queue.heartbeat, job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("ingestion_job_heartbeat_failed", job_id=str(job_id), error=str(e))
+
+    async def _run_job(self, job: ClaimedJob, worker_id: str):
+        """
+        执行单个任务并记录结果
+
+        Args:
+            job: 已领取的任务
+            worker_id: 工作者标识
+        """
+        handler, permanent_errors = self._handlers.get(job.job_type, (None, ()))
+        log = logger.bind(
+            job_id=str(job.id),
+            doc_id=str(job.document_id),
+            job_type=job.job_type,
+            attempt=job.attempts,
+            max_attempts=job.max_attempts,
+            worker_id=worker_id
+        )
+
+        if handler is None:
+            log.error("ingestion_job_handler_missing")
+            await self._execute(self.queue.fail, job, f"未注册的任务类型：{job.job_type}", False)
+            self.failed += 1
+            return
+
+        log.info("ingestion_job_started")
+        self.running += 1
+        heartbeat = asyncio.create_task(self._heartbeat_loop(job.id))
+        try:
+            await handler(job)
+        except asyncio.CancelledError as e:
+            if self._stopping or asyncio.current_task().cancelling():
+                # 停机：任务归还队列，工作协程退出
+                await asyncio.shield(self._execute(self.queue.release, job.id))
+                log.warning("ingestion_job_released")
+                raise
+            # 处理函数内部的取消（如解析进程池关闭时取消排队的任务）不是停机，
+            # 按可重试失败记录，工作协程继续消费队列
+            await self._record_failure(job, e, True, log)
+        except Exception as e:
+            await self._record_failure(job, e, not isinstance(e, permanent_errors), log)
+        else:
+            try:
+                await self._execute(self.queue.complete, job.id)
+            except Exception as e:
+                log.error("ingestion_job_completion_not_recorded", error=str(e))
+            self.succeeded += 1
+            log.info("ingestion_job_succeeded")
+        finally:
+            heartbeat.cancel()
+            self.running -= 1
+
+    async def _record_failure(self, job: ClaimedJob, error: BaseException, retryable: bool, log):
+        """
+        记录任务失败（可重试的按退避时间重新入队）
+
+        Args:
+            job: 任务
+            error: 处理函数抛出的异常
+            retryable: 是否可重试
+            log: 绑定了任务字段的 logger
+        """
+        try:
+            will_retry = await self._execute(self.queue.fail, job, str(error) or type(error).__name__, retryable)
+        except Exception as record_error:
+            # 记录失败本身出错时任务保持 running，由失联回收处理
+            log.error("ingestion_job_failure_not_recorded", error=str(record_error))
+            return
+        if will_retry:
+            self.retried += 1
+            log.warning(
+                "ingestion_job_retry_scheduled",
+                error=str(error),
+                retry_in_seconds=self.queue.retry_delay(job.attempts)
+            )
+        else:
+            self.failed += 1
+            log.error("ingestion_job_failed", error=str(error), retryable=retryable)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取工作池统计（本实例）
+
+        Returns:
+            Dict[str, Any]: 并发度、运行中任务数及累计结果
+        """
+        return {
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed
+        }
+
+
+ingestion_worker_pool = IngestionWorkerPool()
+
+
+def get_ingestion_worker_pool() -> IngestionWorkerPool:
+    """
+    获取全局入库工作池
+
+    Returns:
+        IngestionWorkerPool: 工作池实例
+    """
+    return ingestion_worker_pool
+
+
+async def init_ingestion_workers():
+    """注册任务处理函数并启动工作池"""
+    from app.services.document_service import register_ingestion_handlers
+
+    register_ingestion_handlers(ingestion_worker_pool)
+    await ingestion_worker_pool.start()
+
+
+async def close_ingestion_workers():
+    """停止工作池"""
+    await ingestion_worker_pool.stop()
@@ -0,0 +1,190 @@
+"""
+词法检索服务
+基于 PostgreSQL 全文检索（chunks.content_tsv + GIN 索引）召回精确词项匹配，
+与向量检索互补（产品编号、条款号等向量检索容易漏掉的内容）
+"""
+from typing import List, Dict, Any, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+from app.core.config import get_settings
+from app.exceptions import RetrievalException
+from app.utils.text_segmenter import to_search_document, to_tsquery_text
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+LEXICAL_INDEX_NAME = "idx_chunks_content_tsv"
+
+
+class LexicalSearchService:
+    """
+    词法检索服务
+
+    功能:
+    - 确保 content_tsv 列与 GIN 索引存在
+    - 全文检索（ts_rank_cd 排序）
+    - 回填历史数据的 content_tsv
+    """
+
+    def __init__(self, ts_config: Optional[str] = None):
+        """
+        初始化词法检索服务
+
+        Args:
+            ts_config: 全文检索配置名（默认读取 FTS_CONFIG）
+        """
+        self.ts_config = ts_config or settings.FTS_CONFIG
+
+    async def ensure_schema(self, conn):
+        """
+        确保 content_tsv 列和 GIN 索引存在（幂等）
+
+        Args:
+            conn: 数据库连接或会话
+        """
+        await conn.execute(text(
+            "ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_tsv TSVECTOR"
+        ))
+        await conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {LEXICAL_INDEX_NAME} ON chunks USING gin (content_tsv)"
+        ))
+        logger.info("lexical_index_ensured", index_name=LEXICAL_INDEX_NAME)
+
+    async def search(
+        self,
+        session: AsyncSession,
+        query: str,
+        top_k: int = 10,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        全文检索
+
+        Args:
+            session: 数据库会话
+            query: 用户问题（原文）
+            top_k: 返回数量
+            filter_dict: 过滤条件（如 document_id）
+            include_metadata: 是否返回内容
+
+        Returns:
+            List[Dict[str, Any]]: 与向量检索相同格式的结果，score 为归一化到 [0, 1) 的 ts_rank_cd
+        """
+        tsquery_text = to_tsquery_text(query, max_terms=settings.LEXICAL_MAX_QUERY_TERMS)
+        if not tsquery_text:
+            return []
+
+        try:
+            params = {
+                "ts_config": self.ts_config,
+                "tsquery": tsquery_text,
+                "candidate_limit": settings.LEXICAL_CANDIDATE_LIMIT,
+                "limit": top_k
+            }
+            where_clauses = ["content_tsv @@ q.query"]
+            if filter_dict and 'document_id' in filter_dict:
+                where_clauses.append("document_id = :document_id")
+                params["document_id"] = filter_dict['document_id']
+
+            content_column = "c.content" if include_metadata else "NULL AS content"
+            # GIN 索引预筛选最多 LEXICAL_CANDIDATE_LIMIT 个候选，只对候选计算 ts_rank_cd，
+            # 常见词项命中大量块时排序开销有上限
+            # ts_rank_cd 归一化选项 32：rank / (rank + 1)，使分数落在 [0, 1)
+            sql = text(f"""
+                WITH q AS (
+                    SELECT to_tsquery(CAST(:ts_config AS REGCONFIG), :tsquery) AS query
+                ),
+                candidates AS (
+                    SELECT id, document_id, chunk_index, content, token_count, content_tsv
+                    FROM chunks, q
+                    WHERE {" AND ".join(where_clauses)}
+                    LIMIT :candidate_limit
+                )
+                SELECT c.id, c.document_id, c.chunk_index, {content_column}, c.token_count,
+                       ts_rank_cd(c.content_tsv, q.query, 32) AS lexical_score
+                FROM candidates c, q
+                ORDER BY lexical_score DESC
+                LIMIT :limit
+            """)
+
+            result = await session.execute(sql, params)
+            rows = result.fetchall()
+
+            matches = [
+                {
+                    "id": str(row.id),
+                    "score": float(row.lexical_score),
+                    "metadata": {
+                        "document_id": str(row.document_id),
+                        "chunk_index": row.chunk_index,
+                        "content": row.content,
+                        "token_count": row.token_count
+                    }
+                }
+                for row in rows
+            ]
+
+            logger.info(
+                "lexical_search_completed",
+                top_k=top_k,
+                terms_count=tsquery_text.count("|") + 1,
+                results_count=len(matches),
+                filter=filter_dict
+            )
+
+            return matches
+
+        except Exception as e:
+            logger.error(
+                "lexical_search_failed",
+                error=str(e),
+                exc_info=True
+            )
+            raise RetrievalException(f"全文检索失败：{str(e)}")
+
+    async def backfill(self, session: AsyncSession, batch_size: int = 500) -> int:
+        """
+        为 content_tsv 为空的历史文档块回填分词结果
+
+        Args:
+            session: 数据库会话
+            batch_size: 每批处理的块数
+
+        Returns:
+            int: 回填的块数
+        """
+        total = 0
+        while True:
+            result = await session.execute(
+                text("""
+                    SELECT id, content FROM chunks
+                    WHERE content_tsv IS NULL
+                    LIMIT :limit
+                """),
+                {"limit": batch_size}
+            )
+            rows = result.fetchall()
+            if not rows:
+                break
+
+            await session.execute(
+                text("""
+                    UPDATE chunks AS c
+                    SET content_tsv = to_tsvector(CAST(:ts_config AS REGCONFIG), v.document)
+                    FROM unnest(CAST(:ids AS UUID[]), CAST(:documents AS TEXT[])) AS v(id, document)
+                    WHERE c.id = v.id
+                """),
+                {
+                    "ts_config": self.ts_config,
+                    "ids": [row.id for row in rows],
+                    "documents": [to_search_document(row.content) for row in rows]
+                }
+            )
+            await session.commit()
+
+            total += len(rows)
+            logger.info("lexical_backfill_progress", updated=total)
+
+        return total
@@ -5,6 +5,7 @@ PostgreSQL 向量数据库服务
 
 from typing import List, Dict, Any, Optional, Tuple
 import asyncio
+import json
 import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text, select, func
@@ -12,11 +13,15 @@ from app.models.chunk import Chunk
 from app.models.types import cosine_similarity, euclidean_distance
 from app.core.config import get_settings
 from app.exceptions import RetrievalException
+from app.services.vector_index_manager import VectorIndexManager
 import structlog
 
 logger = structlog.get_logger()
 settings = get_settings()
 
+# 单条 UPDATE 合并的最大向量数（参数约 UPSERT_BATCH_SIZE × 维度 × 4 字节）
+UPSERT_BATCH_SIZE = 500
+
 
 class PostgreSQLVectorService:
     """
@@ -35,14 +40,91 @@ class PostgreSQLVectorService:
         """初始化 PostgreSQL 向量服务"""
         self.dimension = settings.VECTOR_DIMENSION
         self.index_type = settings.VECTOR_INDEX_TYPE
+        self.index_manager = VectorIndexManager(index_type=self.index_type)
+
+    @staticmethod
+    def encode_query_vector(query_vector: List[float]) -> List[float]:
+        """
+        编码查询向量为 float4[] 参数
+        
+        asyncpg 以二进制协议传输 float4[]（每个分量 4 字节），
+        避免在 Python 中把 1024 个浮点数格式化为 '[...]' 文本。
+        不注册 pgvector 的 asyncpg codec，是因为 ORM 写入路径以文本绑定 vector 列，
+        全局替换 vector 类型的编码器会使其失效
         
+        Args:
+            query_vector: 查询向量（list 或 numpy.ndarray）
+            
+        Returns:
+            List[float]: 可直接绑定的浮点数列表
+        """
+        return np.asarray(query_vector, dtype=np.float32).astype(float).tolist()
+
+    def query_vector_sql(self, param: str) -> str:
+        """
+        查询向量参数的 SQL 表达式（float4[] 转换为 vector）
+        
+        Args:
+            param: 绑定参数占位符，如 ":query_vector"
+            
+        Returns:
+            str: SQL 表达式
+        """
+        return f"CAST(CAST({param} AS REAL[]) AS VECTOR({self.dimension}))"
+
+    @staticmethod
+    def _build_where_clause(filter_dict: Optional[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        """
+        构建检索的 WHERE 条件，并写入对应的绑定参数
+        
+        Args:
+            filter_dict: 过滤条件（如 document_id）
+            params: 绑定参数字典（原地修改）
+            
+        Returns:
+            str: WHERE 条件 SQL
+        """
+        where_clauses = ["embedding IS NOT NULL"]
+        if filter_dict and 'document_id' in filter_dict:
+            where_clauses.append("document_id = :document_id")
+            params["document_id"] = filter_dict['document_id']
+        # 可以添加更多过滤条件
+        return " AND ".join(where_clauses)
+
+    @staticmethod
+    def _row_to_match(row) -> Dict[str, Any]:
+        """
+        将检索结果行转换为 Pinecone 兼容格式
+        
+        Args:
+            row: 包含 id、document_id、chunk_index、content、token_count、cosine_distance 的行
+            
+        Returns:
+            Dict[str, Any]: {"id", "score", "metadata"}
+        """
+        # 从 cosine_distance 转换为相似度分数 (cosine_distance 越小越相似)
+        # 余弦相似度 = 1 - cosine_distance
+        similarity_score = 1.0 - float(row.cosine_distance)
+        
+        return {
+            "id": str(row.id),
+            "score": float(similarity_score),
+            "metadata": {
+                "document_id": str(row.document_id),
+                "chunk_index": row.chunk_index,
+                "content": row.content,
+                "token_count": row.token_count
+            }
+        }
+
     async def similarity_search(
         self,
         session: AsyncSession,
         query_vector: List[float],
         top_k: int = 10,
         filter_dict: Optional[Dict[str, Any]] = None,
-        include_metadata: bool = True
+        include_metadata: bool = True,
+        search_effort: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         向量相似度搜索（余弦相似度）
@@ -53,6 +135,8 @@ class PostgreSQLVectorService:
             top_k: 返回最相似的 K 个结果
             filter_dict: 过滤条件（如 document_id）
             include_metadata: 是否返回元数据
+            search_effort: 召回率/延迟权衡（HNSW 的 ef_search 或 IVFFlat 的 probes），
+                None 使用配置默认值
             
         Returns:
             List[Dict[str, Any]]: 搜索结果，按相似度降序排列
@@ -67,62 +151,28 @@ class PostgreSQLVectorService:
             if len(query_vector) != self.dimension:
                 raise ValueError(f"查询向量维度不匹配：期望 {self.dimension}，得到 {len(query_vector)}")
             
-            # 构建基础查询
-            stmt = select(Chunk).where(Chunk.embedding.isnot(None))
-            
-            # 添加过滤条件
-            if filter_dict:
-                if 'document_id' in filter_dict:
-                    stmt = stmt.where(Chunk.document_id == filter_dict['document_id'])
-                # 可以添加更多过滤条件
-            
-            # 执行相似度搜索
-            # 使用原生 SQL 查询，正确处理 pgvector 类型
-            from sqlalchemy import text
-            
-            # 将向量转换为 PostgreSQL 可接受的格式
-            # pgvector 接受数组格式的向量
-            query_vector_str = '[' + ','.join([f'{x:.6f}' for x in query_vector]) + ']'
+            # 精简查询：只取 id、分数和元数据列，不回传 embedding（每行 1024 个浮点数）
+            params = {"query_vector": self.encode_query_vector(query_vector), "limit": top_k}
+            where_clause = self._build_where_clause(filter_dict, params)
             
+            content_column = "content" if include_metadata else "NULL AS content"
             sql = text(f"""
-                SELECT id, document_id, chunk_index, content, token_count, embedding, metadata,
-                       (embedding <=> CAST(:query_vector AS VECTOR({self.dimension}))) as cosine_distance
+                SELECT id, document_id, chunk_index, {content_column}, token_count,
+                       (embedding <=> {self.query_vector_sql(":query_vector")}) AS cosine_distance
                 FROM chunks 
-                WHERE embedding IS NOT NULL
+                WHERE {where_clause}
                 ORDER BY cosine_distance ASC 
                 LIMIT :limit
             """)
             
-            # 执行查询
-            params = {"query_vector": query_vector_str, "limit": top_k}
-            if filter_dict and 'document_id' in filter_dict:
-                sql = text(str(sql).replace("WHERE embedding IS NOT NULL", 
-                                          "WHERE embedding IS NOT NULL AND document_id = :document_id"))
-                params["document_id"] = filter_dict['document_id']
+            # 设置本次查询的 ANN 检索宽度（仅作用于当前事务）
+            await self.index_manager.apply_search_params(session, search_effort, top_k)
                 
             result = await session.execute(sql, params)
             rows = result.fetchall()
             
             # 转换为 Pinecone 兼适格式
-            matches = []
-                        
-            for row in rows:
-                if row.embedding is not None:
-                    # 从 cosine_distance 转换为相似度分数 (cosine_distance 越小越相似)
-                    # 余弦相似度 = 1 - cosine_distance
-                    similarity_score = 1.0 - float(row.cosine_distance)
-                                
-                    match = {
-                        "id": str(row.id),
-                        "score": float(similarity_score),
-                        "metadata": {
-                            "document_id": str(row.document_id),
-                            "chunk_index": row.chunk_index,
-                            "content": row.content,
-                            "token_count": row.token_count
-                        }
-                    }
-                    matches.append(match)
+            matches = [self._row_to_match(row) for row in rows]
             
             logger.info(
                 "postgres_vector_search_completed",
@@ -146,27 +196,96 @@ class PostgreSQLVectorService:
         session: AsyncSession,
         query_vectors: List[List[float]],
         top_k: int = 10,
-        filter_dict: Optional[Dict[str, Any]] = None
+        filter_dict: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+        search_effort: Optional[int] = None
     ) -> List[List[Dict[str, Any]]]:
         """
-        批量向量相似度搜索
+        批量向量相似度搜索（单条 SQL、一次往返）
+        
+        所有查询向量拼接为一个 float4[] 参数，按序号切片还原为 vector，
+        再通过 LATERAL 子查询对每个查询向量执行 ORDER BY ... LIMIT k，
+        每个子查询都能独立走 ANN 索引
         
         Args:
             session: 数据库会话
             query_vectors: 查询向量列表
             top_k: 每个查询返回的结果数
             filter_dict: 过滤条件
+            include_metadata: 是否返回元数据
+            search_effort: 召回率/延迟权衡，None 使用配置默认值
             
         Returns:
-            List[List[Dict[str, Any]]]: 批量搜索结果
+            List[List[Dict[str, Any]]]: 批量搜索结果，与 query_vectors 一一对应
         """
-        results = []
-        for query_vector in query_vectors:
-            result = await self.similarity_search(
-                session, query_vector, top_k, filter_dict
+        if not query_vectors:
+            return []
+        
+        try:
+            for query_vector in query_vectors:
+                if len(query_vector) != self.dimension:
+                    raise ValueError(f"查询向量维度不匹配：期望 {self.dimension}，得到 {len(query_vector)}")
+            
+            flat_vectors = np.asarray(query_vectors, dtype=np.float32).reshape(-1)
+            params = {
+                "query_vectors": self.encode_query_vector(flat_vectors),
+                "query_count": len(query_vectors),
+                "limit": top_k
+            }
+            where_clause = self._build_where_clause(filter_dict, params)
+            
+            content_column = "content" if include_metadata else "NULL AS content"
+            dim = self.dimension
+            sql = text(f"""
+                WITH queries AS (
+                    SELECT ord, CAST(
+                        (CAST(:query_vectors AS REAL[]))[(ord - 1) * {dim} + 1 : ord * {dim}]
+                        AS VECTOR({dim})
+                    ) AS query_vector
+                    FROM generate_series(1, :query_count) AS ord
+                )
+                SELECT q.ord, hit.id, hit.document_id, hit.chunk_index, hit.content,
+                       hit.token_count, hit.cosine_distance
+                FROM queries q
+                CROSS JOIN LATERAL (
+                    SELECT id, document_id, chunk_index, {content_column}, token_count,
+                           (embedding <=> q.query_vector) AS cosine_distance
+                    FROM chunks
+                    WHERE {where_clause}
+                    ORDER BY cosine_distance ASC
+                    LIMIT :limit
+                ) hit
+                ORDER BY q.ord, hit.cosine_distance ASC
+            """)
+            
+            # 设置本次查询的 ANN 检索宽度（仅作用于当前事务）
+            await self.index_manager.apply_search_params(session, search_effort, top_k)
+            
+            result = await session.execute(sql, params)
+            rows = result.fetchall()
+            
+            results: List[List[Dict[str, Any]]] = [[] for _ in query_vectors]
+            for row in rows:
+                results[row.ord - 1].append(self._row_to_match(row))
+            
+            logger.info(
+                "postgres_vector_batch_search_completed",
+                queries_count=len(query_vectors),
+                top_k=top_k,
+                results_count=len(rows),
+                filter=filter_dict
+            )
+            
+            return results
+            
+        except Exception as e:
+            logger.error(
+                "postgres_vector_batch_search_failed",
+                queries_count=len(query_vectors),
+                error=str(e),
+                exc_info=True
             )
-            results.append(result)
-        return results
+            raise RetrievalException(f"PostgreSQL 批量向量检索失败：{str(e)}")
 
     async def upsert_vectors(
         self,
@@ -177,6 +296,10 @@ class PostgreSQLVectorService:
         """
         插入或更新向量
         
+        每 UPSERT_BATCH_SIZE 个向量合并为一条 UPDATE ... FROM unnest(...)：
+        向量拼接为一个 float4[] 参数按序号切片还原，元数据以 JSON 文本数组传入。
+        chunks 表中的 content / chunk_index 是数据源，不会被 metadata 中的（可能截断的）内容覆盖
+        
         Args:
             session: 数据库会话
             vectors: 向量列表，每个向量包含:
@@ -198,85 +321,59 @@ class PostgreSQLVectorService:
                 dimension=self.dimension
             )
             
-            success_count = 0
-            failed_count = 0
-            not_found_count = 0
-            
-            for i, vector_data in enumerate(vectors):
-                chunk_id = vector_data["id"]
-                embedding = vector_data["values"]
-                metadata = vector_data.get("metadata", {})
-                
-                logger.debug(
-                    "processing_vector_upsert",
-                    index=i,
-                    chunk_id=chunk_id,
-                    has_values="values" in vector_data,
-                    values_dimension=len(embedding) if "values" in vector_data else 0,
-                    has_metadata="metadata" in vector_data,
-                    metadata_keys=list(metadata.keys()) if metadata else None
-                )
-                
-                # 📝 关键日志：验证输入数据
-                logger.debug(
-                    "vector_data_validation",
-                    chunk_id=chunk_id,
-                    embedding_type=type(embedding).__name__,
-                    embedding_len=len(embedding),
-                    embedding_sample=embedding[:3] if len(embedding) > 0 else None,
-                    metadata_type=type(metadata).__name__,
-                    metadata_content_preview=metadata.get("content", "")[:50] if metadata else None
-                )
-                
-                # 验证向量维度
-                if len(embedding) != self.dimension:
+            # 验证向量维度
+            for vector_data in vectors:
+                if len(vector_data["values"]) != self.dimension:
                     logger.error(
                         "vector_dimension_mismatch",
-                        chunk_id=chunk_id,
+                        chunk_id=vector_data["id"],
                         expected_dimension=self.dimension,
-                        actual_dimension=len(embedding)
+                        actual_dimension=len(vector_data["values"])
                     )
-                    raise ValueError(f"向量维度不匹配：期望 {self.dimension}，得到 {len(embedding)}")
-                
-                # 📝 关键：直接执行 UPDATE，避免 SELECT 加载 embedding 字段
-                # 使用 update().values() 方式
-                from sqlalchemy import update
-                
-                # 📝 注意：metadata 是 SQLAlchemy 保留字，需要使用 chunk_metadata
-                update_data = {
-                    "embedding": np.array(embedding, dtype=np.float32),
-                    "content": metadata.get("content"),
-                    "chunk_index": metadata.get("chunk_index"),
-                    "chunk_metadata": metadata if metadata else None  # ✅ 使用 chunk_metadata 而非 metadata
+                    raise ValueError(f"向量维度不匹配：期望 {self.dimension}，得到 {len(vector_data['values'])}")
+            
+            dim = self.dimension
+            sql = text(f"""
+                UPDATE chunks AS c
+                SET embedding = CAST(
+                        (CAST(:embeddings AS REAL[]))[(v.ord - 1) * {dim} + 1 : v.ord * {dim}]
+                        AS VECTOR({dim})
+                    ),
+                    metadata = COALESCE(CAST(v.metadata AS JSONB), c.metadata)
+                FROM unnest(CAST(:ids AS UUID[]), CAST(:metadata AS TEXT[]))
+                     WITH ORDINALITY AS v(id, metadata, ord)
+                WHERE c.id = v.id
+            """)
+            
+            success_count = 0
+            for i in range(0, len(vectors), UPSERT_BATCH_SIZE):
+                batch = vectors[i:i + UPSERT_BATCH_SIZE]
+                params = {
+                    "ids": [str(vector_data["id"]) for vector_data in batch],
+                    "embeddings": self.encode_query_vector(
+                        np.asarray([vector_data["values"] for vector_data in batch], dtype=np.float32).reshape(-1)
+                    ),
+                    "metadata": [
+                        json.dumps(vector_data["metadata"], ensure_ascii=False) if vector_data.get("metadata") else None
+                        for vector_data in batch
+                    ]
                 }
-                
-                update_stmt = (
-                    update(Chunk)
-                    .where(Chunk.id == chunk_id)
-                    .values(**update_data)
-                )
-                
-                await session.execute(update_stmt)
-                success_count += 1
-                
-                logger.info(
-                    "chunk_updated_successfully",
-                    chunk_id=chunk_id,
-                    embedding_dimension=len(embedding)
+                result = await session.execute(sql, params)
+                success_count += result.rowcount or 0
+            
+            not_found_count = len(vectors) - success_count
+            if not_found_count:
+                logger.warning(
+                    "postgres_vector_upsert_chunks_not_found",
+                    chunks_not_found=not_found_count
                 )
             
+            # ✅ 不在这里 commit，由外部 session 统一管理事务
             logger.info(
-                "postgres_vector_upsert_phase_completed",
+                "postgres_vector_upsert_completed_without_commit",
                 total_vectors=len(vectors),
                 successful_updates=success_count,
-                chunks_not_found=not_found_count,
-                failed_updates=failed_count
-            )
-            
-            # ✅ 不再在这里 commit，由外部 session 统一管理事务
-            logger.info(
-                "postgres_vector_upsert_completed_without_commit",
-                committed_count=success_count
+                chunks_not_found=not_found_count
             )
             
         except Exception as e:
@@ -382,10 +479,13 @@ class PostgreSQLVectorService:
             result = await session.execute(stmt)
             doc_stats = result.all()
             
+            index_report = await self.index_manager.validate_index(session)
+            
             stats = {
                 "total_vector_count": total_vectors or 0,
                 "dimension": self.dimension,
                 "index_type": self.index_type,
+                "index": index_report,
                 "documents": [
                     {
                         "document_id": str(doc_id),
@@ -1,14 +1,49 @@
 """
 QueryExpander服务 - 扩展用户查询以提高检索质量
 """
+import asyncio
+import hashlib
+import json
+import re
 import httpx
 import structlog
-from typing import List, Optional
+from typing import Dict, List, Optional
+from app.core.cache import TTLCache, create_shared_backend
 from app.core.config import get_settings
+from app.core.http_client import get_http_client, LLM
+from app.services.embedding_service import normalize_query
 
 logger = structlog.get_logger()
 settings = get_settings()
 
+_expansion_cache: Optional[TTLCache] = None
+
+# 进程内在途的扩展请求（缓存键 -> 任务）：RAGService 按请求创建，扩展器实例不共享，
+# 放在模块级才能让并发的相同问题共用一次请求；同时持有任务的强引用，预算超时后任务不会被回收
+_pending_expansions: Dict[str, asyncio.Task] = {}
+
+
+def get_query_expansion_cache() -> TTLCache:
+    """
+    获取进程级查询扩展缓存（问题 -> 查询变体）
+    
+    Returns:
+        TTLCache: 缓存实例
+    """
+    global _expansion_cache
+    if _expansion_cache is None:
+        _expansion_cache = TTLCache(
+            name="query_expansion",
+            max_size=settings.QUERY_EXPANSION_CACHE_SIZE,
+            ttl_seconds=settings.QUERY_EXPANSION_CACHE_TTL_SECONDS,
+            backend=create_shared_backend(
+                settings.CACHE_REDIS_URL,
+                prefix="qexp",
+                ttl_seconds=settings.QUERY_EXPANSION_CACHE_TTL_SECONDS
+            )
+        )
+    return _expansion_cache
+
 
 QUERY_EXPANSION_PROMPT = """你是一个专业的查询扩展助手。请根据用户的问题，生成3-5个相关的查询变体，以帮助检索到更相关的文档。
 
@@ -23,18 +58,123 @@ QUERY_EXPANSION_PROMPT = """你是一个专业的查询扩展助手。请根据
 请返回一个JSON数组，例如：["query1", "query2", "query3"]"""
 
 
+def _forget_expansion(key: str, task: asyncio.Task):
+    """扩展任务结束后移出在途表（只移除同一个任务）"""
+    if _pending_expansions.get(key) is task:
+        del _pending_expansions[key]
+
+
 class QueryExpander:
-    """查询扩展器"""
+    """
+    查询扩展器
+    
+    扩展结果按规范化问题缓存；expand_with_budget 在时间预算内等待扩展，
+    超时时先返回原问题，扩展请求在后台完成并写入缓存；
+    相同问题的在途请求在进程内共享（每个请求各自创建的扩展器也不会重复请求）
+    """
     
     def __init__(
         self,
         llm_base_url: str = None,
         llm_api_key: str = None,
-        llm_model: str = "qwen-max"
+        llm_model: str = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[TTLCache] = None
     ):
         self.llm_base_url = llm_base_url or settings.DASHSCOPE_BASE_URL
         self.llm_api_key = llm_api_key or settings.DASHSCOPE_API_KEY
-        self.llm_model = llm_model or settings.LLM_MODEL
+        self.llm_model = llm_model or settings.QUERY_EXPANSION_MODEL or settings.LLM_MODEL
+        self._http_client = http_client
+        self.cache = cache or get_query_expansion_cache()
+    
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """获取 HTTP 客户端（未注入时使用共享连接池）"""
+        return self._http_client or get_http_client(LLM)
+    
+    def cache_key(self, question: str) -> str:
+        """
+        扩展缓存键：模型名 + 规范化问题的 SHA-256
+        
+        Args:
+            question: 用户问题
+            
+        Returns:
+            str: 缓存键
+        """
+        digest = hashlib.sha256(normalize_query(question).encode("utf-8")).hexdigest()
+        return f"{self.llm_model}:{digest}"
+    
+    async def expand_with_budget(
+        self,
+        question: str,
+        budget_seconds: Optional[float] = None,
+        max_variants: Optional[int] = None
+    ) -> List[str]:
+        """
+        在时间预算内扩展查询（检索前置步骤，不能拖慢首字延迟）
+        
+        缓存命中直接返回；未命中时最多等待 budget_seconds，超时返回 [question]，
+        扩展请求继续在后台执行并写入缓存，相同问题下次即可命中
+        
+        Args:
+            question: 用户原始问题
+            budget_seconds: 等待上限（秒，默认 MULTI_QUERY_EXPANSION_BUDGET_SECONDS）
+            max_variants: 含原问题在内的最大查询数（默认 MULTI_QUERY_MAX_VARIANTS）
+            
+        Returns:
+            List[str]: 查询列表，第一项为原问题
+        """
+        budget_seconds = budget_seconds if budget_seconds is not None else settings.MULTI_QUERY_EXPANSION_BUDGET_SECONDS
+        max_variants = max_variants or settings.MULTI_QUERY_MAX_VARIANTS
+        if max_variants <= 1 or not self.llm_api_key:
+            return [question]
+        
+        key = self.cache_key(question)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return self._with_original(question, cached, max_variants)
+        
+        task = _pending_expansions.get(key)
+        if task is None:
+            task = asyncio.create_task(self._expand_and_cache(key, question))
+            _pending_expansions[key] = task
+            task.add_done_callback(lambda done: _forget_expansion(key, done))
+        
+        try:
+            # shield：超时只取消等待，不取消扩展请求本身
+            variants = await asyncio.wait_for(asyncio.shield(task), timeout=budget_seconds)
+        except asyncio.TimeoutError:
+            logger.info("query_expansion_over_budget", budget_seconds=budget_seconds)
+            return [question]
+        
+        return self._with_original(question, variants or [], max_variants)
+    
+    async def _expand_and_cache(self, key: str, question: str) -> Optional[List[str]]:
+        """
+        请求扩展并写入缓存（失败不写缓存，下次重试）
+        
+        Returns:
+            Optional[List[str]]: 查询变体（不含原问题），失败返回 None
+        """
+        variants = await self._request_expansions(question)
+        if variants is not None:
+            await self.cache.set(key, variants)
+        return variants
+    
+    @staticmethod
+    def _with_original(question: str, variants: List[str], max_variants: int) -> List[str]:
+        """原问题放在首位，去重（按规范化文本）并截断"""
+        queries = [question]
+        seen = {normalize_query(question)}
+        for variant in variants:
+            normalized = normalize_query(variant) if isinstance(variant, str) else ""
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                queries.append(variant.strip())
+            if len(queries) >= max_variants:
+                break
+        return queries
     
     async def expand(
         self,
@@ -55,51 +195,63 @@ class QueryExpander:
             logger.warning("LLM API key not set, returning original query")
             return [question]
         
+        variants = await self._request_expansions(question)
+        if variants is None:
+            return [question]
+        # 确保包含原始查询
+        if question not in variants:
+            variants = [question] + variants
+        return variants[:max_expansions]
+    
+    async def _request_expansions(self, question: str) -> Optional[List[str]]:
+        """
+        调用 LLM 生成查询变体
+        
+        Args:
+            question: 用户原始问题
+            
+        Returns:
+            Optional[List[str]]: 查询变体，请求或解析失败返回 None
+        """
         try:
             prompt = QUERY_EXPANSION_PROMPT.format(question=question)
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.llm_base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.llm_api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.llm_model,
-                        "messages": [
-                            {"role": "system", "content": "你是一个专业的查询扩展助手。"},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.3
-                    }
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                
-                content = result["choices"][0]["message"]["content"]
-                
-                # 解析JSON数组
-                import json
-                import re
-                
-                # 尝试提取JSON数组
-                json_match = re.search(r'\[[^\]]+\]', content, re.DOTALL)
-                if json_match:
-                    expansions = json.loads(json_match.group())
-                    # 确保包含原始查询
-                    if question not in expansions:
-                        expansions = [question] + expansions
-                    return expansions[:max_expansions]
-                
-                # 如果解析失败，返回原始查询
-                logger.warning(f"无法解析扩展结果: {content}")
-                return [question]
-                
+            client = self.http_client
+            response = await client.post(
+                f"{self.llm_base_url}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {self.llm_api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.llm_model,
+                    "messages": [
+                        {"role": "system", "content": "你是一个专业的查询扩展助手。"},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "temperature": 0.3
+                },
+                timeout=30.0
+            )
+            
+            response.raise_for_status()
+            result = response.json()
+            
+            content = result["choices"][0]["message"]["content"]
+            
+            # 尝试提取JSON数组
+            json_match = re.search(r'\[[^\]]+\]', content, re.DOTALL)
+            if json_match:
+                expansions = json.loads(json_match.group())
+                return [item for item in expansions if isinstance(item, str) and item.strip()]
+            
+            # 如果解析失败，返回 None
+            logger.warning(f"无法解析扩展结果: {content}")
+            return None
+            
         except Exception as e:
             logger.error(f"查询扩展失败: {e}")
-            return [question]
+            return None
     
     async def expand_multi_way(
         self,
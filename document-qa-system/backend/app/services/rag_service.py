@@ -2,20 +2,43 @@
 RAG（检索增强生成）服务
 负责完整的 RAG 流程：检索→重排序→回答生成
 """
-from typing import List, Dict, Any, Optional, AsyncGenerator
+from typing import List, Dict, Any, Optional, AsyncGenerator, Tuple
 from uuid import UUID
 import structlog
 from app.services.embedding_service import EmbeddingService
 # 使用向量服务适配器替代具体的 PineconeService
 from app.services.vector_service_adapter import VectorServiceAdapter
 from app.services.rerank_service import RerankService
+from app.services.context_packer import ContextPacker, ContextSource
+from app.services.query_expander import QueryExpander
+from app.services.answer_cache import SemanticAnswerCache, get_answer_cache, replay_answer
+from app.services.rerank_policy import RerankDecision, RerankPolicy, SKIP, vector_score
 from app.core.config import get_settings
+from app.core.metrics import RequestTrace
+from app.core.http_client import get_http_client, LLM
+from app.utils.tokenizer import count_tokens, get_tokenizer
+from app.utils.logger import lazy, verbose
 from app.exceptions import RetrievalException, GenerationException
 import httpx
 
 logger = structlog.get_logger()
 settings = get_settings()
 
+# 优化版 - 精简指令
+PROMPT_TEMPLATE = """你是一个专业的文档问答助手。
+
+要求：
+1. 只基于【文档内容】回答，不要编造
+2. 如需引用，格式：[来源X]
+3. 回答简洁，不超过3句话
+4. 不知道的问题明确说明
+
+【文档】{context}
+【历史】{history}
+【问题】{question}
+
+回答："""
+
 
 class RAGService:
     """
@@ -33,7 +56,12 @@ class RAGService:
         self,
         embedding_svc: EmbeddingService,
         vector_svc: VectorServiceAdapter,
-        rerank_svc: RerankService
+        rerank_svc: RerankService,
+        http_client: Optional[httpx.AsyncClient] = None,
+        context_packer: Optional[ContextPacker] = None,
+        query_expander: Optional[QueryExpander] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        rerank_policy: Optional[RerankPolicy] = None
     ):
         """
         初始化 RAG 服务
@@ -42,20 +70,37 @@ class RAGService:
             embedding_svc: 嵌入向量化服务
             vector_svc: 向量数据库服务（通过适配器）
             rerank_svc: 重排序服务
+            http_client: LLM 调用的 HTTP 客户端（可选，默认使用进程级共享连接池）
+            context_packer: 上下文打包器（可选，默认按 PROMPT_INPUT_TOKEN_BUDGET 打包）
+            query_expander: 查询扩展器（可选，开启 MULTI_QUERY_ENABLED 时默认创建）
+            answer_cache: 语义回答缓存（可选，默认使用进程级共享缓存）
+            rerank_policy: 自适应重排序策略（可选，默认按 ADAPTIVE_RERANK_* 配置）
         """
         self.embedding_svc = embedding_svc
         self.vector_svc = vector_svc
         self.rerank_svc = rerank_svc
+        self.context_packer = context_packer or ContextPacker()
+        self.query_expander = query_expander or (QueryExpander() if settings.MULTI_QUERY_ENABLED else None)
+        self.answer_cache = answer_cache or get_answer_cache()
+        self.rerank_policy = rerank_policy or RerankPolicy()
         self.llm_base_url = settings.DASHSCOPE_BASE_URL
         self.llm_api_key = settings.DASHSCOPE_API_KEY
         self.llm_model = settings.LLM_MODEL
+        self._http_client = http_client
+    
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """获取 HTTP 客户端（未注入时使用共享连接池）"""
+        return self._http_client or get_http_client(LLM)
     
     async def query(
         self,
         question: str,
         conversation_history: Optional[List[Dict[str, str]]] = None,
         top_k: int = None,
-        rerank_top_k: int = None
+        rerank_top_k: int = None,
+        trace: Optional[RequestTrace] = None,
+        query_vector: Optional[List[float]] = None
     ) -> AsyncGenerator[str, None]:
         """
         RAG 查询主流程（流式响应）
@@ -65,6 +110,8 @@ class RAGService:
             conversation_history: 对话历史（可选）
             top_k: 初始检索数量
             rerank_top_k: 重排序后保留数量
+            trace: 请求追踪（可选，记录各阶段耗时；为空时内部创建）
+            query_vector: 预先计算的问题向量（可选，调用方与其他 I/O 并发向量化时传入）
             
         Yields:
             str: 流式输出的 token
@@ -75,6 +122,9 @@ class RAGService:
         """
         top_k = top_k or settings.RAG_TOP_K
         rerank_top_k = rerank_top_k or settings.RERANK_TOP_K
+        trace = trace or RequestTrace()
+        # 调用方提前关闭生成器（客户端断开）时保持 cancelled
+        outcome = "cancelled"
         
         # 记录完整请求参数
         logger.info(
@@ -83,40 +133,63 @@ class RAGService:
             question_length=len(question),
             top_k=top_k,
             rerank_top_k=rerank_top_k,
-            history_length=len(conversation_history) if conversation_history else 0
+            history_length=len(conversation_history) if conversation_history else 0,
+            trace_id=trace.trace_id
         )
         
         try:
-            # Step 1: 将问题转换为向量
+            # Step 1: 将问题转换为向量，命中回答缓存时直接回放
             logger.info("step1_embedding_started", question=question[:50])
             
-            query_vector = await self._embed_question(question)
+            if query_vector is None:
+                query_vector = await self.embed_question(question, trace)
+            
+            answer_cache = self.answer_cache if self._is_answer_cacheable(question, conversation_history) else None
+            corpus_version = None
+            if answer_cache is not None:
+                cached = answer_cache.lookup(query_vector)
+                if cached is not None:
+                    logger.info(
+                        "answer_cache_hit",
+                        question=question[:100],
+                        cached_question=cached.question[:100],
+                        similarity=round(cached.similarity, 4),
+                        corpus_version=cached.corpus_version
+                    )
+                    outcome = "cache_hit"
+                    for piece in replay_answer(cached.answer):
+                        yield piece
+                    return
+                corpus_version = answer_cache.corpus_version
+            
+            # 扩展出的查询变体（开启多查询检索时）
+            with trace.span("expand"):
+                queries, query_vectors = await self._embed_queries(question, query_vector)
             
             logger.info(
                 "step1_embedding_completed",
-                vector_dimension=len(query_vector),
-                vector_sample=query_vector[:5] if query_vector else None
+                queries_count=len(queries),
+                vector_dimension=len(query_vectors[0]),
+                vector_sample=verbose(lambda: query_vectors[0][:5] if query_vectors[0] else None)
             )
             
             # Step 2: 语义检索
             logger.info("step2_retrieval_started", top_k=top_k)
             
-            similar_chunks = await self._retrieve_similar_chunks(
-                query_vector, 
-                top_k=top_k
-            )
+            with trace.span("search"):
+                similar_chunks = await self._retrieve_chunks(queries, query_vectors, top_k=top_k)
             
             logger.info(
                 "step2_retrieval_completed",
                 chunks_count=len(similar_chunks),
-                chunks_details=[
+                chunks_details=verbose(lambda: [
                     {
                         "id": chunk.get("id", "unknown"),
                         "score": chunk.get("score", 0),
                         "content_preview": chunk.get("metadata", {}).get("content", "")[:50] if chunk.get("metadata") else ""
                     }
                     for chunk in similar_chunks[:3]
-                ] if similar_chunks else []
+                ])
             )
             
             # 如果没有检索到文档，给出友好提示
@@ -126,6 +199,7 @@ class RAGService:
                     question=question[:100],
                     suggestion="Pinecone索引可能为空或文档未向量化"
                 )
+                outcome = "no_documents"
                 yield "抱歉，我没有找到相关的文档内容来回答您的问题。请先上传一些文档，然后我会基于这些文档为您提供准确的回答。"
                 return
             
@@ -133,23 +207,25 @@ class RAGService:
             logger.info("step3_rerank_started", chunks_count=len(similar_chunks))
             
             try:
-                reranked_chunks = await self._rerank_results(
-                    similar_chunks,
-                    question,
-                    keep_top_k=rerank_top_k
-                )
+                with trace.span("rerank"):
+                    reranked_chunks, rerank_decision = await self._rerank_adaptive(
+                        similar_chunks,
+                        question,
+                        keep_top_k=rerank_top_k
+                    )
                 
                 logger.info(
                     "step3_rerank_completed",
+                    rerank_action=rerank_decision.action,
                     reranked_count=len(reranked_chunks),
-                    rerank_scores=[
+                    rerank_scores=verbose(lambda: [
                         {
                             "index": i,
                             "score": chunk.get("relevance_score", 0),
                             "original_score": chunk.get("score", 0)
                         }
                         for i, chunk in enumerate(reranked_chunks[:5])
-                    ]
+                    ])
                 )
             except Exception as rerank_error:
                 logger.warning(
@@ -158,14 +234,7 @@ class RAGService:
                     error_type=type(rerank_error).__name__
                 )
                 # 重排序失败时，使用原始相似度结果
-                # 将向量相似度 score 复制到 relevance_score 字段
-                reranked_chunks = []
-                for chunk in similar_chunks[:rerank_top_k]:
-                    chunk_copy = chunk.copy()
-                    # 如果没有 relevance_score，使用原始 score
-                    if 'relevance_score' not in chunk_copy:
-                        chunk_copy['relevance_score'] = chunk_copy.get('score', 0)
-                    reranked_chunks.append(chunk_copy)
+                reranked_chunks = self._without_rerank(similar_chunks, rerank_top_k)
             
             # Step 4: 过滤低相关性结果
             logger.info(
@@ -174,10 +243,11 @@ class RAGService:
                 threshold=settings.RELEVANCE_THRESHOLD
             )
             
-            filtered_chunks = [
-                chunk for chunk in reranked_chunks
-                if chunk.get('relevance_score', 0) >= settings.RELEVANCE_THRESHOLD
-            ]
+            with trace.span("filter"):
+                filtered_chunks = [
+                    chunk for chunk in reranked_chunks
+                    if chunk.get('relevance_score', 0) >= settings.RELEVANCE_THRESHOLD
+                ]
             
             logger.info(
                 "step4_filtering_completed",
@@ -193,31 +263,55 @@ class RAGService:
                     threshold=settings.RELEVANCE_THRESHOLD,
                     suggestion="降低RELEVANCE_THRESHOLD或检查文档相关性"
                 )
+                outcome = "filtered_out"
                 yield "抱歉，找到的文档内容与问题相关性较低。请尝试用不同的方式提问，或上传更多相关文档。"
                 return
             
             # Step 5: 构建 Prompt
             logger.info("step5_build_prompt_started", context_chunks=len(filtered_chunks))
             
-            prompt = self._build_prompt(
-                question=question,
-                context=filtered_chunks,
-                history=conversation_history or []
-            )
+            with trace.span("prompt"):
+                prompt, sources = self._build_prompt(
+                    question=question,
+                    context=filtered_chunks,
+                    history=conversation_history or []
+                )
             
             logger.info(
                 "step5_build_prompt_completed",
+                sources_count=len(sources),
                 prompt_length=len(prompt),
-                prompt_preview=prompt[:200] + "..." if len(prompt) > 200 else prompt
+                prompt_tokens=lazy(get_tokenizer().count, prompt),
+                prompt_preview=verbose(lambda: prompt[:200] + "..." if len(prompt) > 200 else prompt)
             )
             
             # Step 6: 流式生成回答
             logger.info("step6_generation_started")
             
+            # first_token 为从请求开始到首个 token 的耗时（用户感知的首字延迟）；
+            # generation 为流式生成的总耗时（包含下游消费 token 的时间）
             token_count = 0
+            answer_parts = []
+            generation_started = trace.elapsed()
             async for token in self._generate_stream(prompt):
+                if token_count == 0:
+                    trace.record("first_token", trace.elapsed())
                 yield token
+                answer_parts.append(token)
                 token_count += 1
+            trace.record("generation", trace.elapsed() - generation_started)
+            outcome = "answered"
+            
+            # 完整生成后才写入回答缓存（生成期间语料版本变化则不写入）；
+            # 记录的是 Prompt 中实际编号引用的来源，而不是过滤后的全部块
+            if answer_cache is not None:
+                answer_cache.store(
+                    query_vector,
+                    question,
+                    "".join(answer_parts),
+                    self._source_chunks(sources),
+                    corpus_version
+                )
             
             logger.info(
                 "step6_generation_completed",
@@ -228,7 +322,7 @@ class RAGService:
                 "rag_query_completed",
                 question=question[:100],
                 total_tokens_generated=token_count,
-                context_chunks_used=len(filtered_chunks)
+                context_chunks_used=sum(len(source.chunk_ids) for source in sources)
             )
             
         except Exception as e:
@@ -237,9 +331,29 @@ class RAGService:
                 error=str(e),
                 error_type=type(e).__name__,
                 question=question[:100],
+                trace_id=trace.trace_id,
                 exc_info=True
             )
+            outcome = "error"
             raise
+        finally:
+            trace.finish(outcome)
+    
+    async def embed_question(self, question: str, trace: Optional[RequestTrace] = None) -> List[float]:
+        """
+        将问题转换为向量（记录 embed 阶段耗时）
+        
+        Args:
+            question: 用户问题
+            trace: 请求追踪（可选）
+            
+        Returns:
+            List[float]: 问题向量
+        """
+        if trace is None:
+            return await self._embed_question(question)
+        with trace.span("embed"):
+            return await self._embed_question(question)
     
     async def _embed_question(self, question: str) -> List[float]:
         """
@@ -251,23 +365,131 @@ class RAGService:
         Returns:
             List[float]: 1536 维向量
         """
-        return await self.embedding_svc.embed_text(question)
+        return await self.embedding_svc.embed_query(question)
+    
+    def _is_answer_cacheable(
+        self,
+        question: str,
+        conversation_history: Optional[List[Dict[str, str]]]
+    ) -> bool:
+        """
+        是否可以使用回答缓存：只缓存不依赖对话历史的提问
+        
+        对话历史末尾可能就是当前问题本身（先保存用户消息再查询），不算作历史
+        
+        Args:
+            question: 用户问题
+            conversation_history: 对话历史
+            
+        Returns:
+            bool: 是否可缓存
+        """
+        if self.answer_cache is None:
+            return False
+        history = list(conversation_history or [])
+        if history and history[-1].get("role") == "user" and history[-1].get("content") == question:
+            history.pop()
+        return not history
+    
+    async def _embed_queries(
+        self,
+        question: str,
+        query_vector: Optional[List[float]] = None
+    ) -> Tuple[List[str], List[List[float]]]:
+        """
+        扩展问题并向量化全部查询
+        
+        开启多查询检索时先在时间预算内扩展问题，查询变体一次批量向量化；
+        未开启或扩展未返回变体时只向量化原问题
+        
+        Args:
+            question: 用户问题
+            query_vector: 原问题的向量（已计算时传入，避免重复向量化）
+            
+        Returns:
+            Tuple[List[str], List[List[float]]]: (查询列表，首项为原问题；对应的查询向量)
+        """
+        if query_vector is None:
+            query_vector = await self._embed_question(question)
+        if self.query_expander is None or not settings.MULTI_QUERY_ENABLED:
+            return [question], [query_vector]
+        
+        queries = await self.query_expander.expand_with_budget(question)
+        if len(queries) <= 1:
+            return [question], [query_vector]
+        
+        return queries, [query_vector] + await self.embedding_svc.embed_queries(queries[1:])
+    
+    async def _retrieve_chunks(
+        self,
+        queries: List[str],
+        query_vectors: List[List[float]],
+        top_k: int
+    ) -> List[Dict[str, Any]]:
+        """
+        按查询列表检索文档块
+        
+        多个查询时批量检索并与全文检索（开启混合检索时，使用原问题）一起按 RRF 融合，
+        单个查询时走普通检索
+        
+        Args:
+            queries: 查询列表（首项为原问题）
+            query_vectors: 对应的查询向量
+            top_k: 返回数量
+            
+        Returns:
+            List[Dict[str, Any]]: 相似块列表
+        """
+        if len(queries) <= 1:
+            return await self._retrieve_similar_chunks(query_vectors[0], top_k=top_k, question=queries[0])
+        
+        return await self.vector_svc.multi_query_search(
+            query_texts=queries,
+            query_vectors=query_vectors,
+            top_k=top_k,
+            lexical_query=queries[0] if settings.HYBRID_SEARCH_ENABLED else None
+        )
+    
+    async def _retrieve(self, question: str, top_k: int) -> List[Dict[str, Any]]:
+        """
+        检索问题相关的文档块（向量化 + 检索，评估脚本与在线流程共用）
+        
+        Args:
+            question: 用户问题
+            top_k: 返回数量
+            
+        Returns:
+            List[Dict[str, Any]]: 相似块列表
+        """
+        queries, query_vectors = await self._embed_queries(question)
+        return await self._retrieve_chunks(queries, query_vectors, top_k=top_k)
     
     async def _retrieve_similar_chunks(
         self,
         query_vector: List[float],
-        top_k: int
+        top_k: int,
+        question: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         检索相似文档块
         
+        开启混合检索且提供问题原文时，向量检索与全文检索并发执行并以 RRF 融合
+        
         Args:
             query_vector: 查询向量
             top_k: 返回数量
+            question: 用户问题原文（全文检索用）
             
         Returns:
             List[Dict[str, Any]]: 相似块列表
         """
+        if settings.HYBRID_SEARCH_ENABLED and question:
+            return await self.vector_svc.hybrid_search(
+                query_text=question,
+                query_vector=query_vector,
+                top_k=top_k
+            )
+        
         matches = await self.vector_svc.similarity_search(
             query_vector=query_vector,
             top_k=top_k,
@@ -293,79 +515,141 @@ class RAGService:
         Returns:
             List[Dict[str, Any]]: 重排序后的结果
         """
-        # 提取文本内容
-        documents = [
-            chunk['metadata'].get('content', '')
-            for chunk in chunks
-            if 'metadata' in chunk
-        ]
+        # 提取文本内容（只重排序带内容的块，positions 记录其在 chunks 中的位置）
+        positions = [i for i, chunk in enumerate(chunks) if chunk.get('metadata')]
+        documents = [chunks[i]['metadata'].get('content', '') for i in positions]
         
-        # 调用重排序 API
-        reranked = await self.rerank_svc.rerank(
+        # 调用重排序 API（已缓存分数的候选不再发送）
+        reranked = await self.rerank_svc.rerank_cached(
             query=query,
             documents=documents,
+            document_ids=[str(chunks[i].get('id', '')) for i in positions],
             top_k=keep_top_k
         )
         
         # 将分数附加回原始块
         results = []
         for item in reranked:
-            original_idx = item['index']
-            if original_idx < len(chunks):
-                chunk_copy = chunks[original_idx].copy()
+            if item['index'] < len(positions):
+                chunk_copy = chunks[positions[item['index']]].copy()
                 chunk_copy['relevance_score'] = item['relevance_score']
                 results.append(chunk_copy)
         
         return results
     
+    async def _rerank_adaptive(
+        self,
+        chunks: List[Dict[str, Any]],
+        query: str,
+        keep_top_k: int
+    ) -> Tuple[List[Dict[str, Any]], RerankDecision]:
+        """
+        按自适应策略重排序：向量分数已足够明确时跳过，或只重排接近第一名的候选
+        
+        Args:
+            chunks: 初始检索结果
+            query: 用户问题
+            keep_top_k: 保留数量
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], RerankDecision]: (重排序后的结果, 决策)
+        """
+        decision = self.rerank_policy.decide(chunks, keep_top_k)
+        logger.info("rerank_decision", **decision.to_log())
+        
+        if decision.action == SKIP:
+            return self._without_rerank(chunks, keep_top_k), decision
+        
+        candidates = [chunks[i] for i in decision.candidates]
+        return await self._rerank_results(candidates, query, keep_top_k), decision
+    
+    @staticmethod
+    def _without_rerank(chunks: List[Dict[str, Any]], keep_top_k: int) -> List[Dict[str, Any]]:
+        """
+        不经重排序直接取前 keep_top_k 个结果，以向量相似度作为 relevance_score
+        
+        只由全文检索召回的结果没有向量相似度，其 score 是 ts_rank，与 RELEVANCE_THRESHOLD 不可比较；
+        这些结果已通过融合排序进入前 keep_top_k，相关性按阈值计（不被阈值过滤，排在阈值以上的向量结果之后）
+        
+        Args:
+            chunks: 检索结果（按检索排序）
+            keep_top_k: 保留数量
+            
+        Returns:
+            List[Dict[str, Any]]: 结果副本
+        """
+        results = []
+        for chunk in chunks[:keep_top_k]:
+            chunk_copy = chunk.copy()
+            # 如果没有 relevance_score，使用向量相似度
+            if 'relevance_score' not in chunk_copy:
+                score = vector_score(chunk_copy)
+                chunk_copy['relevance_score'] = score if score is not None else settings.RELEVANCE_THRESHOLD
+            results.append(chunk_copy)
+        return results
+    
     def _build_prompt(
         self,
         question: str,
         context: List[Dict[str, Any]],
         history: List[Dict[str, str]]
-    ) -> str:
+    ) -> Tuple[str, List[ContextSource]]:
         """
         构建 LLM Prompt
         
+        文档块和历史按 PROMPT_INPUT_TOKEN_BUDGET 打包：按相关性装入，
+        合并同一文档的相邻块，放不下时裁剪为最相关的句子
+        
         Args:
             question: 用户问题
             context: 相关文档块
             history: 对话历史
             
         Returns:
-            str: 完整的 Prompt
+            Tuple[str, List[ContextSource]]: (完整的 Prompt, 按 [来源 N] 编号顺序排列的来源)
         """
+        # 模板和问题固定占用的 token（模板计数有缓存）
+        reserved_tokens = count_tokens(PROMPT_TEMPLATE) + count_tokens(question)
+        packed = self.context_packer.pack(question, context, history, reserved_tokens=reserved_tokens)
+        
         # 格式化上下文
         context_text = "\n\n".join([
-            f"[来源 {i+1}]\n{chunk['metadata'].get('content', '无内容')}"
-            for i, chunk in enumerate(context)
+            f"[来源 {i+1}]\n{source.content}"
+            for i, source in enumerate(packed.sources)
         ])
         
         # 格式化历史
         history_text = ""
-        if history:
+        if packed.history:
             history_parts = []
-            for msg in history[-5:]:  # 只保留最近 5 轮
+            for msg in packed.history:
                 role = "用户" if msg.get('role') == 'user' else "助手"
                 history_parts.append(f"{role}: {msg.get('content', '')}")
             history_text = "\n".join(history_parts) + "\n\n"
         
-        # 构建系统指令 (优化版 - 精简指令)
-        system_prompt = f"""你是一个专业的文档问答助手。
-
-要求：
-1. 只基于【文档内容】回答，不要编造
-2. 如需引用，格式：[来源X]
-3. 回答简洁，不超过3句话
-4. 不知道的问题明确说明
-
-【文档】{context_text}
-【历史】{history_text}
-【问题】{question}
-
-回答："""
+        prompt = PROMPT_TEMPLATE.format(
+            context=context_text,
+            history=history_text,
+            question=question
+        )
+        return prompt, packed.sources
+    
+    @staticmethod
+    def _source_chunks(sources: List[ContextSource]) -> List[Dict[str, Any]]:
+        """
+        把 Prompt 中的来源展开为块引用（按 [来源 N] 编号顺序，合并的来源展开为多个块）
         
-        return system_prompt
+        Args:
+            sources: 打包后的来源
+            
+        Returns:
+            List[Dict[str, Any]]: 含 id 和 metadata.document_id 的块引用
+        """
+        return [
+            {"id": chunk_id, "metadata": {"document_id": source.document_id}}
+            for source in sources
+            for chunk_id in source.chunk_ids
+        ]
     
     async def _generate_stream(self, prompt: str) -> AsyncGenerator[str, None]:
         """
@@ -378,8 +662,9 @@ class RAGService:
             str: 流式输出的 token
         """
         try:
-            async with httpx.AsyncClient(timeout=settings.LLM_TIMEOUT_SECONDS) as client:
-                response = await client.post(
+            # 使用共享连接池并以流式方式读取响应，首个 token 到达即可输出
+            async with self.http_client.stream(
+                    "POST",
                     f"{self.llm_base_url}/chat/completions",
                     headers={
                         "Authorization": f"Bearer {self.llm_api_key}",
@@ -392,8 +677,7 @@ class RAGService:
                         "max_tokens": 200,  # 限制生成token数量
                         "temperature": 0.3  # 降低随机性
                     }
-                )
-                
+            ) as response:
                 response.raise_for_status()
                 
                 # 处理 SSE 流
@@ -0,0 +1,136 @@
+"""
+自适应重排序策略
+根据向量相似度分布判断是否需要远程重排序：
+第一名明显领先时跳过重排序，只有少数候选接近第一名时只重排这些候选
+"""
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+from app.core.config import get_settings
+
+settings = get_settings()
+
+SKIP = "skip"
+SHRINK = "shrink"
+FULL = "full"
+
+
+def vector_score(chunk: Dict[str, Any]) -> Optional[float]:
+    """
+    取候选的向量相似度
+
+    混合/多查询检索中来自向量检索的结果带 vector_score，
+    只由全文检索召回的结果没有（其 score 为全文检索分数，不可比较）
+
+    Args:
+        chunk: 检索结果
+
+    Returns:
+        Optional[float]: 向量相似度，未知时返回 None
+    """
+    if "vector_score" in chunk:
+        return chunk["vector_score"]
+    if "rrf_score" in chunk:
+        return None
+    return chunk.get("score")
+
+
+@dataclass
+class RerankDecision:
+    """
+    重排序决策
+
+    Attributes:
+        action: skip（不重排序）/ shrink（只重排部分候选）/ full（全部重排序）
+        candidates: 送入重排序的候选位置（skip 时为空）
+        reason: 决策原因
+        top_score: 第一名的向量相似度
+        gap: 第一名与第二名的差距
+        candidates_total: 候选总数
+    """
+    action: str
+    candidates: List[int]
+    reason: str
+    top_score: Optional[float] = None
+    gap: Optional[float] = None
+    candidates_total: int = 0
+
+    def to_log(self) -> Dict[str, Any]:
+        """日志字段（候选位置只记录数量）"""
+        fields = asdict(self)
+        fields["candidates"] = len(self.candidates)
+        return fields
+
+
+class RerankPolicy:
+    """
+    自适应重排序策略
+
+    - skip：第一名相似度 >= skip_min_score 且领先第二名 >= skip_min_gap，
+      向量排序已足够可靠，直接取前 keep_top_k
+    - shrink：与第一名相差超过 shrink_window 的候选不太可能被重排序提到前面，
+      只重排窗口内的候选（至少 keep_top_k 个；没有向量分数的全文检索候选始终保留）
+    - full：其余情况全部重排序
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        skip_min_score: Optional[float] = None,
+        skip_min_gap: Optional[float] = None,
+        shrink_window: Optional[float] = None
+    ):
+        """
+        初始化策略
+
+        Args:
+            enabled: 是否启用（默认 ADAPTIVE_RERANK_ENABLED，关闭时总是 full）
+            skip_min_score: 跳过所需的第一名最低相似度（默认 ADAPTIVE_RERANK_SKIP_MIN_SCORE）
+            skip_min_gap: 跳过所需的第一名领先幅度（默认 ADAPTIVE_RERANK_SKIP_MIN_GAP）
+            shrink_window: 保留与第一名相差不超过该值的候选（默认 ADAPTIVE_RERANK_SHRINK_WINDOW，0 表示不收缩）
+        """
+        self.enabled = settings.ADAPTIVE_RERANK_ENABLED if enabled is None else enabled
+        self.skip_min_score = settings.ADAPTIVE_RERANK_SKIP_MIN_SCORE if skip_min_score is None else skip_min_score
+        self.skip_min_gap = settings.ADAPTIVE_RERANK_SKIP_MIN_GAP if skip_min_gap is None else skip_min_gap
+        self.shrink_window = settings.ADAPTIVE_RERANK_SHRINK_WINDOW if shrink_window is None else shrink_window
+
+    def decide(self, chunks: List[Dict[str, Any]], keep_top_k: int) -> RerankDecision:
+        """
+        根据候选的向量相似度做出决策
+
+        Args:
+            chunks: 检索结果（按检索排序）
+            keep_top_k: 重排序后保留数量
+
+        Returns:
+            RerankDecision: 决策
+        """
+        total = len(chunks)
+        everything = list(range(total))
+        if not self.enabled:
+            return RerankDecision(FULL, everything, "disabled", candidates_total=total)
+
+        scored = sorted(
+            ((score, i) for i, score in ((i, vector_score(chunk)) for i, chunk in enumerate(chunks)) if score is not None),
+            reverse=True
+        )
+        if len(scored) < 2 or total <= 1:
+            return RerankDecision(FULL, everything, "too_few_scores", candidates_total=total)
+
+        top_score = scored[0][0]
+        gap = top_score - scored[1][0]
+
+        if top_score >= self.skip_min_score and gap >= self.skip_min_gap:
+            return RerankDecision(SKIP, [], "decisive_winner", top_score, gap, total)
+
+        if self.shrink_window > 0 and total > keep_top_k:
+            far = {i for score, i in scored if top_score - score > self.shrink_window}
+            # 至少保留 keep_top_k 个候选：按相似度从高到低把被排除的候选补回来
+            for _, i in scored:
+                if total - len(far) >= keep_top_k:
+                    break
+                far.discard(i)
+            if far:
+                candidates = [i for i in everything if i not in far]
+                return RerankDecision(SHRINK, candidates, "clear_cutoff", top_score, gap, total)
+
+        return RerankDecision(FULL, everything, "close_scores", top_score, gap, total)
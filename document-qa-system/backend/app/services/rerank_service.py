@@ -2,15 +2,48 @@
 重排序服务
 调用阿里云百炼 qwen3-rerank API 对检索结果进行重排序
 """
+import asyncio
+import hashlib
 import httpx
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import structlog
+from app.core.cache import TTLCache, create_shared_backend
 from app.core.config import get_settings
+from app.core.http_client import get_http_client, RERANK
+from app.services.embedding_service import normalize_query
+from app.services.embedding_store import content_hash
 from app.exceptions import RetrievalException
+from app.utils.logger import lazy
 
 logger = structlog.get_logger()
 settings = get_settings()
 
+_rerank_score_cache: Optional[TTLCache] = None
+
+
+def get_rerank_score_cache() -> Optional[TTLCache]:
+    """
+    获取进程级重排序分数缓存（未启用时返回 None）
+    
+    Returns:
+        Optional[TTLCache]: 缓存实例
+    """
+    global _rerank_score_cache
+    if not settings.RERANK_CACHE_ENABLED:
+        return None
+    if _rerank_score_cache is None:
+        _rerank_score_cache = TTLCache(
+            name="rerank_score",
+            max_size=settings.RERANK_CACHE_SIZE,
+            ttl_seconds=settings.RERANK_CACHE_TTL_SECONDS,
+            backend=create_shared_backend(
+                settings.CACHE_REDIS_URL,
+                prefix="rrk",
+                ttl_seconds=settings.RERANK_CACHE_TTL_SECONDS
+            )
+        )
+    return _rerank_score_cache
+
 
 class RerankService:
     """
@@ -20,10 +53,110 @@ class RerankService:
     对初始检索结果进行相关性重排序
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        score_cache: Optional[TTLCache] = None
+    ):
+        """
+        初始化重排序服务
+        
+        Args:
+            http_client: HTTP 客户端（可选，默认使用进程级共享连接池）
+            score_cache: 重排序分数缓存（可选，默认使用进程级共享缓存）
+        """
         self.api_key = settings.DASHSCOPE_API_KEY
         self.base_url = "https://dashscope.aliyuncs.com/compatible-api/v1"
         self.model = "qwen3-rerank"
+        self._http_client = http_client
+        self.score_cache = score_cache or get_rerank_score_cache()
+    
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """获取 HTTP 客户端（未注入时使用共享连接池）"""
+        return self._http_client or get_http_client(RERANK)
+    
+    def score_cache_key(self, query: str, document_id: str, document: str) -> str:
+        """
+        分数缓存键：模型名 + 规范化问题的 SHA-256 + 块 ID + 块内容的 SHA-256
+        
+        块内容变化（重新处理）后哈希不同，旧分数自然不再命中
+        
+        Args:
+            query: 用户问题
+            document_id: 块 ID
+            document: 块内容
+            
+        Returns:
+            str: 缓存键
+        """
+        query_digest = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+        return f"{self.model}:{query_digest}:{document_id}:{content_hash(document)}"
+    
+    async def rerank_cached(
+        self,
+        query: str,
+        documents: List[str],
+        document_ids: List[str],
+        top_k: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        带分数缓存的重排序
+        
+        重排序模型对每个 (问题, 文档) 独立打分，分数可以跨请求复用：
+        已缓存的候选直接取分数，只把未缓存的候选发给 API（请求全部分数），
+        合并后按分数取前 top_k；全部命中时不调用 API
+        
+        Args:
+            query: 用户问题
+            documents: 候选文档列表
+            document_ids: 候选块 ID（与 documents 对齐）
+            top_k: 返回前 K 个最相关结果
+            
+        Returns:
+            List[Dict[str, Any]]: 与 rerank 相同格式的结果（index 指向 documents）
+            
+        Raises:
+            RetrievalException: API 调用失败时抛出
+        """
+        if self.score_cache is None:
+            return await self.rerank(query=query, documents=documents, top_k=top_k)
+        if not documents:
+            return []
+        
+        keys = [
+            self.score_cache_key(query, str(document_id), document)
+            for document_id, document in zip(document_ids, documents)
+        ]
+        scores: List[Optional[float]] = list(await asyncio.gather(*[self.score_cache.get(key) for key in keys]))
+        misses = [i for i, score in enumerate(scores) if score is None]
+        
+        if misses:
+            reranked = await self.rerank(
+                query=query,
+                documents=[documents[i] for i in misses],
+                top_k=len(misses)
+            )
+            for item in reranked:
+                index = misses[item['index']]
+                scores[index] = item['relevance_score']
+                await self.score_cache.set(keys[index], item['relevance_score'])
+        
+        logger.info(
+            "rerank_cache_lookup",
+            candidates=len(documents),
+            cache_hits=len(documents) - len(misses),
+            reranked=len(misses),
+            payload_chars=lazy(lambda: sum(len(documents[i]) for i in misses))
+        )
+        
+        results = [
+            {'index': index, 'relevance_score': score}
+            for index, score in enumerate(scores)
+            if score is not None
+        ]
+        results.sort(key=lambda item: item['relevance_score'], reverse=True)
+        return results[:top_k]
     
     async def rerank(
         self, 
@@ -49,41 +182,40 @@ class RerankService:
             return []
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/reranks",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "query": query,
-                        "documents": documents,
-                        "top_n": top_k
-                    },
-                    timeout=30.0
-                )
-                
-                if response.status_code != 200:
-                    raise RetrievalException(f"Rerank API 返回错误：{response.status_code} - {response.text}")
-                
-                data = response.json()
-                
-                results = data.get('results', [])
-                
-                if not results:
-                    logger.warning("rerank_returned_empty_results", query=query[:30])
-                    return []
-                
-                reranked_results = []
-                for item in results:
-                    reranked_results.append({
-                        'index': item['index'],
-                        'relevance_score': item['relevance_score']
-                    })
-                
-                return reranked_results
+            client = self.http_client
+            response = await client.post(
+                f"{self.base_url}/reranks",
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.model,
+                    "query": query,
+                    "documents": documents,
+                    "top_n": top_k
+                }
+            )
+            
+            if response.status_code != 200:
+                raise RetrievalException(f"Rerank API 返回错误：{response.status_code} - {response.text}")
+            
+            data = response.json()
+            
+            results = data.get('results', [])
+            
+            if not results:
+                logger.warning("rerank_returned_empty_results", query=query[:30])
+                return []
+            
+            reranked_results = []
+            for item in results:
+                reranked_results.append({
+                    'index': item['index'],
+                    'relevance_score': item['relevance_score']
+                })
+            
+            return reranked_results
 
         except httpx.RequestError as e:
             raise RetrievalException(f"Rerank API 请求失败：{str(e)}")
@@ -0,0 +1,308 @@
+"""
+向量索引管理服务
+负责 chunks.embedding 列上 pgvector ANN 索引（HNSW / IVFFlat）的生命周期管理
+"""
+
+from typing import Dict, Any, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+from app.core.config import get_settings
+import structlog
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+SUPPORTED_INDEX_TYPES = ("hnsw", "ivfflat")
+
+
+class VectorIndexManager:
+    """
+    pgvector 索引管理器
+
+    功能:
+    - 根据配置生成并创建 HNSW / IVFFlat 索引
+    - 校验索引是否存在、是否有效、参数是否与配置一致
+    - 在线（CONCURRENTLY）重建索引，不阻塞读写
+    - 汇报索引大小与使用情况
+    - 为单次查询设置 hnsw.ef_search / ivfflat.probes
+
+    索引使用 vector_cosine_ops，与检索 SQL 中的 <=> 运算符保持一致
+    """
+
+    def __init__(
+        self,
+        table_name: str = "chunks",
+        column_name: str = "embedding",
+        index_type: Optional[str] = None
+    ):
+        """
+        初始化索引管理器
+
+        Args:
+            table_name: 向量所在表名
+            column_name: 向量列名
+            index_type: 索引类型（hnsw 或 ivfflat），默认读取配置
+        """
+        self.table_name = table_name
+        self.column_name = column_name
+        self.index_type = (index_type or settings.VECTOR_INDEX_TYPE).lower()
+        if self.index_type not in SUPPORTED_INDEX_TYPES:
+            raise ValueError(
+                f"不支持的向量索引类型：{self.index_type}，仅支持 {SUPPORTED_INDEX_TYPES}"
+            )
+        self.index_name = f"idx_{table_name}_{column_name}_{self.index_type}"
+
+    def expected_options(self) -> Dict[str, int]:
+        """
+        根据配置返回期望的索引参数
+
+        Returns:
+            Dict[str, int]: 索引构建参数
+        """
+        if self.index_type == "hnsw":
+            return {
+                "m": settings.HNSW_M,
+                "ef_construction": settings.HNSW_EF_CONSTRUCTION
+            }
+        return {"lists": settings.IVFFLAT_LISTS}
+
+    def build_create_sql(self, index_name: Optional[str] = None, concurrently: bool = False) -> str:
+        """
+        生成创建索引的 DDL
+
+        Args:
+            index_name: 索引名（默认使用 self.index_name）
+            concurrently: 是否使用 CREATE INDEX CONCURRENTLY
+
+        Returns:
+            str: CREATE INDEX 语句
+        """
+        options = ", ".join(f"{key} = {value}" for key, value in self.expected_options().items())
+        return (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS "
+            f"{index_name or self.index_name} ON {self.table_name} "
+            f"USING {self.index_type} ({self.column_name} vector_cosine_ops) "
+            f"WITH ({options})"
+        )
+
+    def search_params(self, search_effort: Optional[int] = None, top_k: int = 10) -> Dict[str, str]:
+        """
+        计算单次查询的 pgvector 会话参数
+
+        Args:
+            search_effort: 检索宽度（hnsw 对应 ef_search，ivfflat 对应 probes），None 使用配置默认值
+            top_k: 本次查询返回数量（HNSW 的 ef_search 不能小于 top_k，否则结果不足）
+
+        Returns:
+            Dict[str, str]: GUC 名称 -> 值
+        """
+        if self.index_type == "hnsw":
+            ef_search = max(search_effort or settings.HNSW_EF_SEARCH, top_k)
+            return {"hnsw.ef_search": str(min(ef_search, 1000))}
+
+        probes = max(search_effort or settings.IVFFLAT_PROBES, 1)
+        return {"ivfflat.probes": str(min(probes, settings.IVFFLAT_LISTS))}
+
+    async def apply_search_params(
+        self,
+        session: AsyncSession,
+        search_effort: Optional[int] = None,
+        top_k: int = 10
+    ):
+        """
+        在当前事务内设置检索参数（set_config 第三个参数为 true，等价于 SET LOCAL）
+
+        Args:
+            session: 数据库会话
+            search_effort: 检索宽度
+            top_k: 本次查询返回数量
+        """
+        for name, value in self.search_params(search_effort, top_k).items():
+            await session.execute(
+                text("SELECT set_config(:name, :value, true)"),
+                {"name": name, "value": value}
+            )
+
+    async def _fetch_index_info(self, conn, index_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        从系统目录查询索引信息
+
+        Args:
+            conn: 数据库连接或会话
+            index_name: 索引名
+
+        Returns:
+            Optional[Dict[str, Any]]: 索引信息，不存在返回 None
+        """
+        result = await conn.execute(
+            text("""
+                SELECT c.relname AS index_name,
+                       am.amname AS index_type,
+                       i.indisvalid AS is_valid,
+                       i.indisready AS is_ready,
+                       c.reloptions AS reloptions,
+                       pg_relation_size(c.oid) AS size_bytes,
+                       COALESCE(s.idx_scan, 0) AS idx_scan
+                FROM pg_class c
+                JOIN pg_index i ON i.indexrelid = c.oid
+                JOIN pg_am am ON am.oid = c.relam
+                LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = c.oid
+                WHERE c.relname = :index_name
+            """),
+            {"index_name": index_name or self.index_name}
+        )
+        row = result.mappings().first()
+        if row is None:
+            return None
+
+        options = {}
+        for option in row["reloptions"] or []:
+            key, _, value = option.partition("=")
+            options[key] = int(value) if value.isdigit() else value
+
+        return {
+            "index_name": row["index_name"],
+            "index_type": row["index_type"],
+            "is_valid": bool(row["is_valid"]),
+            "is_ready": bool(row["is_ready"]),
+            "options": options,
+            "size_bytes": int(row["size_bytes"] or 0),
+            "idx_scan": int(row["idx_scan"] or 0)
+        }
+
+    async def validate_index(self, conn) -> Dict[str, Any]:
+        """
+        校验索引状态
+
+        Args:
+            conn: 数据库连接或会话
+
+        Returns:
+            Dict[str, Any]: 校验结果，issues 为空表示索引健康且与配置一致
+        """
+        info = await self._fetch_index_info(conn)
+        issues = []
+
+        if info is None:
+            issues.append("missing")
+        else:
+            if not info["is_valid"]:
+                # CREATE INDEX CONCURRENTLY 中途失败会留下 INVALID 索引
+                issues.append("invalid")
+            if info["index_type"] != self.index_type:
+                issues.append("type_mismatch")
+            for key, value in self.expected_options().items():
+                if info["options"].get(key) != value:
+                    issues.append(f"option_mismatch:{key}")
+
+        return {
+            "index_name": self.index_name,
+            "exists": info is not None,
+            "healthy": not issues,
+            "issues": issues,
+            "expected_options": self.expected_options(),
+            "actual": info
+        }
+
+    async def ensure_index(self, conn) -> Dict[str, Any]:
+        """
+        确保索引存在（启动时调用）
+
+        缺失时直接创建；已存在但参数不一致时只记录告警，
+        由 rebuild_index_concurrently 在运维窗口内在线重建
+
+        Args:
+            conn: 处于事务中的数据库连接
+
+        Returns:
+            Dict[str, Any]: 校验结果
+        """
+        report = await self.validate_index(conn)
+
+        if not report["exists"]:
+            logger.info(
+                "vector_index_creating",
+                index_name=self.index_name,
+                index_type=self.index_type,
+                options=self.expected_options()
+            )
+            await conn.execute(text(self.build_create_sql()))
+            report = await self.validate_index(conn)
+            logger.info("vector_index_created", index_name=self.index_name)
+        elif not report["healthy"]:
+            logger.warning(
+                "vector_index_needs_rebuild",
+                index_name=self.index_name,
+                issues=report["issues"],
+                suggestion="运行 scripts/manage_vector_index.py rebuild 在线重建"
+            )
+
+        return report
+
+    async def rebuild_index_concurrently(self, engine: Optional[AsyncEngine] = None) -> Dict[str, Any]:
+        """
+        在线重建索引
+
+        流程：CONCURRENTLY 创建临时索引 → 删除旧索引 → 重命名临时索引。
+        CONCURRENTLY 不能在事务中执行，因此使用 AUTOCOMMIT 连接
+
+        Args:
+            engine: 数据库引擎（默认使用应用引擎）
+
+        Returns:
+            Dict[str, Any]: 重建后的校验结果
+        """
+        if engine is None:
+            from app.core.database import engine
+
+        tmp_name = f"{self.index_name}_rebuild"
+
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+            logger.info(
+                "vector_index_rebuild_started",
+                index_name=self.index_name,
+                options=self.expected_options()
+            )
+
+            # 清理上次失败遗留的临时索引
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {tmp_name}"))
+            await conn.execute(text(self.build_create_sql(index_name=tmp_name, concurrently=True)))
+
+            tmp_info = await self._fetch_index_info(conn, tmp_name)
+            if not tmp_info or not tmp_info["is_valid"]:
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {tmp_name}"))
+                raise RuntimeError(f"向量索引重建失败：{tmp_name} 无效")
+
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {self.index_name}"))
+            await conn.execute(text(f"ALTER INDEX {tmp_name} RENAME TO {self.index_name}"))
+
+            report = await self.validate_index(conn)
+
+        logger.info(
+            "vector_index_rebuild_completed",
+            index_name=self.index_name,
+            healthy=report["healthy"]
+        )
+        return report
+
+    async def get_index_report(self, conn) -> Dict[str, Any]:
+        """
+        汇报索引状态（大小、扫描次数、参数、向量行数）
+
+        Args:
+            conn: 数据库连接或会话
+
+        Returns:
+            Dict[str, Any]: 索引报告
+        """
+        report = await self.validate_index(conn)
+
+        result = await conn.execute(
+            text(f"SELECT count(*) FROM {self.table_name} WHERE {self.column_name} IS NOT NULL")
+        )
+        report["vector_rows"] = int(result.scalar() or 0)
+        report["search_params"] = self.search_params()
+
+        return report
@@ -4,6 +4,7 @@
 """
 
 from typing import List, Dict, Any, Optional
+import asyncio
 from abc import ABC, abstractmethod
 import structlog
 from app.exceptions import RetrievalException
@@ -15,6 +16,49 @@ class PostgreSQLVectorService:  # 类型提示用
 logger = structlog.get_logger()
 
 
+def reciprocal_rank_fusion(
+    result_lists: List[List[Dict[str, Any]]],
+    k: int = 60,
+    top_k: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    RRF（Reciprocal Rank Fusion）融合多路检索结果
+    
+    每个结果的融合分数为 sum(1 / (k + rank))，rank 从 1 开始。
+    同一块在多路中出现时保留第一路的结果字典（原始 score 不变），
+    并写入 rrf_score 字段
+    
+    Args:
+        result_lists: 多路检索结果，每路按相关性降序
+        k: 平滑常数
+        top_k: 返回数量（None 返回全部）
+        
+    Returns:
+        List[Dict[str, Any]]: 按 rrf_score 降序的融合结果
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+    
+    for results in result_lists:
+        for rank, match in enumerate(results, start=1):
+            match_id = match["id"]
+            if match_id not in fused:
+                fused[match_id] = match.copy()
+                scores[match_id] = 0.0
+            scores[match_id] += 1.0 / (k + rank)
+    
+    ranked_ids = sorted(scores, key=lambda match_id: scores[match_id], reverse=True)
+    if top_k is not None:
+        ranked_ids = ranked_ids[:top_k]
+    
+    merged = []
+    for match_id in ranked_ids:
+        match = fused[match_id]
+        match["rrf_score"] = scores[match_id]
+        merged.append(match)
+    return merged
+
+
 class VectorServiceInterface(ABC):
     """向量服务接口定义"""
     
@@ -24,11 +68,24 @@ class VectorServiceInterface(ABC):
         query_vector: List[float],
         top_k: int = 10,
         filter_dict: Optional[Dict[str, Any]] = None,
-        include_metadata: bool = True
+        include_metadata: bool = True,
+        search_effort: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """相似度搜索接口"""
         pass
     
+    @abstractmethod
+    async def batch_similarity_search(
+        self,
+        query_vectors: List[List[float]],
+        top_k: int = 10,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+        search_effort: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """批量相似度搜索接口"""
+        pass
+    
     @abstractmethod
     async def upsert_vectors(
         self,
@@ -80,7 +137,8 @@ class VectorServiceAdapter(VectorServiceInterface):
         query_vector: List[float],
         top_k: int = 10,
         filter_dict: Optional[Dict[str, Any]] = None,
-        include_metadata: bool = True
+        include_metadata: bool = True,
+        search_effort: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """相似度搜索 - 适配不同实现的接口差异"""
         try:
@@ -104,7 +162,8 @@ class VectorServiceAdapter(VectorServiceInterface):
                         query_vector=query_vector,
                         top_k=top_k,
                         filter_dict=filter_dict,
-                        include_metadata=include_metadata
+                        include_metadata=include_metadata,
+                        search_effort=search_effort
                     )
             else:
                 # Pinecone 实现
@@ -132,6 +191,244 @@ class VectorServiceAdapter(VectorServiceInterface):
             )
             raise RetrievalException(f"向量搜索失败[{self.service_type}]：{str(e)}")
     
+    async def batch_similarity_search(
+        self,
+        query_vectors: List[List[float]],
+        top_k: int = 10,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+        search_effort: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """批量相似度搜索 - PostgreSQL 单条 SQL 完成，其他实现并发逐条检索"""
+        try:
+            logger.info(
+                "vector_batch_search_started",
+                service_type=self.service_type,
+                queries_count=len(query_vectors),
+                top_k=top_k,
+                filter=filter_dict
+            )
+            
+            if type(self.service_impl).__name__ == 'PostgreSQLVectorService':
+                from app.core.database import AsyncSessionLocal
+                async with AsyncSessionLocal() as session:
+                    result = await self.service_impl.batch_similarity_search(
+                        session=session,
+                        query_vectors=query_vectors,
+                        top_k=top_k,
+                        filter_dict=filter_dict,
+                        include_metadata=include_metadata,
+                        search_effort=search_effort
+                    )
+            else:
+                result = list(await asyncio.gather(*[
+                    self.service_impl.similarity_search(
+                        query_vector=query_vector,
+                        top_k=top_k,
+                        filter_dict=filter_dict,
+                        include_metadata=include_metadata
+                    )
+                    for query_vector in query_vectors
+                ]))
+            
+            logger.info(
+                "vector_batch_search_completed",
+                service_type=self.service_type,
+                results_count=sum(len(matches) for matches in result)
+            )
+            
+            return result
+            
+        except Exception as e:
+            logger.error(
+                "vector_batch_search_failed",
+                service_type=self.service_type,
+                error=str(e),
+                exc_info=True
+            )
+            raise RetrievalException(f"批量向量搜索失败[{self.service_type}]：{str(e)}")
+    
+    async def hybrid_search(
+        self,
+        query_text: str,
+        query_vector: List[float],
+        top_k: int = 10,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        lexical_top_k: Optional[int] = None,
+        search_effort: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        混合检索 - 向量检索与全文检索并发执行，RRF 融合
+        
+        仅 PostgreSQL 实现支持全文检索，其他实现退化为纯向量检索；
+        全文检索失败时同样退化，不影响主流程
+        
+        Args:
+            query_text: 用户问题原文（全文检索用）
+            query_vector: 查询向量
+            top_k: 融合后返回数量
+            filter_dict: 过滤条件
+            lexical_top_k: 全文检索召回数量（默认读取 LEXICAL_TOP_K）
+            search_effort: 向量检索的召回率/延迟权衡
+            
+        Returns:
+            List[Dict[str, Any]]: 融合结果，score 保留各路原始分数，rrf_score 为融合分数，
+                向量检索命中的结果带 vector_score
+        """
+        if type(self.service_impl).__name__ != 'PostgreSQLVectorService':
+            return await self.similarity_search(
+                query_vector=query_vector,
+                top_k=top_k,
+                filter_dict=filter_dict,
+                search_effort=search_effort
+            )
+        
+        from app.core.config import get_settings
+        settings = get_settings()
+        
+        vector_result, lexical_result = await asyncio.gather(
+            self.similarity_search(
+                query_vector=query_vector,
+                top_k=top_k,
+                filter_dict=filter_dict,
+                search_effort=search_effort
+            ),
+            self._lexical_search(query_text, lexical_top_k, filter_dict),
+            return_exceptions=True
+        )
+        
+        if isinstance(vector_result, BaseException):
+            raise vector_result
+        self._tag_vector_scores(vector_result)
+        lexical_result = self._lexical_or_empty(lexical_result)
+        
+        fused = reciprocal_rank_fusion(
+            [vector_result, lexical_result],
+            k=settings.RRF_K,
+            top_k=top_k
+        )
+        
+        vector_ids = {match["id"] for match in vector_result}
+        logger.info(
+            "hybrid_search_completed",
+            vector_count=len(vector_result),
+            lexical_count=len(lexical_result),
+            lexical_only_count=sum(1 for match in fused if match["id"] not in vector_ids),
+            fused_count=len(fused)
+        )
+        
+        return fused
+    
+    async def multi_query_search(
+        self,
+        query_texts: List[str],
+        query_vectors: List[List[float]],
+        top_k: int = 10,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        lexical_query: Optional[str] = None,
+        search_effort: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        多查询检索 - 多个查询向量一次批量检索（PostgreSQL 为单条 SQL），
+        可选并发一路全文检索，所有结果按 RRF 融合
+        
+        Args:
+            query_texts: 查询文本（与 query_vectors 对齐，仅用于日志）
+            query_vectors: 查询向量
+            top_k: 每路召回数量及融合后返回数量
+            filter_dict: 过滤条件
+            lexical_query: 全文检索的查询文本（None 表示不做全文检索；非 PostgreSQL 实现忽略）
+            search_effort: 向量检索的召回率/延迟权衡
+            
+        Returns:
+            List[Dict[str, Any]]: 融合结果，score 保留首次出现时的原始分数，rrf_score 为融合分数，
+                向量检索命中的结果带 vector_score
+        """
+        from app.core.config import get_settings
+        settings = get_settings()
+        
+        searches = [
+            self.batch_similarity_search(
+                query_vectors=query_vectors,
+                top_k=top_k,
+                filter_dict=filter_dict,
+                search_effort=search_effort
+            )
+        ]
+        with_lexical = bool(lexical_query) and type(self.service_impl).__name__ == 'PostgreSQLVectorService'
+        if with_lexical:
+            searches.append(self._lexical_search(lexical_query, None, filter_dict))
+        
+        results = await asyncio.gather(*searches, return_exceptions=True)
+        vector_lists = results[0]
+        if isinstance(vector_lists, BaseException):
+            raise vector_lists
+        
+        for matches in vector_lists:
+            self._tag_vector_scores(matches)
+        result_lists = list(vector_lists)
+        if with_lexical:
+            result_lists.append(self._lexical_or_empty(results[1]))
+        
+        fused = reciprocal_rank_fusion(result_lists, k=settings.RRF_K, top_k=top_k)
+        
+        logger.info(
+            "multi_query_search_completed",
+            queries=query_texts,
+            per_query_counts=[len(matches) for matches in vector_lists],
+            lexical_count=len(result_lists[-1]) if with_lexical else None,
+            fused_count=len(fused)
+        )
+        
+        return fused
+    
+    async def _lexical_search(
+        self,
+        query_text: str,
+        top_k: Optional[int] = None,
+        filter_dict: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        全文检索（使用独立会话，可与向量检索并发）
+        
+        Args:
+            query_text: 查询文本
+            top_k: 召回数量（默认读取 LEXICAL_TOP_K）
+            filter_dict: 过滤条件
+            
+        Returns:
+            List[Dict[str, Any]]: 检索结果
+        """
+        from app.core.config import get_settings
+        from app.core.database import AsyncSessionLocal
+        from app.services.lexical_search_service import LexicalSearchService
+        
+        # AsyncSession 不支持并发，各路检索各自使用独立会话
+        async with AsyncSessionLocal() as session:
+            return await LexicalSearchService().search(
+                session=session,
+                query=query_text,
+                top_k=top_k or get_settings().LEXICAL_TOP_K,
+                filter_dict=filter_dict
+            )
+    
+    @staticmethod
+    def _tag_vector_scores(matches: List[Dict[str, Any]]):
+        """融合前记录向量相似度（融合后 score 可能来自全文检索，无法区分）"""
+        for match in matches:
+            match["vector_score"] = match["score"]
+    
+    @staticmethod
+    def _lexical_or_empty(result) -> List[Dict[str, Any]]:
+        """全文检索失败时退化为空结果，不影响主流程"""
+        if isinstance(result, BaseException):
+            logger.warning(
+                "lexical_search_failed_fallback_to_vector",
+                error=str(result)
+            )
+            return []
+        return result
+    
     async def upsert_vectors(
         self,
         session,
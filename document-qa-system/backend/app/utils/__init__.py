@@ -1,6 +1,6 @@
 """
 工具函数模块
 """
-from .logger import setup_logging
+from .logger import setup_logging, lazy, verbose
 
-__all__ = ["setup_logging"]
+__all__ = ["setup_logging", "lazy", "verbose"]
@@ -1,44 +1,236 @@
 """
 日志配置
 使用 structlog 进行结构化日志记录
+
+热路径日志的开销控制：
+- lazy()/verbose() 包装的字段在日志级别过滤和采样之后才计算，被丢弃的日志不产生计算开销
+- 按事件名采样（LOG_SAMPLE_RATES），警告及以上级别从不采样
+- production 配置（LOG_PROFILE=production）：级别至少 INFO，热路径事件默认采样，丢弃 verbose() 调试负载字段
 """
+import fnmatch
 import logging
+import random
 import sys
+from typing import Any, Callable, Dict, Optional
 import structlog
 from app.core.config import get_settings
 
 settings = get_settings()
 
+PRODUCTION = "production"
+
+# production 配置下的默认采样率（事件名支持通配符，LOG_SAMPLE_RATES 中的同名配置优先）
+PRODUCTION_SAMPLE_RATES: Dict[str, float] = {
+    "step*_started": 0.01,
+    "step*_completed": 0.05,
+    "embedding_success": 0.01,
+    "vector_search_*": 0.01,
+    "vector_batch_search_*": 0.01,
+    "postgres_vector_*search_completed": 0.01,
+    "hybrid_search_completed": 0.05,
+    "multi_query_search_completed": 0.05,
+}
+
+# 从不采样的级别
+_UNSAMPLED_LEVELS = frozenset({"warning", "warn", "error", "critical", "exception"})
+
+
+class LazyField:
+    """延迟计算的日志字段（只有日志确定输出时才计算）"""
+
+    __slots__ = ("fn", "args", "verbose")
+
+    def __init__(self, fn: Callable[..., Any], args: tuple, verbose: bool = False):
+        self.fn = fn
+        self.args = args
+        self.verbose = verbose
+
+    def resolve(self) -> Any:
+        """计算字段值（计算失败时返回错误描述，不影响日志输出）"""
+        try:
+            return self.fn(*self.args)
+        except Exception as e:
+            return f"<lazy field failed: {type(e).__name__}: {e}>"
+
+    def __repr__(self) -> str:
+        # 未经过 resolve_lazy_fields 的渲染路径（如未调用 setup_logging）也能输出实际值
+        return repr(self.resolve())
+
+
+def lazy(fn: Callable[..., Any], *args: Any) -> LazyField:
+    """
+    延迟计算的日志字段
+
+    Args:
+        fn: 计算函数
+        *args: 计算函数的参数
+
+    Returns:
+        LazyField: 字段包装
+
+    Example:
+        logger.info("embedding_success", vector_min=lazy(min, embedding))
+    """
+    return LazyField(fn, args)
+
+
+def verbose(fn: Callable[..., Any], *args: Any) -> LazyField:
+    """
+    延迟计算的调试负载字段（向量样本、内容预览、响应头等），production 配置下丢弃不计算
+
+    Args:
+        fn: 计算函数
+        *args: 计算函数的参数
+
+    Returns:
+        LazyField: 字段包装
+    """
+    return LazyField(fn, args, verbose=True)
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """
+    解析采样率配置
+
+    Args:
+        value: 形如 "step*_started=0.01,embedding_success=0.1" 的配置
+
+    Returns:
+        Dict[str, float]: 事件名（支持通配符）-> 采样率（0~1）
+    """
+    rates = {}
+    for item in value.split(","):
+        name, sep, rate = item.strip().partition("=")
+        if not sep or not name.strip():
+            continue
+        rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class EventSampler:
+    """
+    按事件名采样的 structlog 处理器
+
+    DEBUG/INFO 日志按事件名匹配到的采样率随机保留，未匹配的事件全部保留；
+    事件名到采样率的匹配结果按事件名缓存
+    """
+
+    def __init__(self, rates: Dict[str, float], rng: Callable[[], float] = random.random):
+        """
+        初始化采样器
+
+        Args:
+            rates: 事件名（支持通配符，精确名称优先）-> 采样率
+            rng: 返回 [0, 1) 随机数的函数（测试可注入）
+        """
+        self.rates = dict(rates)
+        self._rng = rng
+        self._resolved: Dict[str, Optional[float]] = {}
+        self.dropped = 0
+
+    def rate_for(self, event: str) -> Optional[float]:
+        """
+        获取事件的采样率
+
+        Args:
+            event: 事件名
+
+        Returns:
+            Optional[float]: 采样率，未配置时返回 None
+        """
+        if event in self._resolved:
+            return self._resolved[event]
+        rate = self.rates.get(event)
+        if rate is None:
+            rate = next((r for pattern, r in self.rates.items() if fnmatch.fnmatchcase(event, pattern)), None)
+        self._resolved[event] = rate
+        return rate
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if method_name in _UNSAMPLED_LEVELS:
+            return event_dict
+        rate = self.rate_for(str(event_dict.get("event", "")))
+        if rate is not None and rate < 1.0 and self._rng() >= rate:
+            self.dropped += 1
+            raise structlog.DropEvent
+        return event_dict
+
+
+def drop_verbose_fields(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """丢弃 verbose() 包装的调试负载字段（production 配置）"""
+    return {
+        key: value for key, value in event_dict.items()
+        if not (isinstance(value, LazyField) and value.verbose)
+    }
+
+
+def resolve_lazy_fields(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """计算延迟字段（位于级别过滤和采样之后）"""
+    for key, value in event_dict.items():
+        if isinstance(value, LazyField):
+            event_dict[key] = value.resolve()
+    return event_dict
+
+
+def build_processors(profile: str, sample_rates: Dict[str, float], use_json_format: bool) -> list:
+    """
+    构建 structlog 处理器链
+
+    Args:
+        profile: 日志配置（production 或其他）
+        sample_rates: LOG_SAMPLE_RATES 中的采样率（覆盖 production 默认值）
+        use_json_format: 是否输出 JSON
+
+    Returns:
+        list: 处理器链
+    """
+    rates = dict(PRODUCTION_SAMPLE_RATES) if profile == PRODUCTION else {}
+    rates.update(sample_rates)
+
+    processors = [structlog.stdlib.filter_by_level]
+    if rates:
+        processors.append(EventSampler(rates))
+    if profile == PRODUCTION:
+        processors.append(drop_verbose_fields)
+    processors += [
+        resolve_lazy_fields,
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.PositionalArgumentsFormatter(),
+        structlog.processors.TimeStamper(fmt="iso"),
+        structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
+        structlog.processors.UnicodeDecoder(),
+        structlog.processors.JSONRenderer() if use_json_format else structlog.dev.ConsoleRenderer()
+    ]
+    return processors
+
 
 def setup_logging():
     """配置结构化日志"""
-    
+
+    profile = settings.LOG_PROFILE.lower()
+    level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
+    if profile == PRODUCTION:
+        # production 配置不输出 DEBUG 日志
+        level = max(level, logging.INFO)
+
     # 配置标准 logging
     logging.basicConfig(
         format='%(message)s',
-        level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO),
+        level=level,
         stream=sys.stdout
     )
-    
+
     # 根据配置选择日志格式：console 或 json
     use_json_format = settings.LOG_FORMAT.lower() == "json" and not settings.DEBUG
-    
+
     structlog.configure(
-        processors=[
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer() if use_json_format else structlog.dev.ConsoleRenderer()
-        ],
+        processors=build_processors(profile, parse_sample_rates(settings.LOG_SAMPLE_RATES), use_json_format),
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
-    
+
     return structlog.get_logger()
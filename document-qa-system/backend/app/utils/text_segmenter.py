@@ -0,0 +1,135 @@
+"""
+中文分词工具
+为 PostgreSQL 全文检索（tsvector/tsquery）生成以空格分隔的词项。
+安装 jieba 时使用搜索引擎模式分词，否则对中文片段退化为二元切分（bigram）
+"""
+import re
+from functools import lru_cache
+from typing import List
+
+# 中文字符片段 / 其他单词（字母、数字、下划线及连字符、点号连接的编号，如 ABC-123、3.2.1）
+# 单词分支排除汉字，"第3.2条"、"X100型" 中的编号与汉字分开
+_TOKEN_PATTERN = re.compile(r"[一-鿿]+|[^\W_一-鿿]+(?:[-._][^\W_一-鿿]+)*", re.UNICODE)
+_CJK_PATTERN = re.compile(r"[一-鿿]+")
+
+# 查询侧丢弃的低信息词项（只作用于 to_tsquery_text，文档侧索引不变）：
+# 几乎每个中文块都含有的虚词/疑问词，单独作为 OR 条件会命中大半个语料库
+_CJK_FUNCTION_CHARS = frozenset("的了吗呢吧啊呀嘛么什哪怎是")
+_QUERY_STOPWORDS = frozenset({
+    "什么", "怎么", "怎样", "如何", "为什么", "哪些", "哪个", "是否", "请问", "一下", "可以", "这个", "那个",
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "is", "are", "was", "be",
+    "what", "how", "why", "which", "who", "it", "s", "do", "does",
+})
+
+
+@lru_cache(maxsize=1)
+def _load_jieba():
+    """加载 jieba（可选依赖），不可用时返回 None"""
+    try:
+        import jieba
+        jieba.setLogLevel(60)  # 关闭词典加载日志
+        return jieba
+    except ImportError:
+        return None
+
+
+def _segment_cjk(run: str) -> List[str]:
+    """
+    切分一段连续中文
+
+    Args:
+        run: 连续中文字符串
+
+    Returns:
+        List[str]: 词项列表
+    """
+    jieba = _load_jieba()
+    if jieba is not None:
+        return [word for word in jieba.cut_for_search(run) if word.strip()]
+
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def segment_text(text: str) -> List[str]:
+    """
+    将文本切分为检索词项（小写）
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        List[str]: 词项列表（保持出现顺序，可重复）
+    """
+    if not text:
+        return []
+
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        token = match.group(0)
+        if _CJK_PATTERN.fullmatch(token):
+            tokens.extend(_segment_cjk(token))
+        else:
+            tokens.append(token.lower())
+    return tokens
+
+
+def to_search_document(text: str) -> str:
+    """
+    生成写入 to_tsvector 的分词文本
+
+    Args:
+        text: 文档块内容
+
+    Returns:
+        str: 空格分隔的词项
+    """
+    return " ".join(segment_text(text))
+
+
+def is_informative_term(token: str) -> bool:
+    """
+    判断查询词项是否有检索价值
+
+    丢弃停用词、单个汉字，以及含虚词/疑问字的二元切分（如 "引的"、"是什"）
+
+    Args:
+        token: segment_text 输出的词项
+
+    Returns:
+        bool: 是否保留
+    """
+    if token in _QUERY_STOPWORDS:
+        return False
+    if _CJK_PATTERN.fullmatch(token):
+        if len(token) == 1:
+            return False
+        if len(token) == 2 and any(char in _CJK_FUNCTION_CHARS for char in token):
+            return False
+    return True
+
+
+def to_tsquery_text(query: str, max_terms: int = 16) -> str:
+    """
+    生成 to_tsquery 的查询表达式（词项之间为 OR，由 ts_rank 决定相关性）
+
+    词项只包含字母、数字和连接符，不会引入 tsquery 运算符；
+    低信息词项（停用词、单字、虚词二元组）不参与查询，最多保留 max_terms 个
+
+    Args:
+        query: 用户问题
+        max_terms: 词项数上限
+
+    Returns:
+        str: 如 "机器 | 学习 | abc-123"，无有效词项时返回空字符串
+    """
+    terms = []
+    seen = set()
+    for token in segment_text(query):
+        if token not in seen and is_informative_term(token):
+            seen.add(token)
+            terms.append(token)
+            if len(terms) >= max_terms:
+                break
+    return " | ".join(terms)
@@ -0,0 +1,263 @@
+"""
+Token 计数工具
+为文档分块和 Prompt 预算提供统一的 token 计数。
+默认按字符类别估算；配置 TOKENIZER_BPE_FILE（Qwen 词表 qwen.tiktoken）且安装 tiktoken 时使用本地 BPE。
+不会隐式下载词表：只有显式设置 TOKENIZER_BACKEND=tiktoken 且未配置词表文件时，
+才使用 TOKENIZER_ENCODING 指定的 tiktoken 内置编码（需已缓存或可访问网络，且与 Qwen 词表不同）
+"""
+import base64
+import math
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, Optional
+import structlog
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# Qwen 词表的预切分规则（与官方 tokenization_qwen.py 一致）
+_QWEN_PAT_STR = (
+    r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}"""
+    r"""| ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+_QWEN_SPECIAL_TOKENS = ("<|endoftext|>", "<|im_start|>", "<|im_end|>")
+
+# 中日韩文字及全角标点
+_CJK_PATTERN = re.compile(r"[　-〿㐀-䶿一-鿿豈-﫿＀-￯]")
+
+# 搜索前缀/后缀窗口时假定的单个 token 最大字符数（窗口不够时自动扩大）
+_MAX_CHARS_PER_TOKEN = 8
+
+
+class Tokenizer(ABC):
+    """
+    Token 计数器抽象基类
+
+    count 不带缓存；重复文本（Prompt 中的文档块、对话历史）使用模块级 count_tokens
+    """
+
+    name: str = "base"
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """
+        计算文本的 token 数
+
+        Args:
+            text: 文本
+
+        Returns:
+            int: token 数
+        """
+        pass
+
+    def prefix_end(self, text: str, start: int, end: int, budget: int) -> int:
+        """
+        求 text[start:end] 中不超过 budget 个 token 的最长前缀
+
+        Args:
+            text: 文本
+            start: 区间起点
+            end: 区间终点
+            budget: token 预算
+
+        Returns:
+            int: 前缀的结束位置（start 表示一个字符也放不下）
+        """
+        window = min(end, start + max(budget, 1) * _MAX_CHARS_PER_TOKEN)
+        while window < end and self.count(text[start:window]) <= budget:
+            window = min(end, start + (window - start) * 2)
+
+        if self.count(text[start:window]) <= budget:
+            return window
+
+        # 二分查找：text[start:lo] 不超预算，text[start:hi] 超预算
+        lo, hi = start, window
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self.count(text[start:mid]) <= budget:
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+    def suffix_start(self, text: str, start: int, end: int, budget: int) -> int:
+        """
+        求 text[start:end] 中不超过 budget 个 token 的最长后缀
+
+        Args:
+            text: 文本
+            start: 区间起点
+            end: 区间终点
+            budget: token 预算
+
+        Returns:
+            int: 后缀的起始位置（end 表示一个字符也放不下）
+        """
+        window = max(start, end - max(budget, 1) * _MAX_CHARS_PER_TOKEN)
+        while window > start and self.count(text[window:end]) <= budget:
+            window = max(start, end - (end - window) * 2)
+
+        if self.count(text[window:end]) <= budget:
+            return window
+
+        # 二分查找：text[hi:end] 不超预算，text[lo:end] 超预算
+        lo, hi = window, end
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self.count(text[mid:end]) <= budget:
+                hi = mid
+            else:
+                lo = mid
+        return hi
+
+
+class TiktokenTokenizer(Tokenizer):
+    """基于 tiktoken 的本地 BPE 计数（Rust 实现，不走网络）"""
+
+    def __init__(self, encoding):
+        """
+        初始化
+
+        Args:
+            encoding: tiktoken.Encoding 实例
+        """
+        self.encoding = encoding
+        self.name = f"tiktoken:{encoding.name}"
+
+    def count(self, text: str) -> int:
+        """计算 token 数（特殊 token 按普通文本处理）"""
+        if not text:
+            return 0
+        return len(self.encoding.encode_ordinary(text))
+
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    按字符类别估算 token 数（tiktoken 不可用时的退化方案）
+
+    Qwen/通义词表中中文约 1.4 字符/token，英文及其他字符约 4 字符/token
+    """
+
+    name = "heuristic"
+    cjk_chars_per_token = 1.4
+    other_chars_per_token = 4.0
+
+    def count(self, text: str) -> int:
+        """估算 token 数"""
+        if not text:
+            return 0
+        cjk = len(text) - len(_CJK_PATTERN.sub("", text))
+        other = len(text) - cjk
+        return math.ceil(cjk / self.cjk_chars_per_token + other / self.other_chars_per_token)
+
+
+def _load_bpe_file(path: str) -> Dict[bytes, int]:
+    """
+    读取 .tiktoken 词表文件（每行：base64 编码的 token 和序号）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        Dict[bytes, int]: token -> 序号
+    """
+    ranks = {}
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                token, rank = line.split()
+                ranks[base64.b64decode(token)] = int(rank)
+    return ranks
+
+
+def _load_tiktoken_encoding():
+    """
+    加载 tiktoken 编码
+
+    Returns:
+        tiktoken.Encoding: 编码实例
+
+    Raises:
+        ImportError: 未安装 tiktoken
+        Exception: 词表文件不可读或内置编码无法加载
+    """
+    import tiktoken
+
+    if settings.TOKENIZER_BPE_FILE:
+        ranks = _load_bpe_file(settings.TOKENIZER_BPE_FILE)
+        special_tokens = {token: len(ranks) + i for i, token in enumerate(_QWEN_SPECIAL_TOKENS)}
+        return tiktoken.Encoding(
+            name="qwen",
+            pat_str=_QWEN_PAT_STR,
+            mergeable_ranks=ranks,
+            special_tokens=special_tokens
+        )
+    return tiktoken.get_encoding(settings.TOKENIZER_ENCODING)
+
+
+def create_tokenizer(backend: Optional[str] = None) -> Tokenizer:
+    """
+    按配置创建 token 计数器
+
+    Args:
+        backend: auto / tiktoken / heuristic（默认 TOKENIZER_BACKEND）；
+            auto 时只在配置了 TOKENIZER_BPE_FILE 时使用 tiktoken（加载失败退化为估算），否则直接估算
+
+    Returns:
+        Tokenizer: 计数器实例
+
+    Raises:
+        ValueError: 不支持的后端类型
+    """
+    backend = backend or settings.TOKENIZER_BACKEND
+    if backend == "heuristic":
+        return HeuristicTokenizer()
+    if backend not in ("auto", "tiktoken"):
+        raise ValueError(f"不支持的 tokenizer 后端：{backend}")
+    if backend == "auto" and not settings.TOKENIZER_BPE_FILE:
+        # 没有本地词表时不加载内置编码（首次使用会联网下载，且不是 Qwen 词表）
+        return HeuristicTokenizer()
+
+    try:
+        tokenizer = TiktokenTokenizer(_load_tiktoken_encoding())
+    except Exception as e:
+        if backend == "tiktoken":
+            raise
+        logger.warning("tokenizer_fallback_to_heuristic", error=str(e), error_type=type(e).__name__)
+        return HeuristicTokenizer()
+
+    logger.info("tokenizer_loaded", tokenizer=tokenizer.name)
+    return tokenizer
+
+
+_tokenizer: Optional[Tokenizer] = None
+
+
+def get_tokenizer() -> Tokenizer:
+    """
+    获取全局 token 计数器（首次调用时加载；进程池子进程各自加载一份）
+
+    Returns:
+        Tokenizer: 计数器实例
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = create_tokenizer()
+    return _tokenizer
+
+
+@lru_cache(maxsize=settings.TOKEN_COUNT_CACHE_SIZE)
+def count_tokens(text: str) -> int:
+    """
+    计算 token 数（按字符串缓存，适合反复出现的文档块和对话历史）
+
+    Args:
+        text: 文本
+
+    Returns:
+        int: token 数
+    """
+    return get_tokenizer().count(text)
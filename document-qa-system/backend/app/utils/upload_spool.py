@@ -0,0 +1,127 @@
+"""
+上传暂存工具
+将上传内容按块写入磁盘临时文件，同时增量计算 SHA-256 和大小，
+单次上传的内存占用与文件大小无关（只保留一个读写块）
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+from fastapi import UploadFile
+from app.core.config import get_settings
+from app.exceptions import FileTooLargeError
+
+settings = get_settings()
+
+
+@dataclass
+class SpooledUpload:
+    """
+    已暂存到磁盘的上传文件
+
+    Attributes:
+        path: 暂存文件路径
+        size: 文件大小（字节）
+        content_hash: 内容 SHA-256（十六进制）
+    """
+    path: str
+    size: int
+    content_hash: str
+
+    async def iter_pieces(self, piece_size: int) -> AsyncIterator[bytes]:
+        """
+        按固定大小读取暂存文件
+
+        Args:
+            piece_size: 每块字节数
+
+        Yields:
+            bytes: 文件内容块
+        """
+        with open(self.path, "rb") as f:
+            while True:
+                piece = await asyncio.to_thread(f.read, piece_size)
+                if not piece:
+                    break
+                yield piece
+
+    def cleanup(self):
+        """删除暂存文件"""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def get_spool_dir() -> str:
+    """
+    获取暂存目录（不存在时创建）
+
+    Returns:
+        str: 暂存目录路径
+    """
+    spool_dir = settings.UPLOAD_SPOOL_DIR or os.path.join(settings.UPLOAD_DIR, "spool")
+    os.makedirs(spool_dir, exist_ok=True)
+    return spool_dir
+
+
+async def spool_stream(
+    chunks: AsyncIterator[bytes],
+    max_size: Optional[int] = None,
+    spool_dir: Optional[str] = None
+) -> SpooledUpload:
+    """
+    将字节流写入暂存文件
+
+    Args:
+        chunks: 上传内容的字节块
+        max_size: 最大允许字节数（超过时立即中止并删除暂存文件）
+        spool_dir: 暂存目录（默认 UPLOAD_SPOOL_DIR）
+
+    Returns:
+        SpooledUpload: 暂存结果
+
+    Raises:
+        FileTooLargeError: 内容超过 max_size
+    """
+    max_size = max_size or settings.MAX_FILE_SIZE_MB * 1024 * 1024
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".part", dir=spool_dir or get_spool_dir())
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLargeError(size, max_size)
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+
+    return SpooledUpload(path=path, size=size, content_hash=digest.hexdigest())
+
+
+async def iter_upload_file(upload: UploadFile, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    按块读取 multipart 上传文件
+
+    Args:
+        upload: FastAPI 上传文件（大于 1MB 时已由 Starlette 落盘）
+        chunk_size: 每次读取字节数
+
+    Yields:
+        bytes: 文件内容块
+    """
+    chunk_size = chunk_size or settings.UPLOAD_STREAM_CHUNK_BYTES
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
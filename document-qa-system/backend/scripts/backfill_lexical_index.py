@@ -0,0 +1,66 @@
+"""
+全文检索回填脚本
+为已有文档块创建 content_tsv 列和 GIN 索引，并回填中文分词结果
+
+使用方法:
+    python scripts/backfill_lexical_index.py
+    python scripts/backfill_lexical_index.py --batch-size 1000
+"""
+
+import sys
+from pathlib import Path
+
+# 修复导入路径问题
+script_dir = Path(__file__).parent.absolute()
+project_root = script_dir.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(script_dir))
+
+import asyncio
+from app.core.database import engine, AsyncSessionLocal
+from app.services.lexical_search_service import LexicalSearchService
+
+
+async def run(batch_size: int) -> int:
+    """
+    确保索引存在并回填 content_tsv
+
+    Args:
+        batch_size: 每批处理的块数
+
+    Returns:
+        int: 回填的块数
+    """
+    service = LexicalSearchService()
+
+    async with engine.begin() as conn:
+        await service.ensure_schema(conn)
+
+    async with AsyncSessionLocal() as session:
+        updated = await service.backfill(session, batch_size=batch_size)
+
+    await engine.dispose()
+    return updated
+
+
+async def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='全文检索 content_tsv 回填工具')
+    parser.add_argument('--batch-size', type=int, default=500, help='每批处理的块数')
+
+    args = parser.parse_args()
+
+    try:
+        updated = await run(args.batch_size)
+        print(f"✅ 回填完成: {updated} 个文档块")
+        return True
+    except Exception as e:
+        print(f"❌ 执行失败: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    exit(0 if success else 1)
@@ -0,0 +1,130 @@
+"""
+文本分块器性能基准
+在多 MB 的合成文本上测量 TextChunker 吞吐量，并检查耗时随文本长度线性增长
+
+使用方法:
+    python scripts/benchmark_chunker.py
+    python scripts/benchmark_chunker.py --sizes 1,4,16 --chunk-size 600 --overlap 200
+"""
+
+import sys
+from pathlib import Path
+
+# 修复导入路径问题
+script_dir = Path(__file__).parent.absolute()
+project_root = script_dir.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(script_dir))
+
+import random
+import time
+from app.chunkers.semantic_chunker import TextChunker
+
+_ZH_SENTENCES = [
+    "向量检索先把文档切分成块，再为每个块计算嵌入向量。",
+    "分块过大时检索精度下降，分块过小时上下文不完整！",
+    "重叠部分可以避免关键信息恰好落在两个块的边界上？",
+    "这一句没有句末标点并且会与下一句直接相连",
+]
+_EN_SENTENCES = [
+    "Retrieval augmented generation grounds answers in source documents. ",
+    "Chunk boundaries should follow paragraphs and sentences where possible. ",
+    "Overlap keeps facts that straddle a boundary retrievable from both sides! ",
+]
+
+
+def build_text(size_mb: float, seed: int = 42) -> str:
+    """
+    生成指定大小的中英文混合文本（含普通段落、超长段落和无标点长串）
+
+    Args:
+        size_mb: 目标大小（MB，按字符数计）
+        seed: 随机种子
+
+    Returns:
+        str: 合成文本
+    """
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    length = 0
+    while length < target:
+        kind = rng.random()
+        if kind < 0.7:
+            paragraph = "".join(rng.choice(_ZH_SENTENCES) for _ in range(rng.randint(1, 8)))
+        elif kind < 0.95:
+            paragraph = "".join(rng.choice(_EN_SENTENCES) for _ in range(rng.randint(5, 60)))
+        else:
+            paragraph = "无标点长串" * rng.randint(200, 800)
+        parts.append(paragraph)
+        length += len(paragraph) + 2
+    return "\n\n".join(parts)
+
+
+def run(sizes, chunk_size: int, overlap: int, repeat: int) -> list:
+    """
+    执行基准测试
+
+    Args:
+        sizes: 文本大小列表（MB）
+        chunk_size: 块大小
+        overlap: 重叠大小
+        repeat: 每个大小重复次数（取最快一次）
+
+    Returns:
+        list: 每个大小的结果
+    """
+    chunker = TextChunker(chunk_size=chunk_size, overlap=overlap)
+    results = []
+
+    for size_mb in sizes:
+        text = build_text(size_mb)
+        best = None
+        chunk_count = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            chunk_count = 0
+            for chunk in chunker.iter_chunks(text):
+                chunk_count += 1
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        chars_mb = len(text) / 1024 / 1024
+        results.append({
+            "size_mb": chars_mb,
+            "seconds": best,
+            "chunks": chunk_count,
+            "mb_per_second": chars_mb / best if best else float("inf"),
+        })
+        print(
+            f"{chars_mb:8.2f}M 字符  {best * 1000:9.1f} ms  "
+            f"{chars_mb / best:7.2f} M 字符/秒  {chunk_count:8d} 块"
+        )
+
+    return results
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='TextChunker 性能基准')
+    parser.add_argument('--sizes', default='1,2,4,8', help='文本大小列表（MB，逗号分隔）')
+    parser.add_argument('--chunk-size', type=int, default=600, help='块大小')
+    parser.add_argument('--overlap', type=int, default=200, help='重叠大小')
+    parser.add_argument('--repeat', type=int, default=3, help='每个大小重复次数')
+
+    args = parser.parse_args()
+    sizes = [float(size) for size in args.sizes.split(',')]
+
+    results = run(sizes, args.chunk_size, args.overlap, args.repeat)
+
+    # 线性时间：每字符耗时应基本不随文本增大而上升
+    if len(results) > 1:
+        first, last = results[0], results[-1]
+        ratio = (last["seconds"] / last["size_mb"]) / (first["seconds"] / first["size_mb"])
+        print(f"每字符耗时比（最大/最小文本）：{ratio:.2f}（≈1 表示线性）")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,7 @@ CREATE TABLE IF NOT EXISTS documents (
     filename VARCHAR(500) NOT NULL,  -- 扩展为 500 以支持长文件名（包括中文）
     file_content BYTEA,
     content_hash VARCHAR(64) UNIQUE,
+    blob_hash VARCHAR(64),  -- 原始文件在 blob 存储中的键（为空表示仍存放在 file_content / document_chunks）
     file_size INTEGER NOT NULL,
     mime_type VARCHAR(200) NOT NULL,  -- 扩展为 200 以支持 Office Open XML 等长 MIME 类型
     status VARCHAR(20) NOT NULL DEFAULT 'processing',
@@ -38,9 +39,13 @@ CREATE TABLE IF NOT EXISTS chunks (
     content TEXT NOT NULL,
     token_count INTEGER NOT NULL,
     embedding vector(1024),
-    metadata JSONB
+    metadata JSONB,
+    content_tsv tsvector  -- 中文分词后的全文检索向量（由应用写入）
 );
 
+-- 已有库补齐 blob 存储引用列，历史数据请执行 scripts/migrate_document_blobs.py 迁移
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS blob_hash VARCHAR(64);
+
 -- Step 4: 创建 document_chunks 表（大文件分块存储）
 CREATE TABLE IF NOT EXISTS document_chunks (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -58,7 +63,45 @@ CREATE TABLE IF NOT EXISTS conversations (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     user_id UUID,
     title VARCHAR(200),
-    messages JSONB,
+    messages JSONB,  -- 旧版历史，已迁移到 conversation_messages（scripts/migrate_conversation_messages.py）
+    message_count INTEGER NOT NULL DEFAULT 0,
+    last_message TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Step 5.1: 创建 conversation_messages 表（每条消息一行，追加为单条 INSERT）
+CREATE TABLE IF NOT EXISTS conversation_messages (
+    id BIGSERIAL PRIMARY KEY,
+    conversation_id UUID NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL,
+    content TEXT NOT NULL,
+    sources JSONB,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Step 5.5: 创建 embedding_cache 表（按模型 + 文本 SHA-256 持久化向量，重新处理时跳过未变化的块）
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    model VARCHAR(100) NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    embedding vector(1024) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (model, content_hash)
+);
+
+-- Step 5.6: 创建 ingestion_jobs 表（文档入库任务队列，工作池通过 FOR UPDATE SKIP LOCKED 领取）
+CREATE TABLE IF NOT EXISTS ingestion_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    job_type VARCHAR(32) NOT NULL DEFAULT 'process',
+    priority INTEGER NOT NULL DEFAULT 100,  -- 数值越小越先执行
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',  -- queued/running/succeeded/failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_at TIMESTAMP,
+    locked_by VARCHAR(100),
+    last_error TEXT,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
@@ -72,6 +115,23 @@ CREATE INDEX IF NOT EXISTS idx_documents_status_created ON documents(status, cre
 CREATE INDEX IF NOT EXISTS idx_chunks_document_id ON chunks(document_id);
 CREATE INDEX IF NOT EXISTS idx_chunks_doc_idx ON chunks(document_id, chunk_index);
 
+-- chunks.embedding 的 ANN 向量索引（与 VECTOR_INDEX_TYPE / HNSW_M / HNSW_EF_CONSTRUCTION 默认配置一致）
+-- 使用 vector_cosine_ops 以匹配检索 SQL 中的 <=> 余弦距离运算符
+-- 调整参数后请使用 scripts/manage_vector_index.py rebuild 在线重建
+CREATE INDEX IF NOT EXISTS idx_chunks_embedding_hnsw ON chunks
+    USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- chunks.content_tsv 的全文检索索引（混合检索的词法召回）
+-- 已有数据请执行 scripts/backfill_lexical_index.py 回填
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_tsv tsvector;
+CREATE INDEX IF NOT EXISTS idx_chunks_content_tsv ON chunks USING gin (content_tsv);
+
+-- ingestion_jobs 表的索引（领取任务只扫描排队中的行；同一文档最多一个活跃任务）
+CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_claim ON ingestion_jobs(priority, created_at)
+    WHERE status = 'queued';
+CREATE UNIQUE INDEX IF NOT EXISTS ux_ingestion_jobs_active_document ON ingestion_jobs(document_id)
+    WHERE status IN ('queued', 'running');
+
 -- document_chunks 表的索引
 CREATE INDEX IF NOT EXISTS idx_document_chunks_document_id ON document_chunks(document_id);
 CREATE INDEX IF NOT EXISTS idx_document_chunks_created_at ON document_chunks(created_at);
@@ -81,6 +141,9 @@ CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations(user_id);
 CREATE INDEX IF NOT EXISTS idx_conversations_updated_at ON conversations(updated_at DESC);
 CREATE INDEX IF NOT EXISTS idx_conversations_user_updated ON conversations(user_id, updated_at DESC);
 
+-- conversation_messages 表的索引（按对话倒序分页读取历史）
+CREATE INDEX IF NOT EXISTS ix_conversation_messages_conversation_id_id ON conversation_messages(conversation_id, id);
+
 -- Step 7: 创建触发器函数（自动更新 updated_at）
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -17,6 +17,8 @@ sys.path.insert(0, str(script_dir))
 from app.core.database import AsyncSessionLocal
 from app.models.chunk import Chunk
 from app.services.embedding_service import EmbeddingService
+from app.services.embedding_pipeline import EmbeddingPipeline
+from app.services.embedding_store import EmbeddingStore
 from sqlalchemy import select, update
 
 
@@ -28,6 +30,9 @@ async def generate_embeddings():
     try:
         # 初始化嵌入服务
         embedding_svc = EmbeddingService()
+        pipeline = EmbeddingPipeline(embedding_svc)
+        # 持久化向量缓存：内容未变化的块直接复用已有向量
+        embedding_store = EmbeddingStore(embedding_svc.model)
         print("✅ 嵌入服务初始化成功")
         
         async with AsyncSessionLocal() as session:
@@ -51,12 +56,18 @@ async def generate_embeddings():
                 for i in range(0, total_chunks, batch_size):
                     batch = chunks_without_embedding[i:i + batch_size]
                     
-                    # 为批次中的每个 chunk 生成向量
-                    for chunk in batch:
+                    # 为批次生成向量（先查缓存，未命中的批量调用 API）
+                    embeddings = await embedding_store.embed_texts(
+                        session, [chunk.content for chunk in batch], pipeline
+                    )
+                    
+                    for chunk, embedding in zip(batch, embeddings):
+                        if embedding is None:
+                            print(f"\n⚠️  处理 chunk {chunk.id} 时出错: 向量化失败")
+                            pbar.update(1)
+                            continue
+                        
                         try:
-                            # 生成嵌入向量
-                            embedding = await embedding_svc.embed_text(chunk.content)
-                            
                             # 更新数据库记录
                             stmt = update(Chunk).where(Chunk.id == chunk.id).values(
                                 embedding=embedding
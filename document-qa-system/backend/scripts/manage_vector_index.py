@@ -0,0 +1,80 @@
+"""
+向量索引管理脚本
+创建、校验、在线重建 chunks.embedding 的 pgvector 索引并输出报告
+
+使用方法:
+    python scripts/manage_vector_index.py ensure
+    python scripts/manage_vector_index.py validate
+    python scripts/manage_vector_index.py rebuild
+    python scripts/manage_vector_index.py report
+"""
+
+import sys
+from pathlib import Path
+
+# 修复导入路径问题
+script_dir = Path(__file__).parent.absolute()
+project_root = script_dir.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(script_dir))
+
+import asyncio
+import json
+from app.core.database import engine
+from app.services.vector_index_manager import VectorIndexManager
+
+
+async def run(command: str, index_type: str = None) -> bool:
+    """
+    执行索引管理命令
+
+    Args:
+        command: ensure / validate / rebuild / report
+        index_type: 索引类型（覆盖配置）
+
+    Returns:
+        bool: 索引是否健康
+    """
+    manager = VectorIndexManager(index_type=index_type)
+
+    if command == "rebuild":
+        report = await manager.rebuild_index_concurrently(engine)
+    elif command == "ensure":
+        async with engine.begin() as conn:
+            report = await manager.ensure_index(conn)
+    elif command == "validate":
+        async with engine.connect() as conn:
+            report = await manager.validate_index(conn)
+    else:
+        async with engine.connect() as conn:
+            report = await manager.get_index_report(conn)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    await engine.dispose()
+    return report["healthy"]
+
+
+async def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='pgvector 向量索引管理工具')
+    parser.add_argument(
+        'command',
+        choices=['ensure', 'validate', 'rebuild', 'report'],
+        help='ensure=缺失时创建, validate=校验, rebuild=在线重建, report=输出报告'
+    )
+    parser.add_argument('--index-type', choices=['hnsw', 'ivfflat'], help='索引类型（默认读取 VECTOR_INDEX_TYPE）')
+
+    args = parser.parse_args()
+
+    try:
+        return await run(args.command, args.index_type)
+    except Exception as e:
+        print(f"❌ 执行失败: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    exit(0 if success else 1)
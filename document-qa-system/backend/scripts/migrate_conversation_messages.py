@@ -0,0 +1,210 @@
+"""
+对话消息迁移脚本
+把 conversations.messages（JSONB 数组）中的历史迁移到 conversation_messages 表，
+同时回填 message_count / last_message，迁移后清空 JSONB 列
+
+上线新版本后、迁移前产生的对话已有 conversation_messages 记录：旧历史与新记录按
+created_at 合并后重新插入（自增 ID 即消息顺序），再按实际行数重算 message_count。
+已迁移的消息按 (role, content, created_at) 去重，脚本可重复执行（包括 --keep-jsonb）
+
+使用方法:
+    python scripts/migrate_conversation_messages.py --dry-run
+    python scripts/migrate_conversation_messages.py --batch-size 200
+    python scripts/migrate_conversation_messages.py --keep-jsonb
+"""
+
+import sys
+from pathlib import Path
+
+# 修复导入路径问题
+script_dir = Path(__file__).parent.absolute()
+project_root = script_dir.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(script_dir))
+
+import asyncio
+from sqlalchemy import text
+from app.core.database import engine, AsyncSessionLocal
+from app.models.conversation_message import ConversationMessage
+from app.repositories.conversation_repository import LAST_MESSAGE_PREVIEW_CHARS
+
+
+# JSONB 中尚未写入 conversation_messages 的旧消息（ord 为数组内顺序）
+PENDING_CTE = """
+    pending AS (
+        SELECT c.id AS conversation_id,
+               COALESCE(e.message->>'role', 'user') AS role,
+               COALESCE(e.message->>'content', '') AS content,
+               e.message->'sources' AS sources,
+               COALESCE(CAST(e.message->>'created_at' AS TIMESTAMP), c.created_at) AS created_at,
+               e.ord
+        FROM conversations c
+        CROSS JOIN LATERAL jsonb_array_elements(c.messages) WITH ORDINALITY AS e(message, ord)
+        WHERE c.id = ANY(CAST(:ids AS UUID[]))
+    ),
+    pending_new AS (
+        SELECT p.* FROM pending p
+        WHERE NOT EXISTS (
+            SELECT 1 FROM conversation_messages m
+            WHERE m.conversation_id = p.conversation_id
+              AND m.role = p.role AND m.content = p.content AND m.created_at = p.created_at
+        )
+    )
+"""
+
+
+async def ensure_schema():
+    """创建 conversation_messages 表并补齐 conversations 元数据列"""
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: ConversationMessage.__table__.create(sync_conn, checkfirst=True))
+        await conn.execute(text(
+            "ALTER TABLE conversations "
+            "ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0, "
+            "ADD COLUMN IF NOT EXISTS last_message TEXT"
+        ))
+
+
+async def migrate(batch_size: int, dry_run: bool, keep_jsonb: bool) -> dict:
+    """
+    迁移 JSONB 历史
+
+    Args:
+        batch_size: 每批迁移的对话数
+        dry_run: 只统计不写入
+        keep_jsonb: 迁移后保留 JSONB 列内容
+
+    Returns:
+        dict: conversations / messages 数量
+    """
+    stats = {"conversations": 0, "messages": 0}
+
+    if not dry_run:
+        await ensure_schema()
+
+    async with AsyncSessionLocal() as session:
+        last_id = None
+
+        while True:
+            result = await session.execute(
+                text("""
+                    SELECT c.id
+                    FROM conversations c
+                    WHERE jsonb_typeof(c.messages) = 'array'
+                      AND jsonb_array_length(c.messages) > 0
+                      AND (CAST(:last_id AS UUID) IS NULL OR c.id > CAST(:last_id AS UUID))
+                    ORDER BY c.id
+                    LIMIT :limit
+                """),
+                {"last_id": last_id, "limit": batch_size}
+            )
+            rows = result.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            ids = [row.id for row in rows]
+
+            if dry_run:
+                result = await session.execute(
+                    text(f"""
+                        WITH {PENDING_CTE}
+                        SELECT COUNT(DISTINCT conversation_id) AS conversations, COUNT(*) AS messages
+                        FROM pending_new
+                    """),
+                    {"ids": ids}
+                )
+                counts = result.one()
+                stats["conversations"] += counts.conversations
+                stats["messages"] += counts.messages
+                continue
+
+            # 锁住对话行，与在线追加消息（同样先更新 conversations 行）串行化
+            await session.execute(
+                text("SELECT id FROM conversations WHERE id = ANY(CAST(:ids AS UUID[])) FOR UPDATE"),
+                {"ids": ids}
+            )
+
+            # 有待迁移消息的对话：删除已有记录，与旧消息按 created_at 合并后按顺序重新插入，
+            # 自增 ID 即消息顺序（created_at 相同时旧消息在前）
+            result = await session.execute(
+                text(f"""
+                    WITH {PENDING_CTE},
+                    removed AS (
+                        DELETE FROM conversation_messages m
+                        WHERE m.conversation_id IN (SELECT conversation_id FROM pending_new)
+                        RETURNING m.id, m.conversation_id, m.role, m.content, m.sources, m.created_at
+                    ),
+                    merged AS (
+                        SELECT conversation_id, role, content, sources, created_at, 0 AS origin, ord AS seq
+                        FROM pending_new
+                        UNION ALL
+                        SELECT conversation_id, role, content, sources, created_at, 1 AS origin, id AS seq
+                        FROM removed
+                    ),
+                    inserted AS (
+                        INSERT INTO conversation_messages (conversation_id, role, content, sources, created_at)
+                        SELECT conversation_id, role, content, sources, created_at
+                        FROM merged
+                        ORDER BY conversation_id, created_at, origin, seq
+                        RETURNING conversation_id
+                    )
+                    SELECT (SELECT COUNT(DISTINCT conversation_id) FROM inserted) AS conversations,
+                           (SELECT COUNT(*) FROM pending_new) AS messages
+                """),
+                {"ids": ids}
+            )
+            counts = result.one()
+            stats["conversations"] += counts.conversations
+            stats["messages"] += counts.messages
+
+            # 按合并后的实际记录重算元数据
+            await session.execute(
+                text("""
+                    UPDATE conversations c
+                    SET message_count = (
+                            SELECT COUNT(*) FROM conversation_messages m WHERE m.conversation_id = c.id
+                        ),
+                        last_message = (
+                            SELECT LEFT(m.content, :preview_chars) FROM conversation_messages m
+                            WHERE m.conversation_id = c.id
+                            ORDER BY m.id DESC
+                            LIMIT 1
+                        ),
+                        messages = CASE WHEN :keep THEN c.messages ELSE NULL END
+                    WHERE c.id = ANY(CAST(:ids AS UUID[]))
+                """),
+                {"ids": ids, "keep": keep_jsonb, "preview_chars": LAST_MESSAGE_PREVIEW_CHARS}
+            )
+            await session.commit()
+            print(f"✅ 已迁移 {stats['conversations']} 个对话，{stats['messages']} 条消息")
+
+    return stats
+
+
+async def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='对话历史迁移到 conversation_messages 表')
+    parser.add_argument('--batch-size', type=int, default=200, help='每批迁移的对话数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计，不写入')
+    parser.add_argument('--keep-jsonb', action='store_true', help='迁移后保留 conversations.messages 内容')
+
+    args = parser.parse_args()
+
+    try:
+        stats = await migrate(args.batch_size, args.dry_run, args.keep_jsonb)
+        print(
+            f"✅ 迁移完成: {stats['conversations']} 个对话，{stats['messages']} 条消息"
+            + ("（dry-run）" if args.dry_run else "")
+        )
+        return True
+    except Exception as e:
+        print(f"❌ 执行失败: {e}")
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    exit(0 if success else 1)
@@ -0,0 +1,177 @@
+"""
+文档原始文件迁移脚本
+把 documents.file_content / document_chunks 中的原始文件迁移到 blob 存储，
+迁移后清空数据库中的二进制列；也可清理未被任何文档引用的 blob
+
+使用方法:
+    python scripts/migrate_document_blobs.py --dry-run
+    python scripts/migrate_document_blobs.py --batch-size 50
+    python scripts/migrate_document_blobs.py --keep-db-copy
+    python scripts/migrate_document_blobs.py --gc
+"""
+
+import sys
+from pathlib import Path
+
+# 修复导入路径问题
+script_dir = Path(__file__).parent.absolute()
+project_root = script_dir.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(script_dir))
+
+import asyncio
+import hashlib
+import os
+import time
+from sqlalchemy import text
+from app.core.database import engine, AsyncSessionLocal
+from app.repositories.document_repository import DocumentRepository
+from app.services.blob_store import create_blob_store
+
+# 新写入的 blob 可能属于尚未提交的上传事务，清理时跳过
+GC_MIN_AGE_SECONDS = 3600
+
+
+async def migrate(batch_size: int, dry_run: bool, keep_db_copy: bool) -> dict:
+    """
+    迁移尚未引用 blob 的文档
+
+    Args:
+        batch_size: 每批查询的文档数
+        dry_run: 只统计不写入
+        keep_db_copy: 迁移后保留数据库中的二进制内容
+
+    Returns:
+        dict: migrated / skipped / mismatched 数量
+    """
+    store = create_blob_store()
+    stats = {"migrated": 0, "skipped": 0, "mismatched": 0}
+
+    async with engine.begin() as conn:
+        await conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS blob_hash VARCHAR(64)"))
+
+    async with AsyncSessionLocal() as session:
+        repo = DocumentRepository(session)
+        last_id = None
+
+        while True:
+            # 只查询 ID 和哈希，内容逐个读取，避免一批文件同时进入内存
+            result = await session.execute(
+                text("""
+                    SELECT id, filename, content_hash FROM documents
+                    WHERE blob_hash IS NULL AND (CAST(:last_id AS UUID) IS NULL OR id > CAST(:last_id AS UUID))
+                    ORDER BY id
+                    LIMIT :limit
+                """),
+                {"last_id": last_id, "limit": batch_size}
+            )
+            rows = result.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            for row in rows:
+                content = await repo.get_document_content(row.id)
+                if content is None:
+                    print(f"⚠️  跳过（无内容）: {row.filename} ({row.id})")
+                    stats["skipped"] += 1
+                    continue
+
+                digest = hashlib.sha256(content).hexdigest()
+                if row.content_hash and row.content_hash != digest:
+                    print(f"❌ 哈希不一致，保持原样: {row.filename} ({row.id})")
+                    stats["mismatched"] += 1
+                    continue
+
+                if dry_run:
+                    stats["migrated"] += 1
+                    continue
+
+                await store.put_bytes(content, digest)
+                await session.execute(
+                    text("""
+                        UPDATE documents
+                        SET blob_hash = :digest,
+                            content_hash = COALESCE(content_hash, :digest),
+                            file_content = CASE WHEN :keep THEN file_content ELSE NULL END
+                        WHERE id = :id
+                    """),
+                    {"digest": digest, "keep": keep_db_copy, "id": row.id}
+                )
+                if not keep_db_copy:
+                    await session.execute(
+                        text("DELETE FROM document_chunks WHERE document_id = :id"),
+                        {"id": row.id}
+                    )
+                await session.commit()
+
+                stats["migrated"] += 1
+                print(f"✅ {row.filename}: {len(content) / 1024 / 1024:.2f}MB -> {digest[:12]}")
+
+    return stats
+
+
+async def collect_garbage(dry_run: bool) -> int:
+    """
+    删除未被任何文档引用的 blob
+
+    Args:
+        dry_run: 只统计不删除
+
+    Returns:
+        int: 删除（或待删除）的 blob 数量
+    """
+    store = create_blob_store()
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(text("SELECT blob_hash FROM documents WHERE blob_hash IS NOT NULL"))
+        referenced = {row.blob_hash for row in result.fetchall()}
+
+    removed = 0
+    now = time.time()
+    for content_hash in list(store.iter_hashes()):
+        if content_hash in referenced:
+            continue
+        path = store.local_path(content_hash)
+        if path and now - os.path.getmtime(path) < GC_MIN_AGE_SECONDS:
+            continue
+        if not dry_run:
+            await store.delete(content_hash)
+        removed += 1
+
+    return removed
+
+
+async def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='文档原始文件迁移到 blob 存储')
+    parser.add_argument('--batch-size', type=int, default=100, help='每批查询的文档数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计，不写入')
+    parser.add_argument('--keep-db-copy', action='store_true', help='迁移后保留数据库中的二进制内容')
+    parser.add_argument('--gc', action='store_true', help='清理未被引用的 blob（不执行迁移）')
+
+    args = parser.parse_args()
+
+    try:
+        if args.gc:
+            removed = await collect_garbage(args.dry_run)
+            print(f"✅ 清理完成: {removed} 个未引用的 blob" + ("（dry-run）" if args.dry_run else ""))
+        else:
+            stats = await migrate(args.batch_size, args.dry_run, args.keep_db_copy)
+            print(
+                f"✅ 迁移完成: 迁移 {stats['migrated']}，跳过 {stats['skipped']}，哈希不一致 {stats['mismatched']}"
+                + ("（dry-run）" if args.dry_run else "")
+            )
+        return True
+    except Exception as e:
+        print(f"❌ 执行失败: {e}")
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    exit(0 if success else 1)
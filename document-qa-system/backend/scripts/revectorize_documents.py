@@ -20,6 +20,8 @@ from sqlalchemy import select
 from app.models.chunk import Chunk
 from app.models.document import Document
 from app.services.embedding_service import EmbeddingService
+from app.services.embedding_pipeline import EmbeddingPipeline
+from app.services.embedding_store import EmbeddingStore
 from app.services.postgresql_vector_service import PostgreSQLVectorService
 from app.core.database import AsyncSessionLocal
 from app.core.config import get_settings
@@ -45,6 +47,9 @@ async def revectorize_documents(
     
     embedding_service = EmbeddingService()
     vector_service = PostgreSQLVectorService()
+    pipeline = EmbeddingPipeline(embedding_service)
+    # 持久化向量缓存：内容未变化的块直接复用已有向量
+    embedding_store = EmbeddingStore(embedding_service.model)
     
     try:
         async with AsyncSessionLocal() as session:
@@ -95,13 +100,19 @@ async def revectorize_documents(
                     # 批量生成向量
                     chunk_contents = [chunk.content for chunk in batch_chunks]
                     try:
-                        embeddings = await embedding_service.embed_batch(
-                            chunk_contents, 
-                            batch_size=min(len(chunk_contents), 10)
+                        embeddings = await embedding_store.embed_texts(
+                            session, chunk_contents, pipeline
                         )
                         
                         # 准备向量数据
                         for j, (chunk, embedding) in enumerate(zip(batch_chunks, embeddings)):
+                            if embedding is None:
+                                logger.warning(
+                                    "chunk_embedding_failed",
+                                    chunk_id=str(chunk.id)
+                                )
+                                continue
+                            
                             if len(embedding) != settings.VECTOR_DIMENSION:
                                 logger.warning(
                                     "embedding_dimension_mismatch",
@@ -0,0 +1,119 @@
+"""
+语义回答缓存单元测试
+"""
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from app.services.answer_cache import SemanticAnswerCache, replay_answer
+from app.services.rag_service import RAGService
+
+
+def _chunk(chunk_id, document_id):
+    return {"id": chunk_id, "score": 0.9, "metadata": {"document_id": document_id, "content": chunk_id}}
+
+
+def _cache(**kwargs):
+    kwargs.setdefault("max_size", 4)
+    kwargs.setdefault("ttl_seconds", 60)
+    kwargs.setdefault("similarity_threshold", 0.95)
+    return SemanticAnswerCache(**kwargs)
+
+
+class TestSemanticAnswerCache:
+    """SemanticAnswerCache 单元测试"""
+
+    def test_hits_similar_question_above_threshold(self):
+        """测试相似度不低于阈值命中，低于阈值未命中"""
+        cache = _cache()
+        cache.store([1.0, 0.0], "问题", "回答", [_chunk("c1", "doc-1")], cache.corpus_version)
+
+        hit = cache.lookup([0.99, 0.05])
+
+        assert hit.answer == "回答"
+        assert hit.document_ids == {"doc-1"}
+        assert hit.similarity == pytest.approx(0.9987, abs=1e-3)
+        assert cache.lookup([0.6, 0.8]) is None
+        assert cache.stats()["hits"] == 1
+
+    def test_invalidation_by_document_and_corpus_version(self):
+        """测试文档失效只影响引用它的回答，语料版本递增后全部失效"""
+        cache = _cache()
+        cache.store([1.0, 0.0], "问题一", "回答一", [_chunk("c1", "doc-1")], 0)
+        cache.store([0.0, 1.0], "问题二", "回答二", [_chunk("c2", "doc-2")], 0)
+
+        assert cache.invalidate_document("doc-1") == 1
+        assert cache.lookup([1.0, 0.0]) is None
+        assert cache.lookup([0.0, 1.0]).answer == "回答二"
+
+        cache.bump_corpus_version()
+        assert cache.lookup([0.0, 1.0]) is None
+        # 开始生成后语料版本变化的回答不写入
+        cache.store([0.0, 1.0], "问题二", "旧回答", [], 0)
+        assert cache.lookup([0.0, 1.0]) is None
+
+    def test_answers_citing_documents_deleted_during_generation_are_not_stored(self):
+        """测试生成期间被删除的文档被引用时回答不写入，语料版本递增后恢复写入"""
+        cache = _cache()
+        version = cache.corpus_version
+
+        cache.invalidate_document("doc-1")
+        cache.store([1.0, 0.0], "问题一", "引用已删除文档", [_chunk("c1", "doc-1")], version)
+        cache.store([0.0, 1.0], "问题二", "回答二", [_chunk("c2", "doc-2")], version)
+
+        assert cache.lookup([1.0, 0.0]) is None
+        assert cache.lookup([0.0, 1.0]).answer == "回答二"
+
+        cache.bump_corpus_version()
+        cache.store([1.0, 0.0], "问题一", "重新处理后的回答", [_chunk("c1", "doc-1")], cache.corpus_version)
+        assert cache.lookup([1.0, 0.0]).answer == "重新处理后的回答"
+
+    def test_evicts_least_recently_used(self):
+        """测试容量满时淘汰最久未使用的回答"""
+        cache = _cache(max_size=2)
+        cache.store([1.0, 0.0, 0.0], "a", "A", [_chunk("c1", "doc-1")], 0)
+        cache.store([0.0, 1.0, 0.0], "b", "B", [], 0)
+        cache.lookup([1.0, 0.0, 0.0])
+        cache.store([0.0, 0.0, 1.0], "c", "C", [], 0)
+
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+        assert cache.lookup([1.0, 0.0, 0.0]).answer == "A"
+        assert cache.stats()["evictions"] == 1
+
+    def test_replay_splits_answer(self):
+        """测试回放切片拼接后与原回答一致"""
+        assert replay_answer("一二三四五", piece_chars=2) == ["一二", "三四", "五"]
+
+
+class TestRAGServiceAnswerCache:
+    """RAGService 回答缓存流程"""
+
+    def _service(self, cache):
+        embedding_svc = Mock(embed_query=AsyncMock(return_value=[1.0, 0.0]))
+        vector_svc = Mock(similarity_search=AsyncMock(return_value=[]))
+        return RAGService(embedding_svc, vector_svc, Mock(), answer_cache=cache)
+
+    @pytest.mark.asyncio
+    async def test_hit_replays_without_retrieval(self):
+        """测试命中时直接回放，不做检索"""
+        cache = _cache()
+        cache.store([1.0, 0.0], "问题", "缓存的回答", [_chunk("c1", "doc-1")], 0)
+        service = self._service(cache)
+
+        history = [{"role": "user", "content": "问题？"}]
+        pieces = [piece async for piece in service.query("问题？", conversation_history=history)]
+
+        assert "".join(pieces) == "缓存的回答"
+        service.vector_svc.similarity_search.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_questions_with_history_bypass_cache(self):
+        """测试带对话历史的提问不查缓存"""
+        cache = _cache()
+        cache.store([1.0, 0.0], "问题", "缓存的回答", [], 0)
+        service = self._service(cache)
+
+        history = [{"role": "user", "content": "上一问"}, {"role": "assistant", "content": "上一答"}]
+        with patch("app.services.rag_service.settings.HYBRID_SEARCH_ENABLED", False):
+            pieces = [piece async for piece in service.query("问题？", conversation_history=history)]
+
+        assert "缓存的回答" not in "".join(pieces)
+        service.vector_svc.similarity_search.assert_awaited_once()
@@ -0,0 +1,77 @@
+"""
+LocalBlobStore 单元测试
+"""
+import hashlib
+import os
+import pytest
+from app.services.blob_store import LocalBlobStore
+from app.parsers.text_parser import TextParser
+
+
+def _sha256(data: bytes) -> str:
+    """计算 SHA-256"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class TestLocalBlobStore:
+    """LocalBlobStore 单元测试"""
+
+    @pytest.mark.asyncio
+    async def test_put_bytes_is_sharded_and_idempotent(self, tmp_path):
+        """测试按哈希分片存储，重复写入相同内容不报错"""
+        store = LocalBlobStore(str(tmp_path))
+        data = b"document body"
+        digest = _sha256(data)
+
+        await store.put_bytes(data, digest)
+        await store.put_bytes(data, digest)
+
+        assert store.path_for(digest) == os.path.join(str(tmp_path), digest[:2], digest[2:4], digest)
+        assert await store.exists(digest)
+        assert await store.read(digest) == data
+        assert list(store.iter_hashes()) == [digest]
+
+    @pytest.mark.asyncio
+    async def test_put_file_moves_source(self, tmp_path):
+        """测试 move=True 时源文件被移入存储"""
+        store = LocalBlobStore(str(tmp_path / "blobs"))
+        source = tmp_path / "upload.part"
+        source.write_bytes(b"spooled")
+        digest = _sha256(b"spooled")
+
+        await store.put_file(str(source), digest, move=True)
+
+        assert not source.exists()
+        with store.open_mmap(digest) as mapped:
+            assert mapped[:] == b"spooled"
+
+    @pytest.mark.asyncio
+    async def test_delete_and_empty_blob(self, tmp_path):
+        """测试空文件读取和删除"""
+        store = LocalBlobStore(str(tmp_path))
+        digest = _sha256(b"")
+
+        await store.put_bytes(b"", digest)
+
+        assert await store.read(digest) == b""
+        assert await store.delete(digest) is True
+        assert await store.delete(digest) is False
+
+    def test_rejects_invalid_hash(self, tmp_path):
+        """测试拒绝非法哈希（防止路径穿越）"""
+        store = LocalBlobStore(str(tmp_path))
+
+        with pytest.raises(ValueError):
+            store.path_for("../../etc/passwd")
+
+    @pytest.mark.asyncio
+    async def test_parser_reads_blob_by_path(self, tmp_path):
+        """测试解析器按路径读取 blob"""
+        store = LocalBlobStore(str(tmp_path))
+        data = "第一段内容。\n\n第二段内容。".encode("utf-8")
+        digest = _sha256(data)
+        await store.put_bytes(data, digest)
+
+        text = await TextParser().parse_file(store.local_path(digest))
+
+        assert "第二段内容" in text
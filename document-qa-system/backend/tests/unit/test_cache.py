@@ -0,0 +1,103 @@
+"""
+TTLCache 与查询向量缓存单元测试
+"""
+import pytest
+from unittest.mock import AsyncMock
+from app.core.cache import TTLCache
+from app.services.embedding_service import EmbeddingService
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBackend:
+    """内存共享后端"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+class TestTTLCache:
+    """TTLCache 单元测试"""
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        """测试超出容量时淘汰最久未使用的项"""
+        cache = TTLCache("test_lru", max_size=2, ttl_seconds=60)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self):
+        """测试过期项视为未命中"""
+        clock = FakeClock()
+        cache = TTLCache("test_ttl", max_size=10, ttl_seconds=5, clock=clock)
+        await cache.set("a", 1)
+
+        clock.now = 4.9
+        assert await cache.get("a") == 1
+        clock.now = 5.0
+        assert await cache.get("a") is None
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 0)
+
+    @pytest.mark.asyncio
+    async def test_shared_backend_fills_local(self):
+        """测试本地未命中时读取共享后端并回填"""
+        backend = FakeBackend()
+        backend.data["k"] = [0.1]
+        cache = TTLCache("test_shared", max_size=10, ttl_seconds=60, backend=backend)
+
+        assert await cache.get("k") == [0.1]
+        assert cache.get_local("k") == [0.1]
+        assert cache.stats()["shared_hits"] == 1
+
+
+class TestQueryEmbeddingCache:
+    """EmbeddingService.embed_query 缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_normalized_queries_share_cache_entry(self):
+        """测试空白/全半角差异的问题命中同一缓存项"""
+        cache = TTLCache("test_query_embedding", max_size=10, ttl_seconds=60)
+        service = EmbeddingService(query_cache=cache)
+        service.embed_text = AsyncMock(return_value=[0.5, 0.5])
+
+        first = await service.embed_query("什么是 RAG？")
+        second = await service.embed_query("  什么是  RAG?  ")
+
+        assert first == second == [0.5, 0.5]
+        service.embed_text.assert_awaited_once()
+        assert service.cache_stats()["hits"] == 1
+        assert service.cache_stats()["misses"] == 1
+
+    def test_cache_key_includes_model(self):
+        """测试缓存键区分模型"""
+        service = EmbeddingService(query_cache=TTLCache("test_key", 1, 1))
+        key_a = service.query_cache_key("问题")
+        service.model = "other-model"
+
+        assert service.query_cache_key("问题") != key_a
@@ -0,0 +1,133 @@
+"""
+对话消息存储单元测试
+"""
+import asyncio
+import pytest
+from datetime import datetime
+from uuid import uuid4
+from unittest.mock import AsyncMock, Mock, patch
+from sqlalchemy.dialects import postgresql
+from app.models.conversation_message import ConversationMessage
+from app.repositories.conversation_repository import ConversationRepository
+from app.services.chat_service import ChatService, ChatTurn
+from app.core.metrics import RequestTrace
+from app.schemas.chat import ChatQueryDTO
+
+
+def _compile(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class TestConversationRepository:
+    """ConversationRepository 语句测试（不连接数据库）"""
+
+    def test_append_is_single_statement_without_reading_history(self):
+        """测试追加消息为一条语句：更新元数据 + 插入消息，不读取 messages"""
+        repo = ConversationRepository(Mock())
+
+        user_sql = _compile(repo.build_append_statement(uuid4(), "user", "你好"))
+        assistant_sql = _compile(repo.build_append_statement(uuid4(), "assistant", "回答", [{"page": 1}]))
+
+        assert user_sql.startswith("WITH conv AS")
+        assert "INSERT INTO conversation_messages" in user_sql
+        assert "message_count=(conversations.message_count +" in user_sql
+        assert "conversations.messages" not in user_sql
+        # 只有用户消息会补全标题
+        assert "title=CASE" in user_sql
+        assert "title=" not in assistant_sql
+
+    @pytest.mark.asyncio
+    async def test_append_returns_none_for_missing_conversation(self):
+        """测试对话不存在时返回 None"""
+        session = Mock(execute=AsyncMock(return_value=Mock(first=Mock(return_value=None))))
+
+        assert await ConversationRepository(session).append_message(uuid4(), "user", "你好") is None
+
+
+class TestChatService:
+    """ChatService 单元测试"""
+
+    @pytest.mark.asyncio
+    async def test_add_message_appends_without_loading_conversation(self):
+        """测试添加消息直接追加，只为助手回答保存引用来源"""
+        repo = Mock(append_message=AsyncMock(side_effect=[3, None]), find_by_id=AsyncMock())
+        service = ChatService(repo)
+        conv_id = uuid4()
+
+        assert await service.add_message(conv_id, "user", "问题", sources=[{"page": 1}]) is True
+        assert await service.add_message(conv_id, "assistant", "回答") is False
+        repo.find_by_id.assert_not_awaited()
+        assert repo.append_message.await_args_list[0].kwargs["sources"] is None
+
+    @pytest.mark.asyncio
+    async def test_get_history_pages_messages(self):
+        """测试分页读取历史并转换为消息格式"""
+        created = datetime(2026, 1, 1)
+        messages = [
+            ConversationMessage(id=7, role="user", content="问题", created_at=created),
+            ConversationMessage(id=8, role="assistant", content="回答", sources=[{"page": 2}], created_at=created),
+        ]
+        repo = Mock(find_messages=AsyncMock(return_value=messages))
+        conv_id = uuid4()
+
+        history = await ChatService(repo).get_history(conv_id, limit=2, before_id=9)
+
+        repo.find_messages.assert_awaited_once_with(conv_id, limit=2, before_id=9)
+        assert [message["id"] for message in history] == [7, 8]
+        assert history[1]["sources"] == [{"page": 2}]
+        assert "sources" not in history[0]
+
+
+class TestChatTurn:
+    """一轮对话的数据库往返测试"""
+
+    @pytest.mark.asyncio
+    async def test_start_turn_appends_and_reads_window_in_one_call(self):
+        """测试追加用户消息与读取历史窗口为一次调用，历史末尾为本轮问题"""
+        prior = [ConversationMessage(id=1, role="user", content="上一问", created_at=datetime(2026, 1, 1))]
+        repo = Mock(append_message_with_history=AsyncMock(return_value=prior), find_messages=AsyncMock())
+        conv_id = uuid4()
+
+        turn = await ChatService(repo).start_turn(conv_id, "本轮问题", history_limit=10)
+
+        repo.append_message_with_history.assert_awaited_once_with(conv_id, "user", "本轮问题", history_limit=9)
+        repo.find_messages.assert_not_awaited()
+        assert turn.conversation_id == conv_id
+        assert [message["content"] for message in turn.history] == ["上一问", "本轮问题"]
+
+    @pytest.mark.asyncio
+    async def test_start_turn_creates_conversation_without_reading_history(self):
+        """测试新对话只执行创建语句，指定的对话不存在时返回空对话 ID"""
+        new_id = uuid4()
+        repo = Mock(create_with_message=AsyncMock(return_value=new_id), append_message_with_history=AsyncMock(return_value=None))
+        service = ChatService(repo)
+
+        created = await service.start_turn(None, "第一问")
+        missing = await service.start_turn(uuid4(), "问题")
+
+        assert created.conversation_id == new_id and created.created
+        assert [message["content"] for message in created.history] == ["第一问"]
+        assert missing.conversation_id is None and missing.history == []
+
+    @pytest.mark.asyncio
+    async def test_begin_turn_overlaps_database_and_embedding(self):
+        """测试保存用户消息与问题向量化并发执行"""
+        from app.api.v1.chat import _begin_turn
+
+        embedding_started = asyncio.Event()
+
+        async def fake_start_turn(conv_id, question, history_limit):
+            # 向量化开始之前数据库调用不会完成：两者串行时此处会超时
+            await asyncio.wait_for(embedding_started.wait(), timeout=1)
+            return ChatTurn(conversation_id=uuid4(), history=[{"role": "user", "content": question}])
+
+        async def fake_embed(question, trace):
+            embedding_started.set()
+            return [0.1, 0.2]
+
+        rag_svc = Mock(embed_question=fake_embed)
+        with patch("app.api.v1.chat.start_chat_turn", fake_start_turn):
+            turn, vector = await _begin_turn(ChatQueryDTO(query="问题"), rag_svc, RequestTrace())
+
+        assert vector == [0.1, 0.2]
+        assert turn.history[-1]["content"] == "问题"
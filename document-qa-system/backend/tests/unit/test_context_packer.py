@@ -0,0 +1,110 @@
+"""
+ContextPacker 单元测试
+"""
+from unittest.mock import Mock
+from app.services.context_packer import ContextPacker, _stitch
+from app.services.rag_service import RAGService
+
+
+def _chunk(chunk_id, content, score, document_id="doc-1", chunk_index=0):
+    """构造检索结果"""
+    return {
+        "id": chunk_id,
+        "relevance_score": score,
+        "metadata": {"document_id": document_id, "chunk_index": chunk_index, "content": content}
+    }
+
+
+def _packer(budget, **kwargs):
+    """按字符数计 token 的打包器（结果可预测）"""
+    kwargs.setdefault("history_token_budget", 0)
+    kwargs.setdefault("min_chunk_tokens", 5)
+    return ContextPacker(input_token_budget=budget, count=len, **kwargs)
+
+
+class TestContextPacker:
+    """ContextPacker 单元测试"""
+
+    def test_ranks_by_relevance_and_reports_budget_drops(self):
+        """测试按相关性装入，预算不足且无法裁剪的块记录为 budget 丢弃"""
+        chunks = [
+            _chunk("low", "低相关内容" * 10, 0.2, document_id="a"),
+            _chunk("high", "高相关内容" * 10, 0.9, document_id="b"),
+        ]
+
+        packed = _packer(60).pack("问题", chunks)
+
+        assert [source.chunk_ids for source in packed.sources] == [["high"]]
+        assert packed.dropped == [{"id": "low", "reason": "budget"}]
+        assert packed.context_tokens == 50
+
+    def test_deduplicates_and_merges_adjacent_chunks(self):
+        """测试重复块丢弃，同一文档相邻块去掉重叠后合并为一个来源"""
+        chunks = [
+            _chunk("c1", "第一句。第二句。", 0.9, chunk_index=1),
+            _chunk("c2", "第二句。第三句。", 0.8, chunk_index=2),
+            _chunk("dup", "第三句。", 0.7, document_id="doc-2"),
+            _chunk("far", "其他文档。", 0.6, document_id="doc-3", chunk_index=9),
+        ]
+
+        packed = _packer(1000).pack("问题", chunks)
+
+        assert [source.content for source in packed.sources] == ["第一句。第二句。第三句。", "其他文档。"]
+        assert packed.sources[0].chunk_ids == ["c1", "c2"]
+        assert {"id": "dup", "reason": "duplicate"} in packed.dropped
+
+    def test_stitch_removes_longest_overlap(self):
+        """测试拼接时去掉最长的首尾重合，没有重合时换行拼接"""
+        overlap = "重叠的句子。" * 300
+
+        assert _stitch("aXaXa", "aXaYb") == "aXaXaYb"
+        assert _stitch("前文" + overlap, overlap + "后文") == "前文" + overlap + "后文"
+        assert _stitch("abc", "def") == "abc\ndef"
+
+    def test_trims_to_sentences_relevant_to_question(self):
+        """测试放不下时只保留与问题相关的句子"""
+        content = "无关的开场白很长很长很长。向量索引使用 HNSW 构建。另一段无关的叙述也很长很长。"
+        chunks = [_chunk("c1", content, 0.9)]
+
+        packed = _packer(30, min_chunk_tokens=5).pack("向量索引用什么构建", chunks)
+
+        source = packed.sources[0]
+        assert source.trimmed is True
+        assert source.content == "向量索引使用 HNSW 构建。"
+        assert packed.trimmed_count == 1
+
+    def test_history_keeps_most_recent_messages_within_budget(self):
+        """测试历史从最近一条往前取，超出预算时截断更早的消息"""
+        history = [
+            {"role": "user", "content": "很早的问题" * 10},
+            {"role": "assistant", "content": "回答一"},
+            {"role": "user", "content": "问题二"},
+        ]
+
+        packed = _packer(1000, history_token_budget=12).pack("问题", [], history)
+
+        assert [message["content"] for message in packed.history] == ["回答一", "问题二"]
+        assert packed.history_tokens == 10
+        assert packed.dropped == [{"messages": 1, "reason": "history_budget"}]
+
+
+class TestBuildPrompt:
+    """RAGService._build_prompt 使用打包器"""
+
+    def test_prompt_only_contains_packed_sources(self):
+        """测试 Prompt 只包含预算内的文档块"""
+        packer = ContextPacker(input_token_budget=400, history_token_budget=0, count=len)
+        service = RAGService(Mock(), Mock(), Mock(), context_packer=packer)
+        chunks = [
+            _chunk("a", "最相关的文档内容。", 0.9, document_id="a"),
+            _chunk("b", "次要内容" * 100, 0.5, document_id="b"),
+        ]
+
+        prompt, sources = service._build_prompt("问题？", chunks, [])
+
+        assert "[来源 1]\n最相关的文档内容。" in prompt
+        # 返回的来源与 Prompt 中的编号一一对应
+        assert [source.chunk_ids for source in sources] == [["a"]]
+        assert service._source_chunks(sources) == [{"id": "a", "metadata": {"document_id": "a"}}]
+        assert "次要内容" * 100 not in prompt
+        assert "【问题】问题？" in prompt
@@ -15,6 +15,7 @@ from sqlalchemy import select, inspect
 from sqlalchemy.exc import ProgrammingError
 from datetime import datetime, timedelta
 from uuid import uuid4
+from unittest.mock import AsyncMock, MagicMock
 from app.models.document import Document
 from app.repositories.document_repository import DocumentRepository
 
@@ -364,4 +365,38 @@ class TestDocumentRepositoryEdgeCases:
         documents, total = await repo.find_all(page=1, limit=10, status="nonexistent_status")
         
         assert total == 0
-        assert len(documents) == 0
\ No newline at end of file
+        assert len(documents) == 0
+
+class TestDocumentRepositoryBulkChunks:
+    """save_chunks_bulk 方法测试类（模拟会话）"""
+
+    @pytest.mark.asyncio
+    async def test_save_chunks_bulk_single_insert(self):
+        """测试批量保存文档块只执行一条 INSERT，并按下标返回块 ID"""
+        session = MagicMock()
+        session.execute = AsyncMock()
+        repo = DocumentRepository(session)
+
+        chunk_ids = await repo.save_chunks_bulk(
+            doc_id=uuid4(),
+            contents=["a", "b", "c"],
+            token_counts=[1, 2, 3],
+            search_documents=["a", "b", "c"]
+        )
+
+        assert len(chunk_ids) == 3
+        assert session.execute.await_count == 1
+        sql, params = session.execute.call_args[0]
+        assert "INSERT INTO chunks" in str(sql)
+        assert params["ids"] == chunk_ids
+        assert params["chunk_indexes"] == [0, 1, 2]
+        assert params["with_tsv"] is True
+
+    @pytest.mark.asyncio
+    async def test_save_chunks_bulk_empty(self):
+        """测试空列表不访问数据库"""
+        session = MagicMock()
+        session.execute = AsyncMock()
+
+        assert await DocumentRepository(session).save_chunks_bulk(uuid4(), [], []) == []
+        session.execute.assert_not_called()
@@ -10,6 +10,25 @@ from app.models.document import Document
 from app.exceptions import DocumentNotFoundException
 
 
+class _FakeSessionFactory:
+    """会话工厂替身：依次返回给定的模拟会话（最后一个重复使用），记录打开次数"""
+
+    def __init__(self, *sessions):
+        self.sessions = sessions
+        self.session = sessions[0]
+        self.opened = 0
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        self.opened += 1
+        return self.sessions[min(self.opened, len(self.sessions)) - 1]
+
+    async def __aexit__(self, *args):
+        return False
+
+
 class TestReprocessDocument:
     """DocumentService.reprocess_document 单元测试"""
     
@@ -25,9 +44,32 @@ class TestReprocessDocument:
         return Mock()
     
     @pytest.fixture
-    def service(self, mock_repo, mock_embedding_svc):
+    def mock_job_queue(self):
+        """模拟入库任务队列"""
+        queue = Mock()
+        queue.enqueue = AsyncMock(return_value=True)
+        return queue
+    
+    @pytest.fixture
+    def mock_db_session(self):
+        """模拟独立事务会话（重新查询文档时返回 ready 状态的文档）"""
+        session = AsyncMock()
+        result = Mock()
+        result.scalar_one_or_none = Mock(return_value=Document(id=uuid4(), filename="test.pdf", status="ready"))
+        session.execute = AsyncMock(return_value=result)
+        return session
+    
+    @pytest.fixture
+    def session_factory(self, mock_db_session):
+        """模拟会话工厂（不连接数据库）"""
+        return _FakeSessionFactory(mock_db_session)
+    
+    @pytest.fixture
+    def service(self, mock_repo, mock_embedding_svc, mock_job_queue, session_factory):
         """创建 DocumentService 实例"""
-        return DocumentService(mock_repo, mock_embedding_svc)
+        return DocumentService(
+            mock_repo, mock_embedding_svc, job_queue=mock_job_queue, session_factory=session_factory
+        )
     
     @pytest.mark.asyncio
     async def test_reprocess_document_success_from_failed_status(self, service, mock_repo):
@@ -64,7 +106,7 @@ class TestReprocessDocument:
             with patch('app.core.database.get_db_session', mock_get_db_session):
                 with patch('asyncio.create_task') as mock_create_task:
                     # Act
-                    result = await service.reprocess_document(doc_id)
+                    result = await service.reprocess_document(doc_id, incremental=False)
                     
                     # Assert
                     assert result is True
@@ -77,8 +119,39 @@ class TestReprocessDocument:
                     # Verify 删除了向量
                     mock_vector_svc.delete_vectors.assert_called_once()
                     
-                    # Verify 启动了异步任务
-                    mock_create_task.assert_called_once()
+                    # Verify 全量重新处理按普通处理任务入队
+                    service.job_queue.enqueue.assert_called_once()
+                    assert service.job_queue.enqueue.call_args.kwargs["job_type"] == "process"
+    
+    @pytest.mark.asyncio
+    async def test_reprocess_document_incremental_keeps_chunks(self, service, mock_repo, session_factory):
+        """测试增量重新处理不清空旧块和向量，按 reprocess 任务入队"""
+        # Arrange
+        doc_id = uuid4()
+        mock_doc = Document(id=doc_id, filename="test.pdf", status="ready")
+        
+        mock_repo.find_by_id = AsyncMock(return_value=mock_doc)
+        mock_repo.delete_chunks_by_document = AsyncMock(return_value=True)
+        mock_repo.update_status = AsyncMock(return_value=True)
+        
+        with patch('app.services.document_service.create_vector_service') as mock_create_vector:
+            mock_session = AsyncMock()
+            
+            async def mock_get_db_session():
+                yield mock_session
+            
+            with patch('app.core.database.get_db_session', mock_get_db_session):
+                # Act
+                result = await service.reprocess_document(doc_id, incremental=True)
+        
+        # Assert
+        assert result is True
+        mock_repo.delete_chunks_by_document.assert_not_called()
+        mock_create_vector.assert_not_called()
+        assert service.job_queue.enqueue.call_args.kwargs["job_type"] == "reprocess"
+        # 只打开一次独立会话：状态重置与入队同一事务提交
+        assert session_factory.opened == 1
+        session_factory.session.commit.assert_awaited_once()
     
     @pytest.mark.asyncio
     async def test_reprocess_document_success_from_ready_status(self, service, mock_repo):
@@ -199,7 +272,7 @@ class TestReprocessDocument:
             with patch('app.core.database.get_db_session', mock_get_db_session):
                 with patch('asyncio.create_task') as mock_create_task:
                     # Act
-                    result = await service.reprocess_document(doc_id)
+                    result = await service.reprocess_document(doc_id, incremental=False)
                     
                     # Assert - 仍然成功，因为清空 chunks 失败不会阻断流程
                     assert result is True
@@ -234,13 +307,13 @@ class TestReprocessDocument:
             with patch('app.core.database.get_db_session', mock_get_db_session):
                 with patch('asyncio.create_task') as mock_create_task:
                     # Act
-                    result = await service.reprocess_document(doc_id)
+                    result = await service.reprocess_document(doc_id, incremental=False)
                     
                     # Assert - 仍然成功，因为向量删除失败不会阻断流程
                     assert result is True
     
     @pytest.mark.asyncio
-    async def test_reprocess_document_commit_failed(self, service, mock_repo):
+    async def test_reprocess_document_commit_failed(self, service, mock_repo, mock_db_session):
         """测试提交事务失败的场景"""
         # Arrange
         doc_id = uuid4()
@@ -265,27 +338,17 @@ class TestReprocessDocument:
             mock_session_1.close = AsyncMock()
             
             # 第二个 session 用于提交事务（失败）
-            mock_session_2 = AsyncMock()
+            mock_session_2 = mock_db_session
             mock_session_2.commit = AsyncMock(side_effect=Exception("Commit failed"))
-            mock_session_2.close = AsyncMock()
             mock_session_2.rollback = AsyncMock()
             
-            # Mock get_db_session generator，返回两个不同的 session
-            call_count = [0]
-            async def mock_get_db_session():
-                call_count[0] += 1
-                if call_count[0] == 1:
-                    yield mock_session_1
-                else:
-                    yield mock_session_2
+            service._session_factory = _FakeSessionFactory(mock_session_1, mock_session_2)
+            # Act
+            result = await service.reprocess_document(doc_id, incremental=False)
             
-            with patch('app.core.database.get_db_session', mock_get_db_session):
-                # Act
-                result = await service.reprocess_document(doc_id)
-                
-                # Assert - 事务提交失败时返回 False
-                assert result is False
-                mock_session_2.rollback.assert_called_once()
+            # Assert - 事务提交失败时返回 False
+            assert result is False
+            mock_session_2.rollback.assert_called_once()
     
     @pytest.mark.asyncio
     async def test_reprocess_document_websocket_notification_failed(self, service, mock_repo):
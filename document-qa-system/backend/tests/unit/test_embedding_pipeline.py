@@ -0,0 +1,85 @@
+"""
+EmbeddingPipeline 单元测试
+"""
+import asyncio
+import pytest
+from unittest.mock import Mock
+from app.services.embedding_pipeline import EmbeddingPipeline
+from app.exceptions import RetrievalException
+
+
+class FakeEmbeddingService:
+    """模拟 Embedding Service：包含 "bad" 的批次整体失败，并记录并发数"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def embed_batch_request(self, texts, timeout=60.0):
+        self.calls.append(list(texts))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if any("bad" in text for text in texts):
+                raise RetrievalException("Embedding API 返回错误：400")
+            return [[float(len(text))] for text in texts]
+        finally:
+            self.in_flight -= 1
+
+
+class TestEmbeddingPipeline:
+    """EmbeddingPipeline 单元测试"""
+
+    def test_pack_batches_by_count_and_chars(self):
+        """测试按条数和字符数打包批次"""
+        pipeline = EmbeddingPipeline(Mock(), batch_size=3, max_batch_chars=10)
+
+        batches = pipeline.pack_batches(["aaaa", "bbbb", "cccc", "d", "e", "f", "g"])
+
+        assert batches == [[0, 1], [2, 3, 4], [5, 6]]
+
+    def test_pack_batches_oversized_text_gets_own_batch(self):
+        """测试超长文本单独成批"""
+        pipeline = EmbeddingPipeline(Mock(), batch_size=10, max_batch_chars=5)
+
+        assert pipeline.pack_batches(["x" * 50, "y"]) == [[0], [1]]
+
+    @pytest.mark.asyncio
+    async def test_embed_all_preserves_order(self):
+        """测试结果按文本下标返回"""
+        svc = FakeEmbeddingService()
+        pipeline = EmbeddingPipeline(svc, batch_size=2, max_concurrency=3)
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+        result = await pipeline.embed_all(texts)
+
+        assert [idx for idx, _ in result.embeddings] == [0, 1, 2, 3, 4]
+        assert result.embeddings[3][1] == [4.0]
+        assert result.failed_indices == []
+        assert len(svc.calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_bisect_isolates_bad_text(self):
+        """测试失败批次二分重试，只丢弃坏文本"""
+        svc = FakeEmbeddingService()
+        pipeline = EmbeddingPipeline(svc, batch_size=8, max_retries=0)
+        texts = ["a", "b", "c", "bad", "e", "f", "g", "h"]
+
+        result = await pipeline.embed_all(texts)
+
+        assert result.failed_indices == [3]
+        assert [idx for idx, _ in result.embeddings] == [0, 1, 2, 4, 5, 6, 7]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """测试在途批次数不超过上限"""
+        svc = FakeEmbeddingService(delay=0.01)
+        pipeline = EmbeddingPipeline(svc, batch_size=1, max_concurrency=2)
+
+        result = await pipeline.embed_all([str(i) for i in range(8)])
+
+        assert len(result.embeddings) == 8
+        assert svc.max_in_flight == 2
@@ -0,0 +1,66 @@
+"""
+EmbeddingStore（持久化向量缓存）单元测试
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.services.embedding_store import EmbeddingStore, content_hash
+from app.services.embedding_pipeline import EmbeddingPipeline
+from app.exceptions import RetrievalException
+
+
+class FakeEmbeddingService:
+    """模拟 Embedding Service：记录请求文本，包含 "bad" 的文本失败"""
+
+    def __init__(self):
+        self.requested = []
+
+    async def embed_batch_request(self, texts, timeout=60.0):
+        self.requested.extend(texts)
+        if any("bad" in text for text in texts):
+            raise RetrievalException("Embedding API 返回错误：400")
+        return [[float(len(text))] for text in texts]
+
+
+class TestEmbeddingStore:
+    """EmbeddingStore 单元测试"""
+
+    @pytest.mark.asyncio
+    async def test_only_changed_and_unique_texts_are_embedded(self):
+        """测试缓存命中的文本不调用 API，重复文本只向量化一次"""
+        store = EmbeddingStore(model="m")
+        store.get_many = AsyncMock(return_value={content_hash("old"): [9.0]})
+        store.put_many = AsyncMock()
+        svc = FakeEmbeddingService()
+        pipeline = EmbeddingPipeline(svc, batch_size=10, max_retries=0)
+
+        embeddings = await store.embed_texts(MagicMock(), ["old", "new", "new", "xy"], pipeline)
+
+        assert embeddings == [[9.0], [3.0], [3.0], [2.0]]
+        assert sorted(svc.requested) == ["new", "xy"]
+        written = store.put_many.call_args[0][1]
+        assert set(written) == {content_hash("new"), content_hash("xy")}
+
+    @pytest.mark.asyncio
+    async def test_failed_texts_map_to_all_duplicates(self):
+        """测试失败文本的所有重复下标都标记为失败，且不写入缓存"""
+        store = EmbeddingStore(model="m")
+        store.get_many = AsyncMock(return_value={})
+        store.put_many = AsyncMock()
+        pipeline = EmbeddingPipeline(FakeEmbeddingService(), batch_size=1, max_retries=0)
+
+        failed = []
+        async for batch_result in store.stream_with_cache(MagicMock(), ["bad", "ok", "bad"], pipeline):
+            failed.extend(batch_result.failed_indices)
+
+        assert sorted(failed) == [0, 2]
+        for call in store.put_many.call_args_list:
+            assert content_hash("bad") not in call[0][1]
+
+    @pytest.mark.asyncio
+    async def test_get_many_errors_are_treated_as_misses(self):
+        """测试缓存表异常时视为全部未命中"""
+        store = EmbeddingStore(model="m")
+        session = MagicMock()
+        session.begin_nested.side_effect = RuntimeError("relation embedding_cache does not exist")
+
+        assert await store.get_many(session, ["abc"]) == {}
@@ -0,0 +1,49 @@
+"""
+HTTPClientRegistry 单元测试
+"""
+import pytest
+from unittest.mock import patch
+from app.core import http_client as http_client_module
+from app.core.http_client import HTTPClientRegistry, EMBEDDING, LLM
+
+
+class TestHTTPClientRegistry:
+    """HTTPClientRegistry 单元测试"""
+
+    @pytest.mark.asyncio
+    async def test_get_reuses_client(self):
+        """测试同一端点复用同一个客户端"""
+        registry = HTTPClientRegistry()
+
+        client = registry.get(EMBEDDING)
+
+        assert registry.get(EMBEDDING) is client
+        assert registry.get(LLM) is not client
+        await registry.close()
+
+    @pytest.mark.asyncio
+    async def test_close_then_get_recreates_client(self):
+        """测试关闭后再次获取会重新创建客户端"""
+        registry = HTTPClientRegistry()
+        client = registry.get(EMBEDDING)
+
+        await registry.close()
+
+        assert client.is_closed
+        assert registry.get_pool_stats() == {}
+        new_client = registry.get(EMBEDDING)
+        assert new_client is not client
+        assert not new_client.is_closed
+        await registry.close()
+
+    @pytest.mark.asyncio
+    async def test_http2_falls_back_without_h2(self):
+        """测试缺少 h2 包时回退到 HTTP/1.1"""
+        registry = HTTPClientRegistry()
+
+        with patch.object(http_client_module, "_http2_available", return_value=False), \
+                patch("httpx.AsyncClient", wraps=http_client_module.httpx.AsyncClient) as client_cls:
+            registry.get(LLM)
+
+        assert client_cls.call_args.kwargs["http2"] is False
+        await registry.close()
@@ -0,0 +1,100 @@
+"""
+混合检索（分词、全文检索、RRF 融合）单元测试
+"""
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.utils.text_segmenter import segment_text, to_tsquery_text
+from app.services.vector_service_adapter import VectorServiceAdapter, reciprocal_rank_fusion
+
+
+def _match(match_id, score=0.5):
+    return {"id": match_id, "score": score, "metadata": {"content": match_id}}
+
+
+class FakePGService:
+    """模拟 PostgreSQL 向量服务（类名用于适配器分支判断）"""
+
+
+FakePGService.__name__ = "PostgreSQLVectorService"
+
+
+class TestTextSegmenter:
+    """分词工具测试"""
+
+    def test_segment_keeps_codes_and_lowercases(self):
+        """测试编号、英文保持完整并转小写"""
+        tokens = segment_text("请查询 ABC-123 和 第3.2条")
+
+        assert "abc-123" in tokens
+        assert "3.2" in tokens
+        assert "3.2" in segment_text("第3.2条规定")
+        assert segment_text("X100型") == ["x100", "型"]
+
+    def test_tsquery_text_is_or_of_unique_terms(self):
+        """测试查询表达式去重并以 OR 连接，不含 tsquery 运算符"""
+        query = to_tsquery_text("it's ABC & b | abc !")
+
+        assert query.split(" | ") == ["abc", "b"]
+        assert to_tsquery_text("？！") == ""
+
+    def test_tsquery_drops_low_information_terms(self):
+        """测试查询去掉停用词、单字和虚词二元组，并限制词项数"""
+        terms = to_tsquery_text("向量索引的构建方法是什么？").split(" | ")
+
+        assert "索引" in terms and "构建" in terms
+        assert not {"引的", "的构", "是什", "什么", "么"} & set(terms)
+        assert to_tsquery_text("是什么的") == ""
+        assert len(to_tsquery_text("甲乙丙丁戊己庚辛壬癸子丑寅卯", max_terms=4).split(" | ")) == 4
+
+
+class TestReciprocalRankFusion:
+    """RRF 融合测试"""
+
+    def test_items_in_both_lists_rank_first(self):
+        """测试两路都命中的结果排在前面，并保留原始 score"""
+        vector = [_match("a", 0.9), _match("b", 0.8)]
+        lexical = [_match("c", 0.4), _match("b", 0.3)]
+
+        fused = reciprocal_rank_fusion([vector, lexical], k=60)
+
+        assert [m["id"] for m in fused] == ["b", "a", "c"]
+        assert fused[0]["score"] == 0.8
+        assert fused[0]["rrf_score"] == pytest.approx(1 / 62 + 1 / 62)
+
+    def test_top_k_truncates(self):
+        """测试按 top_k 截断"""
+        fused = reciprocal_rank_fusion([[_match("a"), _match("b"), _match("c")]], top_k=2)
+
+        assert [m["id"] for m in fused] == ["a", "b"]
+
+
+class TestHybridSearch:
+    """适配器混合检索测试"""
+
+    @pytest.mark.asyncio
+    async def test_hybrid_search_fuses_both_legs(self):
+        """测试向量与全文两路结果融合"""
+        adapter = VectorServiceAdapter(FakePGService())
+        adapter.similarity_search = AsyncMock(return_value=[_match("a"), _match("b")])
+
+        with patch(
+            "app.services.lexical_search_service.LexicalSearchService.search",
+            AsyncMock(return_value=[_match("c"), _match("a")])
+        ):
+            fused = await adapter.hybrid_search("问题", [0.1], top_k=3)
+
+        assert [m["id"] for m in fused] == ["a", "c", "b"]
+
+    @pytest.mark.asyncio
+    async def test_hybrid_search_falls_back_when_lexical_fails(self):
+        """测试全文检索失败时退化为向量检索"""
+        adapter = VectorServiceAdapter(FakePGService())
+        adapter.similarity_search = AsyncMock(return_value=[_match("a"), _match("b")])
+
+        with patch(
+            "app.services.lexical_search_service.LexicalSearchService.search",
+            AsyncMock(side_effect=RuntimeError("no column content_tsv"))
+        ):
+            fused = await adapter.hybrid_search("问题", [0.1], top_k=3)
+
+        assert [m["id"] for m in fused] == ["a", "b"]
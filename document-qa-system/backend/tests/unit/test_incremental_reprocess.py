@@ -0,0 +1,98 @@
+"""
+增量重新处理（DocumentService._sync_chunks_incremental）单元测试
+"""
+import pytest
+from types import SimpleNamespace
+from uuid import uuid4
+from unittest.mock import AsyncMock, Mock
+from app.services.document_service import DocumentService
+from app.services.embedding_store import content_hash
+from app.repositories.document_repository import DocumentRepository
+
+
+def _chunk(content: str):
+    """构造文本块"""
+    return SimpleNamespace(content=content, token_count=len(content))
+
+
+def _row(content: str, chunk_index: int, has_embedding: bool = True):
+    """构造 find_chunk_hashes 返回行"""
+    return SimpleNamespace(
+        id=uuid4(),
+        chunk_index=chunk_index,
+        content_hash=content_hash(content),
+        has_embedding=has_embedding
+    )
+
+
+class TestSyncChunksIncremental:
+    """_sync_chunks_incremental 单元测试"""
+
+    @pytest.fixture
+    def repo(self):
+        """模拟 Repository"""
+        repo = Mock(spec=DocumentRepository)
+        repo.delete_chunks_by_ids = AsyncMock(return_value=0)
+        repo.reindex_chunks = AsyncMock(return_value=0)
+        repo.save_chunks_bulk = AsyncMock(
+            side_effect=lambda **kwargs: [uuid4() for _ in kwargs["contents"]]
+        )
+        return repo
+
+    @pytest.fixture
+    def service(self, repo):
+        """创建 DocumentService（向量化步骤单独模拟）"""
+        service = DocumentService(repo, Mock(), job_queue=Mock())
+        service._embed_and_upsert = AsyncMock()
+        return service
+
+    @pytest.mark.asyncio
+    async def test_only_changed_chunks_are_embedded(self, service, repo):
+        """测试保留未变块、删除消失的块，只向量化新增块"""
+        kept_a = _row("段落 A", 0)
+        removed = _row("段落 B（旧）", 1)
+        kept_c = _row("段落 C", 2)
+        repo.find_chunk_hashes = AsyncMock(return_value=[kept_a, removed, kept_c])
+        chunks = [_chunk("段落 A"), _chunk("段落 B（新）"), _chunk("段落 C")]
+        doc_id = uuid4()
+
+        await service._sync_chunks_incremental(repo, chunks, doc_id, "a.txt", session=Mock())
+
+        repo.delete_chunks_by_ids.assert_called_once_with([removed.id])
+        repo.reindex_chunks.assert_called_once_with([], [])
+        save_kwargs = repo.save_chunks_bulk.call_args.kwargs
+        assert save_kwargs["contents"] == ["段落 B（新）"]
+        assert save_kwargs["chunk_indexes"] == [1]
+
+        args = service._embed_and_upsert.call_args.args
+        chunk_id_map, positions = args[1], args[2]
+        assert positions == [1]
+        assert chunk_id_map[0] == str(kept_a.id)
+        assert chunk_id_map[2] == str(kept_c.id)
+
+    @pytest.mark.asyncio
+    async def test_moved_and_unembedded_chunks(self, service, repo):
+        """测试插入段落后原有块只更新序号，缺少向量的保留块补做向量化"""
+        first = _row("第一段", 0)
+        second = _row("第二段", 1, has_embedding=False)
+        repo.find_chunk_hashes = AsyncMock(return_value=[first, second])
+        chunks = [_chunk("新开头"), _chunk("第一段"), _chunk("第二段")]
+
+        await service._sync_chunks_incremental(repo, chunks, uuid4(), session=Mock())
+
+        repo.delete_chunks_by_ids.assert_called_once_with([])
+        repo.reindex_chunks.assert_called_once_with([first.id, second.id], [1, 2])
+        assert repo.save_chunks_bulk.call_args.kwargs["chunk_indexes"] == [0]
+        assert service._embed_and_upsert.call_args.args[2] == [0, 2]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_document_skips_embedding(self, service, repo):
+        """测试内容完全未变时不插入、不向量化；重复内容按原序号一一对应"""
+        rows = [_row("重复", 0), _row("重复", 1)]
+        repo.find_chunk_hashes = AsyncMock(return_value=rows)
+
+        await service._sync_chunks_incremental(repo, [_chunk("重复"), _chunk("重复")], uuid4())
+
+        repo.reindex_chunks.assert_called_once_with([], [])
+        repo.save_chunks_bulk.assert_not_called()
+        service._embed_and_upsert.assert_not_called()
@@ -0,0 +1,265 @@
+"""
+IngestionJobQueue / IngestionWorkerPool 单元测试
+"""
+import asyncio
+import pytest
+from uuid import uuid4
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.ingestion_queue import ClaimedJob, IngestionJobQueue, IngestionWorkerPool
+from app.exceptions import UnsupportedFileTypeError
+
+
+def _job(attempts=1, max_attempts=3, job_type="process"):
+    """构造已领取的任务"""
+    return ClaimedJob(
+        id=uuid4(),
+        document_id=uuid4(),
+        job_type=job_type,
+        priority=100,
+        attempts=attempts,
+        max_attempts=max_attempts
+    )
+
+
+class _FakeSession:
+    """记录提交次数的会话"""
+
+    def __init__(self):
+        self.commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def commit(self):
+        self.commits += 1
+
+
+class _FakeQueue:
+    """内存任务队列"""
+
+    stale_seconds = 300
+
+    def __init__(self, jobs):
+        self.jobs = list(jobs)
+        self.completed = []
+        self.failures = []
+        self.released = []
+
+    def retry_delay(self, attempts):
+        return 0.0
+
+    async def claim(self, session, worker_id):
+        return self.jobs.pop(0) if self.jobs else None
+
+    async def complete(self, session, job_id):
+        self.completed.append(job_id)
+
+    async def fail(self, session, job, error, retryable=True):
+        self.failures.append((job.id, error, retryable))
+        return retryable and not job.final_attempt
+
+    async def release(self, session, job_id):
+        self.released.append(job_id)
+
+    async def heartbeat(self, session, job_id):
+        pass
+
+    async def recover_stale(self, session):
+        return {"requeued": 0, "failed": 0}
+
+    async def enqueue_orphaned_documents(self, session):
+        return 0
+
+
+def _pool(queue, concurrency=2):
+    """构造使用内存队列的工作池"""
+    return IngestionWorkerPool(
+        queue=queue,
+        concurrency=concurrency,
+        poll_interval=0.01,
+        heartbeat_seconds=60,
+        session_factory=_FakeSession
+    )
+
+
+class TestIngestionJobQueue:
+    """IngestionJobQueue 单元测试"""
+
+    def test_retry_delay_is_exponential_and_capped(self):
+        """测试重试延迟指数增长且有上限"""
+        queue = IngestionJobQueue(retry_backoff_seconds=10, retry_backoff_max_seconds=35)
+
+        assert [queue.retry_delay(n) for n in (1, 2, 3, 4)] == [10, 20, 35, 35]
+
+    @pytest.mark.asyncio
+    async def test_claim_uses_skip_locked_in_priority_order(self):
+        """测试领取任务使用 SKIP LOCKED 并按优先级排序"""
+        job = _job()
+        row = MagicMock(**{
+            "id": job.id, "document_id": job.document_id, "job_type": "process",
+            "priority": 100, "attempts": 1, "max_attempts": 3
+        })
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=MagicMock(first=MagicMock(return_value=row)))
+
+        claimed = await IngestionJobQueue().claim(session, "worker-1")
+
+        sql = str(session.execute.call_args.args[0])
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "ORDER BY priority, created_at" in sql
+        assert claimed.document_id == job.document_id
+        assert not claimed.final_attempt
+
+    @pytest.mark.asyncio
+    async def test_fail_requeues_until_attempts_exhausted(self):
+        """测试失败后重新排队，用完尝试次数或不可重试时标记 failed"""
+        queue = IngestionJobQueue(max_attempts=3, retry_backoff_seconds=5)
+        session = MagicMock()
+        session.execute = AsyncMock()
+
+        assert await queue.fail(session, _job(attempts=1), "boom") is True
+        params = session.execute.call_args.args[1]
+        assert params["status"] == "queued" and params["delay"] == 5
+
+        assert await queue.fail(session, _job(attempts=3), "boom") is False
+        assert session.execute.call_args.args[1]["status"] == "failed"
+
+        assert await queue.fail(session, _job(attempts=1), "bad file", retryable=False) is False
+        assert session.execute.call_args.args[1]["status"] == "failed"
+
+
+class TestIngestionWorkerPool:
+    """IngestionWorkerPool 单元测试"""
+
+    @pytest.mark.asyncio
+    async def test_runs_jobs_with_bounded_concurrency(self):
+        """测试同时运行的任务数不超过并发度"""
+        jobs = [_job() for _ in range(6)]
+        queue = _FakeQueue(jobs)
+        pool = _pool(queue, concurrency=2)
+        active = 0
+        peak = 0
+
+        async def handler(job):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        pool.register("process", handler)
+        await pool.start()
+        for _ in range(100):
+            if len(queue.completed) == len(jobs):
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+        assert sorted(map(str, queue.completed)) == sorted(str(job.id) for job in jobs)
+        assert peak == 2
+        assert pool.stats()["succeeded"] == 6
+
+    @pytest.mark.asyncio
+    async def test_failures_are_retried_unless_permanent(self):
+        """测试普通错误可重试，永久错误直接失败"""
+        queue = _FakeQueue([])
+        pool = _pool(queue)
+
+        async def transient(job):
+            raise RuntimeError("embedding api down")
+
+        async def permanent(job):
+            raise UnsupportedFileTypeError("image/png")
+
+        pool.register("process", transient)
+        pool.register("reprocess", permanent, permanent_errors=(UnsupportedFileTypeError,))
+
+        await pool._run_job(_job(job_type="process"), "w")
+        await pool._run_job(_job(job_type="reprocess"), "w")
+
+        assert [retryable for _, _, retryable in queue.failures] == [True, False]
+        assert pool.stats()["retried"] == 1
+        assert pool.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_document_job_failures_are_recorded_as_failed(self):
+        """测试文档处理失败或未完成时任务记为失败而不是成功"""
+        from app.services.document_service import DocumentService, register_ingestion_handlers
+
+        queue = _FakeQueue([])
+        pool = _pool(queue)
+        register_ingestion_handlers(pool)
+        missing = _job(attempts=1, job_type="process")
+        unfinished = _job(attempts=3, job_type="reprocess")
+
+        async def fake_db_session():
+            yield MagicMock(close=AsyncMock(), commit=AsyncMock(), rollback=AsyncMock())
+
+        with patch("app.core.database.AsyncSessionLocal", _FakeSession), \
+             patch("app.core.database.get_db_session", fake_db_session), \
+             patch("app.repositories.document_repository.DocumentRepository.find_by_id", AsyncMock(return_value=None)), \
+             patch("app.repositories.document_repository.DocumentRepository.update_status", AsyncMock()):
+            await pool._run_job(missing, "w")
+            with patch.object(DocumentService, "_process_document_async", AsyncMock(return_value=None)):
+                await pool._run_job(unfinished, "w")
+
+        assert [(job_id, retryable) for job_id, _, retryable in queue.failures] == [
+            (missing.id, False), (unfinished.id, True)
+        ]
+        assert queue.completed == []
+        assert pool.stats()["succeeded"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancellation_inside_handler_does_not_stop_worker(self):
+        """测试处理函数内部抛出 CancelledError（非停机）时按可重试失败记录，工作协程继续消费"""
+        cancelled, healthy = _job(), _job()
+        queue = _FakeQueue([cancelled, healthy])
+        pool = _pool(queue, concurrency=1)
+        done = asyncio.Event()
+
+        async def handler(job):
+            if job is cancelled:
+                raise asyncio.CancelledError()
+            done.set()
+
+        pool.register("process", handler)
+        await pool.start()
+        await asyncio.wait_for(done.wait(), timeout=1)
+        await asyncio.sleep(0.05)
+        await pool.stop()
+
+        assert [(job_id, retryable) for job_id, _, retryable in queue.failures] == [(cancelled.id, True)]
+        assert queue.completed == [healthy.id]
+        assert queue.released == []
+
+    @pytest.mark.asyncio
+    async def test_stop_releases_running_job(self):
+        """测试停机时运行中的任务归还到队列"""
+        job = _job()
+        queue = _FakeQueue([job])
+        pool = _pool(queue, concurrency=1)
+        started = asyncio.Event()
+
+        async def handler(claimed):
+            started.set()
+            await asyncio.sleep(10)
+
+        pool.register("process", handler)
+        await pool.start()
+        await asyncio.wait_for(started.wait(), timeout=1)
+        await pool.stop()
+
+        assert queue.released == [job.id]
+        assert queue.completed == []
+
+    @pytest.mark.asyncio
+    async def test_disabled_pool_does_not_start(self):
+        """测试并发度为 0 时本实例不消费任务"""
+        pool = _pool(_FakeQueue([_job()]), concurrency=0)
+
+        await pool.start()
+
+        assert pool._tasks == []
@@ -0,0 +1,66 @@
+"""
+日志开销控制单元测试
+"""
+import structlog
+import pytest
+from unittest.mock import Mock
+from app.utils.logger import (
+    EventSampler, build_processors, drop_verbose_fields, lazy, parse_sample_rates, resolve_lazy_fields, verbose
+)
+
+
+def _capture(processors):
+    """用给定处理器链（去掉最终渲染器）包装一个记录输出的 logger"""
+    output = []
+    logger = structlog.wrap_logger(
+        Mock(),
+        processors=processors + [lambda _, __, event_dict: output.append(event_dict) or ""],
+    )
+    return logger, output
+
+
+class TestEventSampler:
+    """EventSampler 单元测试"""
+
+    def test_sampling_by_event_pattern_never_drops_warnings(self):
+        """测试按事件名（通配符/精确名称优先）采样，警告不采样"""
+        sampler = EventSampler({"step*_started": 0.0, "step1_started": 1.0}, rng=lambda: 0.5)
+
+        with pytest.raises(structlog.DropEvent):
+            sampler(None, "info", {"event": "step2_started"})
+        assert sampler(None, "info", {"event": "step1_started"})
+        assert sampler(None, "warning", {"event": "step2_started"})
+        assert sampler(None, "info", {"event": "rag_query_started"})
+        assert sampler.dropped == 1
+
+    def test_parse_sample_rates(self):
+        """测试采样率配置解析（忽略空项，限制在 0~1）"""
+        assert parse_sample_rates(" a=0.1, b*=2 ,,bad") == {"a": 0.1, "b*": 1.0}
+
+
+class TestLazyFields:
+    """延迟字段单元测试"""
+
+    def test_dropped_events_never_compute_fields(self):
+        """测试被采样丢弃的日志不计算延迟字段"""
+        expensive = Mock(return_value=1)
+        logger, output = _capture([EventSampler({"hot": 0.0}), resolve_lazy_fields])
+
+        logger.info("hot", value=lazy(expensive))
+        logger.info("cold", value=lazy(expensive), n=lazy(len, [1, 2]))
+
+        assert expensive.call_count == 1
+        assert output == [{"event": "cold", "value": 1, "n": 2}]
+
+    def test_production_profile_drops_verbose_fields(self):
+        """测试 production 配置丢弃调试负载字段且不计算"""
+        preview = Mock(return_value="preview")
+        processors = build_processors("production", {}, use_json_format=True)
+
+        assert drop_verbose_fields in processors
+        assert any(isinstance(p, EventSampler) for p in processors)
+        logger, output = _capture([drop_verbose_fields, resolve_lazy_fields])
+        logger.info("rag_query_started", preview=verbose(preview), size=lazy(len, "abc"))
+
+        preview.assert_not_called()
+        assert output == [{"event": "rag_query_started", "size": 3}]
@@ -0,0 +1,98 @@
+"""
+指标与请求追踪单元测试
+"""
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.core.metrics import Histogram, MetricsRegistry, GaugeFamily, RequestTrace, RAG_STAGE_SECONDS, RAG_QUERIES
+from app.services.rag_service import RAGService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMetricsRegistry:
+    """MetricsRegistry 单元测试"""
+
+    def test_histogram_renders_cumulative_buckets(self):
+        """测试直方图按累积桶、_sum、_count 输出"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("stage_seconds", "Stage duration", ("stage",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage="embed")
+        histogram.observe(0.5, stage="embed")
+        histogram.observe(3.0, stage="embed")
+
+        text = registry.render()
+
+        assert "# TYPE stage_seconds histogram" in text
+        assert 'stage_seconds_bucket{stage="embed",le="0.1"} 1' in text
+        assert 'stage_seconds_bucket{stage="embed",le="1"} 2' in text
+        assert 'stage_seconds_bucket{stage="embed",le="+Inf"} 3' in text
+        assert 'stage_seconds_sum{stage="embed"} 3.55' in text
+        assert 'stage_seconds_count{stage="embed"} 3' in text
+
+    def test_collectors_render_gauges_and_failures_are_skipped(self):
+        """测试采集函数输出仪表（标签值转义），单个采集失败不影响其他指标"""
+        registry = MetricsRegistry()
+        registry.counter("queries", "Queries", ("outcome",)).inc(outcome="answered")
+
+        def pools():
+            family = GaugeFamily("pool_connections", "Connections")
+            family.add(3, endpoint='dash"scope')
+            return [family]
+
+        def broken():
+            raise RuntimeError("boom")
+
+        registry.register_collector(broken)
+        registry.register_collector(pools)
+        text = registry.render()
+
+        assert "# TYPE queries_total counter" in text
+        assert 'queries_total{outcome="answered"} 1' in text
+        assert "# TYPE pool_connections gauge" in text
+        assert 'pool_connections{endpoint="dash\\"scope"} 3' in text
+
+
+class TestRequestTrace:
+    """RequestTrace 单元测试"""
+
+    def test_spans_and_finish_record_stage_histograms(self):
+        """测试阶段耗时写入直方图，finish 只记录一次 total 和结果"""
+        clock = FakeClock()
+        trace = RequestTrace("trace-1", clock=clock)
+        embed_before = RAG_STAGE_SECONDS.count(stage="embed")
+        total_before = RAG_STAGE_SECONDS.count(stage="total")
+        answered_before = RAG_QUERIES.value(outcome="answered")
+
+        with trace.span("embed"):
+            clock.now += 0.2
+        clock.now += 0.3
+        trace.finish("answered")
+        trace.finish("error")
+
+        assert trace.durations["embed"] == pytest.approx(0.2)
+        assert trace.durations["total"] == pytest.approx(0.5)
+        assert trace.outcome == "answered"
+        assert RAG_STAGE_SECONDS.count(stage="embed") == embed_before + 1
+        assert RAG_STAGE_SECONDS.count(stage="total") == total_before + 1
+        assert RAG_QUERIES.value(outcome="answered") == answered_before + 1
+
+    @pytest.mark.asyncio
+    async def test_rag_query_traces_stages_until_early_exit(self):
+        """测试 RAG 查询在没有检索结果时记录已执行阶段和结果"""
+        embedding_svc = Mock(embed_query=AsyncMock(return_value=[0.1, 0.2]))
+        service = RAGService(embedding_svc, Mock(), Mock(), answer_cache=None, query_expander=None)
+        service._retrieve_chunks = AsyncMock(return_value=[])
+        trace = RequestTrace("trace-2")
+
+        tokens = [token async for token in service.query("问题", trace=trace)]
+
+        assert tokens
+        assert trace.outcome == "no_documents"
+        assert {"embed", "search", "total"} <= set(trace.durations)
+        assert "rerank" not in trace.durations
@@ -0,0 +1,156 @@
+"""
+多查询检索（查询扩展预算、批量向量化、多路融合）单元测试
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from app.core.cache import TTLCache
+from app.services.embedding_service import EmbeddingService
+from app.services.query_expander import QueryExpander
+from app.services.rag_service import RAGService
+from app.services.vector_service_adapter import VectorServiceAdapter
+
+
+def _match(match_id, score=0.5):
+    return {"id": match_id, "score": score, "metadata": {"content": match_id}}
+
+
+class FakePGService:
+    """模拟 PostgreSQL 向量服务（类名用于适配器分支判断）"""
+
+
+FakePGService.__name__ = "PostgreSQLVectorService"
+
+
+def _expander(**kwargs):
+    """不访问网络的扩展器"""
+    cache = TTLCache(name="test_query_expansion", max_size=16, ttl_seconds=60)
+    return QueryExpander(llm_api_key="test-key", llm_model="test-model", cache=cache, **kwargs)
+
+
+class TestExpandWithBudget:
+    """QueryExpander.expand_with_budget 测试"""
+
+    @pytest.mark.asyncio
+    async def test_over_budget_returns_question_and_fills_cache(self):
+        """测试扩展超时先返回原问题，后台完成后写入缓存，下次命中"""
+        expander = _expander()
+
+        async def slow_request(question):
+            await asyncio.sleep(0.05)
+            return ["变体一", "变体二", "变体一"]
+
+        expander._request_expansions = AsyncMock(side_effect=slow_request)
+
+        assert await expander.expand_with_budget("原问题", budget_seconds=0.001) == ["原问题"]
+        await asyncio.sleep(0.1)
+
+        queries = await expander.expand_with_budget("  原问题 ", budget_seconds=0.001, max_variants=4)
+
+        assert queries == ["  原问题 ", "变体一", "变体二"]
+        expander._request_expansions.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_expansion_across_instances(self):
+        """测试每个请求各自创建扩展器时，相同问题并发也只请求一次，超时后后台任务仍被持有"""
+        from app.services import query_expander as query_expander_module
+
+        release = asyncio.Event()
+        cache = TTLCache(name="test_query_expansion_shared", max_size=16, ttl_seconds=60)
+        request = AsyncMock(return_value=["变体"])
+
+        async def slow_request(question):
+            await release.wait()
+            return await request(question)
+
+        expanders = [
+            QueryExpander(llm_api_key="test-key", llm_model="shared-model", cache=cache) for _ in range(3)
+        ]
+        for expander in expanders:
+            expander._request_expansions = slow_request
+
+        results = await asyncio.gather(*(
+            expander.expand_with_budget("同一个问题", budget_seconds=0.01) for expander in expanders
+        ))
+        key = expanders[0].cache_key("同一个问题")
+
+        assert results == [["同一个问题"]] * 3
+        assert key in query_expander_module._pending_expansions
+        release.set()
+        await query_expander_module._pending_expansions[key]
+        await asyncio.sleep(0)
+
+        request.assert_awaited_once()
+        assert key not in query_expander_module._pending_expansions
+        assert await expanders[2].expand_with_budget("同一个问题", budget_seconds=0.01) == ["同一个问题", "变体"]
+
+    @pytest.mark.asyncio
+    async def test_failed_expansion_is_not_cached(self):
+        """测试扩展失败时返回原问题且不写缓存"""
+        expander = _expander()
+        expander._request_expansions = AsyncMock(return_value=None)
+
+        assert await expander.expand_with_budget("问题", budget_seconds=1) == ["问题"]
+        assert await expander.expand_with_budget("问题", budget_seconds=1) == ["问题"]
+        assert expander._request_expansions.await_count == 2
+
+
+class TestEmbedQueries:
+    """EmbeddingService.embed_queries 测试"""
+
+    @pytest.mark.asyncio
+    async def test_misses_are_embedded_in_one_request(self):
+        """测试缓存命中的查询不再请求，其余合并为一次批量请求"""
+        cache = TTLCache(name="test_query_embedding", max_size=16, ttl_seconds=60)
+        service = EmbeddingService(http_client=Mock(), query_cache=cache)
+        await cache.set(service.query_cache_key("原问题"), [1.0])
+        service.embed_batch_request = AsyncMock(return_value=[[2.0], [3.0]])
+
+        vectors = await service.embed_queries(["原问题", "变体一", "变体二"])
+
+        assert vectors == [[1.0], [2.0], [3.0]]
+        service.embed_batch_request.assert_awaited_once_with(["变体一", "变体二"])
+        assert await cache.get(service.query_cache_key("变体二")) == [3.0]
+
+
+class TestMultiQuerySearch:
+    """多查询检索融合测试"""
+
+    @pytest.mark.asyncio
+    async def test_fuses_all_queries_and_lexical_leg(self):
+        """测试各查询的向量结果与全文检索结果一起按 RRF 融合"""
+        adapter = VectorServiceAdapter(FakePGService())
+        adapter.batch_similarity_search = AsyncMock(return_value=[
+            [_match("a"), _match("b")],
+            [_match("b"), _match("c")],
+        ])
+
+        with patch(
+            "app.services.lexical_search_service.LexicalSearchService.search",
+            AsyncMock(return_value=[_match("b"), _match("d")])
+        ):
+            fused = await adapter.multi_query_search(
+                ["原问题", "变体"], [[0.1], [0.2]], top_k=3, lexical_query="原问题"
+            )
+
+        assert [m["id"] for m in fused] == ["b", "a", "c"]
+        adapter.batch_similarity_search.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_rag_service_falls_back_to_single_query(self):
+        """测试扩展未返回变体时走单查询检索"""
+        expander = Mock(expand_with_budget=AsyncMock(return_value=["问题"]))
+        embedding_svc = Mock(embed_query=AsyncMock(return_value=[0.1]), embed_queries=AsyncMock())
+        vector_svc = Mock(
+            similarity_search=AsyncMock(return_value=[_match("a")]),
+            multi_query_search=AsyncMock()
+        )
+        service = RAGService(embedding_svc, vector_svc, Mock(), query_expander=expander)
+
+        with patch("app.services.rag_service.settings.MULTI_QUERY_ENABLED", True), \
+                patch("app.services.rag_service.settings.HYBRID_SEARCH_ENABLED", False):
+            chunks = await service._retrieve("问题", top_k=5)
+
+        assert [m["id"] for m in chunks] == ["a"]
+        embedding_svc.embed_queries.assert_not_awaited()
+        vector_svc.multi_query_search.assert_not_awaited()
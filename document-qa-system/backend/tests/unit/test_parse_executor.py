@@ -0,0 +1,88 @@
+"""
+ParseExecutor 单元测试
+"""
+import asyncio
+import pickle
+import time
+import pytest
+from app.core.parse_executor import ParseExecutor
+from app.exceptions import DocumentParseError, UnsupportedFileTypeError
+
+
+def _slow_job(seconds):
+    """模拟耗时任务"""
+    time.sleep(seconds)
+    return "done"
+
+
+class TestParseExecutor:
+    """ParseExecutor 单元测试"""
+
+    @pytest.mark.asyncio
+    async def test_process_pool_parses_and_chunks(self):
+        """测试在子进程中完成解析和分块"""
+        executor = ParseExecutor(mode="process", max_workers=1, timeout_seconds=60)
+        content = ("第一段内容。" * 50 + "\n\n" + "第二段内容。" * 50).encode("utf-8")
+
+        try:
+            text_content, chunks = await executor.parse_and_chunk("text/plain", content, 200, 20)
+        finally:
+            executor.shutdown()
+
+        assert "第一段内容" in text_content
+        assert len(chunks) > 1
+        assert all(chunk.content for chunk in chunks)
+
+    @pytest.mark.asyncio
+    async def test_timeout_raises_parse_error_and_resets_pool(self):
+        """测试超时抛出 DocumentParseError 并丢弃旧执行池"""
+        executor = ParseExecutor(mode="thread", max_workers=1, timeout_seconds=0.05)
+
+        with pytest.raises(DocumentParseError):
+            await executor.run(_slow_job, 0.5)
+
+        assert executor._pool is None
+        executor.timeout_seconds = 5
+        assert await executor.run(_slow_job, 0) == "done"
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_queue_wait_does_not_count_towards_timeout(self):
+        """测试排队等待槽位的时间不计入超时，后提交的短任务不会因排队超时"""
+        executor = ParseExecutor(mode="thread", max_workers=1, timeout_seconds=0.5)
+
+        try:
+            results = await asyncio.gather(*(executor.run(_slow_job, 0.2) for _ in range(4)))
+        finally:
+            executor.shutdown()
+
+        assert results == ["done"] * 4
+
+    @pytest.mark.asyncio
+    async def test_job_killed_by_other_timeout_is_resubmitted(self):
+        """测试进程池因其他任务超时重建时，被一起终止的任务在新进程池中重新执行"""
+        executor = ParseExecutor(mode="process", max_workers=2, timeout_seconds=30)
+
+        try:
+            running = asyncio.create_task(executor.run(_slow_job, 1.0))
+            # 等待子进程启动并开始执行，再模拟另一个任务超时重建进程池
+            await asyncio.sleep(0.5)
+            executor._restart_pool(executor._pool, "timeout")
+
+            assert await running == "done"
+        finally:
+            executor.shutdown()
+
+    def test_invalid_mode(self):
+        """测试不支持的模式"""
+        with pytest.raises(ValueError):
+            ParseExecutor(mode="fork")
+
+    def test_app_exceptions_survive_pickle(self):
+        """测试业务异常跨进程传递时保留类型和字段"""
+        error = pickle.loads(pickle.dumps(UnsupportedFileTypeError("image/png")))
+
+        assert isinstance(error, UnsupportedFileTypeError)
+        assert error.code == "UNSUPPORTED_FILE_TYPE"
+        assert error.status_code == 400
+        assert error.message == "不支持的文件格式：image/png"
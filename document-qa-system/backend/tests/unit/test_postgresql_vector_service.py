@@ -0,0 +1,127 @@
+"""
+PostgreSQLVectorService 单元测试
+"""
+import uuid
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app.services.postgresql_vector_service import PostgreSQLVectorService
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def _mock_session(rows):
+    """构造返回指定行的模拟会话"""
+    result = MagicMock()
+    result.fetchall.return_value = rows
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+class TestPostgreSQLVectorService:
+    """PostgreSQLVectorService 单元测试"""
+
+    @pytest.mark.asyncio
+    async def test_similarity_search_does_not_select_embedding(self):
+        """测试检索 SQL 不回传 embedding 列，查询向量以 float4[] 绑定"""
+        service = PostgreSQLVectorService()
+        service.index_manager.apply_search_params = AsyncMock()
+        doc_id = uuid.uuid4()
+        session = _mock_session([
+            SimpleNamespace(
+                id=uuid.uuid4(), document_id=doc_id, chunk_index=0,
+                content="内容", token_count=3, cosine_distance=0.25
+            )
+        ])
+
+        matches = await service.similarity_search(
+            session, [0.5] * settings.VECTOR_DIMENSION, top_k=5,
+            filter_dict={"document_id": str(doc_id)}
+        )
+
+        sql, params = session.execute.call_args[0]
+        select_list = str(sql).split("FROM")[0]
+        assert "embedding," not in select_list
+        assert "AS REAL[]" in str(sql)
+        assert "document_id = :document_id" in str(sql)
+        assert isinstance(params["query_vector"], list)
+        assert params["query_vector"][0] == 0.5
+        assert matches[0]["score"] == 0.75
+        assert matches[0]["metadata"]["content"] == "内容"
+
+    @pytest.mark.asyncio
+    async def test_similarity_search_without_metadata_skips_content(self):
+        """测试 include_metadata=False 时不读取 content 列"""
+        service = PostgreSQLVectorService()
+        service.index_manager.apply_search_params = AsyncMock()
+        session = _mock_session([])
+
+        await service.similarity_search(
+            session, [0.1] * settings.VECTOR_DIMENSION, include_metadata=False
+        )
+
+        sql = str(session.execute.call_args[0][0])
+        assert "NULL AS content" in sql
+
+    @pytest.mark.asyncio
+    async def test_batch_similarity_search_single_statement(self):
+        """测试批量检索一次往返并按查询序号分组结果"""
+        service = PostgreSQLVectorService()
+        service.index_manager.apply_search_params = AsyncMock()
+        dim = settings.VECTOR_DIMENSION
+        doc_id = uuid.uuid4()
+
+        def row(ord_, distance):
+            return SimpleNamespace(
+                ord=ord_, id=uuid.uuid4(), document_id=doc_id, chunk_index=0,
+                content="c", token_count=1, cosine_distance=distance
+            )
+
+        session = _mock_session([row(1, 0.1), row(1, 0.2), row(3, 0.3)])
+
+        results = await service.batch_similarity_search(
+            session, [[0.1] * dim, [0.2] * dim, [0.3] * dim], top_k=2
+        )
+
+        assert session.execute.await_count == 1
+        sql, params = session.execute.call_args[0]
+        assert "CROSS JOIN LATERAL" in str(sql)
+        assert params["query_count"] == 3
+        assert len(params["query_vectors"]) == 3 * dim
+        assert [len(matches) for matches in results] == [2, 0, 1]
+        assert results[2][0]["score"] == pytest.approx(0.7)
+
+    @pytest.mark.asyncio
+    async def test_batch_similarity_search_empty(self):
+        """测试空查询列表不访问数据库"""
+        service = PostgreSQLVectorService()
+        session = _mock_session([])
+
+        assert await service.batch_similarity_search(session, []) == []
+        session.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_upsert_vectors_single_statement_per_batch(self):
+        """测试批量更新向量：每批一条 UPDATE ... FROM unnest，不覆盖 content"""
+        service = PostgreSQLVectorService()
+        dim = settings.VECTOR_DIMENSION
+        result = MagicMock()
+        result.rowcount = 2
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=result)
+        vectors = [
+            {"id": str(uuid.uuid4()), "values": [0.1] * dim, "metadata": {"content": "截断内容"}},
+            {"id": str(uuid.uuid4()), "values": [0.2] * dim, "metadata": {}},
+        ]
+
+        await service.upsert_vectors(session, vectors)
+
+        assert session.execute.await_count == 1
+        sql, params = session.execute.call_args[0]
+        assert "FROM unnest" in str(sql)
+        assert "content =" not in str(sql)
+        assert len(params["embeddings"]) == 2 * dim
+        assert params["metadata"][1] is None
+        assert "截断内容" in params["metadata"][0]
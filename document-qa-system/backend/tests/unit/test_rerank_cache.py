@@ -0,0 +1,68 @@
+"""
+重排序分数缓存单元测试
+"""
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.core.cache import TTLCache
+from app.services.rag_service import RAGService
+from app.services.rerank_service import RerankService
+
+
+def _service():
+    cache = TTLCache(name="test_rerank_score", max_size=100, ttl_seconds=60)
+    return RerankService(http_client=Mock(), score_cache=cache)
+
+
+class TestRerankCached:
+    """RerankService.rerank_cached 测试"""
+
+    @pytest.mark.asyncio
+    async def test_partial_hit_only_reranks_uncached_candidates(self):
+        """测试部分命中时只把未缓存的候选发给 API，合并后排序"""
+        service = _service()
+        service.rerank = AsyncMock(return_value=[
+            {"index": 1, "relevance_score": 0.9},
+            {"index": 0, "relevance_score": 0.2},
+        ])
+        await service.rerank_cached("问题", ["文档A", "文档B"], ["a", "b"], top_k=2)
+
+        service.rerank = AsyncMock(return_value=[{"index": 0, "relevance_score": 0.5}])
+        results = await service.rerank_cached(" 问题", ["文档A", "文档B", "文档C"], ["a", "b", "c"], top_k=2)
+
+        service.rerank.assert_awaited_once_with(query=" 问题", documents=["文档C"], top_k=1)
+        assert results == [
+            {"index": 1, "relevance_score": 0.9},
+            {"index": 2, "relevance_score": 0.5},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_changed_content_misses_cache(self):
+        """测试同一块内容变化后不复用旧分数，完全命中时不调用 API"""
+        service = _service()
+        service.rerank = AsyncMock(return_value=[{"index": 0, "relevance_score": 0.7}])
+
+        await service.rerank_cached("问题", ["旧内容"], ["a"])
+        await service.rerank_cached("问题", ["旧内容"], ["a"])
+        await service.rerank_cached("问题", ["新内容"], ["a"])
+
+        assert service.rerank.await_count == 2
+
+
+class TestRerankResults:
+    """RAGService._rerank_results 测试"""
+
+    @pytest.mark.asyncio
+    async def test_scores_map_back_to_chunks_with_content(self):
+        """测试没有 metadata 的块被跳过，分数回填到正确的块"""
+        rerank_svc = Mock(rerank_cached=AsyncMock(return_value=[{"index": 1, "relevance_score": 0.8}]))
+        service = RAGService(Mock(), Mock(), rerank_svc)
+        chunks = [
+            {"id": "a", "metadata": {"content": "A"}},
+            {"id": "empty"},
+            {"id": "b", "metadata": {"content": "B"}},
+        ]
+
+        results = await service._rerank_results(chunks, "问题", keep_top_k=1)
+
+        assert [(chunk["id"], chunk["relevance_score"]) for chunk in results] == [("b", 0.8)]
+        assert rerank_svc.rerank_cached.await_args.kwargs["document_ids"] == ["a", "b"]
@@ -0,0 +1,102 @@
+"""
+自适应重排序策略单元测试
+"""
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.evaluation.rerank_tuning import RerankSample, evaluate_policy, grid_search
+from app.services.rag_service import RAGService
+from app.services.rerank_policy import RerankPolicy, SKIP, SHRINK, FULL
+
+
+def _chunks(*scores):
+    return [{"id": f"c{i}", "score": score, "metadata": {"content": f"c{i}"}} for i, score in enumerate(scores)]
+
+
+def _policy(**kwargs):
+    kwargs.setdefault("enabled", True)
+    kwargs.setdefault("skip_min_score", 0.75)
+    kwargs.setdefault("skip_min_gap", 0.12)
+    kwargs.setdefault("shrink_window", 0.2)
+    return RerankPolicy(**kwargs)
+
+
+class TestRerankPolicy:
+    """RerankPolicy 单元测试"""
+
+    def test_decisive_winner_skips(self):
+        """测试第一名足够高且领先明显时跳过"""
+        decision = _policy().decide(_chunks(0.86, 0.70, 0.68), keep_top_k=2)
+
+        assert decision.action == SKIP
+        assert decision.gap == pytest.approx(0.16)
+
+    def test_far_candidates_are_dropped_but_keep_top_k_remains(self):
+        """测试与第一名差距过大的候选不再重排序，但至少保留 keep_top_k 个"""
+        chunks = _chunks(0.70, 0.65, 0.60, 0.30, 0.20)
+
+        assert _policy().decide(chunks, keep_top_k=2).candidates == [0, 1, 2]
+        assert _policy().decide(chunks, keep_top_k=4).candidates == [0, 1, 2, 3]
+        assert _policy(shrink_window=0).decide(chunks, keep_top_k=2).action == FULL
+
+    def test_lexical_only_candidates_are_always_reranked(self):
+        """测试融合结果中只由全文检索召回的候选（无 vector_score）始终保留"""
+        chunks = [
+            {"id": "a", "score": 0.7, "vector_score": 0.7, "rrf_score": 0.03},
+            {"id": "lex", "score": 0.01, "rrf_score": 0.02},
+            {"id": "b", "score": 0.65, "vector_score": 0.65, "rrf_score": 0.02},
+            {"id": "far", "score": 0.2, "vector_score": 0.2, "rrf_score": 0.01},
+        ]
+
+        decision = _policy().decide(chunks, keep_top_k=2)
+
+        assert decision.action == SHRINK
+        assert decision.candidates == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_skip_uses_vector_scores_without_remote_call(self):
+        """测试跳过时不调用重排序，以向量相似度作为 relevance_score"""
+        rerank_svc = Mock(rerank_cached=AsyncMock())
+        service = RAGService(Mock(), Mock(), rerank_svc, rerank_policy=_policy())
+
+        results, decision = await service._rerank_adaptive(_chunks(0.9, 0.5, 0.4), "问题", keep_top_k=2)
+
+        assert decision.action == SKIP
+        assert [(chunk["id"], chunk["relevance_score"]) for chunk in results] == [("c0", 0.9), ("c1", 0.5)]
+        rerank_svc.rerank_cached.assert_not_awaited()
+
+    def test_fallback_does_not_threshold_lexical_only_hits_on_ts_rank(self):
+        """测试不经重排序时只由全文检索召回的结果不以 ts_rank 作为相关性分数"""
+        from app.core.config import get_settings
+
+        threshold = get_settings().RELEVANCE_THRESHOLD
+        chunks = [
+            {"id": "a", "score": 0.03, "vector_score": 0.8, "rrf_score": 0.03},
+            {"id": "lex", "score": 0.001, "rrf_score": 0.02},
+        ]
+
+        results = RAGService._without_rerank(chunks, keep_top_k=2)
+
+        assert [(chunk["id"], chunk["relevance_score"]) for chunk in results] == [("a", 0.8), ("lex", threshold)]
+
+
+class TestRerankTuning:
+    """策略调优回放测试"""
+
+    def test_grid_search_prefers_fast_policy_that_keeps_agreement(self):
+        """测试挑选延迟最低且与完整重排序一致的参数"""
+        decisive = RerankSample("q1", _chunks(0.9, 0.5, 0.4), {0: 0.9, 1: 0.3, 2: 0.2}, full_latency_ms=100)
+        # 向量第一名与重排序第一名不同，跳过会降低一致性
+        misleading = RerankSample("q2", _chunks(0.9, 0.6, 0.55), {0: 0.1, 1: 0.8, 2: 0.7}, full_latency_ms=100)
+
+        summary = evaluate_policy([decisive, misleading], _policy(skip_min_gap=0.25), keep_top_k=1)
+        results, best = grid_search(
+            [decisive, misleading], keep_top_k=1,
+            skip_min_scores=[0.8], skip_min_gaps=[0.25, 0.35], shrink_windows=[0.0],
+            min_agreement=1.0
+        )
+
+        assert summary["skip_rate"] == 1.0
+        assert summary["agreement"] == 0.5
+        assert best["skip_min_gap"] == 0.35
+        assert best["median_latency_ms"] == 50.0
+        assert len(results) == 2
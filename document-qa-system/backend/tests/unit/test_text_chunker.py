@@ -0,0 +1,71 @@
+"""
+TextChunker 单元测试
+"""
+import pytest
+from app.chunkers.semantic_chunker import TextChunker
+
+
+def _assert_exact_offsets(text, chunks, chunk_size):
+    """断言块内容与原文区间一致且不超过块大小"""
+    for chunk in chunks:
+        assert text[chunk.start_index:chunk.end_index] == chunk.content
+        assert 0 < len(chunk.content) <= chunk_size
+
+
+class TestTextChunker:
+    """TextChunker 单元测试"""
+
+    def test_merges_small_paragraphs_with_exact_offsets(self):
+        """测试小段落合并为一块，偏移与原文一致"""
+        text = "  第一段。\n\n第二段。\n \n第三段。  "
+        chunks = TextChunker(chunk_size=100, overlap=10).chunk_by_semantic(text)
+
+        assert len(chunks) == 1
+        assert chunks[0].content == "第一段。\n\n第二段。\n \n第三段。"
+        _assert_exact_offsets(text, chunks, 100)
+
+    def test_adjacent_chunks_overlap(self):
+        """测试相邻块按句子边界重叠，且覆盖全文"""
+        text = "".join(f"第{i}句内容在这里。" for i in range(200))
+        chunks = TextChunker(chunk_size=120, overlap=30).chunk_by_semantic(text)
+
+        _assert_exact_offsets(text, chunks, 120)
+        assert chunks[0].start_index == 0
+        assert chunks[-1].end_index == len(text)
+        for prev, cur in zip(chunks, chunks[1:]):
+            overlap = prev.end_index - cur.start_index
+            assert 0 < overlap <= 30
+            assert text[cur.start_index - 1] == "。"
+
+    def test_zero_overlap_does_not_repeat_text(self):
+        """测试 overlap=0 时块之间不重叠"""
+        text = "".join(f"Sentence number {i} ends here. " for i in range(100))
+        chunks = TextChunker(chunk_size=200, overlap=0).chunk_by_semantic(text)
+
+        _assert_exact_offsets(text, chunks, 200)
+        for prev, cur in zip(chunks, chunks[1:]):
+            assert cur.start_index >= prev.end_index
+
+    def test_long_text_without_boundaries_is_hard_split(self):
+        """测试无标点长串按固定长度拆分，仍保留重叠"""
+        text = "字" * 1000
+        chunks = TextChunker(chunk_size=100, overlap=20).chunk_by_semantic(text)
+
+        _assert_exact_offsets(text, chunks, 100)
+        assert chunks[-1].end_index == len(text)
+        for prev, cur in zip(chunks, chunks[1:]):
+            assert prev.end_index - cur.start_index == 20
+
+    def test_iter_chunks_is_lazy(self):
+        """测试 iter_chunks 为生成器，空文本不产生块"""
+        chunker = TextChunker(chunk_size=50, overlap=10)
+        iterator = chunker.iter_chunks("第一句。" * 100)
+
+        assert next(iterator).start_index == 0
+        assert list(chunker.iter_chunks(" \n\n ")) == []
+
+    @pytest.mark.parametrize("chunk_size, overlap", [(0, 0), (100, 100), (100, -1)])
+    def test_rejects_invalid_arguments(self, chunk_size, overlap):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            TextChunker(chunk_size=chunk_size, overlap=overlap)
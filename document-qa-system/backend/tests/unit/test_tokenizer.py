@@ -0,0 +1,94 @@
+"""
+Token 计数工具单元测试
+"""
+import base64
+import pytest
+from unittest.mock import patch
+from app.utils import tokenizer as tokenizer_module
+from app.utils.tokenizer import HeuristicTokenizer, create_tokenizer
+from app.chunkers.semantic_chunker import TextChunker
+
+
+class TestHeuristicTokenizer:
+    """HeuristicTokenizer 单元测试"""
+
+    def test_counts_chinese_denser_than_english(self):
+        """测试中文按约 1.4 字符/token 估算，英文按约 4 字符/token"""
+        tokenizer = HeuristicTokenizer()
+
+        assert tokenizer.count("") == 0
+        assert tokenizer.count("检索增强生成系统") == 6
+        assert tokenizer.count("retrieval augmented") == 5
+
+    def test_prefix_and_suffix_fit_budget(self):
+        """测试按 token 预算截取前缀/后缀"""
+        tokenizer = HeuristicTokenizer()
+        text = "前言" + "汉字" * 500 + "结尾"
+
+        end = tokenizer.prefix_end(text, 0, len(text), 100)
+        start = tokenizer.suffix_start(text, 0, len(text), 100)
+
+        assert tokenizer.count(text[:end]) <= 100 < tokenizer.count(text[:end + 1])
+        assert tokenizer.count(text[start:]) <= 100 < tokenizer.count(text[start - 1:])
+
+
+class TestCreateTokenizer:
+    """create_tokenizer 单元测试"""
+
+    def test_auto_falls_back_to_heuristic(self):
+        """测试 tiktoken 编码无法加载时 auto 模式退化为估算"""
+        with patch.object(tokenizer_module, "_load_tiktoken_encoding", side_effect=OSError("offline")), \
+             patch.object(tokenizer_module.settings, "TOKENIZER_BPE_FILE", "/missing/qwen.tiktoken"):
+            assert isinstance(create_tokenizer("auto"), HeuristicTokenizer)
+            with pytest.raises(OSError):
+                create_tokenizer("tiktoken")
+
+    def test_auto_without_bpe_file_never_loads_encoding(self):
+        """测试未配置词表文件时 auto 模式直接估算，不加载（下载）内置编码"""
+        with patch.object(tokenizer_module, "_load_tiktoken_encoding") as load, \
+             patch.object(tokenizer_module.settings, "TOKENIZER_BPE_FILE", ""):
+            assert isinstance(create_tokenizer("auto"), HeuristicTokenizer)
+        load.assert_not_called()
+
+    def test_loads_local_bpe_file(self, tmp_path):
+        """测试从本地 .tiktoken 词表文件加载（不访问网络）"""
+        pytest.importorskip("tiktoken")
+        bpe_file = tmp_path / "bytes.tiktoken"
+        bpe_file.write_bytes(b"".join(
+            base64.b64encode(bytes([i])) + b" " + str(i).encode() + b"\n" for i in range(256)
+        ))
+
+        with patch.object(tokenizer_module.settings, "TOKENIZER_BPE_FILE", str(bpe_file)):
+            tokenizer = create_tokenizer("tiktoken")
+
+        # 只有单字节词表时 token 数等于 UTF-8 字节数
+        assert tokenizer.count("ab 中文") == len("ab 中文".encode("utf-8"))
+
+
+class TestTokenBudgetChunking:
+    """TextChunker 按 token 预算分块"""
+
+    def test_char_mode_does_not_load_tokenizer(self):
+        """测试按字符分块时不加载全局 tokenizer"""
+        with patch.object(tokenizer_module, "_tokenizer", None), \
+             patch.object(tokenizer_module, "create_tokenizer") as create:
+            chunks = TextChunker(chunk_size=50, overlap=10).chunk_by_semantic("第一段内容。\n\n第二段内容。" * 10)
+
+        create.assert_not_called()
+        assert all(chunk.token_count > 0 for chunk in chunks)
+
+    def test_chunks_respect_token_budget_with_overlap(self):
+        """测试每块不超过 token 预算，相邻块重叠且偏移准确"""
+        tokenizer = HeuristicTokenizer()
+        text = "\n\n".join(
+            "".join(f"第{i}段第{j}句的内容。" for j in range(12)) for i in range(30)
+        )
+        chunks = TextChunker(chunk_size=120, overlap=20, tokenizer=tokenizer).chunk_by_semantic(text)
+
+        assert len(chunks) > 1
+        assert chunks[-1].end_index == len(text)
+        for chunk in chunks:
+            assert text[chunk.start_index:chunk.end_index] == chunk.content
+            assert chunk.token_count == tokenizer.count(chunk.content) <= 120
+        for prev, cur in zip(chunks, chunks[1:]):
+            assert 0 < tokenizer.count(text[cur.start_index:prev.end_index]) <= 20
@@ -0,0 +1,130 @@
+"""
+流式上传暂存单元测试
+"""
+import hashlib
+import os
+import pytest
+from uuid import uuid4
+from unittest.mock import AsyncMock, Mock, patch
+from app.utils.upload_spool import spool_stream
+from app.services.blob_store import LocalBlobStore
+from app.services.document_service import DocumentService
+from app.repositories.document_repository import DocumentRepository
+from app.exceptions import FileTooLargeError
+
+
+async def _chunks(parts):
+    """模拟请求体字节流"""
+    for part in parts:
+        yield part
+
+
+class TestSpoolStream:
+    """spool_stream 单元测试"""
+
+    @pytest.mark.asyncio
+    async def test_spools_to_disk_with_incremental_hash(self, tmp_path):
+        """测试写入暂存文件并增量计算哈希和大小"""
+        parts = [b"a" * 1000, b"", b"b" * 2500, b"c"]
+        data = b"".join(parts)
+
+        spooled = await spool_stream(_chunks(parts), max_size=10_000, spool_dir=str(tmp_path))
+
+        try:
+            assert spooled.size == len(data)
+            assert spooled.content_hash == hashlib.sha256(data).hexdigest()
+            pieces = [piece async for piece in spooled.iter_pieces(1024)]
+            assert [len(piece) for piece in pieces] == [1024, 1024, 1024, 429]
+            assert b"".join(pieces) == data
+        finally:
+            spooled.cleanup()
+
+        assert not os.path.exists(spooled.path)
+
+    @pytest.mark.asyncio
+    async def test_too_large_aborts_and_removes_spool_file(self, tmp_path):
+        """测试超过大小限制时中止并删除暂存文件"""
+        with pytest.raises(FileTooLargeError):
+            await spool_stream(_chunks([b"x" * 600, b"x" * 600]), max_size=1000, spool_dir=str(tmp_path))
+
+        assert os.listdir(tmp_path) == []
+
+
+class TestUploadSpooledDocument:
+    """DocumentService.upload_spooled_document 单元测试"""
+
+    @pytest.fixture
+    def repo(self):
+        """模拟 Repository"""
+        repo = Mock(spec=DocumentRepository)
+        repo.session = Mock()
+        repo.find_by_content_hash = AsyncMock(return_value=None)
+        repo.save = AsyncMock(return_value=uuid4())
+        return repo
+
+    @pytest.fixture
+    def job_queue(self):
+        """模拟入库任务队列"""
+        queue = Mock()
+        queue.enqueue = AsyncMock(return_value=True)
+        return queue
+
+    @pytest.mark.asyncio
+    async def test_writes_pieces_and_enqueues_job(self, repo, job_queue, tmp_path):
+        """测试逐块写入内容并入队处理任务"""
+        written = []
+
+        async def save_pieces(doc_id, pieces):
+            async for piece in pieces:
+                written.append(piece)
+            return len(written)
+
+        repo.save_document_pieces = AsyncMock(side_effect=save_pieces)
+        with patch("app.services.document_service.get_blob_store", return_value=None):
+            service = DocumentService(repo, Mock(), job_queue=job_queue)
+        spooled = await spool_stream(_chunks([b"hello world"]), spool_dir=str(tmp_path))
+
+        doc_id = await service.upload_spooled_document(spooled, "a.txt", "text/plain")
+
+        assert doc_id == repo.save.return_value
+        saved_doc = repo.save.call_args.args[0]
+        assert saved_doc.file_content is None
+        assert saved_doc.blob_hash is None
+        assert saved_doc.content_hash == spooled.content_hash
+        assert b"".join(written) == b"hello world"
+        job_queue.enqueue.assert_called_once()
+        spooled.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_moves_spool_file_into_blob_store(self, repo, job_queue, tmp_path):
+        """测试启用 blob 存储时暂存文件移入存储，不写入数据库分块"""
+        store = LocalBlobStore(str(tmp_path / "blobs"))
+        repo.save_document_pieces = AsyncMock()
+        service = DocumentService(repo, Mock(), job_queue=job_queue, blob_store=store)
+        spooled = await spool_stream(_chunks([b"hello ", b"blob"]), spool_dir=str(tmp_path))
+
+        await service.upload_spooled_document(spooled, "a.txt", "text/plain")
+
+        saved_doc = repo.save.call_args.args[0]
+        assert saved_doc.blob_hash == spooled.content_hash
+        assert await store.read(spooled.content_hash) == b"hello blob"
+        assert not os.path.exists(spooled.path)
+        repo.save_document_pieces.assert_not_called()
+        job_queue.enqueue.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_duplicate_content_returns_existing_document(self, repo, job_queue, tmp_path):
+        """测试相同内容直接返回已有文档，不重复写入"""
+        existing = Mock(id=uuid4())
+        repo.find_by_content_hash = AsyncMock(return_value=existing)
+        repo.save_document_pieces = AsyncMock()
+        service = DocumentService(repo, Mock(), job_queue=job_queue)
+        spooled = await spool_stream(_chunks([b"same"]), spool_dir=str(tmp_path))
+
+        doc_id = await service.upload_spooled_document(spooled, "a.txt", "text/plain")
+
+        assert doc_id == existing.id
+        repo.save.assert_not_called()
+        repo.save_document_pieces.assert_not_called()
+        job_queue.enqueue.assert_not_called()
+        spooled.cleanup()
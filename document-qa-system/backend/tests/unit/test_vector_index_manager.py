@@ -0,0 +1,86 @@
+"""
+VectorIndexManager 单元测试
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.services.vector_index_manager import VectorIndexManager
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class TestVectorIndexManager:
+    """VectorIndexManager 单元测试"""
+
+    def test_build_create_sql_hnsw(self):
+        """测试 HNSW 索引 DDL 使用配置参数和余弦运算符类"""
+        manager = VectorIndexManager(index_type="hnsw")
+
+        sql = manager.build_create_sql()
+
+        assert "USING hnsw (embedding vector_cosine_ops)" in sql
+        assert f"m = {settings.HNSW_M}" in sql
+        assert f"ef_construction = {settings.HNSW_EF_CONSTRUCTION}" in sql
+        assert "CONCURRENTLY" not in sql
+
+    def test_build_create_sql_ivfflat_concurrently(self):
+        """测试 IVFFlat 在线创建 DDL"""
+        manager = VectorIndexManager(index_type="ivfflat")
+
+        sql = manager.build_create_sql(index_name="tmp_idx", concurrently=True)
+
+        assert sql.startswith("CREATE INDEX CONCURRENTLY IF NOT EXISTS tmp_idx")
+        assert f"lists = {settings.IVFFLAT_LISTS}" in sql
+
+    def test_unsupported_index_type(self):
+        """测试不支持的索引类型"""
+        with pytest.raises(ValueError):
+            VectorIndexManager(index_type="flat")
+
+    def test_hnsw_ef_search_not_below_top_k(self):
+        """测试 ef_search 不小于 top_k"""
+        manager = VectorIndexManager(index_type="hnsw")
+
+        assert manager.search_params(search_effort=10, top_k=50) == {"hnsw.ef_search": "50"}
+        assert manager.search_params(search_effort=200, top_k=10) == {"hnsw.ef_search": "200"}
+        assert manager.search_params(top_k=1) == {"hnsw.ef_search": str(settings.HNSW_EF_SEARCH)}
+
+    def test_ivfflat_probes_capped_by_lists(self):
+        """测试 probes 不超过 lists"""
+        manager = VectorIndexManager(index_type="ivfflat")
+
+        params = manager.search_params(search_effort=settings.IVFFLAT_LISTS * 10)
+
+        assert params == {"ivfflat.probes": str(settings.IVFFLAT_LISTS)}
+
+    @pytest.mark.asyncio
+    async def test_ensure_index_creates_missing_index(self):
+        """测试索引缺失时自动创建"""
+        manager = VectorIndexManager(index_type="hnsw")
+        manager.validate_index = AsyncMock(side_effect=[
+            {"exists": False, "healthy": False, "issues": ["missing"]},
+            {"exists": True, "healthy": True, "issues": []},
+        ])
+        conn = MagicMock()
+        conn.execute = AsyncMock()
+
+        report = await manager.ensure_index(conn)
+
+        assert report["healthy"] is True
+        executed_sql = str(conn.execute.call_args[0][0])
+        assert "USING hnsw" in executed_sql
+
+    @pytest.mark.asyncio
+    async def test_ensure_index_does_not_rebuild_mismatched_index(self):
+        """测试参数不一致时仅告警不重建"""
+        manager = VectorIndexManager(index_type="hnsw")
+        manager.validate_index = AsyncMock(return_value={
+            "exists": True, "healthy": False, "issues": ["option_mismatch:m"]
+        })
+        conn = MagicMock()
+        conn.execute = AsyncMock()
+
+        report = await manager.ensure_index(conn)
+
+        assert report["issues"] == ["option_mismatch:m"]
+        conn.execute.assert_not_called()